@@ -0,0 +1,66 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from langchain_core.messages import AIMessage
+
+# A step is either the reply text, a dict with "content" and/or "tool_calls"
+# ([{"name": ..., "args": {...}}]), or a callable that receives the message
+# list and returns one of those.
+Step = Union[str, Dict[str, Any], Callable[[List[Any]], Union[str, Dict[str, Any]]]]
+
+
+class ScriptedChatModel:
+    """
+    Deterministic stand-in for the Ollama chat model. Replays a fixed script of
+    replies and tool calls, so orchestrator overhead can be measured without
+    any model latency. An optional `latency` (seconds) simulates model time.
+    """
+
+    def __init__(self, script: Optional[List[Step]] = None, latency: float = 0.0, default_reply: str = "OK."):
+        self.script = list(script or [])
+        self.latency = latency
+        self.default_reply = default_reply
+        self.calls = 0
+        self.total_time = 0.0
+        self.history: List[List[Any]] = []
+
+    def extend(self, steps: List[Step]) -> None:
+        self.script.extend(steps)
+
+    def reset_stats(self) -> None:
+        self.calls = 0
+        self.total_time = 0.0
+        self.history = []
+
+    async def ainvoke(self, messages: List[Any]) -> AIMessage:
+        started = time.perf_counter()
+        self.calls += 1
+        self.history.append(list(messages))
+
+        step = self.script.pop(0) if self.script else self.default_reply
+        if callable(step):
+            step = step(messages)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(step, str):
+            message = AIMessage(content=step)
+        else:
+            tool_calls = [
+                {
+                    "name": tc["name"],
+                    "args": dict(tc.get("args") or {}),
+                    "id": tc.get("id") or f"call_{uuid.uuid4().hex[:8]}",
+                }
+                for tc in step.get("tool_calls", [])
+            ]
+            message = AIMessage(content=step.get("content", ""), tool_calls=tool_calls)
+
+        self.total_time += time.perf_counter() - started
+        return message
+
+    def bind_tools(self, tools: Any) -> "ScriptedChatModel":
+        return self
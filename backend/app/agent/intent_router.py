@@ -0,0 +1,300 @@
+"""
+Rule-based intent router for agent turns that never need the LLM.
+
+Handles "nearest station to X", "is <station> free at <time>", availability
+listings and cancelling an upcoming booking directly against the crud layer.
+Each handler returns the same reply shape as process_agent_message, or None so
+the turn falls through to the booking fast paths and finally the model.
+"""
+
+import difflib
+import re
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .parsing import _convert_time_to_24h, _resolve_relative_date
+from .tools.charging import find_available_slots, find_time_alternatives, list_stations
+from .tools.location import tool_geocode_location
+from ..crud.bookings import get_booking, list_upcoming_user_bookings, update_booking
+from ..crud.station import find_nearby_stations, find_stations_by_coordinates
+from ..models.booking_model import BookingUpdate
+from ..utils import metrics
+
+CONFIRM_WORDS = ("yes", "y", "ok", "okay", "sure", "proceed", "confirm", "yes cancel it", "cancel it")
+
+# "nearest station to ISBT", "closest charging stations near Connaught Place"
+NEAREST_RE = re.compile(
+    r'\b(?:nearest|closest|nearby|stations?)\b.*?\b(?:to|near|around|close to)\s+(?P<place>[^?!.]+)',
+    re.IGNORECASE,
+)
+# "is Central EV Hub free at 3pm tomorrow?"
+FREE_AT_RE = re.compile(
+    r'^\s*(?:is|are)\s+(?:the\s+)?(?P<station>.+?)\s+(?:free|available|open|vacant)\b(?P<rest>.*)$',
+    re.IGNORECASE,
+)
+# "which stations have free slots", "show available stations", "any free slots?"
+AVAILABILITY_RE = re.compile(
+    r'\b(?:free|available|open|vacant)\s+(?:charging\s+)?(?:slots?|stations?|chargers?)\b'
+    r'|\b(?:stations?|slots?|chargers?)\b.*\b(?:free|available|open|vacant)\b',
+    re.IGNORECASE,
+)
+CANCEL_RE = re.compile(r'\bcancel\b.*\bbookings?\b', re.IGNORECASE)
+CANCEL_NTH_RE = re.compile(r'\bcancel\s+(?:booking\s+)?(?:#|no\.?\s*)?(\d{1,2})\b', re.IGNORECASE)
+SELF_LOCATIONS = {"me", "my location", "here", "my place", "current location", "my current location"}
+# Words in "is <station> free" that never name a station
+STATION_STOPWORDS = {
+    "it", "its", "there", "this", "that", "these", "those", "they", "them", "one", "ones", "he", "she",
+    "the", "a", "an", "any", "my", "your", "our", "same", "slot", "slots", "charger", "chargers", "place",
+}
+MIN_STATION_QUERY_CHARS = 3
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Fast-path accounting
+# ─────────────────────────────────────────────────────────────────────────────
+
+_turn_stats: Counter = Counter()
+
+
+def record_turn(path: str) -> None:
+    """Count a turn by how it was answered ("llm" for the model, anything else is a fast path)."""
+    _turn_stats[path] += 1
+    metrics.AGENT_TURNS.inc(path)
+
+
+def fast_path_stats() -> Dict[str, Any]:
+    total = sum(_turn_stats.values())
+    llm_turns = _turn_stats.get("llm", 0)
+    return {
+        "turns": total,
+        "fast_path_turns": total - llm_turns,
+        "llm_turns": llm_turns,
+        "hit_ratio": round((total - llm_turns) / total, 3) if total else 0.0,
+        "by_path": dict(_turn_stats),
+    }
+
+
+def reset_fast_path_stats() -> None:
+    _turn_stats.clear()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _geocode(place: str) -> Optional[Dict[str, float]]:
+    return await tool_geocode_location.ainvoke({"query": place})
+
+
+def _match_station(name: str, stations: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The one station `name` clearly refers to, or None so the model handles the turn.
+    Every content word of `name` must be a whole word of the station name; failing
+    that, a fuzzy match on the full name with the cutoff the orchestrator uses.
+    Pronouns and filler ("is it free", "is this one available") never match.
+    """
+    words = [w for w in _WORD_RE.findall(name.lower()) if w not in STATION_STOPWORDS]
+    if not words or sum(len(w) for w in words) < MIN_STATION_QUERY_CHARS:
+        return None
+    by_words = [s for s in stations if set(words) <= set(_WORD_RE.findall((s.get("name") or "").lower()))]
+    if len(by_words) == 1:
+        return by_words[0]
+    if by_words:
+        return None  # ambiguous, e.g. just "mall" with several malls
+    names = [(s.get("name") or "").lower() for s in stations]
+    matches = difflib.get_close_matches(" ".join(words), names, n=1, cutoff=0.6)
+    if matches:
+        return next(s for s in stations if (s.get("name") or "").lower() == matches[0])
+    return None
+
+
+def _last_assistant(chat_history: List[Dict[str, str]]) -> str:
+    for m in reversed(chat_history or []):
+        if m.get("role") == "assistant":
+            return m.get("hiddenContent") or m.get("content") or ""
+    return ""
+
+
+def _local_time_display(iso_value: str, timezone_offset: int) -> str:
+    try:
+        dt = datetime.fromisoformat(str(iso_value).replace("Z", "+00:00")).replace(tzinfo=None)
+        # JS getTimezoneOffset() is (UTC - Local) in minutes
+        return (dt - timedelta(minutes=timezone_offset or 0)).strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        return str(iso_value)
+
+
+def _reply(text: str, ui_component: Optional[Dict[str, Any]] = None, ctx_cookie: Optional[str] = None) -> Dict[str, Any]:
+    reply = {"text": text, "ui_component": ui_component}
+    if ctx_cookie:
+        reply["_ctx_cookie"] = ctx_cookie
+    return reply
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Handlers
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _cancel_booking(booking_id: str, user_id: str, timezone_offset: int) -> Dict[str, Any]:
+    existing = await get_booking(booking_id)
+    if not existing or str(existing.user_id) != str(user_id):
+        return _reply("I couldn't find that booking any more. Check the Bookings tab for its current status.")
+    if existing.status not in ("confirmed", "pending"):
+        return _reply(f"That booking is already **{existing.status}**, so there is nothing to cancel.")
+    cancelled = await update_booking(booking_id, BookingUpdate(status="cancelled"))
+    if not cancelled:
+        return _reply("I couldn't cancel that booking right now. Please try again from the Bookings tab.")
+    when = _local_time_display(existing.start_time.isoformat(), timezone_offset)
+    return _reply(f"Done — your booking for **{when}** has been cancelled.")
+
+
+async def _handle_cancel(user_message: str, chat_history: List[Dict[str, str]], user_id: str,
+                         timezone_offset: int) -> Optional[Dict[str, Any]]:
+    msg = user_message.lower().strip().rstrip(".!")
+    prev = _last_assistant(chat_history)
+
+    # Confirmation of a cancel we proposed last turn
+    pending = re.search(r'\[CANCEL_PENDING:\s*booking_id=([^\]\s]+)\]', prev)
+    if pending and msg in CONFIRM_WORDS:
+        return await _cancel_booking(pending.group(1), user_id, timezone_offset)
+
+    # Picking one of several bookings we listed last turn
+    options = re.search(r'\[CANCEL_OPTIONS:\s*([^\]]+)\]', prev)
+    nth = CANCEL_NTH_RE.search(user_message)
+    if options and nth:
+        ids = [i.strip() for i in options.group(1).split(",") if i.strip()]
+        idx = int(nth.group(1)) - 1
+        if 0 <= idx < len(ids):
+            return await _cancel_booking(ids[idx], user_id, timezone_offset)
+
+    if not CANCEL_RE.search(user_message):
+        return None
+
+    upcoming = await list_upcoming_user_bookings(user_id)
+    if not upcoming:
+        return _reply("You don't have any upcoming bookings to cancel.")
+
+    if len(upcoming) == 1:
+        b = upcoming[0]
+        when = _local_time_display(b["start_time"], timezone_offset)
+        return _reply(
+            f"You have one upcoming booking at **{b['station_name']}** on **{when}**. Cancel it?",
+            ctx_cookie=f"\n[CANCEL_PENDING: booking_id={b['id']}]",
+        )
+
+    lines = [
+        f"{i}. **{b['station_name']}** — {_local_time_display(b['start_time'], timezone_offset)}"
+        for i, b in enumerate(upcoming, start=1)
+    ]
+    return _reply(
+        "Which booking should I cancel? Reply with e.g. \"cancel 2\".\n\n" + "\n".join(lines),
+        ctx_cookie=f"\n[CANCEL_OPTIONS: {','.join(str(b['id']) for b in upcoming)}]",
+    )
+
+
+async def _handle_nearest(user_message: str) -> Optional[Dict[str, Any]]:
+    m = NEAREST_RE.search(user_message)
+    if not m:
+        return None
+    place = m.group("place").strip()
+    if not place or place.lower() in SELF_LOCATIONS:
+        return None  # no coordinates for "me" — let the model ask
+
+    coords = await _geocode(place)
+    if not coords:
+        return None
+    stations = await find_stations_by_coordinates(target_lat=coords["lat"], target_lon=coords["lon"], limit=3)
+    if not stations:
+        return _reply(f"I couldn't find any stations with free slots near **{place}**.")
+
+    lines = [
+        f"{i}. **{s.get('name')}** — {s.get('distance_km')} km, {s.get('available_slots')} free slot(s)"
+        for i, s in enumerate(stations, start=1)
+    ]
+    return _reply(
+        f"Nearest stations to **{place}**:\n\n" + "\n".join(lines),
+        ui_component={"type": "station_list", "data": stations},
+    )
+
+
+async def _handle_free_at(user_message: str, timezone_offset: int) -> Optional[Dict[str, Any]]:
+    m = FREE_AT_RE.search(user_message.strip().rstrip("?"))
+    if not m:
+        return None
+    station_name = re.sub(r'\s+(?:station)$', '', m.group("station").strip(), flags=re.IGNORECASE)
+    rest = m.group("rest") or ""
+
+    all_stations = await list_stations()
+    station = _match_station(station_name, all_stations)
+    if not station:
+        return None  # not a station we know — the model may understand it better
+
+    time_24h = _convert_time_to_24h(rest)
+    if not time_24h:
+        free = station.get("available_slots") or 0
+        text = (f"**{station['name']}** has **{free}** free slot(s) right now."
+                if free else f"**{station['name']}** has no free slots right now.")
+        return _reply(text, ui_component={"type": "station_list", "data": [station]})
+
+    date_iso = _resolve_relative_date(rest) or date.today().isoformat()
+    slots = await find_available_slots(station["id"], date_iso, time_24h, 60, timezone_offset)
+    if slots:
+        connectors = sorted({s.get("connector_type") for s in slots if s.get("connector_type")})
+        ctx_cookie = f"\n[BOOKING_CONTEXT: station={station['name']}|time={time_24h}|date={date_iso}|battery=None]"
+        return _reply(
+            f"Yes — **{station['name']}** has **{len(slots)}** free slot(s) at **{time_24h}** on **{date_iso}**"
+            f"{' (' + ', '.join(connectors) + ')' if connectors else ''}. Want me to book it?",
+            ctx_cookie=ctx_cookie,
+        )
+
+    time_alts = await find_time_alternatives(station["id"], date_iso, time_24h, 60, timezone_offset)
+    for t in time_alts:
+        t["name"] = f"Wait for {station['name']}"
+        t["original_station_name"] = station["name"]
+    nearby = await find_nearby_stations(station["id"], limit=3)
+    return _reply(
+        f"**{station['name']}** is fully booked at **{time_24h}** on **{date_iso}**. Here are some alternatives:",
+        ui_component={"type": "alternative_slots", "data": time_alts + nearby},
+    )
+
+
+async def _handle_availability(user_message: str) -> Optional[Dict[str, Any]]:
+    if not AVAILABILITY_RE.search(user_message):
+        return None
+    stations = [s for s in await list_stations() if (s.get("available_slots") or 0) > 0]
+    if not stations:
+        return _reply("All stations are fully occupied right now.")
+    stations.sort(key=lambda s: s.get("available_slots") or 0, reverse=True)
+    top = stations[:5]
+    lines = [f"- **{s.get('name')}** ({s.get('city') or 'Unknown city'}): {s.get('available_slots')} free"
+             for s in top]
+    return _reply(
+        f"{len(stations)} station(s) have free slots right now:\n\n" + "\n".join(lines),
+        ui_component={"type": "station_list", "data": top},
+    )
+
+
+async def route_intent(
+    user_message: str,
+    chat_history: List[Dict[str, str]],
+    user_id: str,
+    timezone_offset: int = 0,
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Try each deterministic handler in turn. Returns (path, reply) or None."""
+    if "[VEHICLE_SELECTED:" in user_message:
+        return None
+
+    handlers = [("cancel", lambda: _handle_cancel(user_message, chat_history, user_id, timezone_offset))]
+    # Explicit booking requests belong to the booking fast paths, not the lookups
+    if not re.search(r'(?:book|reserve)', user_message, re.IGNORECASE):
+        handlers += [
+            ("free_at", lambda: _handle_free_at(user_message, timezone_offset)),
+            ("nearest", lambda: _handle_nearest(user_message)),
+            ("availability", lambda: _handle_availability(user_message)),
+        ]
+    for path, handler in handlers:
+        reply = await handler()
+        if reply is not None:
+            return path, reply
+    return None
@@ -0,0 +1,61 @@
+import os
+import time
+from typing import Any, List, Optional, Protocol, Sequence
+
+from ..utils import metrics
+from ..utils.tracing import span
+
+
+class ChatModel(Protocol):
+    """
+    Anything the orchestrator can drive: an async `ainvoke(messages)` that returns
+    an AIMessage, with `tool_calls` populated when the model wants to call tools.
+    LangChain chat models bound with `bind_tools` satisfy this as-is.
+    """
+
+    async def ainvoke(self, messages: List[Any]) -> Any:
+        ...
+
+
+# Tool-bound model used by the orchestrator. Built lazily so importing the
+# agent does not construct an Ollama client until a chat actually needs it.
+_chat_model: Optional[ChatModel] = None
+# Label for LLM metrics
+_model_name = os.getenv("AGENT_LLM_MODEL", "qwen2.5:3b")
+
+
+def get_chat_model(tools: Sequence[Any]) -> ChatModel:
+    """Return the active chat model, building the default Ollama model on first use."""
+    global _chat_model
+    if _chat_model is None:
+        from langchain_ollama import ChatOllama
+
+        # We use the qwen2.5:3b model running locally on Ollama
+        llm = ChatOllama(model=os.getenv("AGENT_LLM_MODEL", "qwen2.5:3b"), temperature=0)
+        _chat_model = llm.bind_tools(list(tools))
+    return _chat_model
+
+
+def set_chat_model(model: Optional[ChatModel]) -> None:
+    """Swap in a different chat model (e.g. ScriptedChatModel). Pass None to restore the default."""
+    global _chat_model, _model_name
+    _chat_model = model
+    _model_name = type(model).__name__ if model is not None else os.getenv("AGENT_LLM_MODEL", "qwen2.5:3b")
+
+
+async def invoke_model(model: ChatModel, messages: List[Any]) -> Any:
+    """Call the model, recording latency and (when the model reports usage) token counts."""
+    with span("llm.chat", {"gen_ai.request.model": _model_name, "gen_ai.input.messages": len(messages)}) as llm_span:
+        started = time.perf_counter()
+        response = await model.ainvoke(messages)
+        metrics.LLM_CALL_LATENCY.observe(time.perf_counter() - started, _model_name)
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage:
+            metrics.LLM_TOKENS.inc(_model_name, "input", amount=usage.get("input_tokens", 0))
+            metrics.LLM_TOKENS.inc(_model_name, "output", amount=usage.get("output_tokens", 0))
+            llm_span.set_attributes({
+                "gen_ai.usage.input_tokens": usage.get("input_tokens", 0),
+                "gen_ai.usage.output_tokens": usage.get("output_tokens", 0),
+            })
+        llm_span.set_attribute("agent.tool_calls", len(getattr(response, "tool_calls", None) or []))
+    return response
@@ -1,5 +1,4 @@
 from typing import List, Dict, Any, Optional
-import logging
 import json
 import re
 import difflib
@@ -11,15 +10,19 @@ from .tools.charging import (
     tool_create_booking_request,
     tool_search_station_by_name,
     current_user_id,
+    hold_slot_for_user,
 )
+from .scheduler import inference_scheduler, PRIORITY_BOOKING, PRIORITY_DEFAULT
+from .llm import get_chat_model, invoke_model
+from .parsing import _resolve_relative_date, _convert_time_to_24h, _looks_like_time
+from .intent_router import route_intent, record_turn
+from .response_cache import response_cache, cache_context
+from ..utils.structured_logging import get_logger
+from ..utils.tracing import span
 
-from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 
-logger = logging.getLogger(__name__)
-
-# We use the qwen2.5:3b model running locally on Ollama
-llm = ChatOllama(model="qwen2.5:3b", temperature=0)
+logger = get_logger(__name__)
 
 tools = [
     tool_geocode_location,
@@ -28,90 +31,16 @@ tools = [
     tool_create_booking_request,
 ]
 
-llm_with_tools = llm.bind_tools(tools)
 tool_map = {tool.name: tool for tool in tools}
 
+# Router answers that only depend on the message and current availability
+CACHEABLE_ROUTES = {"nearest", "availability", "free_at"}
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Helpers: extract booking intent from the very first user message natively
 # so we don't rely on the LLM to parse dates/times correctly.
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _resolve_relative_date(text: str) -> Optional[str]:
-    """
-    Detects relative date words in text and returns YYYY-MM-DD.
-    Checks for: today, tomorrow, day after tomorrow.
-    Returns None if no pattern matched.
-    """
-    text_lower = text.lower()
-    today = date.today()
-
-    if "day after tomorrow" in text_lower:
-        return (today + timedelta(days=2)).isoformat()
-    if "tomorrow" in text_lower:
-        return (today + timedelta(days=1)).isoformat()
-    if "today" in text_lower:
-        return today.isoformat()
-
-    # Check explicit date patterns: DD/MM/YYYY or YYYY-MM-DD or DD-MM-YYYY
-    # YYYY-MM-DD
-    m = re.search(r'\b(\d{4})-(\d{2})-(\d{2})\b', text)
-    if m:
-        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
-    # DD/MM/YYYY
-    m = re.search(r'\b(\d{1,2})[/-](\d{1,2})[/-](\d{4})\b', text)
-    if m:
-        d_, mo, yr = m.group(1), m.group(2), m.group(3)
-        return f"{yr}-{mo.zfill(2)}-{d_.zfill(2)}"
-
-    return None
-
-
-def _convert_time_to_24h(text: str) -> Optional[str]:
-    """
-    Extracts a time from text and converts it to HH:MM (24-hour).
-    Handles: 2pm, 2:30pm, 14:00, 2 PM, 2:30 AM, etc.
-    Also handles "at 2" by assuming PM if it's currently morning/afternoon.
-    Returns None if no time found.
-    """
-    # Pattern: H[:MM][am|pm]
-    pattern = re.compile(
-        r'\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|AM|PM)\b',
-        re.IGNORECASE
-    )
-    m = pattern.search(text)
-    if m:
-        hour = int(m.group(1))
-        minute = int(m.group(2)) if m.group(2) else 0
-        meridiem = m.group(3).lower()
-        if meridiem == 'pm' and hour != 12:
-            hour += 12
-        if meridiem == 'am' and hour == 12:
-            hour = 0
-        return f"{hour:02d}:{minute:02d}"
-
-    # Already 24h pattern HH:MM (no am/pm)
-    m24 = re.search(r'\b(\d{1,2}):(\d{2})\b', text)
-    if m24:
-        h, mn = int(m24.group(1)), int(m24.group(2))
-        if 0 <= h <= 23 and 0 <= mn <= 59:
-            return f"{h:02d}:{mn:02d}"
-
-    # Pattern: "at 2" or "at 14" (implicit)
-    m_at = re.search(r'\b(?:at|@)\s+(\d{1,2})\b', text, re.IGNORECASE)
-    if m_at:
-        h = int(m_at.group(1))
-        if 0 <= h <= 23:
-            # Heuristic: if h < 7, it's probably PM (e.g. "at 2" -> 14:00)
-            if h < 12 and h > 0:
-                # If they say "at 2", they likely mean 2pm unless specified.
-                # However, to be safe, we could check current time, 
-                # but let's stick to a simple 12h->24h bias if h is small.
-                if h <= 7: h += 12 
-            return f"{h:02d}:00"
-
-    return None
-
-
 def _extract_booking_intent(text: str) -> Dict[str, Optional[str]]:
     """
     Tries to extract station name, time (24h), and date from a free-form booking message.
@@ -225,29 +154,6 @@ def _is_uuid(val: str) -> bool:
         return False
 
 
-def _looks_like_time(text: str) -> bool:
-    """
-    Check if a candidate station name is actually a time expression.
-    Helps prevent "book at 7pm" from extracting "7pm" as the station name.
-    """
-    if not text:
-        return False
-    text_lower = text.lower().strip()
-    # Check for common time patterns
-    time_patterns = [
-        r'^\d{1,2}(?::\d{2})?\s*(?:am|pm)?$',  # "2", "2pm", "14:00", "2:30pm"
-        r'^(?:am|pm)$',  # "am", "pm"
-        r'^\d{1,2}$',  # just a number
-    ]
-    for pat in time_patterns:
-        if re.match(pat, text_lower):
-            return True
-    # Also check if text contains only time keywords
-    if re.match(r'^(?:today|tomorrow|day after tomorrow|morning|afternoon|evening|night)$', text_lower):
-        return True
-    return False
-
-
 async def _detect_implicit_booking_intent(user_message: str, chat_history: List[Dict[str, str]]) -> bool:
     """
     Detect if user is implicitly trying to book based on:
@@ -270,7 +176,7 @@ async def _detect_implicit_booking_intent(user_message: str, chat_history: List[
             potential_station = m.group(1).strip()
             # Check if this looks like a station name (at least 2 chars, not just time)
             if len(potential_station) > 2 and not _looks_like_time(potential_station):
-                print(f"[AGENT] 🎯 Implicit booking detected: '{potential_station}' + time")
+                logger.debug("[AGENT] 🎯 Implicit booking detected: '%s' + time", potential_station)
                 return True
     
     return False
@@ -291,7 +197,7 @@ async def _fuzzy_resolve_station(name: str) -> Optional[str]:
             canonical = next((n for n in names if n.lower() == best_match_lower), None)
             return canonical
     except Exception as e:
-        print(f"[ORCHESTRATOR] Fuzzy resolve error: {e}")
+        logger.error("[ORCHESTRATOR] Fuzzy resolve error: %s", e)
     return None
 
 
@@ -346,13 +252,36 @@ async def process_agent_message(
     # ── RESET/CANCEL LOGIC: Check for explicit reset/cancel intent ────────────
     reset_keywords = ["cancel", "reset", "start over", "clear chat", "clear context", "stop booking","no"]
     if lower_msg.strip() in reset_keywords:
-        print(f"[AGENT] 🔄 User requested context RESET")
+        logger.debug("[AGENT] 🔄 User requested context RESET")
+        record_turn("reset")
         return {
             "text": "Context cleared. How can I help you start a new booking?",
             "ui_component": None,
             "_ctx_cookie": "\n[BOOKING_CONTEXT: station=|time=|date=|battery=None]"
         }
 
+    # ── RESPONSE CACHE: repeated lookups answered from a recent reply ────────
+    date_bucket = _resolve_relative_date(user_message) or today_iso
+    # Routed lookups answer the message alone, so they are shared across conversations and users;
+    # free_at resolves "at 5pm" in the caller's timezone
+    routed_ctx = cache_context(date_bucket=date_bucket, timezone_offset=timezone_offset or 0)
+    if not is_vehicle_selected:
+        cached = response_cache.get_reply(user_message, routed_ctx)
+        if cached is not None:
+            record_turn("cache")
+            logger.debug("[AGENT] ♻️  Served lookup from response cache")
+            return cached
+
+    # ── RULE-BASED ROUTER: lookups and cancellations that need no LLM ────────
+    routed = await route_intent(user_message, chat_history, str(uid) if uid else "", timezone_offset)
+    if routed:
+        path, routed_reply = routed
+        record_turn(path)
+        logger.debug("[AGENT] 🧭 Intent router handled turn (%s)", path)
+        if path in CACHEABLE_ROUTES:
+            response_cache.put_reply(user_message, routed_ctx, routed_reply)
+        return routed_reply
+
     for m in chat_history:
         if m["role"] == "user":
             history_msgs.append(HumanMessage(content=m.get("hiddenContent") or m["content"]))
@@ -368,7 +297,7 @@ async def process_agent_message(
     # If implicit booking detected but no extract yet, try extracting anyway
     if not new_intent and has_implicit_booking_intent:
         new_intent = _extract_booking_intent(user_message)
-        print(f"[AGENT] 🎯 Extracting implicit booking intent: {new_intent}")
+        logger.debug("[AGENT] 🎯 Extracting implicit booking intent: %s", new_intent)
     
     # Also extract vehicle selection from current message if present
     current_vs = re.search(
@@ -380,14 +309,6 @@ async def process_agent_message(
     # Look for: "today", "tomorrow", "day after tomorrow", or a specific date
     is_date_response = bool(re.search(r'\b(?:today|tomorrow|day after tomorrow)\b', lower_msg, re.IGNORECASE)) or _resolve_relative_date(user_message)
     
-    # If user is confirming a date, extract it
-    if is_date_response and station and time_24h and not date_was_mentioned:
-        confirmed_date = _resolve_relative_date(user_message)
-        if confirmed_date:
-            date_iso = confirmed_date
-            date_was_mentioned = True
-            print(f"[AGENT] ✅ User confirmed date: {date_iso}")
-    
     # Merge: latest intent wins for station/time/date to allow overrides
     station_raw = new_intent.get("station") or booked_ctx["station"]
     
@@ -397,13 +318,21 @@ async def process_agent_message(
         resolved = await _fuzzy_resolve_station(station_raw)
         if resolved:
             station = resolved
-            print(f"[AGENT] 🔍 Fuzzy resolved {station_raw!r} → {station!r}")
+            logger.debug("[AGENT] 🔍 Fuzzy resolved %r → %r", station_raw, station)
 
     time_24h = new_intent.get("time_24h") or booked_ctx["time_24h"]
     date_iso = new_intent.get("date_iso") or booked_ctx["date_iso"]
     
     # Track if date was NOT explicitly mentioned by user
     date_was_mentioned = new_intent.get("date_iso") is not None or booked_ctx["date_iso"] is not None
+
+    # If user is confirming a date, extract it
+    if is_date_response and station and time_24h and not date_was_mentioned:
+        confirmed_date = _resolve_relative_date(user_message)
+        if confirmed_date:
+            date_iso = confirmed_date
+            date_was_mentioned = True
+            logger.debug("[AGENT] ✅ User confirmed date: %s", date_iso)
     
     # Only use today as default if we proceed past the date confirmation check
     if not date_iso:
@@ -412,6 +341,11 @@ async def process_agent_message(
     vehicle_id = booked_ctx["vehicle_id"] or (current_vs.group(1).strip() if current_vs else None)
     connector_type = booked_ctx["connector_type"] or (current_vs.group(2).strip() if current_vs else None)
     battery = new_intent.get("battery") or booked_ctx["battery"]
+    if battery is None and is_battery_msg:
+        # Plain battery reply ("40%", "battery is 40") outside a booking sentence
+        bat = re.search(r'(\d{1,3})\s*%', user_message) or re.search(r'\bbattery\b\D{0,20}(\d{1,3})', lower_msg)
+        if bat and 0 < int(bat.group(1)) <= 100:
+            battery = float(bat.group(1))
 
     # Special logic for "Yes" / confirmation turns
     is_confirmation = user_message.lower().strip() in ("yes", "y", "ok", "okay", "sure", "proceed", "book it", "confirm")
@@ -420,13 +354,12 @@ async def process_agent_message(
         # Check if we previously asked about a different connector
         m_connector = re.search(r'but a \*\*([^*]+)\*\* connector is available', prev_assistant)
         if m_connector:
-            print(f"[AGENT] ✅ User confirmed connector fallback to {m_connector.group(1)}")
+            logger.debug("[AGENT] ✅ User confirmed connector fallback to %s", m_connector.group(1))
             connector_type = m_connector.group(1).strip()
 
-    print(f"\n{'='*60}")
-    print(f"[AGENT] 📨 User message: {user_message!r}")
-    print(f"[AGENT] 🔍 Extracted — station={station!r} time={time_24h!r} date={date_iso!r}")
-    print(f"[AGENT] 🚗 vehicle_id={vehicle_id!r} connector={connector_type!r} battery={battery!r}")
+    logger.debug("[AGENT] 📨 User message: %r", user_message)
+    logger.debug("[AGENT] 🔍 Extracted — station=%r time=%r date=%r", station, time_24h, date_iso)
+    logger.debug("[AGENT] 🚗 vehicle_id=%r connector=%r battery=%r", vehicle_id, connector_type, battery)
 
     ui_component = None
 
@@ -442,7 +375,7 @@ async def process_agent_message(
     )
     
     if should_ask_for_date:
-        print(f"[AGENT] 📅 Date not mentioned - asking user to confirm")
+        logger.debug("[AGENT] 📅 Date not mentioned - asking user to confirm")
         
         tomorrow_iso = (date.today() + timedelta(days=1)).isoformat()
         
@@ -459,7 +392,7 @@ async def process_agent_message(
             f"battery={battery if battery is not None else 'None'}]"
         )
         
-        print(f"{'='*60}\n")
+        record_turn("date_confirm")
         return {"text": reply, "ui_component": None, "_ctx_cookie": ctx_cookie}
 
     # ── FAST PATH: Show vehicle card immediately on booking intent ────────────
@@ -520,20 +453,35 @@ async def process_agent_message(
                 "ctx_cookie": ctx_cookie,
             }
         }
-        print(f"[AGENT] 🚗 FAST PATH — showing vehicle card ({len(user_vehicles)} vehicle(s))")
-        print(f"{'='*60}\n")
+        if station != "the station" and time_24h:
+            # Keep a slot aside while the user picks a vehicle and battery level
+            connectors = {
+                (v.get("connectorType") or v.get("charging_connector") or v.get("connector_type") or "").strip()
+                for v in user_vehicles
+            }
+            await hold_slot_for_user(
+                station, date_iso, time_24h, 60,
+                connector_type=connectors.pop() if len(connectors) == 1 else None,
+                timezone_offset=timezone_offset,
+            )
+        logger.debug("[AGENT] 🚗 FAST PATH — showing vehicle card (%s vehicle(s))", len(user_vehicles))
+        record_turn("vehicle_card")
         return {"text": reply, "ui_component": ui_component, "_ctx_cookie": ctx_cookie}
 
     # ── FAST PATH: Vehicle was just selected — if we have all context, ask only for battery ─
     if is_vehicle_selected and vehicle_id and station and time_24h and not battery:
+        # Move the hold onto a slot that fits the chosen vehicle's connector
+        await hold_slot_for_user(station, date_iso, time_24h, 60,
+                                 connector_type=connector_type, timezone_offset=timezone_offset)
         reply = f"What's your current battery percentage?"
-        print(f"[AGENT] 🔋 Vehicle selected — asking for battery %")
-        print(f"{'='*60}\n")
+        logger.debug("[AGENT] 🔋 Vehicle selected — asking for battery %")
+        record_turn("battery_prompt")
         return {"text": reply, "ui_component": None}
 
     # ── FAST PATH: All info available — trigger booking directly ─────────────
     if vehicle_id and station and time_24h and battery is not None:
-        print(f"[AGENT] ⚡ FAST BOOKING — all fields ready, calling tool directly")
+        logger.debug("[AGENT] ⚡ FAST BOOKING — all fields ready, calling tool directly")
+        ctx_cookie = None
         try:
             result = await tool_create_booking_request.ainvoke({
                 "station_name_or_id": station,
@@ -557,15 +505,23 @@ async def process_agent_message(
                         f"I couldn't find a **{result['requested_connector']}** connector at **{result['station_name']}** for this time, "
                         f"but a **{result['found_connector']}** connector is available. Would you like to use that instead?"
                     )
+                    # Keep battery in context so a plain "yes" can finish the booking natively
+                    ctx_cookie = (
+                        f"\n[BOOKING_CONTEXT: station={station}|time={time_24h}|"
+                        f"date={date_iso}|battery={battery}]"
+                    )
                 elif "not available" in err.lower() or "unavailable" in err.lower():
                     reply = f"The requested slot is not available for this duration. Here are some suggested alternatives:"
                 else:
                     reply = f"Booking failed: {err}"
         except Exception as e:
             reply = f"Booking failed: {e}"
-        print(f"[AGENT] 💬 Fast booking result: {reply[:150]!r}")
-        print(f"{'='*60}\n")
-        return {"text": reply, "ui_component": ui_component}
+        logger.debug("[AGENT] 💬 Fast booking result: %r", reply[:150])
+        record_turn("fast_booking")
+        response = {"text": reply, "ui_component": ui_component}
+        if ctx_cookie:
+            response["_ctx_cookie"] = ctx_cookie
+        return response
 
     # ── FALLBACK: LLM handles everything else ────────────────────────────────
     # (station search, clarification questions, etc.)
@@ -661,25 +617,45 @@ User Vehicles: {len(user_vehicles)} registered
 
     messages.append(HumanMessage(content=user_message))
 
-    print(f"[AGENT] 🤖 LLM Mode: General conversation with tools...")
+    # Open-ended questions outside a booking flow are reused per user for a short while
+    is_cacheable_turn = not (is_booking_intent or vehicle_id or battery is not None or time_24h)
+    llm_ctx = cache_context(scope=str(uid), station=station, date_bucket=date_iso, chat_history=chat_history)
+    if is_cacheable_turn:
+        cached = response_cache.get_reply(user_message, llm_ctx)
+        if cached is not None:
+            record_turn("cache")
+            logger.debug("[AGENT] ♻️  Served LLM reply from response cache")
+            return cached
+
+    logger.debug("[AGENT] 🤖 LLM Mode: General conversation with tools...")
+    record_turn("llm")
 
     max_iterations = 6
+    llm_with_tools = get_chat_model(tools)
+
+    # Turns that are finishing a booking get served ahead of open-ended chat
+    is_booking_turn = bool(vehicle_id or (is_booking_intent and station))
+    priority = PRIORITY_BOOKING if is_booking_turn else PRIORITY_DEFAULT
 
     for iteration in range(max_iterations):
-        print(f"[AGENT] 🤖 Iteration {iteration+1} — invoking model...")
-        response = await llm_with_tools.ainvoke(messages)
+        logger.debug("[AGENT] 🤖 Iteration %s — invoking model...", iteration+1)
+        with span("agent.iteration", {"agent.iteration": iteration + 1, "agent.priority": priority}):
+            response = await inference_scheduler.run(
+                lambda: invoke_model(llm_with_tools, messages),
+                priority=priority,
+            )
         messages.append(response)
 
         if not response.tool_calls:
-            print(f"[AGENT] ✅ No more tool calls, model produced text.")
+            logger.debug("[AGENT] ✅ No more tool calls, model produced text.")
             break
 
-        print(f"[AGENT] 🔧 Tool calls: {[tc['name'] for tc in response.tool_calls]}")
+        logger.debug("[AGENT] 🔧 Tool calls: %s", [tc['name'] for tc in response.tool_calls])
 
         for tool_call in response.tool_calls:
             tool_name = tool_call["name"]
             tool_args = tool_call["args"]
-            print(f"[AGENT] ⚙️  Executing {tool_name} with args {tool_args}")
+            logger.debug("[AGENT] ⚙️  Executing %s with args %s", tool_name, tool_args)
 
             tool_fn = tool_map.get(tool_name)
             if not tool_fn:
@@ -690,17 +666,24 @@ User Vehicles: {len(user_vehicles)} registered
                 # that are already in the context. We helper them here.
                 if tool_name == "tool_create_booking_request":
                     if not tool_args.get("vehicle_id") and vehicle_id:
-                        print(f"[AGENT] 🛠️ Auto-injecting vehicle_id: {vehicle_id}")
+                        logger.debug("[AGENT] 🛠️ Auto-injecting vehicle_id: %s", vehicle_id)
                         tool_args["vehicle_id"] = vehicle_id
                     if not tool_args.get("station_name_or_id") and station:
-                        print(f"[AGENT] 🛠️ Auto-injecting station: {station}")
+                        logger.debug("[AGENT] 🛠️ Auto-injecting station: %s", station)
                         tool_args["station_name_or_id"] = station
                     if not tool_args.get("current_battery") and battery:
-                        print(f"[AGENT] 🛠️ Auto-injecting battery: {battery}")
+                        logger.debug("[AGENT] 🛠️ Auto-injecting battery: %s", battery)
                         tool_args["current_battery"] = battery
 
                 try:
-                    raw_result = await tool_fn.ainvoke(tool_args)
+                    with span("agent.tool", {"agent.tool.name": tool_name}) as tool_span:
+                        raw_result = response_cache.get_tool_result(tool_name, tool_args)
+                        tool_span.set_attribute("agent.tool.cached", raw_result is not None)
+                        if raw_result is None:
+                            raw_result = await tool_fn.ainvoke(tool_args)
+                            response_cache.put_tool_result(tool_name, tool_args, raw_result)
+                        else:
+                            logger.debug("[AGENT] ♻️  %s result served from cache", tool_name)
                     result = json.dumps(raw_result, default=str)
 
                     if tool_name in ("tool_find_stations_nearby", "tool_search_station_by_name"):
@@ -715,7 +698,7 @@ User Vehicles: {len(user_vehicles)} registered
                                 ui_component = raw_result["ui_component"]
 
                 except Exception as e:
-                    print(f"[AGENT] ❌ Error executing {tool_name}: {e}")
+                    logger.error("[AGENT] ❌ Error executing %s: %s", tool_name, e)
                     result = f"Error: {e}"
 
             messages.append(ToolMessage(content=str(result), tool_call_id=tool_call["id"]))
@@ -746,15 +729,18 @@ User Vehicles: {len(user_vehicles)} registered
                 for v in user_vehicles
             ]
         }
-        print(f"[AGENT] 🚗 Vehicle selection sentinel — injecting UI card with {len(user_vehicles)} vehicle(s)")
+        logger.debug("[AGENT] 🚗 Vehicle selection sentinel — injecting UI card with %s vehicle(s)", len(user_vehicles))
     elif SENTINEL in final_text and not user_vehicles:
         final_text = "You don't have any vehicles registered. Please add a vehicle in your profile before making a booking."
-        print(f"[AGENT] ⚠️  Vehicle selection required but user has no vehicles")
+        logger.warning("[AGENT] ⚠️  Vehicle selection required but user has no vehicles")
 
-    print(f"[AGENT] 💬 Final text: {final_text[:200]!r}")
-    print(f"{'='*60}\n")
+    logger.debug("[AGENT] 💬 Final text: %r", final_text[:200])
 
-    return {
+    reply = {
         "text": final_text,
         "ui_component": ui_component
     }
+    ui_type = ui_component.get("type") if isinstance(ui_component, dict) else None
+    if is_cacheable_turn and ui_type not in ("booking_confirmation", "vehicle_selection", "alternative_slots"):
+        response_cache.put_reply(user_message, llm_ctx, reply)
+    return reply
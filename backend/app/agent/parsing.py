@@ -0,0 +1,104 @@
+import re
+from datetime import date, timedelta
+from typing import Optional
+
+# Pure text helpers shared by the orchestrator and the intent router.
+
+
+def _resolve_relative_date(text: str) -> Optional[str]:
+    """
+    Detects relative date words in text and returns YYYY-MM-DD.
+    Checks for: today, tomorrow, day after tomorrow.
+    Returns None if no pattern matched.
+    """
+    text_lower = text.lower()
+    today = date.today()
+
+    if "day after tomorrow" in text_lower:
+        return (today + timedelta(days=2)).isoformat()
+    if "tomorrow" in text_lower:
+        return (today + timedelta(days=1)).isoformat()
+    if "today" in text_lower:
+        return today.isoformat()
+
+    # Check explicit date patterns: DD/MM/YYYY or YYYY-MM-DD or DD-MM-YYYY
+    # YYYY-MM-DD
+    m = re.search(r'\b(\d{4})-(\d{2})-(\d{2})\b', text)
+    if m:
+        return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
+    # DD/MM/YYYY
+    m = re.search(r'\b(\d{1,2})[/-](\d{1,2})[/-](\d{4})\b', text)
+    if m:
+        d_, mo, yr = m.group(1), m.group(2), m.group(3)
+        return f"{yr}-{mo.zfill(2)}-{d_.zfill(2)}"
+
+    return None
+
+
+def _convert_time_to_24h(text: str) -> Optional[str]:
+    """
+    Extracts a time from text and converts it to HH:MM (24-hour).
+    Handles: 2pm, 2:30pm, 14:00, 2 PM, 2:30 AM, etc.
+    Also handles "at 2" by assuming PM if it's currently morning/afternoon.
+    Returns None if no time found.
+    """
+    # Pattern: H[:MM][am|pm]
+    pattern = re.compile(
+        r'\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|AM|PM)\b',
+        re.IGNORECASE
+    )
+    m = pattern.search(text)
+    if m:
+        hour = int(m.group(1))
+        minute = int(m.group(2)) if m.group(2) else 0
+        meridiem = m.group(3).lower()
+        if meridiem == 'pm' and hour != 12:
+            hour += 12
+        if meridiem == 'am' and hour == 12:
+            hour = 0
+        return f"{hour:02d}:{minute:02d}"
+
+    # Already 24h pattern HH:MM (no am/pm)
+    m24 = re.search(r'\b(\d{1,2}):(\d{2})\b', text)
+    if m24:
+        h, mn = int(m24.group(1)), int(m24.group(2))
+        if 0 <= h <= 23 and 0 <= mn <= 59:
+            return f"{h:02d}:{mn:02d}"
+
+    # Pattern: "at 2" or "at 14" (implicit)
+    m_at = re.search(r'\b(?:at|@)\s+(\d{1,2})\b', text, re.IGNORECASE)
+    if m_at:
+        h = int(m_at.group(1))
+        if 0 <= h <= 23:
+            # Heuristic: if h < 7, it's probably PM (e.g. "at 2" -> 14:00)
+            if h < 12 and h > 0:
+                # If they say "at 2", they likely mean 2pm unless specified.
+                # However, to be safe, we could check current time, 
+                # but let's stick to a simple 12h->24h bias if h is small.
+                if h <= 7: h += 12 
+            return f"{h:02d}:00"
+
+    return None
+
+
+def _looks_like_time(text: str) -> bool:
+    """
+    Check if a candidate station name is actually a time expression.
+    Helps prevent "book at 7pm" from extracting "7pm" as the station name.
+    """
+    if not text:
+        return False
+    text_lower = text.lower().strip()
+    # Check for common time patterns
+    time_patterns = [
+        r'^\d{1,2}(?::\d{2})?\s*(?:am|pm)?$',  # "2", "2pm", "14:00", "2:30pm"
+        r'^(?:am|pm)$',  # "am", "pm"
+        r'^\d{1,2}$',  # just a number
+    ]
+    for pat in time_patterns:
+        if re.match(pat, text_lower):
+            return True
+    # Also check if text contains only time keywords
+    if re.match(r'^(?:today|tomorrow|day after tomorrow|morning|afternoon|evening|night)$', text_lower):
+        return True
+    return False
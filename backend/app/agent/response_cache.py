@@ -0,0 +1,311 @@
+"""
+Short-lived cache for repeated agent questions and read-only tool results.
+
+Replies are keyed on a normalized, hashed form of the user message plus the
+context that changes the answer (scope, resolved station, date bucket,
+timezone, the last assistant turn for conversational replies and any numbers
+in the message, so "3pm" never answers "4pm"). Near-duplicates —
+reordered words, filler words, small typos — are matched with a local
+character-trigram vector, so no embedding model is involved. Entries expire
+after a freshness window and are dropped whenever station availability
+changes (see app.utils.availability).
+"""
+
+import copy
+import difflib
+import hashlib
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from ..utils.availability import subscribe
+
+CACHE_ENABLED = os.getenv("AGENT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_TTL = float(os.getenv("AGENT_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "512"))
+CACHE_SIMILARITY = float(os.getenv("AGENT_CACHE_SIMILARITY", "0.85"))
+
+# Tools whose results depend only on their arguments (and on availability)
+CACHEABLE_TOOLS = {"tool_geocode_location", "tool_search_station_by_name", "tool_find_stations_nearby"}
+# Geocoding does not change when a slot is booked
+AVAILABILITY_FREE_TOOLS = {"tool_geocode_location"}
+
+FILLER_WORDS = {
+    "a", "an", "the", "please", "pls", "plz", "can", "could", "would", "you", "me", "show", "tell",
+    "give", "list", "hey", "hi", "hello", "i", "want", "to", "know", "some", "any", "there", "us",
+    "kindly", "just", "now", "right", "currently", "of", "for", "is", "are", "do", "does",
+    "has", "have", "got",
+}
+VECTOR_DIM = 1024
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_message(text: str) -> str:
+    """Lowercase, drop cookies/punctuation/filler words, fold plurals and collapse whitespace."""
+    text = re.sub(r"\[[A-Z_]+:[^\]]*\]", " ", text or "").lower()
+    words = [w for w in _WORD_RE.findall(text) if w not in FILLER_WORDS]
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words)
+
+
+def _vectorize(normalized: str) -> Dict[int, float]:
+    """Hashed character-trigram vector, L2 normalised."""
+    counts: Counter = Counter()
+    for word in normalized.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            counts[int(hashlib.md5(padded[i:i + 3].encode()).hexdigest()[:8], 16) % VECTOR_DIM] += 1
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+
+def _cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def _words_align(a: Iterable[str], b: Iterable[str]) -> bool:
+    """Every content word on each side has a close spelling on the other (typos, plurals)."""
+    a, b = set(a), set(b)
+    for left, right in ((a, b), (b, a)):
+        for word in left - right:
+            if not difflib.get_close_matches(word, list(right), n=1, cutoff=0.8):
+                return False
+    return True
+
+
+@dataclass
+class _Entry:
+    normalized: str
+    vector: Dict[int, float]
+    value: Any
+    station_ids: Set[str]
+    availability_dependent: bool
+    expires_at: float
+
+
+@dataclass
+class _Stats:
+    hits: int = 0
+    near_hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    by_kind: Counter = field(default_factory=Counter)
+
+
+class ResponseCache:
+    """LRU of replies and tool results with TTL and availability invalidation."""
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                 similarity: float = CACHE_SIMILARITY, enabled: bool = CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.enabled = enabled
+        # bucket key -> {exact key -> entry}; buckets keep near-duplicate scans small
+        self._buckets: Dict[str, "OrderedDict[str, _Entry]"] = {}
+        self._size = 0
+        self._stats = _Stats()
+
+    # ── keys ─────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _bucket_key(kind: str, normalized: str, context: Dict[str, Any]) -> str:
+        numbers = ",".join(re.findall(r"\d+", normalized))
+        ctx = "|".join(f"{k}={context[k]}" for k in sorted(context) if context[k] not in (None, ""))
+        return f"{kind}|{ctx}|n={numbers}"
+
+    @staticmethod
+    def _exact_key(bucket: str, normalized: str) -> str:
+        return hashlib.sha1(f"{bucket}#{normalized}".encode()).hexdigest()
+
+    # ── lookups ──────────────────────────────────────────────────────────────
+    def _get(self, kind: str, text: str, context: Dict[str, Any], near: bool) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        normalized = normalize_message(text)
+        if not normalized:
+            return None
+        bucket_key = self._bucket_key(kind, normalized, context)
+        bucket = self._buckets.get(bucket_key)
+        if not bucket:
+            self._stats.misses += 1
+            return None
+
+        now = time.monotonic()
+        entry = bucket.get(self._exact_key(bucket_key, normalized))
+        if entry and entry.expires_at > now:
+            bucket.move_to_end(self._exact_key(bucket_key, normalized))
+            self._stats.hits += 1
+            self._stats.by_kind[kind] += 1
+            return copy.deepcopy(entry.value)
+
+        if near:
+            vector = _vectorize(normalized)
+            words = normalized.split()
+            best, best_score = None, self.similarity
+            for candidate in bucket.values():
+                if candidate.expires_at <= now:
+                    continue
+                score = _cosine(vector, candidate.vector)
+                if score >= best_score and _words_align(words, candidate.normalized.split()):
+                    best, best_score = candidate, score
+            if best is not None:
+                self._stats.near_hits += 1
+                self._stats.by_kind[kind] += 1
+                return copy.deepcopy(best.value)
+
+        self._stats.misses += 1
+        return None
+
+    def _put(self, kind: str, text: str, context: Dict[str, Any], value: Any,
+             station_ids: Iterable[str] = (), availability_dependent: bool = True) -> None:
+        if not self.enabled:
+            return
+        normalized = normalize_message(text)
+        if not normalized:
+            return
+        bucket_key = self._bucket_key(kind, normalized, context)
+        bucket = self._buckets.setdefault(bucket_key, OrderedDict())
+        key = self._exact_key(bucket_key, normalized)
+        if key not in bucket:
+            self._size += 1
+        bucket[key] = _Entry(
+            normalized=normalized,
+            vector=_vectorize(normalized),
+            value=copy.deepcopy(value),
+            station_ids={str(s) for s in station_ids if s},
+            availability_dependent=availability_dependent,
+            expires_at=time.monotonic() + self.ttl,
+        )
+        bucket.move_to_end(key)
+        if self._size > self.max_entries:
+            self._evict()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for bucket_key in list(self._buckets):
+            bucket = self._buckets[bucket_key]
+            for key in [k for k, e in bucket.items() if e.expires_at <= now]:
+                del bucket[key]
+                self._size -= 1
+        # Still over budget: drop the least recently used entry of each bucket in turn
+        while self._size > self.max_entries:
+            for bucket_key in list(self._buckets):
+                bucket = self._buckets[bucket_key]
+                if bucket:
+                    bucket.popitem(last=False)
+                    self._size -= 1
+                if self._size <= self.max_entries:
+                    break
+        self._buckets = {k: v for k, v in self._buckets.items() if v}
+
+    # ── replies ──────────────────────────────────────────────────────────────
+    def get_reply(self, message: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self._get("reply", message, context, near=True)
+
+    def put_reply(self, message: str, context: Dict[str, Any], reply: Dict[str, Any]) -> None:
+        self._put("reply", message, context, reply, station_ids=_station_ids_in(reply))
+
+    # ── tool results ─────────────────────────────────────────────────────────
+    @staticmethod
+    def _tool_text(args: Dict[str, Any]) -> str:
+        return " ".join(f"{k} {args[k]}" for k in sorted(args))
+
+    def get_tool_result(self, tool_name: str, args: Dict[str, Any]) -> Optional[Any]:
+        if tool_name not in CACHEABLE_TOOLS:
+            return None
+        return self._get(f"tool:{tool_name}", self._tool_text(args), {}, near=False)
+
+    def put_tool_result(self, tool_name: str, args: Dict[str, Any], result: Any) -> None:
+        if tool_name not in CACHEABLE_TOOLS or result is None:
+            return
+        self._put(
+            f"tool:{tool_name}", self._tool_text(args), {}, result,
+            station_ids=_station_ids_in(result),
+            availability_dependent=tool_name not in AVAILABILITY_FREE_TOOLS,
+        )
+
+    # ── invalidation ─────────────────────────────────────────────────────────
+    def invalidate(self, station_id: Optional[str] = None) -> None:
+        """Drop availability-dependent entries for a station (or all of them)."""
+        dropped = 0
+        for bucket in self._buckets.values():
+            for key in [
+                k for k, e in bucket.items()
+                if e.availability_dependent and (station_id is None or not e.station_ids or station_id in e.station_ids)
+            ]:
+                del bucket[key]
+                dropped += 1
+        self._size -= dropped
+        self._buckets = {k: v for k, v in self._buckets.items() if v}
+        if dropped:
+            self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._size = 0
+
+    def reset_stats(self) -> None:
+        self._stats = _Stats()
+
+    def stats(self) -> Dict[str, Any]:
+        s = self._stats
+        lookups = s.hits + s.near_hits + s.misses
+        return {
+            "enabled": self.enabled,
+            "entries": self._size,
+            "hits": s.hits,
+            "near_hits": s.near_hits,
+            "misses": s.misses,
+            "hit_ratio": round((s.hits + s.near_hits) / lookups, 3) if lookups else 0.0,
+            "invalidations": s.invalidations,
+            "by_kind": dict(s.by_kind),
+            "ttl": self.ttl,
+        }
+
+
+def _station_ids_in(value: Any) -> Set[str]:
+    """Collect station ids referenced by a reply or tool result."""
+    found: Set[str] = set()
+
+    def walk(v: Any) -> None:
+        if isinstance(v, dict):
+            for k in ("station_id", "id"):
+                if isinstance(v.get(k), str) and (k == "station_id" or "name" in v):
+                    found.add(v[k])
+            for child in v.values():
+                if isinstance(child, (dict, list)):
+                    walk(child)
+        elif isinstance(v, list):
+            for child in v:
+                walk(child)
+
+    walk(value)
+    return found
+
+
+def cache_context(scope: str = "", station: Optional[str] = None, date_bucket: Optional[str] = None,
+                  chat_history: Optional[List[Dict[str, Any]]] = None,
+                  timezone_offset: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Cache key context. Pass `chat_history` for turns whose meaning depends on the
+    conversation: follow-ups ("yes", "the first one") mean different things after
+    different assistant turns, so the last assistant message becomes part of the key.
+    Pass `timezone_offset` when the reply renders or resolves local times.
+    """
+    last_turn = next((m for m in reversed(chat_history or []) if m.get("role") == "assistant"), None)
+    turn = None
+    if last_turn is not None:
+        content = last_turn.get("hiddenContent") or last_turn.get("content") or ""
+        turn = hashlib.sha1(content.encode()).hexdigest()[:16]
+    return {"scope": scope, "station": (station or "").lower(), "date": date_bucket, "turn": turn,
+            "tz": timezone_offset}
+
+
+response_cache = ResponseCache()
+subscribe(response_cache.invalidate)
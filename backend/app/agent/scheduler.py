@@ -0,0 +1,127 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first. Booking-completion turns jump ahead of
+# open-ended chat so a user half-way through a booking is not stuck
+# behind a burst of "stations near me" questions.
+PRIORITY_BOOKING = 0
+PRIORITY_DEFAULT = 10
+
+
+class InferenceQueueFull(Exception):
+    """Raised immediately when every model slot is busy and the wait queue is full."""
+
+
+class InferenceTimeout(Exception):
+    """Raised when a call could not be scheduled and completed within its timeout."""
+
+
+class InferenceScheduler:
+    """
+    Bounds concurrent LLM calls to the number of parallel slots the model server
+    exposes (Ollama's OLLAMA_NUM_PARALLEL). Callers beyond that wait in a bounded
+    priority queue; once the queue is full new calls are rejected straight away
+    instead of piling up on the event loop.
+    """
+
+    def __init__(self, concurrency: int = 1, max_queue: int = 16, timeout: float = 60.0):
+        self.concurrency = max(1, int(concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.timeout = float(timeout)
+        self._running = 0
+        self._queued = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_DEFAULT,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Run `call()` once a slot is free. The timeout covers queueing and inference."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout if timeout is not None else self.timeout)
+
+        await self._acquire(priority, deadline)
+        try:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            result = await asyncio.wait_for(call(), remaining)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise InferenceTimeout("Model did not respond in time")
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int, deadline: float) -> None:
+        if self._running < self.concurrency and not self._queued:
+            self._running += 1
+            return
+
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise InferenceQueueFull(
+                f"LLM queue full ({self._running} running, {self._queued} waiting)"
+            )
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self._queued += 1
+
+        try:
+            await asyncio.wait_for(fut, max(0.0, deadline - loop.time()))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed to us just as we gave up - pass it on.
+                self._release()
+            else:
+                # Entry stays in the heap; _release skips cancelled futures.
+                self._queued -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise InferenceTimeout("Timed out waiting for a free model slot")
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            # Hand the slot straight to the next waiter; _running is unchanged.
+            self._queued -= 1
+            fut.set_result(None)
+            return
+        self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "queued": self._queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+# Defaults follow the model server's parallel slot count when it is exported.
+inference_scheduler = InferenceScheduler(
+    concurrency=int(os.getenv("AGENT_LLM_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", "1"))),
+    max_queue=int(os.getenv("AGENT_LLM_MAX_QUEUE", "16")),
+    timeout=float(os.getenv("AGENT_LLM_TIMEOUT", "60")),
+)
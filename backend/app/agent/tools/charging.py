@@ -3,12 +3,16 @@ from contextvars import ContextVar
 from langchain_core.tools import tool
 from ...crud.station import find_stations_by_coordinates
 from ...crud.bookings import request_slot_booking
+from ...crud.slot_holds import SLOT_HOLD_MINUTES, create_slot_hold, list_active_holds
 from ...crud.statistics import list_stations
 from ...models.booking_model import BookingCreate
 from ...database import get_supabase_client
 from datetime import datetime, timedelta
 import uuid
 import difflib
+from ...utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 # Injected by the orchestrator before each agent loop — allows the tool
 # to write the authenticated user's ID into the booking without the LLM
@@ -22,7 +26,7 @@ async def tool_search_station_by_name(name: str) -> List[Dict[str, Any]]:
     Use this when the user mentions a specific station name (e.g., 'Central EV', 'Green Charge Hub').
     Returns matching stations with availability info.
     """
-    print(f"[TOOL:search_station_by_name] Searching DB for name: {name!r}")
+    logger.debug("[TOOL:search_station_by_name] Searching DB for name: %r", name)
     try:
         import difflib
         all_stations = await list_stations()
@@ -33,7 +37,7 @@ async def tool_search_station_by_name(name: str) -> List[Dict[str, Any]]:
         
         # 2. If no direct matches, try fuzzy matching
         if not results:
-            print(f"[TOOL:search_station_by_name] No direct match for {name!r}, trying fuzzy...")
+            logger.debug("[TOOL:search_station_by_name] No direct match for %r, trying fuzzy...", name)
             station_names = [s.get("name") or "" for s in all_stations]
             matches = difflib.get_close_matches(name, station_names, n=5, cutoff=0.5)
             
@@ -43,12 +47,12 @@ async def tool_search_station_by_name(name: str) -> List[Dict[str, Any]]:
                 # Sort results by match similarity
                 results.sort(key=lambda s: difflib.SequenceMatcher(None, name_lower, (s.get("name") or "").lower()).ratio(), reverse=True)
 
-        print(f"[TOOL:search_station_by_name] Found {len(results)} stations matching {name!r}")
+        logger.debug("[TOOL:search_station_by_name] Found %s stations matching %r", len(results), name)
         for r in results:
-            print(f"[TOOL:search_station_by_name]   → {r.get('name')} | available={r.get('available_slots')}")
+            logger.debug("[TOOL:search_station_by_name]   → %s | available=%s", r.get('name'), r.get('available_slots'))
         return results
     except Exception as e:
-        print(f"[TOOL:search_station_by_name] ❌ Error: {e}")
+        logger.error("[TOOL:search_station_by_name] ❌ Error: %s", e)
         return []
 
 @tool
@@ -61,16 +65,17 @@ async def tool_find_stations_nearby(
     """
     Finds EV charging stations near a specific latitude and longitude.
     """
-    print(f"[TOOL:find_stations_nearby] lat={lat} lon={lon} limit={limit} sort_by={sort_by}")
+    logger.debug("[TOOL:find_stations_nearby] lat=%s lon=%s limit=%s sort_by=%s", lat, lon, limit, sort_by)
     stations = await find_stations_by_coordinates(target_lat=lat, target_lon=lon, limit=limit, sort_by=sort_by)
-    print(f"[TOOL:find_stations_nearby] returned {len(stations) if isinstance(stations, list) else stations}")
+    logger.debug("[TOOL:find_stations_nearby] returned %s", len(stations) if isinstance(stations, list) else stations)
     return stations
 
 async def find_available_slots(
     station_id: str,
     date: str,
     start_time: str,
-    duration_minutes: int
+    duration_minutes: int,
+    timezone_offset: Optional[int] = 0,
 ) -> List[Dict[str, Any]]:
     """
     Queries the database to find explicitly available charging slots at a specific station for a given time.
@@ -78,9 +83,10 @@ async def find_available_slots(
     Parameters:
       - date: YYYY-MM-DD
       - start_time: HH:MM (24-hour format)
+      - timezone_offset: minutes to add to the local time to get UTC
     Returns a list of available slots.
     """
-    print(f"[TOOL:find_available_slots] Checking station {station_id} for {date} {start_time}")
+    logger.debug("[TOOL:find_available_slots] Checking station %s for %s %s", station_id, date, start_time)
     try:
         supabase = await get_supabase_client()
         
@@ -94,6 +100,9 @@ async def find_available_slots(
         dt_str = f"{date} {start_time}"
         req_start = datetime.strptime(dt_str, "%Y-%m-%d %H:%M")
         req_end = req_start + timedelta(minutes=duration_minutes)
+        # Holds are stored in UTC (see hold_slot_for_user)
+        req_start_utc = req_start + timedelta(minutes=timezone_offset or 0)
+        req_end_utc = req_end + timedelta(minutes=timezone_offset or 0)
 
         # 3. Fetch overlapping bookings
         blocking_statuses = ["confirmed", "active", "pending"]
@@ -104,6 +113,10 @@ async def find_available_slots(
             .execute()
             
         bookings = bookings_resp.data or []
+
+        # Live holds: other users' holds block a slot, our own mark it as ours
+        me = current_user_id.get("")
+        holds = await list_active_holds(station_id=station_id)
         
         # 4. Filter slots
         available_slots = []
@@ -113,7 +126,24 @@ async def find_available_slots(
                 
             slot_id = slot["id"]
             is_overlap = False
+            held_by_me = False
+            for h in holds:
+                if h.get("slot_id") != slot_id:
+                    continue
+                try:
+                    h_start = datetime.fromisoformat(h["start_time"].replace("Z", "+00:00")).replace(tzinfo=None)
+                    h_end = datetime.fromisoformat(h["end_time"].replace("Z", "+00:00")).replace(tzinfo=None)
+                except Exception:
+                    continue
+                if req_start_utc < h_end and h_start < req_end_utc:
+                    if me and str(h.get("user_id")) == me:
+                        held_by_me = True
+                    else:
+                        is_overlap = True
+                        break
             for b in bookings:
+                if is_overlap:
+                    break
                 if b.get("slot_id") != slot_id:
                     continue
                 # Parse existing booking times
@@ -127,7 +157,7 @@ async def find_available_slots(
                         is_overlap = True
                         break
                 except Exception as e:
-                    print(f"[TOOL:find_available_slots] Time parse error: {e}")
+                    logger.warning("[TOOL:find_available_slots] Time parse error: %s", e, sample=20)
                     pass
             
             if not is_overlap:
@@ -135,15 +165,17 @@ async def find_available_slots(
                     "slot_id": slot_id,
                     "connector_type": slot.get("connector_type"),
                     "max_power_kw": slot.get("max_power_kw"),
-                    "charger_type": slot.get("charger_type")
+                    "charger_type": slot.get("charger_type"),
+                    "held_by_me": held_by_me,
                 })
                 
         return available_slots
     except Exception as e:
-        print(f"[TOOL:find_available_slots] ❌ Error: {e}")
+        logger.error("[TOOL:find_available_slots] ❌ Error: %s", e)
         return []
 
-async def find_time_alternatives(station_id: str, req_date: str, req_time: str, duration: int) -> List[Dict[str, Any]]:
+async def find_time_alternatives(station_id: str, req_date: str, req_time: str, duration: int,
+                                 timezone_offset: Optional[int] = 0) -> List[Dict[str, Any]]:
     """Helper to find future available slots at the SAME station in 30-min increments."""
     from datetime import timedelta
     alternatives = []
@@ -161,7 +193,7 @@ async def find_time_alternatives(station_id: str, req_date: str, req_time: str,
             test_date = next_time.strftime("%Y-%m-%d")
             test_time = next_time.strftime("%H:%M")
             
-            slots = await find_available_slots(station_id, test_date, test_time, duration)
+            slots = await find_available_slots(station_id, test_date, test_time, duration, timezone_offset)
             if slots:
                 alternatives.append({
                     "id": f"{station_id}-time-{i}",
@@ -173,12 +205,72 @@ async def find_time_alternatives(station_id: str, req_date: str, req_time: str,
                     "max_power_kw": max((s.get("max_power_kw", 0) for s in slots if s.get("max_power_kw")), default=0)
                 })
     except Exception as e:
-        print(f"[TOOL:find_time_alternatives] Error: {e}")
+        logger.error("[TOOL:find_time_alternatives] Error: %s", e)
             
     # Sort by time ascending
     alternatives.sort(key=lambda x: x["suggested_time"])
     return alternatives
 
+async def hold_slot_for_user(
+    station_name_or_id: str,
+    date: str,
+    time_slot: str,
+    duration: int = 60,
+    connector_type: Optional[str] = None,
+    timezone_offset: Optional[int] = 0,
+) -> Optional[Dict[str, Any]]:
+    """
+    Best-effort soft hold for the booking conversation in progress: picks a free
+    slot (matching connector_type when given) and holds it for the current user
+    for SLOT_HOLD_MINUTES. An existing hold that already fits is kept as is.
+    Returns the hold, or None if nothing could be held.
+    """
+    user_id = current_user_id.get("")
+    if not user_id or SLOT_HOLD_MINUTES <= 0:
+        return None
+    try:
+        from datetime import timezone
+        start_dt = (datetime.strptime(f"{date} {time_slot}", "%Y-%m-%d %H:%M")
+                    + timedelta(minutes=timezone_offset or 0)).replace(tzinfo=timezone.utc)
+        end_dt = start_dt + timedelta(minutes=duration)
+
+        supabase = await get_supabase_client()
+        station_id = station_name_or_id
+        try:
+            uuid.UUID(station_id)
+        except ValueError:
+            resp = supabase.table("stations").select("id, name").ilike("name", station_name_or_id).limit(1).execute()
+            if resp.data:
+                station_id = resp.data[0]["id"]
+            else:
+                results = await tool_search_station_by_name.ainvoke({"name": station_name_or_id})
+                if not results:
+                    return None
+                station_id = results[0]["id"]
+
+        for h in await list_active_holds(user_id=user_id):
+            same_window = (str(h.get("station_id")) == str(station_id)
+                           and datetime.fromisoformat(h["start_time"].replace("Z", "+00:00")) == start_dt
+                           and datetime.fromisoformat(h["end_time"].replace("Z", "+00:00")) == end_dt)
+            if same_window and (not connector_type or (h.get("connector_type") or "").lower() == connector_type.lower()):
+                return h
+
+        slots = await find_available_slots(station_id, date, time_slot, duration, timezone_offset)
+        if connector_type:
+            slots = [s for s in slots if (s.get("connector_type") or "").lower() == connector_type.lower()] or slots
+        if not slots:
+            return None
+        slot = next((s for s in slots if s.get("held_by_me")), slots[0])
+
+        # find_available_slots has just checked bookings; other users' holds are re-checked atomically
+        hold = await create_slot_hold(user_id, station_id, slot["slot_id"], start_dt, end_dt,
+                                      connector_type=slot.get("connector_type"), verify=False)
+        logger.debug("[TOOL:hold_slot] 🔒 Holding slot %s (%s) until %s", slot['slot_id'], slot.get('connector_type'), hold.get('expires_at'))
+        return hold
+    except Exception as e:
+        logger.error("[TOOL:hold_slot] Could not place hold: %s", e)
+        return None
+
 @tool
 async def tool_create_booking_request(
     duration: int,
@@ -228,7 +320,7 @@ async def tool_create_booking_request(
         # but in normal chat flows, LLM passes the string name here.
     except ValueError:
         # It's a string name, search the DB
-        print(f"[TOOL:create_booking_request] Auto-resolving string {station_id!r} to UUID...")
+        logger.debug("[TOOL:create_booking_request] Auto-resolving string %r to UUID...", station_id)
         results = await tool_search_station_by_name.ainvoke({"name": station_id})
         if not results:
             return {"error": f"Could not find any station matching the name '{station_id}'. Ask the user to clarify the name."}
@@ -239,19 +331,19 @@ async def tool_create_booking_request(
             return {"error": f"Station name '{station_id}' does not closely match '{best_name}'. Please confirm the correct station name."}
         station_id = results[0]["id"]
         station_name_resolved = results[0].get("name", station_name_resolved)
-        print(f"[TOOL:create_booking_request] Resolved to UUID {station_id} (ratio: {ratio:.2f})")
+        logger.debug("[TOOL:create_booking_request] Resolved to UUID %s (ratio: %.2f)", station_id, ratio)
 
     # Auto-find an available slot ID from Python natively
-    print(f"[TOOL:create_booking_request] Auto-assigning slot for {connector_type}...")
+    logger.debug("[TOOL:create_booking_request] Auto-assigning slot for %s...", connector_type)
     try:
         from ...crud.station import find_nearby_stations
-        available_slots = await find_available_slots(station_id, date, time_slot, duration)
+        available_slots = await find_available_slots(station_id, date, time_slot, duration, timezone_offset)
         
         if not available_slots:
-            print(f"[TOOL:create_booking_request] ❌ No slots at {station_id}. Fetching alternatives...")
+            logger.warning("[TOOL:create_booking_request] ⚠️  No slots at %s. Fetching alternatives...", station_id)
             time_alts = []
             if station_id:
-                time_alts = await find_time_alternatives(station_id, date, time_slot, duration)
+                time_alts = await find_time_alternatives(station_id, date, time_slot, duration, timezone_offset)
                 if time_alts:
                     # Add station name to time suggestions
                     for t in time_alts:
@@ -271,9 +363,10 @@ async def tool_create_booking_request(
                 }
             }
 
-        # 1st priority: exact connector match
+        # 1st priority: exact connector match, preferring a slot this user is holding
         matching_slot = next(
-            (s for s in available_slots if s.get("connector_type", "").lower() == connector_type.lower()),
+            (s for s in sorted(available_slots, key=lambda s: not s.get("held_by_me"))
+             if s.get("connector_type", "").lower() == connector_type.lower()),
             None
         )
 
@@ -281,7 +374,7 @@ async def tool_create_booking_request(
         if matching_slot is None:
             matching_slot = available_slots[0]
             actual_type = matching_slot.get("connector_type", "Unknown")
-            print(f"[TOOL:create_booking_request] ⚠️  No exact {connector_type!r} match — found {actual_type!r} instead")
+            logger.warning("[TOOL:create_booking_request] ⚠️  No exact %r match — found %r instead", connector_type, actual_type)
             
             # Check if this fallback was already accepted/informed in chat (orchestrator will handle message)
             # For the tool purpose, we return the info and let orchestrator decide whether to prompt user.
@@ -297,7 +390,7 @@ async def tool_create_booking_request(
         slot_id = matching_slot["slot_id"]
         # Save actual connector matched to show in UI
         matched_connector_type = matching_slot.get("connector_type", connector_type)
-        print(f"[TOOL:create_booking_request] Assigned slot_id: {slot_id} ({matched_connector_type})")
+        logger.debug("[TOOL:create_booking_request] Assigned slot_id: %s (%s)", slot_id, matched_connector_type)
     except Exception as e:
         return {"error": f"Failed to calculate slot availability: {e}"}
 
@@ -334,17 +427,14 @@ async def tool_create_booking_request(
         "current_battery_level": current_battery,
         "user_id": user_id,
     }
-    print(f"[TOOL:create_booking_request] ─── booking_data ───")
-    for k, v in booking_data.items():
-        print(f"[TOOL:create_booking_request]   {k}: {v!r}")
-    print(f"[TOOL:create_booking_request] ────────────────────")
+    logger.debug("[TOOL:create_booking_request] booking_data", **booking_data)
 
     try:
         # NOTE: Using BookingCreate ensures validation
         validated_data = BookingCreate(**booking_data)
-        print(f"[TOOL:create_booking_request] ✅ Pydantic validation passed")
+        logger.debug("[TOOL:create_booking_request] ✅ Pydantic validation passed")
     except Exception as e:
-        print(f"[TOOL:create_booking_request] ❌ Pydantic validation FAILED: {e}")
+        logger.error("[TOOL:create_booking_request] ❌ Pydantic validation FAILED: %s", e)
         return {"error": f"Validation failed: {e}"}
 
     try:
@@ -383,18 +473,18 @@ async def tool_create_booking_request(
             result["booking_date"] = start_dt_obj.strftime("%Y-%m-%d")
             result["booking_datetime_display"] = f"{start_dt_obj.strftime('%Y-%m-%d')} {start_time_str}-{end_time_str} ({duration_display})"
         
-        print(f"[TOOL:create_booking_request] ✅ Booking created: {result}")
+        logger.debug("[TOOL:create_booking_request] ✅ Booking created: %s", result)
         return result
     except Exception as e:
         err_msg = str(e)
-        print(f"[TOOL:create_booking_request] ❌ request_slot_booking FAILED: {err_msg}")
+        logger.error("[TOOL:create_booking_request] ❌ request_slot_booking FAILED: %s", err_msg)
         
         # If it's a conflict error, try to provide alternatives
         if "unavailable" in err_msg or "existing booking" in err_msg:
             from ...crud.station import find_nearby_stations
-            print(f"[TOOL:create_booking_request] 🔄 Conflict detected, fetching alternatives...")
+            logger.debug("[TOOL:create_booking_request] 🔄 Conflict detected, fetching alternatives...")
             
-            time_alts = await find_time_alternatives(station_id, date, time_slot, duration)
+            time_alts = await find_time_alternatives(station_id, date, time_slot, duration, timezone_offset)
             if time_alts:
                 for t in time_alts:
                     t["name"] = f"Wait for {station_name_resolved}"
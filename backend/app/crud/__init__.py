@@ -39,6 +39,8 @@ from .charging_sessions import (
     update_charging_session,
     list_charging_sessions,
     list_charging_sessions_between,
+    list_user_charging_sessions,
+    list_user_charging_sessions_changed_since,
 )
 
 # Station Managers
@@ -83,6 +85,7 @@ from .statistics import (
     get_all_users,
     get_stations_with_managers,
     list_stations,
+    station_slot_counts,
     list_station_managers,
     list_managers_for_station,
     get_all_station_managers,
@@ -113,12 +116,13 @@ __all__ = [
     # Charging Sessions
     "get_charging_session", "create_charging_session", "update_charging_session",
     "list_charging_sessions", "list_charging_sessions_between",
+    "list_user_charging_sessions", "list_user_charging_sessions_changed_since",
     # Station Managers
     "get_station_manager", "create_station_manager", "update_station_manager",
     "list_station_managers", "list_managers_for_station", "assign_manager_to_station",
     "get_all_station_managers", "get_manager_stations", "get_manager_bookings", "get_manager_sessions",
     # Stations
-    "list_stations", "create_station", "get_station", "update_station", "delete_station",
+    "list_stations", "station_slot_counts", "create_station", "get_station", "update_station", "delete_station",
     # Feedback
     "get_feedback", "create_feedback", "update_feedback", "list_feedback", "list_station_feedback",
     # Admins
@@ -2,7 +2,11 @@ from typing import Any, Dict, List, Optional
 from uuid import UUID
 import httpx
 from ..database import get_supabase_client
+from ..utils.tracing import trace_module
 from ..models import AdminCreate, AdminUpdate, AdminOut, ProfileOut
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 async def list_profiles() -> List[ProfileOut]:
     """Get all user profiles."""
@@ -12,7 +16,7 @@ async def list_profiles() -> List[ProfileOut]:
         data = response.data or []
         return [ProfileOut(**profile) for profile in data]
     except httpx.HTTPError as e:
-        print(f"Error fetching user profiles: {e}")
+        logger.error("Error fetching user profiles: %s", e)
         return []
 
 
@@ -23,7 +27,7 @@ async def get_admin(admin_id: UUID) -> Optional[AdminOut]:
         data = response.data
         return AdminOut(**data) if data else None
     except httpx.HTTPError as e:
-        print(f"Error fetching admin {admin_id}: {e}")
+        logger.error("Error fetching admin %s: %s", admin_id, e)
         return None
 
 async def create_admin(admin_data: AdminCreate) -> Optional[AdminOut]:
@@ -33,7 +37,7 @@ async def create_admin(admin_data: AdminCreate) -> Optional[AdminOut]:
         created = (response.data or [None])[0]
         return AdminOut(**created) if created else None
     except httpx.HTTPError as e:
-        print(f"Error creating admin: {e}")
+        logger.error("Error creating admin: %s", e)
         return None
 
 async def update_admin(admin_id: UUID, update_data: AdminUpdate) -> Optional[AdminOut]:
@@ -43,7 +47,7 @@ async def update_admin(admin_id: UUID, update_data: AdminUpdate) -> Optional[Adm
         updated = (response.data or [None])[0]
         return AdminOut(**updated) if updated else None
     except httpx.HTTPError as e:
-        print(f"Error updating admin {admin_id}: {e}")
+        logger.error("Error updating admin %s: %s", admin_id, e)
         return None
 
 async def list_admins() -> List[AdminOut]:
@@ -53,5 +57,8 @@ async def list_admins() -> List[AdminOut]:
         items = response.data or []
         return [AdminOut(list_profiles**item) for item in items]
     except httpx.HTTPError as e:
-        print(f"Error listing admins: {e}")
+        logger.error("Error listing admins: %s", e)
         return []
+
+
+trace_module(globals())
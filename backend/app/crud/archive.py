@@ -0,0 +1,147 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..database import get_supabase_service_role_client
+from ..utils.tracing import trace_module
+from ..utils import cold_storage
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Off by default: the job deletes rows from the hot tables once they are written to Parquet.
+# It also needs ARCHIVE_DIR on storage every worker mounts (see utils.cold_storage).
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() in ("1", "true", "yes")
+# Finished bookings/sessions that started longer ago than this move to cold storage
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+# Ids per DELETE ... id=in.(...) request, to keep the URL short
+_DELETE_CHUNK = 200
+# Every worker schedules the job; a lease in Postgres lets one of them run it at a time.
+# A holder that dies keeps it until it expires.
+ARCHIVE_LEASE_SECONDS = int(os.getenv("ARCHIVE_LEASE_SECONDS", str(6 * 60 * 60)))
+_LEASE_JOB = "archive_cold_rows"
+_LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Rows in these states never change again
+ARCHIVABLE_STATUSES = {
+    "charging_sessions": ["completed", "cancelled"],
+    "bookings": ["completed", "cancelled"],
+}
+
+
+async def _archive_table(supabase, table: str, cutoff: datetime) -> int:
+    archived = 0
+    skipped = 0
+    while True:
+        rows = (
+            supabase.table(table)
+            .select("*")
+            .in_("status", ARCHIVABLE_STATUSES[table])
+            .lt("start_time", cutoff.isoformat())
+            .order("start_time")
+            .order("id")
+            .range(skipped, skipped + ARCHIVE_BATCH_SIZE - 1)
+            .execute()
+        ).data or []
+        if not rows:
+            break
+        batch_size = len(rows)
+
+        if table == "bookings":
+            # Deleting a booking deletes its sessions; keep bookings whose sessions are still hot
+            ids = [str(r["id"]) for r in rows]
+            live = supabase.table("charging_sessions").select("booking_id").in_("booking_id", ids).execute().data or []
+            live_ids = {str(s["booking_id"]) for s in live}
+            if live_ids:
+                rows = [r for r in rows if str(r["id"]) not in live_ids]
+                skipped += len(live_ids)
+
+        if rows:
+            # Written (and renamed into place) before the delete; a crash in between leaves the
+            # rows in both places (and the next run archives them again), so readers prefer the
+            # hot copy and count each archived id once
+            cold_storage.write_rows(table, rows)
+            ids = [str(r["id"]) for r in rows]
+            for i in range(0, len(ids), _DELETE_CHUNK):
+                supabase.table(table).delete().in_("id", ids[i:i + _DELETE_CHUNK]).execute()
+            archived += len(rows)
+
+        if batch_size < ARCHIVE_BATCH_SIZE:
+            break
+    return archived
+
+
+async def archive_cold_rows(older_than_days: int = ARCHIVE_AFTER_DAYS) -> Dict[str, Any]:
+    """
+    Move completed/cancelled bookings and sessions that started more than
+    `older_than_days` ago into Parquet cold storage and delete them from the
+    hot tables. Sessions go first so no booking is deleted (cascading to its
+    sessions) before its sessions are archived. Skipped while another worker
+    holds the job's lease.
+    """
+    if not cold_storage.available():
+        return {"success": False, "error": "pyarrow is not installed", "updated_count": 0}
+    if not cold_storage.configured():
+        return {"success": False, "error": "ARCHIVE_DIR must be an absolute path on shared storage", "updated_count": 0}
+    leased = False
+    try:
+        supabase = await get_supabase_service_role_client()
+        leased = bool(supabase.rpc("try_acquire_job_lease", {
+            "lease_job": _LEASE_JOB, "lease_holder": _LEASE_HOLDER, "ttl_seconds": ARCHIVE_LEASE_SECONDS,
+        }).execute().data)
+        if not leased:
+            logger.info("⏭️  Archive run skipped: another worker holds the lease")
+            return {"success": True, "skipped": True, "updated_count": 0}
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        counts = {}
+        for table in ("charging_sessions", "bookings"):
+            counts[table] = await _archive_table(supabase, table, cutoff)
+        total = sum(counts.values())
+        if total:
+            logger.info("✅ Archived %s bookings and %s charging sessions", counts['bookings'], counts['charging_sessions'])
+        return {"success": True, "updated_count": total, **counts}
+    except Exception as e:
+        logger.error("❌ Error archiving cold rows: %s", e)
+        return {"success": False, "error": str(e), "updated_count": 0}
+    finally:
+        if leased:
+            try:
+                supabase.rpc("release_job_lease", {"lease_job": _LEASE_JOB, "lease_holder": _LEASE_HOLDER}).execute()
+            except Exception as e:
+                logger.warning("⚠️  Could not release the archive lease: %s", e)
+
+
+def with_archived_rows(
+    table: str,
+    hot_rows: List[Dict[str, Any]],
+    columns: Iterable[str],
+    since: Optional[datetime] = None,
+    station_ids: Optional[Iterable[str]] = None,
+    time_column: str = "start_time",
+) -> List[Dict[str, Any]]:
+    """
+    Add archived rows matching the same window/station filter to rows read from a
+    hot table. Rows present in both, or archived twice (an interrupted archive run),
+    are counted once, preferring the hot copy; `columns` must include "id" for that.
+    """
+    try:
+        cold = cold_storage.read_rows(table, columns=columns, since=since, station_ids=station_ids, time_column=time_column)
+    except Exception as e:
+        logger.warning("⚠️  Could not read archived %s: %s", table, e)
+        return hot_rows
+    if not cold:
+        return hot_rows
+    seen = {str(r.get("id")) for r in hot_rows}
+    merged = list(hot_rows)
+    for row in cold:
+        row_id = str(row.get("id"))
+        if row_id not in seen:
+            seen.add(row_id)
+            merged.append(row)
+    return merged
+
+
+trace_module(globals())
@@ -1,9 +1,16 @@
 from typing import Any, Dict, List, Optional
 from uuid import UUID
 from ..database import get_supabase_client, get_supabase_service_role_client
+from ..utils.tracing import trace_module
 import httpx
 from ..models import BookingCreate, BookingUpdate, BookingOut
+from ..utils.availability import notify_availability_change
+from ..utils.sync_cursor import SYNC_PAGE_SIZE, fetch_changed_rows
+from .slot_holds import list_active_holds, overlapping_holds, release_slot_holds
 from datetime import datetime
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 # from ...utils.datetime_utils import datetime_to_str  # add this if not exists
 
 # User requests a booking slot (status: pending)
@@ -65,7 +72,7 @@ async def request_slot_booking(booking_data: BookingCreate) -> Optional[BookingO
                 if station_data and station_data.get("status") == "under_maintenance":
                     raise ValueError(f"Station is currently under maintenance and unavailable for booking")
         except httpx.HTTPError as e:
-            print(f"Error checking slot/station status for slot {slot_id}: {e}")
+            logger.error("Error checking slot/station status for slot %s: %s", slot_id, e)
             # re-raise to be handled by router
             raise
 
@@ -131,9 +138,18 @@ async def request_slot_booking(booking_data: BookingCreate) -> Optional[BookingO
                 else:
                     raise ValueError(f"Slot {slot_id} unavailable between {start_dt.isoformat()} and {end_dt.isoformat()} due to existing booking.")
         except httpx.HTTPError as e:
-            print(f"Error checking existing bookings for slot {slot_id}: {e}")
+            logger.error("Error checking existing bookings for slot %s: %s", slot_id, e)
             raise
 
+    # Another user's live hold blocks the window too (emergency bookings pre-empt holds)
+    if slot_id:
+        battery_level = booking_dict.get('current_battery_level')
+        is_emergency = battery_level is not None and float(battery_level) < 15.0
+        held = overlapping_holds(await list_active_holds(slot_id=slot_id), start_dt, end_dt,
+                                 exclude_user_id=booking_dict.get('user_id'))
+        if held and not is_emergency:
+            raise ValueError(f"Slot {slot_id} unavailable between {start_dt.isoformat()} and {end_dt.isoformat()} due to an active hold.")
+
     # No conflicts or we successfully pre-empted others — insert as confirmed!
     try:
         if isinstance(start_dt, datetime):
@@ -148,12 +164,16 @@ async def request_slot_booking(booking_data: BookingCreate) -> Optional[BookingO
         created = (response.data or [None])[0]
         if not created:
             raise RuntimeError("Failed to insert booking")
+        if slot_id and booking_dict.get('user_id'):
+            # The booking replaces whatever hold the user had on this slot
+            await release_slot_holds(booking_dict['user_id'], slot_id=slot_id)
+        notify_availability_change(created.get("station_id"))
         return BookingOut(**created)
     except httpx.HTTPError as e:
-        print(f"❌ Error creating booking (http): {e}")
+        logger.error("❌ Error creating booking (http): %s", e)
         raise
     except Exception as e:
-        print(f"❌ Error creating booking: {e}")
+        logger.error("❌ Error creating booking: %s", e)
         raise
 
 # Added alias expected by other modules
@@ -169,7 +189,7 @@ async def get_pending_bookings(station_id: UUID) -> List[BookingOut]:
         items = response.data or []
         return [BookingOut(**item) for item in items]
     except httpx.HTTPError as e:
-        print(f"Error fetching pending bookings for station {station_id}: {e}")
+        logger.error("Error fetching pending bookings for station %s: %s", station_id, e)
         return []
 
 # Manager accepts or rejects a booking
@@ -179,9 +199,11 @@ async def manager_update_booking_status(booking_id: UUID, status: str) -> Option
         supabase = await get_supabase_client()
         response = supabase.table("bookings").update({"status": status}).eq("id", str(booking_id)).execute()
         updated = (response.data or [None])[0]
+        if updated:
+            notify_availability_change(updated.get("station_id"))
         return BookingOut(**updated) if updated else None
     except httpx.HTTPError as e:
-        print(f"Error updating booking status for {booking_id}: {e}")
+        logger.error("Error updating booking status for %s: %s", booking_id, e)
         return None
 
 
@@ -197,13 +219,14 @@ async def accept_booking_atomic(booking_id: UUID, manager_id: UUID) -> Optional[
         rpc_res = supabase.rpc('accept_booking', { 'booking_uuid': str(booking_id), 'manager_uuid': str(manager_id) }).execute()
         data = getattr(rpc_res, 'data', None)
         if not data:
-            print(f"accept_booking_atomic: RPC returned no data for {booking_id}")
+            logger.debug("accept_booking_atomic: RPC returned no data for %s", booking_id)
             return None
         payload = data[0] if isinstance(data, list) and len(data) > 0 else data
+        notify_availability_change(payload.get("station_id"))
         return BookingOut(**payload)
     except Exception as e:
         # If RPC not available or errors, fall back to application-side checks
-        print(f"accept_booking_atomic rpc error (falling back): {e}")
+        logger.error("accept_booking_atomic rpc error (falling back): %s", e)
         try:
             supabase = await get_supabase_service_role_client()
 
@@ -211,11 +234,11 @@ async def accept_booking_atomic(booking_id: UUID, manager_id: UUID) -> Optional[
             resp = supabase.table("bookings").select("*").eq("id", str(booking_id)).single().execute()
             booking = resp.data
             if not booking:
-                print(f"accept_booking_atomic: booking {booking_id} not found")
+                logger.warning("accept_booking_atomic: booking %s not found", booking_id)
                 return None
 
             if booking.get("status") != "pending":
-                print(f"accept_booking_atomic: booking {booking_id} not pending (status={booking.get('status')})")
+                logger.warning("accept_booking_atomic: booking %s not pending (status=%s)", booking_id, booking.get('status'))
                 return None
 
             slot_id = booking.get("slot_id")
@@ -226,7 +249,7 @@ async def accept_booking_atomic(booking_id: UUID, manager_id: UUID) -> Optional[
             # Verify manager manages the station
             station_check = supabase.table("stations").select("id").eq("id", station_id).eq("station_manager", str(manager_id)).single().execute()
             if not station_check.data:
-                print(f"accept_booking_atomic: manager {manager_id} does not manage station {station_id}")
+                logger.warning("accept_booking_atomic: manager %s does not manage station %s", manager_id, station_id)
                 return None
 
             # Get confirmed bookings for same slot and check for overlap
@@ -237,15 +260,17 @@ async def accept_booking_atomic(booking_id: UUID, manager_id: UUID) -> Optional[
                 a_start = a.get("start_time")
                 a_end = a.get("end_time")
                 if not (a_end <= start_time or a_start >= end_time):
-                    print(f"accept_booking_atomic: overlapping confirmed booking {a.get('id')} found for slot {slot_id}")
+                    logger.warning("accept_booking_atomic: overlapping confirmed booking %s found for slot %s", a.get('id'), slot_id)
                     return None
 
             # No overlap and manager authorized — confirm booking
             upd = supabase.table("bookings").update({"status": "confirmed"}).eq("id", str(booking_id)).execute()
             updated = (upd.data or [None])[0]
+            if updated:
+                notify_availability_change(station_id)
             return BookingOut(**updated) if updated else None
         except Exception as e2:
-            print(f"accept_booking_atomic fallback error: {e2}")
+            logger.error("accept_booking_atomic fallback error: %s", e2)
             return None
 
 # Added: update a booking by id
@@ -257,9 +282,11 @@ async def update_booking(booking_id: UUID, update_data: BookingUpdate) -> Option
         upd = update_data.dict(exclude_unset=True) if hasattr(update_data, "dict") else dict(update_data)
         resp = supabase.table("bookings").update(upd).eq("id", str(booking_id)).execute()
         updated = (resp.data or [None])[0]
+        if updated:
+            notify_availability_change(updated.get("station_id"))
         return BookingOut(**updated) if updated else None
     except Exception as e:
-        print(f"❌ Error updating booking {booking_id}: {e}")
+        logger.error("❌ Error updating booking %s: %s", booking_id, e)
         return None
 
 # Added: fetch a single booking by id
@@ -271,24 +298,29 @@ async def get_booking(booking_id: UUID) -> Optional[BookingOut]:
         data = resp.data
         return BookingOut(**data) if data else None
     except Exception as e:
-        print(f"❌ Error fetching booking {booking_id}: {e}")
+        logger.error("❌ Error fetching booking %s: %s", booking_id, e)
         return None
 
 # Added: list bookings, optionally filtered by user_id
-async def list_bookings(user_id: Optional[UUID] = None) -> List[BookingOut]:
+async def list_bookings(user_id: Optional[UUID] = None, validate: bool = True, columns: str = "*") -> List[BookingOut]:
     """Return bookings. If user_id is provided, return bookings for that user only.
 
     Args:
         user_id: Optional UUID of the user whose bookings should be returned.
+        validate: When False, return the trusted rows as dicts without building BookingOut models.
+        columns: PostgREST select for a sparse fieldset; anything but "*" returns the
+            raw rows without the vehicle/station/slot enrichment.
     """
     try:
         supabase = await get_supabase_client()
         # First get the basic booking data
-        query = supabase.table("bookings").select("*")
+        query = supabase.table("bookings").select(columns)
         if user_id is not None:
             query = query.eq("user_id", str(user_id))
         resp = query.execute()
         items = resp.data or []
+        if columns != "*":
+            return items
 
         # For each booking, fetch related data separately to avoid join issues
         transformed_items = []
@@ -307,7 +339,7 @@ async def list_bookings(user_id: Optional[UUID] = None) -> List[BookingOut]:
                 else:
                     transformed['vehicle_name'] = 'Unknown Vehicle'
             except Exception as e:
-                print(f"Error fetching vehicle for booking {item.get('id')}: {e}")
+                logger.error("Error fetching vehicle for booking %s: %s", item.get('id'), e, sample=20)
                 transformed['vehicle_name'] = 'Unknown Vehicle'
 
             # Get station info
@@ -325,7 +357,7 @@ async def list_bookings(user_id: Optional[UUID] = None) -> List[BookingOut]:
                     transformed['station_name'] = 'Unknown Station'
                     transformed['station_address'] = 'Address not available'
             except Exception as e:
-                print(f"Error fetching station for booking {item.get('id')}: {e}")
+                logger.error("Error fetching station for booking %s: %s", item.get('id'), e, sample=20)
                 transformed['station_name'] = 'Unknown Station'
                 transformed['station_address'] = 'Address not available'
 
@@ -341,20 +373,67 @@ async def list_bookings(user_id: Optional[UUID] = None) -> List[BookingOut]:
                 else:
                     transformed['connector_type'] = 'Unknown'
             except Exception as e:
-                print(f"Error fetching slot for booking {item.get('id')}: {e}")
+                logger.error("Error fetching slot for booking %s: %s", item.get('id'), e, sample=20)
                 transformed['connector_type'] = 'Unknown'
 
             transformed_items.append(transformed)
 
+        if not validate:
+            return transformed_items
         return [BookingOut(**item) for item in transformed_items]
     except Exception as e:
-        print(f"❌ Error listing bookings: {e}")
+        logger.error("❌ Error listing bookings: %s", e)
+        return []
+
+
+async def list_user_bookings_changed_since(user_id: UUID, since_ts: str, limit: int = SYNC_PAGE_SIZE,
+                                          columns: str = "*") -> List[Dict[str, Any]]:
+    """Raw booking rows of one user with updated_at >= since_ts, oldest change first (limit + 1 rows)."""
+    try:
+        supabase = await get_supabase_client()
+        query = supabase.table("bookings").select(columns).eq("user_id", str(user_id))
+        return fetch_changed_rows(query, since_ts, limit)
+    except Exception as e:
+        logger.error("❌ Error listing changed bookings for user %s: %s", user_id, e)
+        raise
+
+
+async def list_upcoming_user_bookings(user_id: UUID, limit: int = 5) -> List[Dict[str, Any]]:
+    """Return a user's confirmed/pending bookings that have not started yet, soonest first,
+    with station names attached. Two queries regardless of the number of bookings."""
+    try:
+        supabase = await get_supabase_client()
+        now_iso = datetime.utcnow().isoformat()
+        resp = (
+            supabase.table("bookings")
+            .select("id, station_id, slot_id, start_time, end_time, status")
+            .eq("user_id", str(user_id))
+            .in_("status", ["confirmed", "pending"])
+            .gte("start_time", now_iso)
+            .order("start_time")
+            .limit(limit)
+            .execute()
+        )
+        items = resp.data or []
+        station_ids = list({str(b["station_id"]) for b in items if b.get("station_id")})
+        names = {}
+        if station_ids:
+            st_resp = supabase.table("stations").select("id, name").in_("id", station_ids).execute()
+            names = {str(s["id"]): s.get("name") for s in (st_resp.data or [])}
+        for b in items:
+            b["station_name"] = names.get(str(b.get("station_id")), "Unknown Station")
+        return items
+    except Exception as e:
+        logger.error("❌ Error listing upcoming bookings for %s: %s", user_id, e)
         return []
 
 
-async def activate_started_bookings() -> Dict[str, Any]:
+async def activate_started_bookings(unbounded: bool = False) -> Dict[str, Any]:
     """Activate all confirmed bookings that have reached their start_time.
 
+    By default only bookings that started within the RPC's lookback are scanned;
+    unbounded=True also sweeps older ones (slower, run by the daily sweep).
+
     Returns:
         Dict containing the number of bookings activated.
     """
@@ -362,7 +441,7 @@ async def activate_started_bookings() -> Dict[str, Any]:
         supabase = await get_supabase_service_role_client()
 
         # Call the RPC function to activate started bookings
-        rpc_result = supabase.rpc('activate_started_bookings').execute()
+        rpc_result = supabase.rpc('activate_started_bookings', {'lookback': None} if unbounded else {}).execute()
 
         # Improved response parsing with multiple fallback strategies
         updated_count = 0
@@ -387,7 +466,7 @@ async def activate_started_bookings() -> Dict[str, Any]:
                 message = getattr(rpc_result, 'message', '')
 
         except Exception as parse_error:
-            print(f"⚠️  Response parsing failed: {parse_error}")
+            logger.warning("⚠️  Response parsing failed: %s", parse_error)
             # Strategy 3: Try to extract from error details if available
             try:
                 if hasattr(rpc_result, 'data') and rpc_result.data:
@@ -402,26 +481,30 @@ async def activate_started_bookings() -> Dict[str, Any]:
                         updated_count = parsed.get('updated_count', 0)
                         message = parsed.get('message', '')
             except Exception as fallback_error:
-                print(f"⚠️  Fallback parsing also failed: {fallback_error}")
+                logger.warning("⚠️  Fallback parsing also failed: %s", fallback_error)
 
         if updated_count > 0:
-            print(f"✅ Activated {updated_count} started bookings")
+            notify_availability_change()
+            logger.info("✅ Activated %s started bookings", updated_count)
             if message:
-                print(f"   📝 {message}")
+                logger.debug("   📝 %s", message)
         else:
-            print("ℹ️  No bookings to activate")
+            logger.debug("ℹ️  No bookings to activate")
 
         return {"success": True, "updated_count": updated_count, "message": message}
 
     except Exception as e:
-        print(f"❌ Error activating started bookings: {e}")
+        logger.error("❌ Error activating started bookings: %s", e)
         # Don't return error details that might contain sensitive info
         return {"success": False, "error": "Failed to activate bookings", "updated_count": 0}
 
 
-async def complete_expired_bookings() -> Dict[str, Any]:
+async def complete_expired_bookings(unbounded: bool = False) -> Dict[str, Any]:
     """Complete all active bookings that have passed their end_time.
 
+    By default only bookings that started within the RPC's lookback are scanned;
+    unbounded=True also sweeps older ones (slower, run by the daily sweep).
+
     Returns:
         Dict containing the number of bookings completed.
     """
@@ -429,7 +512,7 @@ async def complete_expired_bookings() -> Dict[str, Any]:
         supabase = await get_supabase_service_role_client()
 
         # Call the RPC function to complete expired bookings
-        rpc_result = supabase.rpc('complete_expired_bookings').execute()
+        rpc_result = supabase.rpc('complete_expired_bookings', {'lookback': None} if unbounded else {}).execute()
 
         # Improved response parsing with multiple fallback strategies
         updated_count = 0
@@ -454,7 +537,7 @@ async def complete_expired_bookings() -> Dict[str, Any]:
                 message = getattr(rpc_result, 'message', '')
 
         except Exception as parse_error:
-            print(f"⚠️  Response parsing failed: {parse_error}")
+            logger.warning("⚠️  Response parsing failed: %s", parse_error)
             # Strategy 3: Try to extract from error details if available
             try:
                 if hasattr(rpc_result, 'data') and rpc_result.data:
@@ -469,18 +552,22 @@ async def complete_expired_bookings() -> Dict[str, Any]:
                         updated_count = parsed.get('updated_count', 0)
                         message = parsed.get('message', '')
             except Exception as fallback_error:
-                print(f"⚠️  Fallback parsing also failed: {fallback_error}")
+                logger.warning("⚠️  Fallback parsing also failed: %s", fallback_error)
 
         if updated_count > 0:
-            print(f"✅ Completed {updated_count} expired bookings")
+            notify_availability_change()
+            logger.info("✅ Completed %s expired bookings", updated_count)
             if message:
-                print(f"   📝 {message}")
+                logger.debug("   📝 %s", message)
         else:
-            print("ℹ️  No expired bookings to complete")
+            logger.debug("ℹ️  No expired bookings to complete")
 
         return {"success": True, "updated_count": updated_count, "message": message}
 
     except Exception as e:
-        print(f"❌ Error completing expired bookings: {e}")
+        logger.error("❌ Error completing expired bookings: %s", e)
         # Don't return error details that might contain sensitive info
         return {"success": False, "error": "Failed to complete bookings", "updated_count": 0}
+
+
+trace_module(globals())
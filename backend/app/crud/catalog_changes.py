@@ -0,0 +1,132 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from ..database import get_supabase_service_role_client
+from ..utils.tracing import trace_module
+from .slots import list_slots
+from .statistics import list_stations, station_slot_counts
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Max change log entries folded into one /stations/changes page
+CATALOG_CHANGES_PAGE = int(os.getenv("CATALOG_CHANGES_PAGE", "1000"))
+# A page stops at the first entry younger than this, so a version committed out of order is never skipped
+CATALOG_CHANGES_SETTLE_SECONDS = float(os.getenv("CATALOG_CHANGES_SETTLE_SECONDS", "5"))
+CATALOG_CHANGES_KEEP_DAYS = int(os.getenv("CATALOG_CHANGES_KEEP_DAYS", "30"))
+
+
+def _parse_changed_at(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        changed_at = value
+    else:
+        changed_at = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return changed_at if changed_at.tzinfo else changed_at.replace(tzinfo=timezone.utc)
+
+
+async def _version_edge(newest: bool) -> int:
+    supabase = await get_supabase_service_role_client()
+    response = supabase.table("catalog_changes").select("version").order("version", desc=newest).limit(1).execute()
+    rows = response.data or []
+    return int(rows[0]["version"]) if rows else 0
+
+
+async def full_catalog() -> Dict[str, Any]:
+    """Every station (with slot counts) and slot, stamped with the current change log version."""
+    # Read the version first: anything changing while we load is sent again on the next sync
+    version = await _version_edge(newest=True)
+    return {
+        "version": version,
+        "full": True,
+        "has_more": False,
+        "stations": await list_stations(),
+        "slots": await list_slots([]),
+        "deleted": {"stations": [], "slots": []},
+    }
+
+
+async def catalog_changes_since(since: int, limit: int = CATALOG_CHANGES_PAGE) -> Dict[str, Any]:
+    """
+    Stations and slots inserted/updated since `since`, plus tombstones for deleted ones.
+    Falls back to a full catalog when `since` is older than the retained change log
+    (or newer than anything logged, e.g. after a database reset).
+
+    Args:
+        since: Last version the client has applied (0 for a first sync).
+        limit: Max change log entries to fold into this page; `has_more` signals another page.
+    """
+    if since <= 0:
+        return await full_catalog()
+
+    supabase = await get_supabase_service_role_client()
+    oldest, newest = await _version_edge(newest=False), await _version_edge(newest=True)
+    if newest == 0 or since > newest or since < oldest - 1:
+        return await full_catalog()
+
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=CATALOG_CHANGES_SETTLE_SECONDS)
+    response = (
+        supabase.table("catalog_changes")
+        .select("version, entity, entity_id, op, changed_at")
+        .gt("version", since)
+        .order("version")
+        .limit(limit + 1)
+        .execute()
+    )
+    entries = response.data or []
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    # A lower version may still be uncommitted while this one is young: stop here rather than
+    # move the cursor past it. Filtering young entries out instead would skip it for good.
+    for i, entry in enumerate(entries):
+        if _parse_changed_at(entry.get("changed_at")) >= settled_before:
+            entries, has_more = entries[:i], False
+            break
+
+    # Only the latest operation per row matters
+    latest: Dict[tuple, str] = {}
+    for entry in entries:
+        latest[(entry["entity"], str(entry["entity_id"]))] = entry["op"]
+
+    def ids(entity: str, deleted: bool) -> List[str]:
+        return [eid for (ent, eid), op in latest.items() if ent == entity and (op == "delete") == deleted]
+
+    changed_station_ids, changed_slot_ids = ids("station", False), ids("slot", False)
+    stations: List[Dict[str, Any]] = []
+    if changed_station_ids:
+        stations = supabase.table("stations").select("*").in_("id", changed_station_ids).execute().data or []
+        counts = await station_slot_counts(changed_station_ids)
+        for station in stations:
+            station.update(counts.get(str(station.get("id"))) or {"total_slots": 0, "available_slots": 0, "connector_types": []})
+    slots: List[Dict[str, Any]] = []
+    if changed_slot_ids:
+        slots = supabase.table("charging_slots").select("*").in_("id", changed_slot_ids).execute().data or []
+
+    # Rows logged as changed but already gone by now are tombstones too
+    found_stations = {str(s.get("id")) for s in stations}
+    found_slots = {str(s.get("id")) for s in slots}
+    return {
+        "version": int(entries[-1]["version"]) if entries else since,
+        "full": False,
+        "has_more": has_more,
+        "stations": stations,
+        "slots": slots,
+        "deleted": {
+            "stations": ids("station", True) + [sid for sid in changed_station_ids if sid not in found_stations],
+            "slots": ids("slot", True) + [sid for sid in changed_slot_ids if sid not in found_slots],
+        },
+    }
+
+
+async def prune_catalog_changes(keep_days: int = CATALOG_CHANGES_KEEP_DAYS) -> Dict[str, Any]:
+    """Drop old change log entries; clients older than the log do a full reload."""
+    try:
+        supabase = await get_supabase_service_role_client()
+        response = supabase.rpc("prune_catalog_changes", {"keep_days": keep_days}).execute()
+        return response.data or {"updated_count": 0}
+    except Exception as e:
+        logger.error("❌ Error pruning catalog changes: %s", e)
+        return {"updated_count": 0, "error": str(e)}
+
+
+trace_module(globals())
@@ -2,6 +2,12 @@ from typing import Any, Dict, List, Optional
 from uuid import UUID
 import httpx
 from ..database import get_supabase_client
+from ..utils.tracing import trace_module
+from ..utils.availability import notify_availability_change
+from ..utils.sync_cursor import SYNC_PAGE_SIZE, fetch_changed_rows
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 
 async def get_charging_session(session_id: UUID) -> Optional[Dict[str, Any]]:
@@ -10,7 +16,7 @@ async def get_charging_session(session_id: UUID) -> Optional[Dict[str, Any]]:
         response =  supabase.table("charging_sessions").select("*").eq("id", str(session_id)).single().execute()
         return response.data[0]
     except httpx.HTTPError as e:
-        print(f"Error fetching charging session {session_id}: {e}")
+        logger.error("Error fetching charging session %s: %s", session_id, e)
         return None
 
 async def create_charging_session(session_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -18,29 +24,45 @@ async def create_charging_session(session_data: Dict[str, Any]) -> Optional[Dict
         supabase = await get_supabase_client()
         response =  supabase.table("charging_sessions").insert(session_data).execute()
         if response.data:
+            notify_availability_change(response.data[0].get("station_id"))
             return response.data[0]
     except httpx.HTTPError as e:
-        print(f"Error creating charging session: {e}")
+        logger.error("Error creating charging session: %s", e)
         return None
 
 async def update_charging_session(session_id: UUID, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     try:
         supabase = await get_supabase_client()
         response =  supabase.table("charging_sessions").update(update_data).eq("id", str(session_id)).execute()
+        if response.data:
+            notify_availability_change(response.data[0].get("station_id"))
         return response.data
     except httpx.HTTPError as e:
-        print(f"Error updating charging session {session_id}: {e}")
+        logger.error("Error updating charging session %s: %s", session_id, e)
         return None
 
-async def list_charging_sessions(station_ids: List[UUID]) -> List[Dict[str, Any]]:
+async def list_user_charging_sessions(user_id: UUID, columns: str = "*") -> List[Dict[str, Any]]:
+    """All sessions of one user, newest first."""
+    supabase = await get_supabase_client()
+    response = supabase.table("charging_sessions").select(columns).eq("user_id", str(user_id)).order("created_at", desc=True).execute()
+    return response.data or []
+
+async def list_user_charging_sessions_changed_since(user_id: UUID, since_ts: str, limit: int = SYNC_PAGE_SIZE,
+                                                    columns: str = "*") -> List[Dict[str, Any]]:
+    """Sessions of one user with updated_at >= since_ts, oldest change first (limit + 1 rows)."""
+    supabase = await get_supabase_client()
+    query = supabase.table("charging_sessions").select(columns).eq("user_id", str(user_id))
+    return fetch_changed_rows(query, since_ts, limit)
+
+async def list_charging_sessions(station_ids: List[UUID], columns: str = "*") -> List[Dict[str, Any]]:
     if not station_ids:
         return []
     try:
         supabase = await get_supabase_client()
-        response =  supabase.table("charging_sessions").select("*").in_("station_id", [str(s) for s in station_ids]).execute()
+        response =  supabase.table("charging_sessions").select(columns).in_("station_id", [str(s) for s in station_ids]).execute()
         return response.data or []
     except httpx.HTTPError as e:
-        print(f"Error listing charging sessions for stations {station_ids}: {e}")
+        logger.error("Error listing charging sessions for stations %s: %s", station_ids, e)
         return []
 
 async def list_charging_sessions_between(station_ids: List[UUID], start_iso: str, end_iso: str) -> List[Dict[str, Any]]:
@@ -58,5 +80,8 @@ async def list_charging_sessions_between(station_ids: List[UUID], start_iso: str
         )
         return response.data or []
     except httpx.HTTPError as e:
-        print(f"Error listing charging sessions between {start_iso} and {end_iso}: {e}")
+        logger.error("Error listing charging sessions between %s and %s: %s", start_iso, end_iso, e)
         return []
+
+
+trace_module(globals())
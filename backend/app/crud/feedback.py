@@ -2,6 +2,10 @@ from typing import Any, Dict, List, Optional
 from uuid import UUID
 import httpx
 from ..database import get_supabase_client
+from ..utils.tracing import trace_module
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 
 async def get_feedback(feedback_id: UUID) -> Optional[Dict[str, Any]]:
@@ -10,7 +14,7 @@ async def get_feedback(feedback_id: UUID) -> Optional[Dict[str, Any]]:
         response =  supabase.table("feedback").select("*").eq("id", str(feedback_id)).single().execute()
         return response.data
     except httpx.HTTPError as e:
-        print(f"Error fetching feedback {feedback_id}: {e}")
+        logger.error("Error fetching feedback %s: %s", feedback_id, e)
         return None
 
 async def create_feedback(feedback_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -19,7 +23,7 @@ async def create_feedback(feedback_data: Dict[str, Any]) -> Optional[Dict[str, A
         response =  supabase.table("feedback").insert(feedback_data).execute()
         return response.data
     except httpx.HTTPError as e:
-        print(f"Error creating feedback: {e}")
+        logger.error("Error creating feedback: %s", e)
         return None
 
 async def update_feedback(feedback_id: UUID, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -28,7 +32,7 @@ async def update_feedback(feedback_id: UUID, update_data: Dict[str, Any]) -> Opt
         response =  supabase.table("feedback").update(update_data).eq("id", str(feedback_id)).execute()
         return response.data
     except httpx.HTTPError as e:
-        print(f"Error updating feedback {feedback_id}: {e}")
+        logger.error("Error updating feedback %s: %s", feedback_id, e)
         return None
 
 async def list_station_feedback(station_id: UUID) -> List[Dict[str, Any]]:
@@ -37,7 +41,7 @@ async def list_station_feedback(station_id: UUID) -> List[Dict[str, Any]]:
         response =  supabase.table("feedback").select("*").eq("station_id", str(station_id)).execute()
         return response.data or []
     except httpx.HTTPError as e:
-        print(f"Error listing feedback for station {station_id}: {e}")
+        logger.error("Error listing feedback for station %s: %s", station_id, e)
         return []
 
 async def list_feedback(station_ids: List[UUID]) -> List[Dict[str, Any]]:
@@ -48,5 +52,8 @@ async def list_feedback(station_ids: List[UUID]) -> List[Dict[str, Any]]:
         response =  supabase.table("feedback").select("*").in_("station_id", [str(s) for s in station_ids]).execute()
         return response.data or []
     except httpx.HTTPError as e:
-        print(f"Error listing feedback for stations {station_ids}: {e}")
-        return []
\ No newline at end of file
+        logger.error("Error listing feedback for stations %s: %s", station_ids, e)
+        return []
+
+
+trace_module(globals())
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional
+
+from ..database import get_supabase_service_role_client
+from ..utils.tracing import trace_module
+from ..utils.availability import notify_availability_change
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+async def list_charge_point_connectors(charge_point_id: str) -> List[Dict[str, Any]]:
+    """The slots mapped to a charger's connectors (see supabase/migrations/20261024_add_ocpp_central_system.sql)."""
+    supabase = await get_supabase_service_role_client()
+    response = (
+        supabase.table("charging_slots").select("id,station_id,connector_id,status,ocpp_status")
+        .eq("charge_point_id", charge_point_id).execute()
+    )
+    return [row for row in response.data or [] if row.get("connector_id") is not None]
+
+
+async def get_session_by_transaction(transaction_id: int) -> Optional[Dict[str, Any]]:
+    """
+    The active session an OCPP transaction belongs to, shaped like the sessions ocpp_apply_batch()
+    returns for accepted starts, or None. Used when a charger reports on a transaction this process
+    did not see start.
+    """
+    supabase = await get_supabase_service_role_client()
+    response = (
+        supabase.table("charging_sessions")
+        .select("id,station_id,user_id,slot_id,start_time,status,meter_start_wh,energy_used,current_power_kw,current_soc,telemetry_at")
+        .eq("ocpp_transaction_id", transaction_id).eq("status", "active").limit(1).execute()
+    )
+    if not response.data:
+        return None
+    session = response.data[0]
+    price = None
+    if session.get("station_id"):
+        station = supabase.table("stations").select("price_per_hour").eq("id", str(session["station_id"])).limit(1).execute()
+        if station.data:
+            price = station.data[0].get("price_per_hour")
+    session["price_per_hour"] = float(price) if price is not None else 10.0
+    return session
+
+
+async def apply_charger_batch(statuses: List[Dict[str, Any]], starts: List[Dict[str, Any]],
+                              stops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply connector status changes, transaction starts and transaction stops in one RPC call.
+    Returns {"statuses", "stops", "starts": [{ref, transaction_id, status, session}]}; raises on
+    failure so the caller can retry or fail the waiting chargers' requests.
+    """
+    supabase = await get_supabase_service_role_client()
+    rpc_result = supabase.rpc("ocpp_apply_batch", {"statuses": statuses, "starts": starts, "stops": stops}).execute()
+    data = rpc_result.data
+    payload = data[0] if isinstance(data, list) and data else data
+    if not isinstance(payload, dict):
+        payload = {"statuses": 0, "stops": 0, "starts": []}
+    stations = {u.get("station_id") for u in statuses}
+    stations.update((r.get("session") or {}).get("station_id") for r in payload.get("starts") or [])
+    for station_id in stations - {None}:
+        notify_availability_change(station_id)
+    if stops:
+        notify_availability_change()
+    return payload
+
+
+trace_module(globals())
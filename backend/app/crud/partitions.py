@@ -0,0 +1,47 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+from ..database import get_supabase_service_role_client
+from ..utils.tracing import trace_module
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Monthly partitions are kept this many months ahead of the current one
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# Tables partitioned by month (see supabase/migrations/20261022_partition_bookings_sessions_activity.sql)
+PARTITIONED_TABLES = ("bookings", "charging_sessions", "user_activity_log")
+
+
+async def ensure_monthly_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD) -> Dict[str, Any]:
+    """Create any missing monthly partitions up to `months_ahead` months out. Called by the scheduler."""
+    try:
+        supabase = await get_supabase_service_role_client()
+        rpc_result = supabase.rpc("ensure_monthly_partitions", {"months_ahead": months_ahead}).execute()
+        data = rpc_result.data
+        payload = data[0] if isinstance(data, list) and data else data
+        return payload if isinstance(payload, dict) else {"updated_count": 0}
+    except Exception as e:
+        logger.error("❌ Error creating monthly partitions: %s", e)
+        return {"updated_count": 0, "error": str(e)}
+
+
+async def detach_monthly_partitions(table: str, older_than: datetime) -> List[str]:
+    """
+    Detach the monthly partitions of `table` that end on or before `older_than`.
+    Returns the names of the detached tables, which keep their data until dropped.
+    """
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"{table} is not partitioned")
+    supabase = await get_supabase_service_role_client()
+    rpc_result = supabase.rpc(
+        "detach_monthly_partitions", {"p_table": table, "older_than": older_than.isoformat()}
+    ).execute()
+    data = rpc_result.data
+    payload = data[0] if isinstance(data, list) and data else data
+    return list((payload or {}).get("detached") or [])
+
+
+trace_module(globals())
@@ -2,7 +2,11 @@ import httpx
 from typing import Any, Dict, List, Optional
 from uuid import UUID
 from ..database import get_supabase_client, get_supabase_service_role_client
+from ..utils.tracing import trace_module
 from ..models import ProfileCreate, ProfileUpdate, ProfileOut
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 
 async def get_user_profile(user_id: UUID) -> Optional[ProfileOut]:
@@ -56,12 +60,12 @@ async def get_user_profile(user_id: UUID) -> Optional[ProfileOut]:
                 'country': data.get('country'),
                 'zip_code': data.get('zip_code')
             }
-            print(f"Profile data before ProfileOut: {profile_data}")  # Debug
+            logger.debug("Profile data before ProfileOut: %s", profile_data)
             return ProfileOut(**profile_data)
         return None
 
     except Exception as e:
-        print(f"Error fetching user profile {user_id}: {e}")
+        logger.error("Error fetching user profile %s: %s", user_id, e)
         return None
 
 async def create_user_profile(profile_data: ProfileCreate) -> Optional[ProfileOut]:
@@ -71,7 +75,7 @@ async def create_user_profile(profile_data: ProfileCreate) -> Optional[ProfileOu
         created = (response.data or [None])[0]
         return ProfileOut(**created) if created else None
     except httpx.HTTPError as e:
-        print(f"Error creating user profile: {e}")
+        logger.error("Error creating user profile: %s", e)
         return None
 
 async def update_user_profile(user_id: UUID, update_data: ProfileUpdate) -> Optional[ProfileOut]:
@@ -127,5 +131,8 @@ async def update_user_profile(user_id: UUID, update_data: ProfileUpdate) -> Opti
             return ProfileOut(**profile_data)
         return None
     except httpx.HTTPError as e:
-        print(f"Error updating user profile {user_id}: {e}")
+        logger.error("Error updating user profile %s: %s", user_id, e)
         return None
+
+
+trace_module(globals())
@@ -0,0 +1,166 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from ..database import get_supabase_service_role_client
+from ..utils.tracing import trace_module
+from ..utils.availability import notify_availability_change
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# How long a hold lives when the caller doesn't ask for a specific duration, and the cap
+SLOT_HOLD_MINUTES = int(os.getenv("SLOT_HOLD_MINUTES", "5"))
+SLOT_HOLD_MAX_MINUTES = int(os.getenv("SLOT_HOLD_MAX_MINUTES", "15"))
+# Longest window a hold may cover (the longest booking the app takes) and how far in the
+# past its start may be, so "now" requests survive a little clock skew
+SLOT_HOLD_MAX_WINDOW_MINUTES = int(os.getenv("SLOT_HOLD_MAX_WINDOW_MINUTES", "480"))
+SLOT_HOLD_START_GRACE_MINUTES = int(os.getenv("SLOT_HOLD_START_GRACE_MINUTES", "5"))
+
+BLOCKING_BOOKING_STATUSES = ["confirmed", "active", "pending"]
+
+
+def _parse_dt(v) -> Optional[datetime]:
+    """Parse a datetime or ISO string into an aware UTC datetime."""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        v = datetime.fromisoformat(v.replace("Z", "+00:00"))
+    if v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    return v.astimezone(timezone.utc)
+
+
+def overlapping_holds(holds: List[Dict[str, Any]], start, end, exclude_user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Holds whose window intersects [start, end), ignoring the given user's own holds."""
+    start_dt, end_dt = _parse_dt(start), _parse_dt(end)
+    result = []
+    for h in holds:
+        if exclude_user_id and str(h.get("user_id")) == str(exclude_user_id):
+            continue
+        h_start, h_end = _parse_dt(h.get("start_time")), _parse_dt(h.get("end_time"))
+        if h_start and h_end and start_dt < h_end and h_start < end_dt:
+            result.append(h)
+    return result
+
+
+async def list_active_holds(station_id: Optional[UUID] = None, slot_id: Optional[UUID] = None,
+                            user_id: Optional[UUID] = None) -> List[Dict[str, Any]]:
+    """Unexpired holds, filtered by station, slot and/or user. Holds of every user are visible."""
+    try:
+        supabase = await get_supabase_service_role_client()
+        query = supabase.table("slot_holds").select("*").gt("expires_at", datetime.now(timezone.utc).isoformat())
+        if station_id:
+            query = query.eq("station_id", str(station_id))
+        if slot_id:
+            query = query.eq("slot_id", str(slot_id))
+        if user_id:
+            query = query.eq("user_id", str(user_id))
+        response = query.execute()
+        return response.data or []
+    except Exception as e:
+        logger.error("Error listing slot holds: %s", e)
+        return []
+
+
+async def create_slot_hold(user_id: UUID, station_id: UUID, slot_id: UUID, start_time, end_time,
+                           minutes: Optional[int] = None, connector_type: Optional[str] = None,
+                           verify: bool = True) -> Dict[str, Any]:
+    """Hold a slot and time window for a user for a few minutes.
+
+    Raises ValueError when the window is invalid (in the past, longer than
+    SLOT_HOLD_MAX_WINDOW_MINUTES), the slot is not at station_id, the window
+    overlaps a blocking booking, or it is already held by another user. Pass
+    verify=False only when the caller has just checked bookings itself (e.g.
+    find_available_slots); holds are always checked. A user keeps at most one live
+    hold: placing a new one replaces the previous hold, and re-holding the same slot
+    never keeps it past SLOT_HOLD_MAX_MINUTES from the first hold. The checks and
+    the insert run in one transaction in the place_slot_hold RPC.
+    """
+    start_dt, end_dt = _parse_dt(start_time), _parse_dt(end_time)
+    if not start_dt or not end_dt:
+        raise ValueError("start_time and end_time are required and must be valid datetimes")
+    if end_dt <= start_dt:
+        raise ValueError("end_time must be after start_time")
+    if start_dt < datetime.now(timezone.utc) - timedelta(minutes=SLOT_HOLD_START_GRACE_MINUTES):
+        raise ValueError("start_time must not be in the past")
+    if end_dt - start_dt > timedelta(minutes=SLOT_HOLD_MAX_WINDOW_MINUTES):
+        raise ValueError(f"A hold can cover at most {SLOT_HOLD_MAX_WINDOW_MINUTES} minutes")
+
+    minutes = min(minutes or SLOT_HOLD_MINUTES, SLOT_HOLD_MAX_MINUTES)
+    supabase = await get_supabase_service_role_client()
+    result = supabase.rpc("place_slot_hold", {
+        "hold_user_id": str(user_id),
+        "hold_station_id": str(station_id),
+        "hold_slot_id": str(slot_id),
+        "hold_start": start_dt.isoformat(),
+        "hold_end": end_dt.isoformat(),
+        "hold_minutes": minutes,
+        "max_minutes": SLOT_HOLD_MAX_MINUTES,
+        "hold_connector_type": connector_type,
+        "check_bookings": verify,
+    }).execute()
+    data = result.data
+    payload = data[0] if isinstance(data, list) and data else data
+    status = payload.get("status") if isinstance(payload, dict) else None
+
+    window = f"between {start_dt.isoformat()} and {end_dt.isoformat()}"
+    if status == "slot_not_found":
+        raise ValueError(f"Slot {slot_id} not found")
+    if status == "station_mismatch":
+        raise ValueError(f"Slot {slot_id} does not belong to station {station_id}")
+    if status == "booked":
+        raise ValueError(f"Slot {slot_id} unavailable {window} due to existing booking.")
+    if status == "held":
+        raise ValueError(f"Slot {slot_id} unavailable {window} due to an active hold.")
+    created = payload.get("hold") if status == "ok" else None
+    if not created:
+        raise RuntimeError("Failed to place slot hold")
+    notify_availability_change(created.get("station_id") or station_id)
+    return created
+
+
+async def release_slot_holds(user_id: UUID, slot_id: Optional[UUID] = None, hold_id: Optional[UUID] = None) -> int:
+    """Release a user's holds (optionally only one hold or the holds on one slot). Returns rows removed."""
+    try:
+        supabase = await get_supabase_service_role_client()
+        query = supabase.table("slot_holds").delete().eq("user_id", str(user_id))
+        if slot_id:
+            query = query.eq("slot_id", str(slot_id))
+        if hold_id:
+            query = query.eq("id", str(hold_id))
+        removed = query.execute().data or []
+        for station_id in {h.get("station_id") for h in removed}:
+            notify_availability_change(station_id)
+        return len(removed)
+    except Exception as e:
+        logger.error("Error releasing slot holds for user %s: %s", user_id, e)
+        return 0
+
+
+async def expire_slot_holds() -> Dict[str, Any]:
+    """Delete expired holds. Called by the lifecycle scheduler."""
+    try:
+        supabase = await get_supabase_service_role_client()
+        try:
+            rpc_result = supabase.rpc('expire_slot_holds').execute()
+            data = rpc_result.data
+            payload = data[0] if isinstance(data, list) and data else data
+            updated_count = payload.get("updated_count", 0) if isinstance(payload, dict) else 0
+        except Exception as rpc_error:
+            # RPC not deployed yet — fall back to a plain delete
+            logger.error("expire_slot_holds rpc error (falling back): %s", rpc_error)
+            removed = supabase.table("slot_holds").delete().lte("expires_at", datetime.now(timezone.utc).isoformat()).execute()
+            updated_count = len(removed.data or [])
+
+        if updated_count > 0:
+            notify_availability_change()
+            logger.info("✅ Expired %s slot holds", updated_count)
+        return {"success": True, "updated_count": updated_count}
+    except Exception as e:
+        logger.error("❌ Error expiring slot holds: %s", e)
+        return {"success": False, "error": "Failed to expire slot holds", "updated_count": 0}
+
+
+trace_module(globals())
@@ -2,6 +2,11 @@ from typing import Any, Dict, List, Optional
 from uuid import UUID
 import httpx
 from ..database import get_supabase_client
+from ..utils.tracing import trace_module
+from ..utils.availability import notify_availability_change
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 
 async def get_slot(slot_id: UUID) -> Optional[Dict[str, Any]]:
@@ -10,16 +15,16 @@ async def get_slot(slot_id: UUID) -> Optional[Dict[str, Any]]:
         response =  supabase.table("charging_slots").select("*").eq("id", str(slot_id)).single().execute()
         return response.data
     except httpx.HTTPError as e:
-        print(f"Error fetching slot {slot_id}: {e}")
+        logger.error("Error fetching slot %s: %s", slot_id, e)
         return None
 
-async def list_station_slots(station_id: UUID) -> List[Dict[str, Any]]:
+async def list_station_slots(station_id: UUID, columns: str = "*") -> List[Dict[str, Any]]:
     try:
         supabase = await get_supabase_client()
-        response =  supabase.table("charging_slots").select("*").eq("station_id", str(station_id)).execute()
+        response =  supabase.table("charging_slots").select(columns).eq("station_id", str(station_id)).execute()
         return response.data or []
     except httpx.HTTPError as e:
-        print(f"Error listing slots for station {station_id}: {e}")
+        logger.error("Error listing slots for station %s: %s", station_id, e)
         return []
 
 async def create_slot(slot_data) -> Optional[Dict[str, Any]]:
@@ -36,9 +41,10 @@ async def create_slot(slot_data) -> Optional[Dict[str, Any]]:
             slot_dict['station_id'] = str(slot_dict['station_id'])
 
         response =  supabase.table("charging_slots").insert(slot_dict).execute()
-        print("Create slot response:", response)
-        print("Response data type:", type(response.data))
-        print("Response data:", response.data)
+        notify_availability_change(slot_dict.get("station_id"))
+        logger.debug("Create slot response: %s", response)
+        logger.debug("Response data type: %s", type(response.data))
+        logger.debug("Response data: %s", response.data)
 
         # Ensure we return a single dict, not a list
         if response.data and isinstance(response.data, list) and len(response.data) > 0:
@@ -48,16 +54,18 @@ async def create_slot(slot_data) -> Optional[Dict[str, Any]]:
         else:
             return None
     except httpx.HTTPError as e:
-        print(f"Error creating slot: {e}")
+        logger.error("Error creating slot: %s", e)
         return None
 
 async def update_slot(slot_id: UUID, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     try:
         supabase = await get_supabase_client()
         response =  supabase.table("charging_slots").update(update_data).eq("id", str(slot_id)).execute()
-        print("Update slot response:", response)
-        print("Update response data type:", type(response.data))
-        print("Update response data:", response.data)
+        changed = response.data[0] if isinstance(response.data, list) and response.data else None
+        notify_availability_change(changed.get("station_id") if changed else None)
+        logger.debug("Update slot response: %s", response)
+        logger.debug("Update response data type: %s", type(response.data))
+        logger.debug("Update response data: %s", response.data)
 
         # Ensure we return a single dict, not a list
         if response.data and isinstance(response.data, list) and len(response.data) > 0:
@@ -67,18 +75,21 @@ async def update_slot(slot_id: UUID, update_data: Dict[str, Any]) -> Optional[Di
         else:
             return None
     except httpx.HTTPError as e:
-        print(f"Error updating slot {slot_id}: {e}")
+        logger.error("Error updating slot %s: %s", slot_id, e)
         return None
 
-async def list_slots(station_ids: List[UUID]) -> List[Dict[str, Any]]:
+async def list_slots(station_ids: List[UUID], columns: str = "*") -> List[Dict[str, Any]]:
     # If station_ids is empty, return all slots (router treats empty list as "all slots")
     try:
         supabase = await get_supabase_client()
         if not station_ids:
-            response = supabase.table("charging_slots").select("*").execute()
+            response = supabase.table("charging_slots").select(columns).execute()
             return response.data or []
-        response =  supabase.table("charging_slots").select("*").in_("station_id", [str(s) for s in station_ids]).execute()
+        response =  supabase.table("charging_slots").select(columns).in_("station_id", [str(s) for s in station_ids]).execute()
         return response.data or []
     except httpx.HTTPError as e:
-        print(f"Error listing slots for stations {station_ids}: {e}")
+        logger.error("Error listing slots for stations %s: %s", station_ids, e)
         return []
+
+
+trace_module(globals())
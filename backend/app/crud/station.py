@@ -3,7 +3,12 @@ from uuid import UUID
 from supabase import create_client, AsyncClient
 import asyncio
 from ..database import get_supabase_client  # we'll define this helper
+from ..utils.tracing import trace_module
+from ..utils.availability import notify_availability_change
 import math
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 # Get the async Supabase client
 
@@ -13,9 +18,11 @@ async def create_station(station_data: Dict[str, Any]) -> Optional[Dict[str, Any
     try:
         supabase = await get_supabase_client()
         response = supabase.table("stations").insert(station_data).execute()
+        if response.data:
+            notify_availability_change(response.data[0].get("id"))
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"❌ Error creating station: {e}")
+        logger.error("❌ Error creating station: %s", e)
         return None
 
 
@@ -27,7 +34,7 @@ async def get_station(station_id: UUID) -> Optional[Dict[str, Any]]:
         # print(f"Fetched station {station_id}: {response.data}")
         return response.data if response.data else None
     except Exception as e:
-        print(f"❌ Error fetching station {station_id}: {e}")
+        logger.error("❌ Error fetching station %s: %s", station_id, e)
         return None
 
 
@@ -41,13 +48,14 @@ async def update_station(station_id: UUID, update_data: Dict[str, Any]) -> Optio
         if manager_id:
             # First assign the manager to the station
             assign_response = supabase.table("stations").update({"station_manager": str(manager_id)}).eq("id", str(station_id)).execute()
-            print(f"Assigned manager {manager_id} to station {station_id}")
+            logger.info("Assigned manager %s to station %s", manager_id, station_id)
 
         # Update the station with remaining data
         response = supabase.table("stations").update(update_data).eq("id", str(station_id)).execute()
+        notify_availability_change(station_id)
         return response.data if response.data else None
     except Exception as e:
-        print(f"❌ Error updating station {station_id}: {e}")
+        logger.error("❌ Error updating station %s: %s", station_id, e)
         return None
 
 
@@ -56,6 +64,7 @@ async def delete_station(station_id: UUID) -> Optional[Dict[str, Any]]:
     try:
         supabase = await get_supabase_client()
         supabase.table("stations").delete().eq("id", str(station_id)).execute()
+        notify_availability_change(station_id)
         return {"message": "Station deleted successfully"}
     except Exception as e:
         return False
@@ -90,7 +99,7 @@ async def find_stations_by_coordinates(target_lat: float, target_lon: float, exc
             status = (slot.get("status") or "").lower()
             if not is_available:
                 continue
-            if status in ["maintenance", "disabled", "out_of_order"]:
+            if status in ["occupied", "maintenance", "under_maintenance", "disabled", "out_of_order"]:
                 continue
             if slot_id in occupied_slot_ids:
                 continue
@@ -147,7 +156,7 @@ async def find_stations_by_coordinates(target_lat: float, target_lon: float, exc
         return valid_stations[:limit]
 
     except Exception as e:
-        print(f"❌ Error finding stations by coordinates: {e}")
+        logger.error("❌ Error finding stations by coordinates: %s", e)
         return []
 
 async def find_nearest_station(station_id: str) -> Optional[Dict[str, Any]]:
@@ -171,7 +180,7 @@ async def find_nearest_station(station_id: str) -> Optional[Dict[str, Any]]:
         return nearest_list[0] if nearest_list else None
         
     except Exception as e:
-        print(f"❌ Error finding nearest station: {e}")
+        logger.error("❌ Error finding nearest station: %s", e)
         return None
 
 async def find_nearby_stations(station_id: str, limit: int = 3, sort_by: str = "distance") -> List[Dict[str, Any]]:
@@ -194,5 +203,8 @@ async def find_nearby_stations(station_id: str, limit: int = 3, sort_by: str = "
             sort_by=sort_by
         )
     except Exception as e:
-        print(f"❌ Error finding nearby stations: {e}")
+        logger.error("❌ Error finding nearby stations: %s", e)
         return []
+
+
+trace_module(globals())
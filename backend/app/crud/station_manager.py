@@ -2,9 +2,14 @@ from typing import Any, Dict, List, Optional
 from uuid import UUID
 import httpx
 from ..database import get_supabase_client, get_supabase_service_role_client
+from ..utils.tracing import trace_module
 from .statistics import list_stations
+from ..utils.availability import notify_availability_change
 from ..crud.profiles import get_user_profile
 from fastapi import HTTPException
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 async def get_station_manager(manager_id: UUID) -> Optional[Dict[str, Any]]:
     try:
@@ -12,7 +17,7 @@ async def get_station_manager(manager_id: UUID) -> Optional[Dict[str, Any]]:
         response = supabase.table("station_managers").select("*").eq("id", str(manager_id)).single().execute()
         return response.data
     except httpx.HTTPError as e:
-        print(f"Error fetching manager {manager_id}: {e}")
+        logger.error("Error fetching manager %s: %s", manager_id, e)
         return None
 
 async def create_station_manager(manager_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -31,7 +36,7 @@ async def create_station_manager(manager_data: Dict[str, Any]) -> Optional[Dict[
         user_exists = False
 
         try:
-            print(f"Attempting to create account for {email}...")
+            logger.debug("Attempting to create account for %s...", email)
             if not password:
                 raise HTTPException(status_code=400, detail="Password is required")
             signup_response = supabase.auth.sign_up({
@@ -48,41 +53,41 @@ async def create_station_manager(manager_data: Dict[str, Any]) -> Optional[Dict[
             })
 
             if signup_response.user:
-                print(f"New user created: {signup_response.user.id}")
+                logger.info("New user created: %s", signup_response.user.id)
                 existing_user_id = signup_response.user.id
             else:
-                print("Signup response had no user - checking if error indicates existing user")
+                logger.warning("Signup response had no user - checking if error indicates existing user")
 
         except Exception as signup_error:
             error_str = str(signup_error).lower()
-            print(f"Signup failed with error: {error_str}")
+            logger.error("Signup failed with error: %s", error_str)
 
             if "already" in error_str and ("registered" in error_str or "exist" in error_str):
-                print(f"User {email} already exists, will treat as existing user")
+                logger.debug("User %s already exists, will treat as existing user", email)
                 user_exists = True
 
                 # Now get the existing user ID from auth
                 users_response = supabase_service_role.auth.admin.list_users()
                 users = users_response.data.users if hasattr(users_response, 'data') and hasattr(users_response.data, 'users') else []
-                print(f"list_users returned {len(users)} users for lookup")
+                logger.debug("list_users returned %s users for lookup", len(users))
 
                 # Debug: show all emails in the response
                 for u in users[:5]:  # Show first 5 for debug
-                    print(f"  User: {u.email if hasattr(u, 'email') else getattr(u, 'data', {}).get('email', 'no-email')}")
+                    logger.debug("  User: %s", u.email if hasattr(u, 'email') else getattr(u, 'data', {}).get('email', 'no-email'))
 
                 existing_user = next((u for u in users if (u.email if hasattr(u, 'email') else getattr(u, 'data', {}).get('email', None)) == email), None)
                 if existing_user:
                     existing_user_id = existing_user.id if hasattr(existing_user, 'id') else getattr(existing_user, 'data', {}).get('id')
-                    print(f"Found existing user ID: {existing_user_id}")
+                    logger.debug("Found existing user ID: %s", existing_user_id)
                 else:
-                    print(f"User {email} not found in users list, trying profiles table...")
+                    logger.warning("User %s not found in users list, trying profiles table...", email)
 
                     # Try to get user ID from profiles table
                     try:
                         profiles_response = supabase_service_role.table("profiles").select("id").eq("email", email).single().execute()
                         if profiles_response.data:
                             existing_user_id = profiles_response.data["id"]
-                            print(f"Found user ID from profiles: {existing_user_id}")
+                            logger.debug("Found user ID from profiles: %s", existing_user_id)
                         else:
                             raise HTTPException(status_code=400, detail=f"User {email} already registered. Please have them log in to complete their profile first, then try making them a station manager.")
                     except Exception:
@@ -96,7 +101,7 @@ async def create_station_manager(manager_data: Dict[str, Any]) -> Optional[Dict[
         is_new_user = not user_exists
 
         if user_exists:
-            print(f"User already exists with ID: {user_id}")
+            logger.debug("User already exists with ID: %s", user_id)
             # If password is provided for existing user, reset it
             if password:
                 try:
@@ -104,12 +109,12 @@ async def create_station_manager(manager_data: Dict[str, Any]) -> Optional[Dict[
                         user_id,
                         {"password": password}
                     )
-                    print(f"Password reset for existing user {email}")
+                    logger.info("Password reset for existing user %s", email)
                 except Exception as e:
-                    print(f"Failed to reset password for existing user: {e}")
+                    logger.error("Failed to reset password for existing user: %s", e)
                     raise HTTPException(status_code=500, detail="Failed to reset user password")
         else:
-            print(f"New user created with ID: {user_id}")
+            logger.info("New user created with ID: %s", user_id)
 
         # Check if user is already in station_managers table
         manager_exists = supabase.table("station_managers").select("*").eq("id", user_id).execute()
@@ -127,13 +132,13 @@ async def create_station_manager(manager_data: Dict[str, Any]) -> Optional[Dict[
             }
             update_response = supabase.table("profiles").update(profile_update).eq("id", user_id).execute()
             if update_response.data:
-                print(f"Updated profile role to station_manager for user {user_id}")
+                logger.info("Updated profile role to station_manager for user %s", user_id)
             else:
-                print(f"Could not update profile role for user {user_id}")
+                logger.error("Could not update profile role for user %s", user_id)
 
         # Create station manager record if it doesn't exist
         if not manager_exists.data or len(manager_exists.data) == 0:
-            print("Creating station manager record...")
+            logger.debug("Creating station manager record...")
             data = {
                 "id": user_id,
                 "name": manager_data.get("name"),
@@ -149,19 +154,19 @@ async def create_station_manager(manager_data: Dict[str, Any]) -> Optional[Dict[
             insert_response = supabase.table("station_managers").insert(data).execute()
 
             if insert_response.data:
-                print(f"Successfully created station manager record: {insert_response.data[0]}")
+                logger.info("Successfully created station manager record: %s", insert_response.data[0])
                 return insert_response.data[0]
             else:
                 raise HTTPException(status_code=500, detail="Failed to create station manager record")
         else:
             # User is already a station manager, return existing record
-            print(f"User {user_id} is already registered as station manager")
+            logger.debug("User %s is already registered as station manager", user_id)
             return manager_exists.data[0]
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error creating station manager: {e}")
+        logger.error("Error creating station manager: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 async def update_station_manager(manager_id: UUID, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -187,6 +192,8 @@ async def update_station_manager(manager_id: UUID, update_data: Dict[str, Any])
                 supabase.table("stations").update({"station_manager": None}).in_("id", to_remove).execute()
             if to_add:
                 supabase.table("stations").update({"station_manager": str(manager_id)}).in_("id", to_add).execute()
+            if to_add or to_remove:
+                notify_availability_change()
 
         # Update manager record with remaining fields (do not attempt to write station_ids)
         if update_data:
@@ -198,7 +205,7 @@ async def update_station_manager(manager_id: UUID, update_data: Dict[str, Any])
             fresh = supabase.table("station_managers").select("*").eq("id", str(manager_id)).maybe_single().execute()
             return getattr(fresh, "data", None)
     except httpx.HTTPError as e:
-        print(f"Error updating manager {manager_id}: {e}")
+        logger.error("Error updating manager %s: %s", manager_id, e)
         return None
 
 async def assign_manager_to_station(manager_user_id: UUID, station_id: UUID) -> Optional[Dict[str, Any]]:
@@ -207,10 +214,11 @@ async def assign_manager_to_station(manager_user_id: UUID, station_id: UUID) ->
         supabase = await get_supabase_client()
         # Assign the station -> manager (stations.station_manager is the single source of truth)
         response = supabase.table("stations").update({"station_manager": str(manager_user_id)}).eq("id", str(station_id)).execute()
+        notify_availability_change(station_id)
         if response and getattr(response, "data", None):
             return response.data[0]
     except httpx.HTTPError as e:
-        print(f"Error assigning manager {manager_user_id} to station {station_id}: {e}")
+        logger.error("Error assigning manager %s to station %s: %s", manager_user_id, station_id, e)
         return None
 
 async def delete_station_manager(manager_id: UUID) -> bool:
@@ -220,36 +228,37 @@ async def delete_station_manager(manager_id: UUID) -> bool:
 
         # First, unassign all stations that were assigned to this manager
         unassign_response = supabase.table("stations").update({"station_manager": None}).eq("station_manager", str(manager_id)).execute()
-        print(f"Unassigned manager {manager_id} from {len(unassign_response.data or [])} stations")
+        notify_availability_change()
+        logger.info("Unassigned manager %s from %s stations", manager_id, len(unassign_response.data or []))
 
         # Update profile role back to app_user
         profile_update = supabase.table("profiles").update({"role": "app_user"}).eq("id", str(manager_id)).execute()
         if profile_update.data:
-            print(f"Updated profile role to app_user for user {manager_id}")
+            logger.info("Updated profile role to app_user for user %s", manager_id)
 
         # Delete the manager record
         delete_response = supabase.table("station_managers").delete().eq("id", str(manager_id)).execute()
         if delete_response.data and len(delete_response.data) > 0:
-            print(f"Deleted station manager record for {manager_id}")
+            logger.info("Deleted station manager record for %s", manager_id)
             return True
         else:
-            print(f"No manager record found to delete for {manager_id}")
+            logger.warning("No manager record found to delete for %s", manager_id)
             return False
 
     except httpx.HTTPError as e:
-        print(f"Error deleting manager {manager_id}: {e}")
+        logger.error("Error deleting manager %s: %s", manager_id, e)
         return False
 
 
-async def get_manager_stations(manager_id: str) -> List[Dict[str, Any]]:
+async def get_manager_stations(manager_id: str, columns: str = "*", with_slot_counts: bool = True) -> List[Dict[str, Any]]:
     """Get all stations managed by a specific station manager"""
     try:
-        stations = await list_stations()
+        stations = await list_stations(columns, with_slot_counts)
         manager_stations = [station for station in stations if str(station.get("station_manager")) == str(manager_id)]
-        print(f"Fetched stations for manager {manager_id}: {manager_stations}")
+        logger.debug("Fetched stations for manager %s: %s", manager_id, manager_stations)
         return manager_stations
     except Exception as e:
-        print(f"Error fetching stations for manager {manager_id}: {e}")
+        logger.error("Error fetching stations for manager %s: %s", manager_id, e)
         return []
 
 
@@ -285,7 +294,7 @@ async def get_manager_bookings(manager_id: str) -> List[Dict[str, Any]]:
                     if profile:
                         user_profiles[user_id] = profile
                 except Exception as e:
-                    print(f"Error fetching profile for user {user_id}: {e}")
+                    logger.error("Error fetching profile for user %s: %s", user_id, e)
 
         # Process the bookings to add user, station, and slot info
         processed_bookings = []
@@ -321,7 +330,7 @@ async def get_manager_bookings(manager_id: str) -> List[Dict[str, Any]]:
 
         return processed_bookings
     except httpx.HTTPError as e:
-        print(f"Error fetching bookings for manager {manager_id}: {e}")
+        logger.error("Error fetching bookings for manager %s: %s", manager_id, e)
         return []
 
 
@@ -340,5 +349,8 @@ async def get_manager_sessions(manager_id: str) -> List[Dict[str, Any]]:
         sessions_response = supabase.table("charging_sessions").select("*").in_("station_id", station_ids).execute()
         return sessions_response.data or []
     except httpx.HTTPError as e:
-        print(f"Error fetching sessions for manager {manager_id}: {e}")
+        logger.error("Error fetching sessions for manager %s: %s", manager_id, e)
         return []
+
+
+trace_module(globals())
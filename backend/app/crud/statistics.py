@@ -3,6 +3,11 @@ from uuid import UUID
 import httpx
 from datetime import datetime, timedelta, timezone
 from ..database import get_supabase_client, get_supabase_service_role_client
+from ..utils.tracing import trace_module
+from .archive import with_archived_rows
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 
 async def get_admin_statistics() -> Dict[str, Any]:
@@ -23,7 +28,7 @@ async def get_admin_statistics() -> Dict[str, Any]:
             "total_sessions": total_sessions
         }
     except httpx.HTTPError as e:
-        print(f"Error fetching admin statistics: {e}")
+        logger.error("Error fetching admin statistics: %s", e)
         return {
             "total_users": 0,
             "total_stations": 0,
@@ -37,12 +42,17 @@ async def list_user_vehicles(owner_id: UUID) -> List[Dict[str, Any]]:
     response =  supabase.table("vehicles").select("*").eq("owner_id", str(owner_id)).execute()
     return response.data or []
 
-async def list_stations() -> List[Dict[str, Any]]:
-    supabase = await get_supabase_client()
+async def station_slot_counts(station_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Compute total_slots / available_slots / connector_types per station from charging_slots.
 
-    # Get all stations
-    stations_response = supabase.table("stations").select("*").execute()
-    stations = stations_response.data or []
+    A slot is available only if is_available is True, its status is not
+    'occupied'/'maintenance'/'under_maintenance'/'disabled'/'out_of_order' (the OCPP central
+    system sets these from charger status) and no active charging session occupies it.
+
+    Args:
+        station_ids: Stations to compute; None means every station.
+    """
+    supabase = await get_supabase_client()
 
     # Get all active charging sessions to check slot occupancy
     active_sessions_response = supabase.table("charging_sessions").select("slot_id").is_("end_time", None).execute()
@@ -50,59 +60,69 @@ async def list_stations() -> List[Dict[str, Any]]:
     if active_sessions_response.data:
         occupied_slot_ids = {str(session.get("slot_id")) for session in active_sessions_response.data if session.get("slot_id")}
 
-    # For each station, calculate available and total slots from charging_slots table
+    # All slots for the requested stations in one query
+    slots_query = supabase.table("charging_slots").select("id, station_id, is_available, status, connector_type, max_power_kw")
+    if station_ids is not None:
+        if not station_ids:
+            return {}
+        slots_query = slots_query.in_("station_id", [str(s) for s in station_ids])
+    slots = slots_query.execute().data or []
+
+    counts: Dict[str, Dict[str, Any]] = {
+        str(sid): {"total_slots": 0, "available_slots": 0, "connector_types": []} for sid in (station_ids or [])
+    }
+    seen_connectors: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for slot in slots:
+        station_id = str(slot.get("station_id"))
+        station = counts.setdefault(station_id, {"total_slots": 0, "available_slots": 0, "connector_types": []})
+        is_slot_available = slot.get("is_available", False)
+        slot_status = (slot.get("status") or "").lower()
+        is_not_occupied = str(slot.get("id")) not in occupied_slot_ids
+        is_not_under_maintenance = slot_status not in ["occupied", "maintenance", "under_maintenance", "disabled", "out_of_order"]
+        available = bool(is_slot_available and is_not_occupied and is_not_under_maintenance)
+
+        station["total_slots"] += 1
+        if available:
+            station["available_slots"] += 1
+
+        # Collect unique connector types (type + power) with their available count
+        connector_type = slot.get("connector_type")
+        max_power = slot.get("max_power_kw", 0)
+        if connector_type:
+            connectors = seen_connectors.setdefault(station_id, {})
+            connector_key = f"{connector_type}_{max_power}"
+            if connector_key not in connectors:
+                connectors[connector_key] = {
+                    "type": connector_type,
+                    "power": f"{max_power}kW" if max_power else "N/A",
+                    "available": 0,
+                }
+                station["connector_types"].append(connectors[connector_key])
+            if available:
+                connectors[connector_key]["available"] += 1
+
+    return counts
+
+
+async def list_stations(columns: str = "*", with_slot_counts: bool = True) -> List[Dict[str, Any]]:
+    """List stations with slot availability computed from charging_slots.
+
+    Args:
+        columns: PostgREST select for the stations table (must include id when with_slot_counts is set).
+        with_slot_counts: When False, skip the slot queries and leave
+            total_slots / available_slots / connector_types as stored.
+    """
+    supabase = await get_supabase_client()
+
+    # Get all stations
+    stations_response = supabase.table("stations").select(columns).execute()
+    stations = stations_response.data or []
+    if not with_slot_counts:
+        return stations
+
+    counts = await station_slot_counts()
     for station in stations:
-        station_id = station.get("id")
-
-        # Get all slots for this station
-        slots_response = supabase.table("charging_slots").select("id, is_available, status, connector_type, max_power_kw").eq("station_id", station_id).execute()
-        slots = slots_response.data or []
-
-        # Calculate total and available slots
-        # A slot is available only if:
-        # 1. is_available is True AND status is not 'maintenance'/'disabled'/etc.
-        # 2. Slot is not currently occupied by an active charging session
-        total_slots = len(slots)
-        available_slots = 0
-
-        # Collect unique connector types from slots
-        connector_types = []
-        seen_connectors = set()
-
-        for slot in slots:
-            slot_id = str(slot.get("id"))
-            is_slot_available = slot.get("is_available", False)
-            slot_status = slot.get("status", "").lower()
-            is_not_occupied = slot_id not in occupied_slot_ids
-            is_not_under_maintenance = slot_status not in ["maintenance", "disabled", "out_of_order"]
-
-            if is_slot_available and is_not_occupied and is_not_under_maintenance:
-                available_slots += 1
-
-            # Collect connector types
-            connector_type = slot.get("connector_type")
-            max_power = slot.get("max_power_kw", 0)
-            if connector_type:
-                connector_key = f"{connector_type}_{max_power}"
-                if connector_key not in seen_connectors:
-                    seen_connectors.add(connector_key)
-                    connector_types.append({
-                        "type": connector_type,
-                        "power": f"{max_power}kW" if max_power else "N/A",
-                        "available": 1 if (is_slot_available and is_not_occupied and is_not_under_maintenance) else 0
-                    })
-                else:
-                    # Update available count for existing connector type
-                    for conn in connector_types:
-                        if conn["type"] == connector_type and conn["power"] == f"{max_power}kW":
-                            if is_slot_available and is_not_occupied and is_not_under_maintenance:
-                                conn["available"] += 1
-                            break
-
-        # Update station with calculated values
-        station["total_slots"] = total_slots
-        station["available_slots"] = available_slots
-        station["connector_types"] = connector_types
+        station.update(counts.get(str(station.get("id"))) or {"total_slots": 0, "available_slots": 0, "connector_types": []})
 
     return stations
 
@@ -127,7 +147,7 @@ async def get_stations_with_managers() -> list[dict]:
         manager_id = station_data.get("station_manager")
         if manager_id:
             managers = await list_managers_for_station(manager_id)
-            print("Managers for station", station_id, ":", managers)
+            logger.debug("Managers for station %s : %s", station_id, managers)
             station_data["managers"] = managers
         else:
             station_data["managers"] = []
@@ -174,7 +194,7 @@ async def get_user_growth_over_time(days: int = 30) -> List[Dict[str, Any]]:
         return result
 
     except Exception as e:
-        print(f"Error getting user growth data: {e}")
+        logger.error("Error getting user growth data: %s", e)
         return []
 
 
@@ -188,20 +208,24 @@ async def get_energy_consumption_trends(days: int = 30, station_ids: List[str] =
         start_date = end_date - timedelta(days=days)
 
         # Build query
-        query = supabase.table("charging_sessions").select("start_time, energy_consumed").gte("start_time", start_date.isoformat())
+        query = supabase.table("charging_sessions").select("id, start_time, energy_consumed").gte("start_time", start_date.isoformat())
 
         # Filter by station_ids if provided (for station managers)
         if station_ids:
             query = query.in_("station_id", station_ids)
 
         response = query.execute()
+        sessions = with_archived_rows(
+            "charging_sessions", response.data or [], ["id", "start_time", "energy_consumed"],
+            since=start_date, station_ids=station_ids or None,
+        )
 
-        if not response.data:
+        if not sessions:
             return []
 
         # Group by date
         date_energy = {}
-        for session in response.data:
+        for session in sessions:
             started_at = session.get("start_time")
             energy = session.get("energy_consumed", 0)
             if started_at and energy:
@@ -225,7 +249,7 @@ async def get_energy_consumption_trends(days: int = 30, station_ids: List[str] =
         return result
 
     except Exception as e:
-        print(f"Error getting energy consumption data: {e}")
+        logger.error("Error getting energy consumption data: %s", e)
         return []
 
 
@@ -239,20 +263,24 @@ async def get_revenue_trends(days: int = 30, station_ids: List[str] = None) -> L
         start_date = end_date - timedelta(days=days)
 
         # Build query
-        query = supabase.table("charging_sessions").select("start_time, cost").gte("start_time", start_date.isoformat())
+        query = supabase.table("charging_sessions").select("id, start_time, cost").gte("start_time", start_date.isoformat())
 
         # Filter by station_ids if provided (for station managers)
         if station_ids:
             query = query.in_("station_id", station_ids)
 
         response = query.execute()
+        sessions = with_archived_rows(
+            "charging_sessions", response.data or [], ["id", "start_time", "cost"],
+            since=start_date, station_ids=station_ids or None,
+        )
 
-        if not response.data:
+        if not sessions:
             return []
 
         # Group by date
         date_revenue = {}
-        for session in response.data:
+        for session in sessions:
             started_at = session.get("start_time")
             cost = session.get("cost", 0)
             if started_at and cost:
@@ -276,7 +304,7 @@ async def get_revenue_trends(days: int = 30, station_ids: List[str] = None) -> L
         return result
 
     except Exception as e:
-        print(f"Error getting revenue data: {e}")
+        logger.error("Error getting revenue data: %s", e)
         return []
 
 
@@ -289,14 +317,17 @@ async def get_bookings_trends(days: int = 30) -> List[Dict[str, Any]]:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
 
-        response =  supabase.table("bookings").select("created_at").gte("created_at", start_date.isoformat()).execute()
+        response =  supabase.table("bookings").select("id, created_at").gte("created_at", start_date.isoformat()).execute()
+        bookings = with_archived_rows(
+            "bookings", response.data or [], ["id", "created_at"], since=start_date, time_column="created_at"
+        )
 
-        if not response.data:
+        if not bookings:
             return []
 
         # Group by date
         date_counts = {}
-        for booking in response.data:
+        for booking in bookings:
             created_at = booking.get("created_at")
             if created_at:
                 # Extract date part (YYYY-MM-DD)
@@ -319,7 +350,7 @@ async def get_bookings_trends(days: int = 30) -> List[Dict[str, Any]]:
         return result
 
     except Exception as e:
-        print(f"Error getting bookings data: {e}")
+        logger.error("Error getting bookings data: %s", e)
         return []
 
 
@@ -329,14 +360,17 @@ async def get_station_utilization() -> List[Dict[str, Any]]:
         supabase = await get_supabase_client()
 
         # Get all sessions per station
-        sessions_response =  supabase.table("charging_sessions").select("station_id, energy_consumed, cost").execute()
+        sessions_response =  supabase.table("charging_sessions").select("id, station_id, energy_consumed, cost").execute()
+        sessions = with_archived_rows(
+            "charging_sessions", sessions_response.data or [], ["id", "station_id", "energy_consumed", "cost"]
+        )
 
-        if not sessions_response.data:
+        if not sessions:
             return []
 
         # Aggregate by station
         station_stats = {}
-        for session in sessions_response.data:
+        for session in sessions:
             station_id = session.get("station_id")
             if station_id:
                 if station_id not in station_stats:
@@ -370,7 +404,7 @@ async def get_station_utilization() -> List[Dict[str, Any]]:
         return result
 
     except Exception as e:
-        print(f"Error getting station utilization data: {e}")
+        logger.error("Error getting station utilization data: %s", e)
         return []
 
 
@@ -406,7 +440,7 @@ async def get_charging_type_distribution(days: int = 30, station_ids: List[str]
             result.append({"name": name, "value": value})
         return result
     except Exception as e:
-        print(f"Error getting charging type distribution: {e}")
+        logger.error("Error getting charging type distribution: %s", e)
         return []
 
 
@@ -435,7 +469,7 @@ async def get_peak_hours(hours: int = 24) -> List[Dict[str, Any]]:
         result = [{"hour": k, "usage": v} for k, v in counts.items()]
         return result
     except Exception as e:
-        print(f"Error getting peak hours: {e}")
+        logger.error("Error getting peak hours: %s", e)
         return []
 
 
@@ -480,7 +514,7 @@ async def list_station_managers() -> List[Dict[str, Any]]:
         response =  supabase.table("station_managers").select("*").execute()
         return response.data or []
     except httpx.HTTPError as e:
-        print(f"Error listing station managers: {e}")
+        logger.error("Error listing station managers: %s", e)
         return []
 
 
@@ -494,7 +528,7 @@ async def list_managers_for_station(station_id: UUID) -> List[Dict[str, Any]]:
             return []
         return response.data
     except httpx.HTTPError as e:
-        print(f"Error listing managers for station {station_id}: {e}")
+        logger.error("Error listing managers for station %s: %s", station_id, e)
         return []
 
 
@@ -579,25 +613,39 @@ async def get_active_sessions_count() -> int:
         response = supabase.table("charging_sessions").select("id").is_("end_time", None).execute()
         return len(response.data) if response.data else 0
     except Exception as e:
-        print(f"Error getting active sessions count: {e}")
+        logger.error("Error getting active sessions count: %s", e)
         return 0
 
 
-async def get_average_session_duration() -> str:
-    """Get average session duration in minutes (formatted string)."""
+async def get_average_session_duration(window_days: Optional[int] = None) -> str:
+    """Get average session duration in minutes (formatted string).
+
+    All-time by default; pass window_days to average only sessions started in the
+    last window_days days, which reads the recent partitions only.
+    """
     try:
         supabase = await get_supabase_client()
 
         # Get completed sessions with start and end times
-        response = supabase.table("charging_sessions").select("start_time, end_time").not_.is_("end_time", None).execute()
-
-        if not response.data or len(response.data) == 0:
+        window_start = datetime.now(timezone.utc) - timedelta(days=window_days) if window_days else None
+        query = supabase.table("charging_sessions").select("id, start_time, end_time")
+        if window_start:
+            query = query.gte("start_time", window_start.isoformat())
+        response = query.not_.is_("end_time", None).execute()
+        sessions = [
+            s for s in with_archived_rows(
+                "charging_sessions", response.data or [], ["id", "start_time", "end_time"], since=window_start
+            )
+            if s.get("end_time")
+        ]
+
+        if not sessions:
             return "N/A"
 
         total_duration_minutes = 0
         count = 0
 
-        for session in response.data:
+        for session in sessions:
             start_time = session.get("start_time")
             end_time = session.get("end_time")
 
@@ -618,7 +666,7 @@ async def get_average_session_duration() -> str:
         return f"{int(avg_minutes)} min"
 
     except Exception as e:
-        print(f"Error calculating average session duration: {e}")
+        logger.error("Error calculating average session duration: %s", e)
         return "N/A"
 
 
@@ -652,7 +700,7 @@ async def calculate_co2_saved() -> str:
             return f"{int(co2_saved_kg * 1000)} g"
 
     except Exception as e:
-        print(f"Error calculating CO2 saved: {e}")
+        logger.error("Error calculating CO2 saved: %s", e)
         return "0 kg"
 
 
@@ -681,7 +729,7 @@ async def log_user_activity(user_id: UUID, action: str, details: str = "", relat
             return response.data[0]
 
     except Exception as e:
-        print(f"Error logging user activity: {e}")
+        logger.error("Error logging user activity: %s", e)
 
     return None
 
@@ -721,7 +769,7 @@ async def get_recent_activity(limit: int = 10) -> List[Dict[str, Any]]:
         return activities
 
     except Exception as e:
-        print(f"Error getting recent activity: {e}")
+        logger.error("Error getting recent activity: %s", e)
         return []
 
 
@@ -769,10 +817,13 @@ async def get_user_statistics(user_id: UUID) -> Dict[str, Any]:
         }
 
     except Exception as e:
-        print(f"Error getting user statistics for {user_id}: {e}")
+        logger.error("Error getting user statistics for %s: %s", user_id, e)
         return {
             "totalBookings": 0,
             "totalEnergy": 0.0,
             "totalSpent": 0.0,
             "co2Saved": "0 kg"
         }
+
+
+trace_module(globals())
@@ -0,0 +1,116 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from ..database import get_supabase_service_role_client
+from ..utils import metrics
+from ..utils.tracing import trace_module
+from ..utils.telemetry_buffer import SessionBuffer, evict_idle, pending_buffers
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Downsampled points sent per ingest_session_telemetry call
+TELEMETRY_WRITE_BATCH = int(os.getenv("TELEMETRY_WRITE_BATCH", "500"))
+
+SESSION_TELEMETRY_COLUMNS = (
+    "id,station_id,user_id,booking_id,start_time,end_time,status,energy_used,cost,"
+    "current_power_kw,current_soc,telemetry_at"
+)
+
+
+async def get_sessions_for_telemetry(session_ids: List[UUID]) -> Dict[str, Dict[str, Any]]:
+    """
+    Sessions by id with their live columns and their station's price_per_hour; unknown ids are
+    missing from the result. Two queries however many sessions a charger batch covers. Telemetry
+    is written by chargers, not users, so this reads with the service role.
+    """
+    if not session_ids:
+        return {}
+    supabase = await get_supabase_service_role_client()
+    response = (
+        supabase.table("charging_sessions").select(SESSION_TELEMETRY_COLUMNS)
+        .in_("id", [str(s) for s in session_ids]).execute()
+    )
+    sessions = {str(row["id"]): row for row in response.data or []}
+    station_ids = sorted({str(row["station_id"]) for row in sessions.values() if row.get("station_id")})
+    prices: Dict[str, Any] = {}
+    if station_ids:
+        stations = supabase.table("stations").select("id,price_per_hour").in_("id", station_ids).execute()
+        prices = {str(row["id"]): row.get("price_per_hour") for row in stations.data or []}
+    for row in sessions.values():
+        price = prices.get(str(row.get("station_id")))
+        row["price_per_hour"] = float(price) if price is not None else 10.0
+    return sessions
+
+
+async def list_session_telemetry(session_id: UUID, since: Optional[datetime] = None,
+                                 limit: int = 500) -> List[Dict[str, Any]]:
+    """Persisted downsampled points of one session, oldest first."""
+    supabase = await get_supabase_service_role_client()
+    query = supabase.table("session_telemetry").select(
+        "bucket_start,samples,energy_kwh,power_kw_avg,power_kw_max,soc,last_reading_at"
+    ).eq("session_id", str(session_id))
+    if since is not None:
+        query = query.gte("bucket_start", since.isoformat())
+    response = query.order("bucket_start", desc=True).limit(limit).execute()
+    return list(reversed(response.data or []))
+
+
+async def write_telemetry_points(points: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Upsert downsampled points and refresh the live columns of their sessions in one RPC call.
+    Raises on failure so the caller can keep the readings buffered and retry.
+    """
+    if not points:
+        return {"updated_count": 0, "session_count": 0}
+    supabase = await get_supabase_service_role_client()
+    rpc_result = supabase.rpc("ingest_session_telemetry", {"points": points}).execute()
+    data = rpc_result.data
+    payload = data[0] if isinstance(data, list) and data else data
+    return payload if isinstance(payload, dict) else {"updated_count": 0, "session_count": 0}
+
+
+async def flush_session_telemetry() -> Dict[str, Any]:
+    """
+    Write the readings buffered since the last flush as downsampled points, about
+    TELEMETRY_WRITE_BATCH points per RPC call, then drop idle buffers. The sessions of a failed
+    call stay pending and are retried on the next run. Called by the scheduler.
+    """
+    batches: List[List[Tuple[SessionBuffer, int, List[Dict[str, Any]]]]] = [[]]
+    batch_points = 0
+    for buffer in pending_buffers():
+        taken = buffer.unflushed
+        points = buffer.take_pending()
+        if batch_points and batch_points + len(points) > TELEMETRY_WRITE_BATCH:
+            batches.append([])
+            batch_points = 0
+        batches[-1].append((buffer, taken, points))
+        batch_points += len(points)
+
+    written = sessions = 0
+    errors = []
+    for batch in batches:
+        points = [point for _, _, session_points in batch for point in session_points]
+        if not points:
+            continue
+        try:
+            result = await write_telemetry_points(points)
+            written += int(result.get("updated_count") or 0)
+            sessions += int(result.get("session_count") or 0)
+            metrics.TELEMETRY_POINTS.inc(amount=len(points))
+        except Exception as e:
+            for buffer, taken, _ in batch:
+                buffer.restore(taken)
+            errors.append(str(e))
+            logger.error("❌ Error writing %s telemetry points: %s", len(points), e)
+    evict_idle()
+
+    result: Dict[str, Any] = {"updated_count": written, "session_count": sessions}
+    if errors:
+        result["error"] = errors[0]
+    return result
+
+
+trace_module(globals())
@@ -2,7 +2,11 @@ from typing import Any, Dict, List, Optional
 from uuid import UUID
 import httpx
 from ..database import get_supabase_client
+from ..utils.tracing import trace_module
 from ..models import VehicleCreate, VehicleUpdate, VehicleOut
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 
 async def get_vehicle(vehicle_id: UUID) -> Optional[VehicleOut]:
@@ -12,7 +16,7 @@ async def get_vehicle(vehicle_id: UUID) -> Optional[VehicleOut]:
         data = response.data
         return VehicleOut(**data) if data else None
     except httpx.HTTPError as e:
-        print(f"Error fetching vehicle {vehicle_id}: {e}")
+        logger.error("Error fetching vehicle %s: %s", vehicle_id, e)
         return None
 
 async def create_vehicle(vehicle_data: VehicleCreate) -> Optional[VehicleOut]:
@@ -22,7 +26,7 @@ async def create_vehicle(vehicle_data: VehicleCreate) -> Optional[VehicleOut]:
         created = (response.data or [None])[0]
         return VehicleOut(**created) if created else None
     except httpx.HTTPError as e:
-        print(f"Error creating vehicle: {e}")
+        logger.error("Error creating vehicle: %s", e)
         return None
 
 async def update_vehicle(vehicle_id: UUID, update_data: VehicleUpdate) -> Optional[VehicleOut]:
@@ -32,7 +36,7 @@ async def update_vehicle(vehicle_id: UUID, update_data: VehicleUpdate) -> Option
         updated = (response.data or [None])[0]
         return VehicleOut(**updated) if updated else None
     except httpx.HTTPError as e:
-        print(f"Error updating vehicle {vehicle_id}: {e}")
+        logger.error("Error updating vehicle %s: %s", vehicle_id, e)
         return None
 
 async def list_user_vehicles(owner_id: UUID) -> List[VehicleOut]:
@@ -42,5 +46,8 @@ async def list_user_vehicles(owner_id: UUID) -> List[VehicleOut]:
         items = response.data or []
         return [VehicleOut(**item) for item in items]
     except httpx.HTTPError as e:
-        print(f"Error listing vehicles for owner {owner_id}: {e}")
-        return []
\ No newline at end of file
+        logger.error("Error listing vehicles for owner %s: %s", owner_id, e)
+        return []
+
+
+trace_module(globals())
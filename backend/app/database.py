@@ -4,6 +4,7 @@ import os
 from supabase import create_client, Client  # ✅ use create_client, not async
 from supabase.lib.client_options import ClientOptions
 from dotenv import load_dotenv
+from .utils.db_instrumentation import instrument
 
 # Load env vars
 load_dotenv()
@@ -37,7 +38,7 @@ async def get_supabase_client() -> Client:
     if not _supabase_client:
         check_env_vars()
         print(f"Initializing Supabase client with URL: {SUPABASE_URL}")
-        _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        _supabase_client = instrument(create_client(SUPABASE_URL, SUPABASE_KEY))
     return _supabase_client
 
 # --- Service role client ---
@@ -47,9 +48,16 @@ async def get_supabase_service_role_client() -> Client:
     if not _supabase_service_role_client:
         check_env_vars()
         print(f"Initializing Supabase service role client with URL: {SUPABASE_URL}")
-        _supabase_service_role_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+        _supabase_service_role_client = instrument(create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY))
     return _supabase_service_role_client
 
+# --- Client override (benchmarks / in-process stand-ins) ---
+def set_supabase_clients(client, service_role_client=None):
+    """Replace both singleton clients, e.g. with an in-memory stand-in. Pass None to reset."""
+    global _supabase_client, _supabase_service_role_client
+    _supabase_client = instrument(client)
+    _supabase_service_role_client = instrument(service_role_client if service_role_client is not None else client)
+
 # --- Init DB (optional startup test) ---
 def init_db():
     """Initialize Supabase connection."""
@@ -6,6 +6,8 @@ import asyncio
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from .database import get_supabase_client,get_supabase_service_role_client
+from .utils.tracing import traced
+from .utils.request_recording import note_role
 from dotenv import load_dotenv
 import inspect
 from typing import Optional
@@ -17,6 +19,7 @@ logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+@traced("auth.get_current_user")
 async def get_current_user(token: Optional[str] = None, auth_token: str = Depends(oauth2_scheme)) -> dict:
     """
     Get current authenticated user from Supabase token and determine role from role tables.
@@ -50,7 +53,7 @@ async def get_current_user(token: Optional[str] = None, auth_token: str = Depend
                 headers={"WWW-Authenticate": "Bearer"},
             )
         user_id = user_obj.id
-        logger.debug(f"[auth] user_id={user_id}")
+        logger.debug("[auth] user_id=%s", user_id)
         # Initialize defaults
         role = "app_user"
         station_ids = []
@@ -72,7 +75,7 @@ async def get_current_user(token: Optional[str] = None, auth_token: str = Depend
             meta_role = user_obj.user_metadata.get("role")
         if not meta_role and isinstance(user_obj, dict):
             meta_role = (user_obj.get("app_metadata") or {}).get("role") or (user_obj.get("user_metadata") or {}).get("role")
-        logger.debug(f"[auth] meta_role={meta_role}")
+        logger.debug("[auth] meta_role=%s", meta_role)
         if meta_role == "admin":
             role = "admin"
 
@@ -86,20 +89,20 @@ async def get_current_user(token: Optional[str] = None, auth_token: str = Depend
         # If still not admin, perform parallel database queries to check roles
         if role != "admin":
             # Prepare queries with timeouts to prevent hanging on Supabase issues
-            # Supabase queries are synchronous, so run them in threads with timeouts
-            loop = asyncio.get_event_loop()
+            # Supabase queries are synchronous, so run them in threads with timeouts;
+            # to_thread carries the request context (trace span, DB budget) into the thread
 
             tasks = [
                 asyncio.wait_for(
-                    loop.run_in_executor(None, lambda: supabase_service_role.table("admins").select("id").eq("id", user_id).execute()),
+                    asyncio.to_thread(lambda: supabase_service_role.table("admins").select("id").eq("id", user_id).execute()),
                     timeout=10.0
                 ),
                 asyncio.wait_for(
-                    loop.run_in_executor(None, lambda: supabase.table("station_managers").select("*").eq("id", user_id).execute()),
+                    asyncio.to_thread(lambda: supabase.table("station_managers").select("*").eq("id", user_id).execute()),
                     timeout=10.0
                 ),
                 asyncio.wait_for(
-                    loop.run_in_executor(None, lambda: supabase.table("profiles").select("id").eq("id", user_id).execute()),
+                    asyncio.to_thread(lambda: supabase.table("profiles").select("id").eq("id", user_id).execute()),
                     timeout=10.0
                 ),
             ]
@@ -107,15 +110,15 @@ async def get_current_user(token: Optional[str] = None, auth_token: str = Depend
             if user_email:
                 tasks.extend([
                     asyncio.wait_for(
-                        loop.run_in_executor(None, lambda: supabase_service_role.table("admins").select("id").eq("email", user_email).execute()),
+                        asyncio.to_thread(lambda: supabase_service_role.table("admins").select("id").eq("email", user_email).execute()),
                         timeout=10.0
                     ),
                     asyncio.wait_for(
-                        loop.run_in_executor(None, lambda: supabase.table("station_managers").select("*").eq("email", user_email).execute()),
+                        asyncio.to_thread(lambda: supabase.table("station_managers").select("*").eq("email", user_email).execute()),
                         timeout=10.0
                     ),
                     asyncio.wait_for(
-                        loop.run_in_executor(None, lambda: supabase.table("profiles").select("id").eq("email", user_email).execute()),
+                        asyncio.to_thread(lambda: supabase.table("profiles").select("id").eq("email", user_email).execute()),
                         timeout=10.0
                     ),
                 ])
@@ -140,7 +143,7 @@ async def get_current_user(token: Optional[str] = None, auth_token: str = Depend
             # Handle exceptions in results
             for i, result in enumerate(results):
                 if isinstance(result, Exception):
-                    logger.warning(f"[auth] Query {i} failed: {result}")
+                    logger.warning("[auth] Query %s failed: %s", i, result)
                     results[i] = None
 
             # Check admin role from queries
@@ -160,11 +163,11 @@ async def get_current_user(token: Optional[str] = None, auth_token: str = Depend
                     role = "station_manager"
                     # Get station IDs from stations table where station_manager = user_id (with timeout)
                     stations_response = await asyncio.wait_for(
-                        loop.run_in_executor(None, lambda: supabase.table("stations").select("id").eq("station_manager", user_id).execute()),
+                        asyncio.to_thread(lambda: supabase.table("stations").select("id").eq("station_manager", user_id).execute()),
                         timeout=10.0
                     )
                     station_ids = [s.get("id") for s in (stations_response.data or []) if s.get("id")]
-                    logger.debug(f"[auth] station_managers found: {manager_data}")
+                    logger.debug("[auth] station_managers found: %s", manager_data)
                 else:
                     # Check if user exists in profiles table by id or email
                     profile_exists = (
@@ -179,7 +182,8 @@ async def get_current_user(token: Optional[str] = None, auth_token: str = Depend
                         )
 
         # Log final role and station_ids
-        logger.info(f"[auth] final role={role} station_ids={station_ids}")
+        logger.debug("[auth] final role=%s station_ids=%s", role, station_ids)
+        note_role(role)
 
         return {
             "id": user_id,
@@ -194,6 +198,24 @@ async def get_current_user(token: Optional[str] = None, auth_token: str = Depend
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+# For clients that cannot set an Authorization header (EventSource)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
+
+
+async def get_current_user_or_query_token(token: Optional[str] = None,
+                                          auth_token: Optional[str] = Depends(optional_oauth2_scheme)) -> dict:
+    """
+    get_current_user that also accepts the access token as `?token=`.
+    The Authorization header wins when both are sent.
+    """
+    if not (auth_token or token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(token=auth_token or token, auth_token=auth_token)
+
 def get_current_active_user(current_user: dict = Depends(get_current_user)) -> dict:
     """
     Ensure user is active (optional, you can check role too)
@@ -222,14 +244,14 @@ def require_admin(current_user: dict = Depends(get_current_active_user)) -> dict
 def require_station_manager(current_user: dict = Depends(get_current_active_user)) -> dict:
     role = current_user.get("role", "")
     user_id = current_user.get("id", "unknown")
-    logger.info(f"[auth] require_station_manager called for user {user_id} with role '{role}'")
+    logger.debug("[auth] require_station_manager called for user %s with role '%s'", user_id, role)
     if role != "station_manager":
-        logger.warning(f"[auth] Access denied for user {user_id}: role '{role}' is not station_manager")
+        logger.warning("[auth] Access denied for user %s: role '%s' is not station_manager", user_id, role)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Station Manager privileges required",
         )
-    logger.info(f"[auth] Access granted for station_manager user {user_id}")
+    logger.debug("[auth] Access granted for station_manager user %s", user_id)
     return current_user
 
 
@@ -237,14 +259,14 @@ def require_admin_or_manager(current_user: dict = Depends(get_current_active_use
     """Require user to be admin or station manager"""
     role = current_user.get("role", "")
     user_id = current_user.get("id", "unknown")
-    logger.info(f"[auth] require_admin_or_manager called for user {user_id} with role '{role}'")
+    logger.debug("[auth] require_admin_or_manager called for user %s with role '%s'", user_id, role)
     if role not in ["admin", "station_manager"]:
-        logger.warning(f"[auth] Access denied for user {user_id}: role '{role}' not authorized")
+        logger.warning("[auth] Access denied for user %s: role '%s' not authorized", user_id, role)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin or Station Manager privileges required",
         )
-    logger.info(f"[auth] Access granted for {role} user {user_id}")
+    logger.debug("[auth] Access granted for %s user %s", role, user_id)
     return current_user
 
 
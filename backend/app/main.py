@@ -1,25 +1,17 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import time
 from starlette.middleware.base import BaseHTTPMiddleware
 import os
 from dotenv import load_dotenv
 import logging
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-import logging
 import asyncio
+from .utils.structured_logging import setup_logging
 
-# Configure logging
-
-logging.basicConfig(level=logging.INFO)
+# Configure logging: records are queued and written by a background thread
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Import routers
@@ -36,13 +28,38 @@ from .routers import (
     activity,
     admin,
     analytics,
-    agent
+    agent,
+    ocpp
 )
+from .routers.agent import warm_agent
 from .database import init_db
 from .crud.bookings import complete_expired_bookings, activate_started_bookings
+from .crud.slot_holds import expire_slot_holds
+from .crud.catalog_changes import prune_catalog_changes
+from .crud.partitions import ensure_monthly_partitions
+from .crud.archive import ARCHIVE_ENABLED, archive_cold_rows
+from .crud.telemetry import flush_session_telemetry
+from .ocpp.central_system import central_system
+from .utils.compression import CompressionMiddleware
+from .utils import cold_storage, metrics
+from .utils.metrics import MetricsMiddleware, track_job
+from .utils.db_budget import DbBudgetMiddleware
+from .utils.request_recording import RequestRecordingMiddleware
+from .utils.tracing import TracingMiddleware, init_tracing
+from .utils.profiling import ProfilingMiddleware
+from .utils.telemetry_buffer import TELEMETRY_FLUSH_SECONDS
 
 load_dotenv()
 
+# The chat agent can be switched off per deployment; when on, it is imported on
+# first use unless AGENT_PRELOAD asks for it to be warmed in the background at startup.
+AGENT_ENABLED = os.getenv("AGENT_ENABLED", "true").lower() in ("1", "true", "yes")
+AGENT_PRELOAD = os.getenv("AGENT_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+# Requests allowed per client IP per period (seconds)
+RATE_LIMIT_CALLS = int(os.getenv("RATE_LIMIT_CALLS", "100"))
+RATE_LIMIT_PERIOD = int(os.getenv("RATE_LIMIT_PERIOD", "60"))
+
 # Verify environment variables
 required_env_vars = ["SUPABASE_URL", "SUPABASE_KEY", "SERVICE_ROLE"]
 missing_vars = [var for var in required_env_vars if not os.getenv(var)]
@@ -85,6 +102,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
 
             # Check if rate limit exceeded
             if client['calls'] > self.calls:
+                metrics.RATE_LIMITED.inc()
                 return JSONResponse(
                     status_code=429,
                     content={"detail": "Rate limit exceeded. Please try again later."}
@@ -117,8 +135,11 @@ if os.getenv("PRODUCTION_FRONTEND_URL"):
     print(os.getenv("PRODUCTION_FRONTEND_URL"))
 
 # Add security middlewares
-app.add_middleware(RateLimitMiddleware, calls=100, period=60)  # 100 requests per minute
+app.add_middleware(RateLimitMiddleware, calls=RATE_LIMIT_CALLS, period=RATE_LIMIT_PERIOD)  # 100 requests per minute by default
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])  # Replace with your domains in production
+app.add_middleware(CompressionMiddleware)  # gzip/brotli for responses over COMPRESSION_MIN_SIZE bytes
+app.add_middleware(RequestRecordingMiddleware)  # anonymized traces for benchmarks/replay.py when REQUEST_RECORDING
+app.add_middleware(DbBudgetMiddleware)  # per-route DB call budgets, see utils/db_budget.py
 
 # Add CORS middleware with enhanced security
 app.add_middleware(
@@ -135,6 +156,9 @@ app.add_middleware(
     ],
     max_age=3600,  # Cache preflight requests for 1 hour
 )
+app.add_middleware(MetricsMiddleware)  # outside the limiter, so rate-limited requests are timed too
+app.add_middleware(TracingMiddleware)  # server span per request when TRACING_ENABLED
+app.add_middleware(ProfilingMiddleware)  # outermost: X-Profile from admins when PROFILING_ENABLED
 
 # Include all routers
 app.include_router(auth.router)
@@ -149,14 +173,18 @@ app.include_router(feedback.router)
 app.include_router(activity.router)
 app.include_router(admin.router)
 app.include_router(analytics.router)
-app.include_router(agent.router)
+app.include_router(ocpp.router)
+if AGENT_ENABLED:
+    app.include_router(agent.router)
 
 async def activate_started_bookings_task():
     """Background task to activate started bookings every minute."""
     while True:
         try:
             logger.info("🔄 Running automatic booking activation check...")
-            result = await activate_started_bookings()
+            with track_job("activate_started_bookings", 60) as run:
+                result = await activate_started_bookings()
+                run.ok = result.get("success", True) and "error" not in result
             if result.get("updated_count", 0) > 0:
                 logger.info(f"✅ Activated {result['updated_count']} started bookings")
             else:
@@ -173,7 +201,9 @@ async def complete_expired_bookings_task():
     while True:
         try:
             logger.info("🔄 Running automatic booking completion check...")
-            result = await complete_expired_bookings()
+            with track_job("complete_expired_bookings", 300) as run:
+                result = await complete_expired_bookings()
+                run.ok = result.get("success", True) and "error" not in result
             if result.get("updated_count", 0) > 0:
                 logger.info(f"✅ Completed {result['updated_count']} expired bookings")
             else:
@@ -184,6 +214,89 @@ async def complete_expired_bookings_task():
         # Wait 5 minutes before next check
         await asyncio.sleep(300)  # 5 minutes = 300 seconds
 
+async def sweep_stale_bookings_task():
+    """Background task to activate/complete bookings older than the RPC lookback at startup and once a day."""
+    while True:
+        try:
+            with track_job("sweep_stale_bookings", 24 * 60 * 60) as run:
+                activated = await activate_started_bookings(unbounded=True)
+                completed = await complete_expired_bookings(unbounded=True)
+                run.ok = all(r.get("success", True) and "error" not in r for r in (activated, completed))
+            swept = activated.get("updated_count", 0) + completed.get("updated_count", 0)
+            if swept > 0:
+                logger.info(f"✅ Swept {swept} bookings older than the lifecycle lookback")
+        except Exception as e:
+            logger.error(f"❌ Error in stale booking sweep: {e}")
+
+        await asyncio.sleep(24 * 60 * 60)
+
+async def expire_slot_holds_task():
+    """Background task to clear expired slot holds every minute."""
+    while True:
+        try:
+            with track_job("expire_slot_holds", 60) as run:
+                result = await expire_slot_holds()
+                run.ok = result.get("success", True) and "error" not in result
+            if result.get("updated_count", 0) > 0:
+                logger.info(f"✅ Expired {result['updated_count']} slot holds")
+        except Exception as e:
+            logger.error(f"❌ Error in slot hold expiry: {e}")
+
+        await asyncio.sleep(60)
+
+async def prune_catalog_changes_task():
+    """Background task to trim the station catalog change log every 6 hours."""
+    while True:
+        try:
+            with track_job("prune_catalog_changes", 6 * 60 * 60) as run:
+                result = await prune_catalog_changes()
+                run.ok = result.get("success", True) and "error" not in result
+            if result.get("updated_count", 0) > 0:
+                logger.info(f"✅ Pruned {result['updated_count']} catalog change log entries")
+        except Exception as e:
+            logger.error(f"❌ Error pruning catalog change log: {e}")
+
+        await asyncio.sleep(6 * 60 * 60)
+
+async def ensure_monthly_partitions_task():
+    """Background task to create upcoming monthly table partitions once a day."""
+    while True:
+        try:
+            with track_job("ensure_monthly_partitions", 24 * 60 * 60) as run:
+                result = await ensure_monthly_partitions()
+                run.ok = result.get("success", True) and "error" not in result
+            if result.get("updated_count", 0) > 0:
+                logger.info(f"✅ Created {result['updated_count']} monthly partitions")
+        except Exception as e:
+            logger.error(f"❌ Error creating monthly partitions: {e}")
+
+        await asyncio.sleep(24 * 60 * 60)
+
+async def archive_cold_rows_task():
+    """Background task to move old finished bookings and sessions to Parquet once a day."""
+    while True:
+        try:
+            with track_job("archive_cold_rows", 24 * 60 * 60) as run:
+                result = await archive_cold_rows()
+                run.ok = result.get("success", True) and "error" not in result
+            if not result.get("success", True):
+                logger.error(f"❌ Archival run failed: {result.get('error')}")
+        except Exception as e:
+            logger.error(f"❌ Error in archival run: {e}")
+
+        await asyncio.sleep(24 * 60 * 60)
+
+async def flush_session_telemetry_task():
+    """Background task to write buffered charger telemetry every TELEMETRY_FLUSH_SECONDS."""
+    while True:
+        await asyncio.sleep(TELEMETRY_FLUSH_SECONDS)
+        try:
+            with track_job("flush_session_telemetry", TELEMETRY_FLUSH_SECONDS) as run:
+                result = await flush_session_telemetry()
+                run.ok = "error" not in result
+        except Exception as e:
+            logger.error(f"❌ Error flushing session telemetry: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """
@@ -191,14 +304,42 @@ async def startup_event():
     """
     init_db()
     print("✅ Database initialized")
+    init_tracing()
 
 
     # # Start background tasks for booking lifecycle management
     asyncio.create_task(activate_started_bookings_task())
     asyncio.create_task(complete_expired_bookings_task())
+    asyncio.create_task(sweep_stale_bookings_task())
+    asyncio.create_task(expire_slot_holds_task())
+    asyncio.create_task(prune_catalog_changes_task())
+    asyncio.create_task(ensure_monthly_partitions_task())
+    asyncio.create_task(flush_session_telemetry_task())
+    if ARCHIVE_ENABLED and not cold_storage.configured():
+        logger.error("❌ ARCHIVE_ENABLED is set but ARCHIVE_DIR is not an absolute path on shared storage; archive job not started")
+    elif ARCHIVE_ENABLED:
+        asyncio.create_task(archive_cold_rows_task())
+    if AGENT_ENABLED and AGENT_PRELOAD:
+        asyncio.create_task(warm_agent())
     print("✅ Automatic booking lifecycle tasks started")
     print("🚀 FastAPI startup complete")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write charger updates and telemetry still buffered in this worker before it exits."""
+    await central_system.batcher.flush()
+    result = await flush_session_telemetry()
+    if result.get("updated_count", 0) > 0:
+        logger.info(f"✅ Flushed {result['updated_count']} telemetry points on shutdown")
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """Prometheus scrape endpoint. Set METRICS_TOKEN to require `Authorization: Bearer <token>`."""
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        return JSONResponse(status_code=401, content={"detail": "Invalid metrics token"})
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 def root():
     return {"message": "SmartEV Backend API is running 🚀"}
@@ -4,11 +4,15 @@ from .station_model import StationBase, StationCreate, StationUpdate, StationOut
 from .vehicle_model import VehicleBase, VehicleCreate, VehicleUpdate, VehicleOut
 from .slot_model import SlotBase, SlotCreate, SlotUpdate, SlotOut
 from .booking_model import BookingBase, BookingCreate, BookingUpdate, BookingOut
+from .slot_hold_model import SlotHoldCreate, SlotHoldOut
 from .charging_session_model import (
     ChargingSessionBase,
     ChargingSessionCreate,
     ChargingSessionUpdate,
     ChargingSessionOut,
+    MeterReading,
+    SessionTelemetry,
+    TelemetryBatch,
 )
 from .feedback_model import FeedbackBase, FeedbackCreate, FeedbackUpdate, FeedbackOut
 from .admin_model import AdminBase, AdminCreate, AdminUpdate, AdminOut
@@ -20,7 +24,9 @@ __all__ = [
     "VehicleBase", "VehicleCreate", "VehicleUpdate", "VehicleOut",
     "SlotBase", "SlotCreate", "SlotUpdate", "SlotOut",
     "BookingBase", "BookingCreate", "BookingUpdate", "BookingOut",
+    "SlotHoldCreate", "SlotHoldOut",
     "ChargingSessionBase", "ChargingSessionCreate", "ChargingSessionUpdate", "ChargingSessionOut",
+    "MeterReading", "SessionTelemetry", "TelemetryBatch",
     "FeedbackBase", "FeedbackCreate", "FeedbackUpdate", "FeedbackOut",
     "AdminBase", "AdminCreate", "AdminUpdate", "AdminOut",
 ]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -39,3 +39,19 @@ class ChargingSessionUpdate(BaseModel):
 class ChargingSessionOut(ChargingSessionBase):
     class Config:
         from_attributes = True
+
+
+class MeterReading(BaseModel):
+    timestamp: datetime
+    energy_kwh: Optional[float] = Field(default=None, ge=0)  # delivered in this session so far
+    power_kw: Optional[float] = Field(default=None, ge=0)
+    soc: Optional[float] = Field(default=None, ge=0, le=100)  # state of charge, percent
+
+
+class SessionTelemetry(BaseModel):
+    session_id: str
+    readings: List[MeterReading] = Field(..., min_length=1, max_length=1000)
+
+
+class TelemetryBatch(BaseModel):
+    sessions: List[SessionTelemetry] = Field(..., min_length=1, max_length=500)
@@ -0,0 +1,73 @@
+from pydantic import BaseModel, Field
+from pydantic.alias_generators import to_camel
+from typing import List, Literal, Optional
+from datetime import datetime
+
+# Request payloads of the OCPP 1.6-J messages the central system handles. Field names are
+# snake_case and read from the camelCase JSON keys the specification uses.
+
+ConnectorStatus = Literal[
+    "Available", "Preparing", "Charging", "SuspendedEVSE", "SuspendedEV",
+    "Finishing", "Reserved", "Unavailable", "Faulted",
+]
+
+
+class OcppPayload(BaseModel):
+    class Config:
+        alias_generator = to_camel
+        populate_by_name = True
+
+
+class BootNotificationRequest(OcppPayload):
+    charge_point_vendor: str = Field(..., max_length=20)
+    charge_point_model: str = Field(..., max_length=20)
+    charge_point_serial_number: Optional[str] = Field(default=None, max_length=25)
+    firmware_version: Optional[str] = Field(default=None, max_length=50)
+
+
+class AuthorizeRequest(OcppPayload):
+    id_tag: str = Field(..., max_length=20)
+
+
+class StatusNotificationRequest(OcppPayload):
+    connector_id: int = Field(..., ge=0)
+    error_code: str
+    status: ConnectorStatus
+    timestamp: Optional[datetime] = None
+    info: Optional[str] = Field(default=None, max_length=50)
+
+
+class SampledValue(OcppPayload):
+    value: str
+    context: Optional[str] = None
+    measurand: str = "Energy.Active.Import.Register"
+    phase: Optional[str] = None
+    unit: Optional[str] = None
+
+
+class MeterValue(OcppPayload):
+    timestamp: datetime
+    sampled_value: List[SampledValue]
+
+
+class MeterValuesRequest(OcppPayload):
+    connector_id: int = Field(..., ge=0)
+    transaction_id: Optional[int] = None
+    meter_value: List[MeterValue]
+
+
+class StartTransactionRequest(OcppPayload):
+    connector_id: int = Field(..., gt=0)
+    id_tag: str = Field(..., max_length=20)
+    meter_start: int  # Wh
+    timestamp: datetime
+    reservation_id: Optional[int] = None
+
+
+class StopTransactionRequest(OcppPayload):
+    transaction_id: int
+    meter_stop: int  # Wh
+    timestamp: datetime
+    id_tag: Optional[str] = Field(default=None, max_length=20)
+    reason: Optional[str] = None
+    transaction_data: Optional[List[MeterValue]] = None
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class SlotHoldCreate(BaseModel):
+    station_id: str
+    slot_id: str
+    start_time: datetime
+    end_time: datetime
+    # Defaults to SLOT_HOLD_MINUTES; capped server-side
+    minutes: Optional[int] = Field(default=None, ge=1)
+
+
+class SlotHoldOut(BaseModel):
+    hold_id: str = Field(..., alias='id')
+    station_id: str
+    slot_id: str
+    user_id: str
+    connector_type: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    expires_at: datetime
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
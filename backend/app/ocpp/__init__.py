@@ -0,0 +1 @@
+# Makes ocpp an importable package
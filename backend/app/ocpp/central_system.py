@@ -0,0 +1,552 @@
+"""
+OCPP 1.6-J central system.
+
+Chargers keep a WebSocket open to /ocpp/{charge_point_id} (routers/ocpp.py)
+and send BootNotification, Heartbeat, Authorize, StatusNotification,
+StartTransaction, StopTransaction and MeterValues. Each connector of a charger
+is a charging_slots row with that charge_point_id and connector_id.
+
+Connector state and open transactions are kept in memory, so heartbeats,
+repeated status reports and meter values cost no database call. Status
+changes are coalesced per slot and written together with transaction starts
+and stops by one ocpp_apply_batch call per OCPP_BATCH_SECONDS window, however
+many chargers are connected; StartTransaction and StopTransaction are answered
+once their batch is written. Meter values go to the session telemetry buffers
+(utils/telemetry_buffer.py), which write downsampled points.
+
+A connection is one coroutine reading frames in order (OCPP-J allows one
+outstanding call per direction), so a process holds thousands of chargers.
+
+    OCPP_HEARTBEAT_SECONDS  heartbeat interval handed to chargers at boot (300)
+    OCPP_BATCH_SECONDS      how long updates are collected before a write (0.25)
+    OCPP_RETRY_SECONDS      wait after a failed write before retrying status updates (5)
+    OCPP_MAX_CONNECTIONS    chargers served per process (10000)
+    OCPP_AUTH_SECRET        chargers must send HTTP Basic credentials: their id
+                            and charge_point_password(id). Without it every
+                            charger is refused, unless
+    OCPP_ALLOW_UNAUTHENTICATED=true  accepts chargers without credentials
+                            (local testing only: anyone could then act as any
+                            mapped charger)
+
+A charger only reports on its own transactions: stops and meter values for a
+transaction started on another charger's connector are ignored. Chargers are
+only tracked once their connectors are found (at BootNotification or their
+first message), so unknown ids hold no state after they disconnect.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import itertools
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from starlette.websockets import WebSocket
+
+from ..crud.ocpp import apply_charger_batch, get_session_by_transaction, list_charge_point_connectors
+from ..models.ocpp_model import (
+    AuthorizeRequest,
+    BootNotificationRequest,
+    MeterValue,
+    MeterValuesRequest,
+    StartTransactionRequest,
+    StatusNotificationRequest,
+    StopTransactionRequest,
+)
+from ..utils import metrics
+from ..utils.structured_logging import get_logger
+from ..utils.telemetry_buffer import get_session_buffer, open_session_buffer
+from .protocol import CALL, OcppError, call_error, call_result, parse_frame
+
+logger = get_logger(__name__)
+
+OCPP_HEARTBEAT_SECONDS = int(os.getenv("OCPP_HEARTBEAT_SECONDS", "300"))
+OCPP_BATCH_SECONDS = float(os.getenv("OCPP_BATCH_SECONDS", "0.25"))
+OCPP_RETRY_SECONDS = float(os.getenv("OCPP_RETRY_SECONDS", "5"))
+OCPP_MAX_CONNECTIONS = int(os.getenv("OCPP_MAX_CONNECTIONS", "10000"))
+OCPP_AUTH_SECRET = os.getenv("OCPP_AUTH_SECRET", "")
+OCPP_ALLOW_UNAUTHENTICATED = os.getenv("OCPP_ALLOW_UNAUTHENTICATED", "false").lower() in ("1", "true", "yes")
+
+# Slot status each connector status maps to; None leaves the slot status alone
+SLOT_STATUS = {
+    "Available": "available",
+    "Preparing": "occupied",
+    "Charging": "occupied",
+    "SuspendedEVSE": "occupied",
+    "SuspendedEV": "occupied",
+    "Finishing": "occupied",
+    "Reserved": None,
+    "Unavailable": "under_maintenance",
+    "Faulted": "out_of_order",
+}
+
+# Transactions the database does not know are not looked up again for this long
+MISSING_TRANSACTION_TTL = 300
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def charge_point_password(charge_point_id: str) -> str:
+    """The HTTP Basic password a charger is configured with when OCPP_AUTH_SECRET is set."""
+    return hmac.new(OCPP_AUTH_SECRET.encode(), charge_point_id.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def authenticate(charge_point_id: str, authorization: Optional[str]) -> bool:
+    """OCPP security profile 1: Basic auth with the charge point id as user name."""
+    if not OCPP_AUTH_SECRET:
+        return OCPP_ALLOW_UNAUTHENTICATED
+    if not authorization or not authorization.lower().startswith("basic "):
+        return False
+    try:
+        user, _, password = base64.b64decode(authorization[6:]).decode().partition(":")
+    except ValueError:
+        return False
+    return user == charge_point_id and hmac.compare_digest(password, charge_point_password(charge_point_id))
+
+
+class Connector:
+    __slots__ = ("connector_id", "slot_id", "station_id", "status", "error_code", "updated_at", "transaction_id")
+
+    def __init__(self, row: Dict[str, Any]):
+        self.connector_id = int(row["connector_id"])
+        self.slot_id = str(row["id"])
+        self.station_id = str(row["station_id"]) if row.get("station_id") else None
+        self.status: Optional[str] = row.get("ocpp_status")
+        self.error_code: Optional[str] = None
+        self.updated_at: Optional[datetime] = None
+        self.transaction_id: Optional[int] = None
+
+
+class Transaction:
+    __slots__ = ("transaction_id", "charge_point_id", "connector_id", "slot_id", "meter_start_wh", "session")
+
+    def __init__(self, transaction_id: int, charge_point_id: Optional[str], connector_id: Optional[int],
+                 slot_id: Optional[str], meter_start_wh: int, session: Dict[str, Any]):
+        self.transaction_id = transaction_id
+        self.charge_point_id = charge_point_id  # None when loaded from its session after a restart
+        self.connector_id = connector_id
+        self.slot_id = slot_id
+        self.meter_start_wh = meter_start_wh
+        self.session = session
+
+
+class ChargePoint:
+    """A charger and its connectors; outlives its connection so a reconnect keeps the state."""
+
+    def __init__(self, charge_point_id: str):
+        self.id = charge_point_id
+        self.websocket: Optional[WebSocket] = None
+        self.connectors: Optional[Dict[int, Connector]] = None
+        self.status: Optional[str] = None  # connector 0, the charger as a whole
+        self.boot: Dict[str, Any] = {}
+        self.connected_at: Optional[float] = None
+        self.last_seen: Optional[float] = None
+
+    def station_ids(self) -> set:
+        return {c.station_id for c in (self.connectors or {}).values() if c.station_id}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "charge_point_id": self.id,
+            "connected": self.websocket is not None,
+            "status": self.status,
+            "boot": self.boot,
+            "connected_at": datetime.fromtimestamp(self.connected_at, timezone.utc).isoformat() if self.connected_at else None,
+            "last_seen": datetime.fromtimestamp(self.last_seen, timezone.utc).isoformat() if self.last_seen else None,
+            "connectors": [
+                {
+                    "connector_id": c.connector_id,
+                    "slot_id": c.slot_id,
+                    "station_id": c.station_id,
+                    "status": c.status,
+                    "error_code": c.error_code,
+                    "transaction_id": c.transaction_id,
+                    "updated_at": c.updated_at.isoformat() if c.updated_at else None,
+                }
+                for c in sorted((self.connectors or {}).values(), key=lambda c: c.connector_id)
+            ],
+        }
+
+
+class UpdateBatcher:
+    """
+    Collects connector status changes (the latest per slot wins), transaction starts and
+    transaction stops, and writes them with one apply_charger_batch call per window. Starts and
+    stops are awaited by the charger's request; a failed write fails them with an InternalError
+    so the charger retries, while status changes stay queued and are retried after
+    OCPP_RETRY_SECONDS.
+    """
+
+    def __init__(self, window: float = OCPP_BATCH_SECONDS):
+        self.window = window
+        self._statuses: Dict[str, Dict[str, Any]] = {}
+        self._starts: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._stops: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._refs = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+
+    def add_status(self, update: Dict[str, Any]) -> None:
+        self._statuses[update["slot_id"]] = update
+        self._wake()
+
+    async def start(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._submit(self._starts, dict(item, ref=next(self._refs)))
+
+    async def stop(self, item: Dict[str, Any]) -> None:
+        await self._submit(self._stops, item)
+
+    async def _submit(self, queue: List[Tuple[Dict[str, Any], asyncio.Future]], item: Dict[str, Any]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        queue.append((item, future))
+        self._wake()
+        return await future
+
+    def _pending(self) -> bool:
+        return bool(self._statuses or self._starts or self._stops)
+
+    def _wake(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            while self._pending():
+                await asyncio.sleep(self.window)
+                if not await self.flush():
+                    await asyncio.sleep(OCPP_RETRY_SECONDS)
+        finally:
+            self._task = None
+
+    async def flush(self) -> bool:
+        """Write everything collected so far; False when the write failed."""
+        statuses, self._statuses = self._statuses, {}
+        starts, self._starts = self._starts, []
+        stops, self._stops = self._stops, []
+        if not (statuses or starts or stops):
+            return True
+        try:
+            result = await apply_charger_batch(list(statuses.values()), [i for i, _ in starts], [i for i, _ in stops])
+        except Exception as e:
+            metrics.OCPP_BATCHES.inc("error")
+            logger.error("❌ Error writing OCPP batch: %s", e, statuses=len(statuses), starts=len(starts), stops=len(stops))
+            for slot_id, update in statuses.items():
+                # A newer status that arrived during the write wins
+                self._statuses.setdefault(slot_id, update)
+            for _, future in starts + stops:
+                if not future.done():
+                    future.set_exception(OcppError("InternalError", "Could not record the transaction"))
+            return False
+
+        metrics.OCPP_BATCHES.inc("success")
+        by_ref = {r.get("ref"): r for r in result.get("starts") or []}
+        for item, future in starts:
+            if future.done():
+                continue
+            started = by_ref.get(item["ref"])
+            if started is None:
+                future.set_exception(OcppError("InternalError", "Transaction start was not recorded"))
+            else:
+                future.set_result(started)
+        for _, future in stops:
+            if not future.done():
+                future.set_result(None)
+        return True
+
+
+Handler = Callable[["CentralSystem", ChargePoint, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class CentralSystem:
+    def __init__(self):
+        self.charge_points: Dict[str, ChargePoint] = {}
+        self.transactions: Dict[int, Transaction] = {}
+        self.batcher = UpdateBatcher()
+        self._missing_transactions: Dict[int, float] = {}
+        self._connections = 0
+
+    @property
+    def connection_count(self) -> int:
+        return self._connections
+
+    def is_connected(self, charge_point_id: str) -> bool:
+        charge_point = self.charge_points.get(charge_point_id)
+        return charge_point is not None and charge_point.websocket is not None
+
+    async def serve(self, charge_point_id: str, websocket: WebSocket) -> None:
+        """Handle an accepted charger connection until it closes."""
+        # Registered in charge_points once its connectors are found (see _connectors)
+        charge_point = self.charge_points.get(charge_point_id) or ChargePoint(charge_point_id)
+        previous = charge_point.websocket
+        if previous is not None:
+            # The charger reconnected before the old socket timed out
+            try:
+                await previous.close(code=1000)
+            except Exception:
+                pass
+        charge_point.websocket = websocket
+        charge_point.connected_at = charge_point.last_seen = time.time()
+        self._connections += 1
+        metrics.OCPP_CONNECTIONS.set(self._connections)
+        logger.info("🔌 Charger %s connected", charge_point_id, sample=50)
+        try:
+            async for text in websocket.iter_text():
+                charge_point.last_seen = time.time()
+                reply = await self.dispatch(charge_point, text)
+                if reply is not None:
+                    await websocket.send_text(reply)
+        except Exception as e:
+            logger.warning("⚠️  Charger %s connection failed: %s", charge_point_id, e, sample=20)
+        finally:
+            self._connections -= 1
+            metrics.OCPP_CONNECTIONS.set(self._connections)
+            if charge_point.websocket is websocket:
+                charge_point.websocket = None
+
+    async def dispatch(self, charge_point: ChargePoint, text: str) -> Optional[str]:
+        """The reply frame to one incoming frame, or None when there is nothing to answer."""
+        try:
+            message_type, unique_id, action, payload = parse_frame(text)
+        except OcppError as e:
+            logger.warning("⚠️  Dropping malformed frame from %s: %s", charge_point.id, e, sample=20)
+            return None
+        if message_type != CALL:
+            # The central system sends no calls of its own, so there are no results to match
+            return None
+        handler = HANDLERS.get(action)
+        if handler is None:
+            metrics.OCPP_MESSAGES.inc("unknown", "not_implemented")
+            return call_error(unique_id, OcppError("NotImplemented", f"{action} is not supported"))
+        try:
+            result = await handler(self, charge_point, payload)
+        except ValidationError as e:
+            metrics.OCPP_MESSAGES.inc(action, "invalid")
+            first = e.errors()[0]
+            return call_error(unique_id, OcppError(
+                "FormationViolation", first.get("msg", "Invalid payload"), {"field": ".".join(str(p) for p in first.get("loc", ()))}
+            ))
+        except OcppError as e:
+            metrics.OCPP_MESSAGES.inc(action, "error")
+            return call_error(unique_id, e)
+        except Exception as e:
+            metrics.OCPP_MESSAGES.inc(action, "error")
+            logger.error("❌ Error handling %s from %s: %s", action, charge_point.id, e)
+            return call_error(unique_id, OcppError("InternalError", "Could not process the request"))
+        metrics.OCPP_MESSAGES.inc(action, "ok")
+        return call_result(unique_id, result)
+
+    async def _connectors(self, charge_point: ChargePoint, reload: bool = False) -> Dict[int, Connector]:
+        if charge_point.connectors is None or reload:
+            rows = await list_charge_point_connectors(charge_point.id)
+            known = charge_point.connectors or {}
+            connectors = {}
+            for row in rows:
+                connector = Connector(row)
+                if connector.connector_id in known:
+                    # Keep what this process already knows about the connector
+                    old = known[connector.connector_id]
+                    connector.status, connector.error_code = old.status, old.error_code
+                    connector.updated_at, connector.transaction_id = old.updated_at, old.transaction_id
+                connectors[connector.connector_id] = connector
+            charge_point.connectors = connectors
+            if connectors:
+                self.charge_points.setdefault(charge_point.id, charge_point)
+        return charge_point.connectors
+
+    async def _transaction(self, transaction_id: int) -> Optional[Transaction]:
+        """An open transaction, loaded from its session if it started before this process saw it."""
+        transaction = self.transactions.get(transaction_id)
+        if transaction is not None:
+            return transaction
+        missing_since = self._missing_transactions.get(transaction_id)
+        if missing_since is not None and time.monotonic() - missing_since < MISSING_TRANSACTION_TTL:
+            return None
+        session = await get_session_by_transaction(transaction_id)
+        if session is None:
+            if len(self._missing_transactions) > 10000:
+                self._missing_transactions.clear()
+            self._missing_transactions[transaction_id] = time.monotonic()
+            return None
+        transaction = Transaction(transaction_id, None, None, str(session["slot_id"]) if session.get("slot_id") else None,
+                                  int(session.get("meter_start_wh") or 0), session)
+        self.transactions[transaction_id] = transaction
+        return transaction
+
+    async def _own_transaction(self, charge_point: ChargePoint, transaction_id: int) -> Optional[Transaction]:
+        """The open transaction if it runs on one of this charger's connectors, else None."""
+        transaction = await self._transaction(transaction_id)
+        if transaction is None:
+            return None
+        if transaction.charge_point_id is not None:
+            owned = transaction.charge_point_id == charge_point.id
+        else:
+            slot_ids = {c.slot_id for c in (await self._connectors(charge_point)).values()}
+            owned = transaction.slot_id is not None and transaction.slot_id in slot_ids
+        if not owned:
+            logger.warning("⚠️  Charger %s reported on transaction %s of another charger",
+                           charge_point.id, transaction_id, sample=10)
+            return None
+        return transaction
+
+    def _record_meter_values(self, transaction: Transaction, meter_values: List[MeterValue]) -> None:
+        """Feed sampled energy, power and SoC to the session's telemetry buffer."""
+        readings = []
+        for meter_value in meter_values:
+            energy = power = soc = None
+            for sampled in meter_value.sampled_value:
+                if sampled.phase:
+                    continue  # per-phase values; the totals are reported without a phase
+                try:
+                    value = float(sampled.value)
+                except ValueError:
+                    continue
+                unit = (sampled.unit or "").lower()
+                if sampled.measurand == "Energy.Active.Import.Register":
+                    wh = value * 1000 if unit == "kwh" else value
+                    energy = max(0.0, (wh - transaction.meter_start_wh) / 1000)
+                elif sampled.measurand == "Power.Active.Import":
+                    power = max(0.0, value if unit == "kw" else value / 1000)
+                elif sampled.measurand == "SoC":
+                    soc = min(100.0, max(0.0, value))
+            if energy is not None or power is not None or soc is not None:
+                readings.append((meter_value.timestamp, energy, power, soc))
+        if not readings:
+            return
+        buffer = get_session_buffer(transaction.session["id"]) or open_session_buffer(transaction.session)
+        if buffer is not None:
+            buffer.add(readings)
+
+    # ------------------------------------------------------------
+    # Handlers
+    # ------------------------------------------------------------
+
+    async def on_boot_notification(self, charge_point: ChargePoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = BootNotificationRequest.model_validate(payload)
+        charge_point.boot = {
+            "vendor": request.charge_point_vendor,
+            "model": request.charge_point_model,
+            "serial_number": request.charge_point_serial_number,
+            "firmware_version": request.firmware_version,
+        }
+        connectors = await self._connectors(charge_point, reload=True)
+        if not connectors:
+            logger.warning("⚠️  Rejected boot of unmapped charger %s", charge_point.id, sample=10)
+        return {
+            "status": "Accepted" if connectors else "Rejected",
+            "currentTime": _now().isoformat(),
+            "interval": OCPP_HEARTBEAT_SECONDS,
+        }
+
+    async def on_heartbeat(self, charge_point: ChargePoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {"currentTime": _now().isoformat()}
+
+    async def on_authorize(self, charge_point: ChargePoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Id tags are not tied to users; whether a car may charge is decided by its booking at
+        # StartTransaction
+        AuthorizeRequest.model_validate(payload)
+        return {"idTagInfo": {"status": "Accepted"}}
+
+    async def on_status_notification(self, charge_point: ChargePoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = StatusNotificationRequest.model_validate(payload)
+        if request.connector_id == 0:
+            charge_point.status = request.status
+            return {}
+        connector = (await self._connectors(charge_point)).get(request.connector_id)
+        if connector is None:
+            logger.warning("⚠️  Status for unmapped connector %s/%s", charge_point.id, request.connector_id, sample=20)
+            return {}
+        changed = (connector.status, connector.error_code) != (request.status, request.error_code)
+        connector.status, connector.error_code = request.status, request.error_code
+        connector.updated_at = request.timestamp or _now()
+        if changed:
+            self.batcher.add_status({
+                "slot_id": connector.slot_id,
+                "station_id": connector.station_id,
+                "ocpp_status": request.status,
+                "error_code": request.error_code,
+                "status": SLOT_STATUS[request.status],
+                "at": connector.updated_at.isoformat(),
+            })
+        return {}
+
+    async def on_start_transaction(self, charge_point: ChargePoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = StartTransactionRequest.model_validate(payload)
+        connector = (await self._connectors(charge_point)).get(request.connector_id)
+        # Unmapped connectors still get a transaction id, as the protocol requires, but are refused
+        started = await self.batcher.start({
+            "slot_id": connector.slot_id if connector else None,
+            "id_tag": request.id_tag,
+            "meter_start": request.meter_start,
+            "at": request.timestamp.isoformat(),
+        })
+        transaction_id = int(started["transaction_id"])
+        if started.get("status") == "Accepted" and started.get("session") and connector is not None:
+            session = started["session"]
+            self.transactions[transaction_id] = Transaction(
+                transaction_id, charge_point.id, request.connector_id, connector.slot_id, request.meter_start, session
+            )
+            connector.transaction_id = transaction_id
+            open_session_buffer(session)
+        return {"transactionId": transaction_id, "idTagInfo": {"status": started.get("status", "Invalid")}}
+
+    async def on_stop_transaction(self, charge_point: ChargePoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = StopTransactionRequest.model_validate(payload)
+        transaction = await self._own_transaction(charge_point, request.transaction_id)
+        if transaction is None:
+            # Unknown, already closed or another charger's: nothing to close. Still answered, so
+            # the charger does not keep retrying the message.
+            return {}
+        final = MeterValue.model_validate({"timestamp": request.timestamp, "sampledValue": [
+            {"value": str(request.meter_stop), "measurand": "Energy.Active.Import.Register", "unit": "Wh"},
+            {"value": "0", "measurand": "Power.Active.Import", "unit": "W"},
+        ]})
+        self._record_meter_values(transaction, (request.transaction_data or []) + [final])
+        await self.batcher.stop({
+            "transaction_id": request.transaction_id,
+            "meter_stop": request.meter_stop,
+            "at": request.timestamp.isoformat(),
+            "reason": request.reason,
+        })
+        self.transactions.pop(request.transaction_id, None)
+        for connector in (charge_point.connectors or {}).values():
+            if connector.transaction_id == request.transaction_id:
+                connector.transaction_id = None
+        return {"idTagInfo": {"status": "Accepted"}}
+
+    async def on_meter_values(self, charge_point: ChargePoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = MeterValuesRequest.model_validate(payload)
+        transaction_id = request.transaction_id
+        if transaction_id is None:
+            connector = (await self._connectors(charge_point)).get(request.connector_id)
+            transaction_id = connector.transaction_id if connector else None
+        if transaction_id is None:
+            return {}  # idle connector readings carry no session progress
+        transaction = await self._own_transaction(charge_point, transaction_id)
+        if transaction is not None:
+            self._record_meter_values(transaction, request.meter_value)
+        return {}
+
+    def snapshot(self, station_ids: Optional[set] = None) -> List[Dict[str, Any]]:
+        """Known chargers and their connectors, optionally only those at the given stations."""
+        return [
+            cp.snapshot() for cp in self.charge_points.values()
+            if station_ids is None or cp.station_ids() & station_ids
+        ]
+
+
+HANDLERS: Dict[str, Handler] = {
+    "BootNotification": CentralSystem.on_boot_notification,
+    "Heartbeat": CentralSystem.on_heartbeat,
+    "Authorize": CentralSystem.on_authorize,
+    "StatusNotification": CentralSystem.on_status_notification,
+    "StartTransaction": CentralSystem.on_start_transaction,
+    "StopTransaction": CentralSystem.on_stop_transaction,
+    "MeterValues": CentralSystem.on_meter_values,
+}
+
+central_system = CentralSystem()
@@ -0,0 +1,56 @@
+"""
+OCPP-J message framing (OCPP 1.6 JSON over WebSocket, section 4 of the spec).
+
+Every frame is a JSON array:
+
+    [2, "<unique id>", "<action>", {payload}]                 CALL
+    [3, "<unique id>", {payload}]                              CALLRESULT
+    [4, "<unique id>", "<code>", "<description>", {details}]   CALLERROR
+"""
+
+import json
+from typing import Any, Dict, Optional, Tuple
+
+CALL = 2
+CALLRESULT = 3
+CALLERROR = 4
+
+SUBPROTOCOL = "ocpp1.6"
+
+
+class OcppError(Exception):
+    """Turned into a CALLERROR frame; `code` is one of the OCPP-J error codes."""
+
+    def __init__(self, code: str, description: str = "", details: Optional[Dict[str, Any]] = None):
+        super().__init__(description or code)
+        self.code = code
+        self.description = description
+        self.details = details or {}
+
+
+def parse_frame(text: str) -> Tuple[int, str, Optional[str], Any]:
+    """(message type, unique id, action or None, payload) of a frame; raises OcppError when malformed."""
+    try:
+        frame = json.loads(text)
+    except ValueError:
+        raise OcppError("FormationViolation", "Frame is not valid JSON")
+    if not isinstance(frame, list) or len(frame) < 3 or not isinstance(frame[1], str):
+        raise OcppError("FormationViolation", "Frame is not an OCPP-J message array")
+    message_type, unique_id = frame[0], frame[1]
+    if message_type == CALL:
+        if len(frame) != 4 or not isinstance(frame[2], str) or not isinstance(frame[3], dict):
+            raise OcppError("FormationViolation", "CALL must be [2, id, action, payload]")
+        return CALL, unique_id, frame[2], frame[3]
+    if message_type == CALLRESULT:
+        return CALLRESULT, unique_id, None, frame[2]
+    if message_type == CALLERROR:
+        return CALLERROR, unique_id, None, frame[2:]
+    raise OcppError("MessageTypeNotSupported", f"Unknown message type {message_type!r}")
+
+
+def call_result(unique_id: str, payload: Dict[str, Any]) -> str:
+    return json.dumps([CALLRESULT, unique_id, payload], separators=(",", ":"))
+
+
+def call_error(unique_id: str, error: OcppError) -> str:
+    return json.dumps([CALLERROR, unique_id, error.code, error.description, error.details], separators=(",", ":"))
@@ -10,6 +10,7 @@ __all__ = [
     "station_managers",
     "activity",
     "admin",
-    "analytics"
+    "analytics",
+    "ocpp"
 ]
 
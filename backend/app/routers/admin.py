@@ -1,5 +1,6 @@
 import asyncio
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from typing import List, Dict, Any
 from ..dependencies import require_admin, get_current_user
 from ..crud import (
@@ -21,6 +22,11 @@ from ..crud import (
 )
 from ..crud.profiles import get_user_profile
 from ..utils.logger import log_activity
+from ..utils.fast_json import fast_response
+from ..utils import profiling
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["Admin Dashboard"])
 
@@ -144,7 +150,7 @@ async def get_composite_dashboard_data(current_user: dict = Depends(get_current_
         )
 
         # Return all data in a single response
-        return {
+        return fast_response({
             "stations": stations_managers or [],
             "managers": managers_stations or [],
             "users": users or [],
@@ -162,10 +168,10 @@ async def get_composite_dashboard_data(current_user: dict = Depends(get_current_
                 "co2_saved": co2_saved or {},
                 "recent_activity": recent_activity or []
             }
-        }
+        })
     except Exception as e:
         # Log error but return base stats to prevent dashboard failure
-        print(f"Error loading dashboard data: {e}")
+        logger.error("Error loading dashboard data: %s", e)
         return {
             "stations": [],
             "managers": [],
@@ -185,3 +191,24 @@ async def get_composite_dashboard_data(current_user: dict = Depends(get_current_
                 "recent_activity": []
             }
         }
+
+
+# ------------------------
+# 🔬 Request profiles (X-Profile: 1, see utils/profiling.py)
+# ------------------------
+
+@router.get("/profiles", response_model=List[Dict[str, Any]], dependencies=[Depends(require_admin)])
+async def get_request_profiles():
+    """List the most recent request profiles, newest first"""
+    return profiling.list_profiles()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_request_profile(profile_id: str):
+    """Return one request profile: a pyinstrument HTML flame graph, or cProfile stats as text"""
+    profile = profiling.render_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if profile["format"] == "html":
+        return HTMLResponse(profile["output"])
+    return PlainTextResponse(profile["output"])
@@ -1,11 +1,36 @@
+import asyncio
+import importlib
+import importlib.util
+import sys
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
 from ..dependencies import get_current_user
-from ..agent.orchestrator import process_agent_message
+from ..agent.scheduler import InferenceQueueFull, InferenceTimeout, inference_scheduler
 
 router = APIRouter(prefix="/agent", tags=["Agent"])
 
+# The orchestrator pulls in LangChain and the tool stack; it is imported on the
+# first chat request (or by warm_agent() at startup) so workers that never
+# serve chat don't pay for it at boot.
+ORCHESTRATOR_MODULE = importlib.util.resolve_name("..agent.orchestrator", __package__)
+AGENT_PACKAGE = ORCHESTRATOR_MODULE.rsplit(".", 1)[0]
+_load_lock = asyncio.Lock()
+# Set only once the import has finished: the module shows up in sys.modules as
+# soon as its import starts, so that cannot tell a loaded agent from a loading one.
+_orchestrator = None
+
+
+async def warm_agent():
+    """Import the agent stack off the event loop. Safe to call more than once."""
+    global _orchestrator
+    if _orchestrator is not None:
+        return _orchestrator
+    async with _load_lock:
+        if _orchestrator is None:
+            _orchestrator = await asyncio.to_thread(importlib.import_module, ORCHESTRATOR_MODULE)
+    return _orchestrator
+
 class AgentRequest(BaseModel):
     message: str
     chat_history: List[Dict[str, str]] = []
@@ -19,7 +44,8 @@ async def chat_with_agent(request: AgentRequest, current_user: dict = Depends(ge
     Stateless endpoint for the frontend component to interact with the LLM Agent.
     """
     try:
-        response = await process_agent_message(
+        orchestrator = await warm_agent()
+        response = await orchestrator.process_agent_message(
             user_message=request.message, 
             chat_history=request.chat_history, 
             user_context=current_user,
@@ -28,7 +54,30 @@ async def chat_with_agent(request: AgentRequest, current_user: dict = Depends(ge
             timezone_offset=request.timezone_offset
         )
         return response
+    except InferenceQueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="The assistant is busy right now. Please try again in a few seconds.",
+            headers={"Retry-After": "5"},
+        )
+    except InferenceTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail="The assistant took too long to respond. Please try again.",
+            headers={"Retry-After": "10"},
+        )
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/status")
+async def agent_status(current_user: dict = Depends(get_current_user)):
+    """Current load on the LLM inference queue and how many turns skipped the LLM."""
+    status = {"loaded": _orchestrator is not None, "inference": inference_scheduler.stats()}
+    # Reporting must not be what loads the agent stack
+    if status["loaded"]:
+        status["fast_path"] = sys.modules[f"{AGENT_PACKAGE}.intent_router"].fast_path_stats()
+        status["response_cache"] = sys.modules[f"{AGENT_PACKAGE}.response_cache"].response_cache.stats()
+    return status
@@ -36,7 +36,7 @@ async def signup(request: Request):
         user = getattr(res, "user", None)
 
         # Debug logging
-        logger.info(f"[auth.signup] sign_up result session={'yes' if session else 'no'} user_id={getattr(user, 'id', None)} email={getattr(user, 'email', None)}")
+        logger.info("[auth.signup] sign_up result session=%s user_id=%s email=%s", 'yes' if session else 'no', getattr(user, 'id', None), getattr(user, 'email', None))
 
         if not session or not user:
             raise Exception("Invalid login credentials")
@@ -47,7 +47,7 @@ async def signup(request: Request):
             # get_current_user expects the token param; call it directly
             normalized = await get_current_user(token=session.access_token)
         except Exception as e:
-            logger.warning(f"[auth.login] failed to compute normalized user: {e}")
+            logger.warning("[auth.login] failed to compute normalized user: %s", e)
 
         # Build user payload merged with normalized info when available
         user_payload = {
@@ -96,7 +96,7 @@ async def login(request: Request):
         user = getattr(res, "user", None)
 
         # Debug logging
-        logger.info(f"[auth.login] sign_in result session={'yes' if session else 'no'} user_id={getattr(user, 'id', None)} email={getattr(user, 'email', None)}")
+        logger.info("[auth.login] sign_in result session=%s user_id=%s email=%s", 'yes' if session else 'no', getattr(user, 'id', None), getattr(user, 'email', None))
 
         if not session or not user:
             raise Exception("Invalid login credentials")
@@ -105,7 +105,7 @@ async def login(request: Request):
         try:
             normalized = await get_current_user(token=session.access_token)
         except Exception as e:
-            logger.warning(f"[auth.login] failed to compute normalized user: {e}")
+            logger.warning("[auth.login] failed to compute normalized user: %s", e)
 
         user_payload = {
             "id": user.id,
@@ -135,7 +135,7 @@ async def login(request: Request):
 @router.get("/me")
 async def me(current_user: dict = Depends(get_current_user)):
     """Return normalized current user with role and station_ids."""
-    logger.info(f"[auth.me] current_user id={current_user.get('id')} role={current_user.get('role')} stations={current_user.get('station_ids')}")
+    logger.debug("[auth.me] current_user id=%s role=%s stations=%s", current_user.get('id'), current_user.get('role'), current_user.get('station_ids'))
     return current_user
 
 
@@ -170,7 +170,7 @@ async def refresh(request: Request):
     try:
         normalized = await get_current_user(token=access_token)
     except Exception as e:
-        logger.warning(f"[auth.refresh] failed to compute normalized user: {e}")
+        logger.warning("[auth.refresh] failed to compute normalized user: %s", e)
 
     user_payload = None
     if normalized:
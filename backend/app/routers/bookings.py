@@ -1,28 +1,59 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional
 from uuid import UUID
 from ..dependencies import get_current_user
-from ..crud.bookings import list_bookings, create_booking, get_booking, update_booking, accept_booking_atomic, complete_expired_bookings
+from ..crud.bookings import list_bookings, list_user_bookings_changed_since, create_booking, get_booking, update_booking, accept_booking_atomic, complete_expired_bookings
 from ..crud.station import find_nearby_stations
 from ..crud.profiles import get_user_profile
 from ..utils.logger import log_activity
+from ..crud.slot_holds import create_slot_hold, list_active_holds, release_slot_holds
 from ..models.booking_model import BookingCreate, BookingOut, BookingUpdate
+from ..models.slot_hold_model import SlotHoldCreate, SlotHoldOut
 from ..database import get_supabase_client
+from ..utils.fast_json import FAST_JSON_ENABLED, FastJSONResponse, fast_response, project_rows
+from ..utils.fieldsets import parse_fields, sparse_response
+from ..utils.sync_cursor import SYNC_PAGE_SIZE, decode_cursor, sync_page
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
 
 
 @router.get("/", response_model=List[BookingOut])
-async def get_bookings(current_user: Any = Depends(get_current_user)):
+async def get_bookings(fields: Optional[str] = None, since: Optional[str] = None,
+                       current_user: Any = Depends(get_current_user)):
     """
-    Return list of bookings for the current user.
+    Return list of bookings for the current user. `fields=id,status,...` limits the returned fields.
+    With `since=<cursor>` (empty for a first sync) only bookings changed since the cursor are
+    returned as `{"items", "cursor", "has_more"}`.
     """
     user_id = current_user["id"] if isinstance(current_user, dict) else getattr(current_user, "id", None)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid user")
 
+    required = ("id", "updated_at") if since is not None else ("id",)
+    fieldset = parse_fields(fields, BookingOut, computed=("nearest_station",), required=required)
+    if since is not None:
+        since_ts = decode_cursor(since)
+        try:
+            rows = await list_user_bookings_changed_since(
+                user_id, since_ts, columns=fieldset.columns if fieldset else "*"
+            )
+        except Exception:
+            raise HTTPException(status_code=500, detail="Failed to fetch bookings")
+        page = sync_page(rows, since_ts, SYNC_PAGE_SIZE)
+        if fieldset is not None:
+            page["items"] = [{key: row.get(key) for key in fieldset.output} for row in page["items"]]
+        else:
+            page["items"] = project_rows(page["items"], BookingOut)
+        return FastJSONResponse(page)
+
+    if fieldset is not None:
+        return sparse_response(await list_bookings(user_id, validate=False, columns=fieldset.columns), fieldset)
+
     # Call your existing CRUD layer
-    return await list_bookings(user_id)
+    return fast_response(await list_bookings(user_id, validate=not FAST_JSON_ENABLED), BookingOut)
 
 
 @router.post("/", response_model=BookingOut)
@@ -86,6 +117,49 @@ async def add_booking(request: Request, current_user: Any = Depends(get_current_
     return new_booking
 
 
+@router.get("/holds", response_model=List[SlotHoldOut])
+async def get_my_holds(current_user: Any = Depends(get_current_user)):
+    """Return the current user's live slot holds."""
+    user_id = current_user["id"] if isinstance(current_user, dict) else getattr(current_user, "id", None)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid user")
+    return await list_active_holds(user_id=user_id)
+
+
+@router.post("/holds", response_model=SlotHoldOut)
+async def add_hold(hold: SlotHoldCreate, current_user: Any = Depends(get_current_user)):
+    """
+    Soft-hold a slot and time window for a few minutes while the user finishes booking.
+    Replaces any hold the user already has.
+    """
+    user_id = current_user["id"] if isinstance(current_user, dict) else getattr(current_user, "id", None)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid user")
+
+    try:
+        return await create_slot_hold(user_id, hold.station_id, hold.slot_id, hold.start_time, hold.end_time, hold.minutes)
+    except ValueError as e:
+        error_msg = str(e)
+        if "unavailable between" in error_msg:
+            raise HTTPException(status_code=409, detail="This charging slot is not available during your selected time.")
+        if "not found" in error_msg:
+            raise HTTPException(status_code=404, detail="Slot not found")
+        raise HTTPException(status_code=400, detail=error_msg)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Unable to hold this slot right now. Please try again later.")
+
+
+@router.delete("/holds/{hold_id}")
+async def delete_hold(hold_id: UUID, current_user: Any = Depends(get_current_user)):
+    """Release one of the current user's holds."""
+    user_id = current_user["id"] if isinstance(current_user, dict) else getattr(current_user, "id", None)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid user")
+    if not await release_slot_holds(user_id, hold_id=hold_id):
+        raise HTTPException(status_code=404, detail="Hold not found")
+    return {"message": "Hold released"}
+
+
 @router.put("/{booking_id}", response_model=BookingOut)
 async def update_booking_item(booking_id: UUID, update: BookingUpdate, current_user: Any = Depends(get_current_user)):
     """Update a booking (owner or station_manager)."""
@@ -142,7 +216,7 @@ async def update_booking_item(booking_id: UUID, update: BookingUpdate, current_u
                 # since updated is an instance of BookingOut, we set the property
                 updated.nearest_station = nearest
         except Exception as e:
-            print(f"Error finding nearest station: {e}")
+            logger.error("Error finding nearest station: %s", e)
 
     return updated
 
@@ -1,10 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from uuid import UUID
+
+from ..dependencies import get_current_user, require_admin, require_admin_or_manager
+from ..crud import (
+    list_charging_sessions,
+    create_charging_session,
+    list_charging_sessions_between,
+    list_stations,
+    list_user_charging_sessions,
+    list_user_charging_sessions_changed_since,
+)
+from ..crud.telemetry import get_sessions_for_telemetry, list_session_telemetry
+from ..models import ChargingSessionCreate, ChargingSessionOut, TelemetryBatch
+from ..utils import metrics
+from ..utils.fast_json import FastJSONResponse, fast_response
+from ..utils.fieldsets import parse_fields, sparse_response
+from ..utils.sync_cursor import SYNC_PAGE_SIZE, decode_cursor, sync_page
+from ..utils.structured_logging import get_logger
+from ..utils.telemetry_buffer import (
+    SessionBuffer,
+    get_session_buffer,
+    open_session_buffer,
+    stored_progress,
+)
 
-from ..dependencies import get_current_user, require_admin
-from ..crud import list_charging_sessions, create_charging_session, list_charging_sessions_between, list_stations
-from ..models import ChargingSessionCreate, ChargingSessionOut
-from ..database import get_supabase_client
+logger = get_logger(__name__)
 
 router = APIRouter(
     prefix="/charging_sessions",
@@ -13,42 +34,49 @@ router = APIRouter(
 
 
 @router.get("/user/", response_model=List[Dict[str, Any]])
-async def get_user_sessions(current_user=Depends(get_current_user)):
+async def get_user_sessions(fields: Optional[str] = None, since: Optional[str] = None, current_user=Depends(get_current_user)):
     """
     List charging sessions for the current user with station and vehicle data populated.
-    This includes completed sessions with actual costs.
+    This includes completed sessions with actual costs. `fields=id,cost,...` limits the returned fields.
+    With `since=<cursor>` (empty for a first sync) only sessions changed since the cursor are
+    returned as `{"items", "cursor", "has_more"}`.
     """
     user_id = current_user["id"] if isinstance(current_user, dict) else getattr(current_user, "id", None)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid user")
+    fieldset = parse_fields(fields, required=("id", "updated_at") if since is not None else ("id",))
+    columns = fieldset.columns if fieldset else "*"
+
+    if since is not None:
+        since_ts = decode_cursor(since)
+        try:
+            rows = await list_user_charging_sessions_changed_since(user_id, since_ts, columns=columns)
+        except Exception as e:
+            logger.error("Error syncing user sessions: %s", e)
+            raise HTTPException(status_code=500, detail="Failed to fetch user sessions")
+        page = sync_page(rows, since_ts, SYNC_PAGE_SIZE)
+        if fieldset is not None:
+            page["items"] = [{key: row.get(key) for key in fieldset.output} for row in page["items"]]
+        return FastJSONResponse(page)
 
     try:
-        supabase = await get_supabase_client()
-
-        # Get all charging sessions for this user
-        response = supabase.table("charging_sessions").select("*").eq("user_id", str(user_id)).order("created_at", desc=True).execute()
-        sessions = response.data or []
-
-        print(f"Found {len(sessions)} charging sessions for user {user_id}")
+        # Raw session rows; the client joins station and vehicle data
+        sessions = await list_user_charging_sessions(user_id, columns)
+        logger.debug("Found %s charging sessions for user %s", len(sessions), user_id)
 
-        # For now, just return the raw session data to avoid database issues
-        # We'll process the data on the client side
-        processed_sessions = []
-        for session in sessions:
-            processed = dict(session)
-            processed_sessions.append(processed)
-
-        return processed_sessions
+        if fieldset is not None:
+            return sparse_response(sessions, fieldset)
+        return fast_response(sessions)
     except Exception as e:
-        print(f"Error fetching user sessions: {e}")
+        logger.error("Error fetching user sessions: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch user sessions")
 
 
 @router.get("/", response_model=List[ChargingSessionOut])
-async def get_sessions(current_user=Depends(get_current_user)):
+async def get_sessions(fields: Optional[str] = None, current_user=Depends(get_current_user)):
     """
     List charging sessions accessible to the current user.
-    Station managers/admins can view their stations' sessions.
+    Station managers/admins can view their stations' sessions. `fields=id,cost,...` limits the returned fields.
     """
     # Extract station_ids for the current user
     station_ids = (
@@ -58,7 +86,10 @@ async def get_sessions(current_user=Depends(get_current_user)):
     )
 
     # list_charging_sessions is async - await the result
-    return await list_charging_sessions(station_ids)
+    fieldset = parse_fields(fields, ChargingSessionOut)
+    if fieldset is not None:
+        return sparse_response(await list_charging_sessions(station_ids, fieldset.columns), fieldset)
+    return fast_response(await list_charging_sessions(station_ids), ChargingSessionOut)
 
 
 @router.post("/", response_model=ChargingSessionOut)
@@ -96,3 +127,90 @@ async def consumption_analytics(start: str, end: str):
     station_ids = [s.get("station_id") or s.get("id") for s in stations if (s.get("station_id") or s.get("id"))]
     # await the between listing as it's async
     return await list_charging_sessions_between(station_ids, start, end)
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _telemetry_buffer(session_id: str, sessions: Dict[str, Dict[str, Any]],
+                      current_user: dict) -> Tuple[Optional[SessionBuffer], Optional[str]]:
+    """The buffer to append a session's readings to, or why its readings are rejected."""
+    buffer = get_session_buffer(session_id)
+    session = sessions.get(session_id)
+    if buffer is None and session is None:
+        return None, "not_found"
+    station_id = buffer.station_id if buffer is not None else session.get("station_id")
+    if current_user.get("role") != "admin" and str(station_id) not in {str(s) for s in current_user.get("station_ids") or []}:
+        return None, "forbidden"
+    if buffer is not None:
+        return buffer, None
+    if session.get("status") != "active":
+        return None, "not_active"
+    buffer = open_session_buffer(session)
+    return (buffer, None) if buffer is not None else (None, "buffer_full")
+
+
+@router.post("/telemetry", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_telemetry(batch: TelemetryBatch, current_user=Depends(require_admin_or_manager)):
+    """
+    Accept batched meter readings (cumulative session kWh, kW, state of charge) for active sessions.
+    Readings are buffered in memory and written as downsampled points every TELEMETRY_FLUSH_SECONDS;
+    station managers may only report for their own stations. Returns reading counts by result and
+    the sessions whose readings were rejected, with the reason.
+    """
+    session_ids = [item.session_id for item in batch.sessions if _is_uuid(item.session_id)]
+    unbuffered = sorted({sid for sid in session_ids if get_session_buffer(sid) is None})
+    try:
+        sessions = await get_sessions_for_telemetry(unbuffered)
+    except Exception as e:
+        logger.error("❌ Error loading sessions for telemetry: %s", e)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Telemetry ingestion unavailable")
+
+    totals = {"accepted": 0, "stale": 0, "invalid": 0, "overflow": 0}
+    rejected = []
+    for item in batch.sessions:
+        buffer, reason = _telemetry_buffer(item.session_id, sessions, current_user) if _is_uuid(item.session_id) else (None, "not_found")
+        if buffer is None:
+            rejected.append({"session_id": item.session_id, "reason": reason})
+            metrics.TELEMETRY_READINGS.inc("rejected", amount=len(item.readings))
+            continue
+        counts = buffer.add((r.timestamp, r.energy_kwh, r.power_kw, r.soc) for r in item.readings)
+        for result, n in counts.items():
+            totals[result] += n
+    if rejected:
+        logger.debug("Rejected telemetry for %s sessions", len(rejected), sample=20)
+    return {**totals, "rejected": rejected}
+
+
+@router.get("/{session_id}/live", response_model=Dict[str, Any])
+async def session_live(session_id: str, current_user=Depends(get_current_user)):
+    """
+    Live progress of a charging session: metered energy, power, state of charge, cost so far and
+    recent downsampled points. Visible to the session's user, its station's managers and admins.
+    """
+    if not _is_uuid(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    buffer = get_session_buffer(session_id)
+    session = None
+    if buffer is None:
+        session = (await get_sessions_for_telemetry([session_id])).get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+    owner_id = buffer.user_id if buffer is not None else session.get("user_id")
+    station_id = buffer.station_id if buffer is not None else session.get("station_id")
+
+    role = current_user.get("role") if isinstance(current_user, dict) else getattr(current_user, "role", None)
+    user_id = current_user.get("id") if isinstance(current_user, dict) else getattr(current_user, "id", None)
+    station_ids = (current_user.get("station_ids") if isinstance(current_user, dict) else getattr(current_user, "station_ids", None)) or []
+    if role != "admin" and str(owner_id) != str(user_id) and str(station_id) not in {str(s) for s in station_ids}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to view this session")
+
+    if buffer is not None:
+        return fast_response(buffer.progress())
+    points = await list_session_telemetry(session_id)
+    return fast_response(stored_progress(session, points))
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, WebSocket
+from typing import Any, Dict, List
+
+from ..dependencies import require_admin_or_manager
+from ..ocpp.central_system import OCPP_AUTH_SECRET, OCPP_MAX_CONNECTIONS, authenticate, central_system
+from ..ocpp.protocol import SUBPROTOCOL
+from ..utils.fast_json import fast_response
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(
+    prefix="/ocpp",
+    tags=["OCPP"]
+)
+
+# OCPP 1.6 limits the charge box identity to 48 characters
+MAX_CHARGE_POINT_ID_LENGTH = 48
+
+
+@router.websocket("/{charge_point_id}")
+async def ocpp_endpoint(websocket: WebSocket, charge_point_id: str):
+    """
+    OCPP 1.6-J central system endpoint. Chargers are configured with
+    ws(s)://<host>/ocpp/<charge point id>; see app/ocpp/central_system.py.
+    """
+    if len(charge_point_id) > MAX_CHARGE_POINT_ID_LENGTH:
+        await websocket.close(code=1008)
+        return
+    if not authenticate(charge_point_id, websocket.headers.get("authorization")):
+        reason = "bad credentials" if OCPP_AUTH_SECRET else "OCPP_AUTH_SECRET is not set"
+        logger.warning("⚠️  Rejected charger %s: %s", charge_point_id, reason, sample=10)
+        await websocket.close(code=1008)
+        return
+    # Replacing a live connection of the same charger does not add one
+    reconnect = central_system.is_connected(charge_point_id)
+    if central_system.connection_count >= OCPP_MAX_CONNECTIONS and not reconnect:
+        logger.warning("⚠️  Rejected charger %s: %s connections open", charge_point_id, OCPP_MAX_CONNECTIONS, sample=10)
+        await websocket.close(code=1013)
+        return
+    offered = websocket.scope.get("subprotocols") or []
+    await websocket.accept(subprotocol=SUBPROTOCOL if SUBPROTOCOL in offered else None)
+    await central_system.serve(charge_point_id, websocket)
+
+
+@router.get("/charge_points", response_model=List[Dict[str, Any]])
+async def list_charge_points(current_user=Depends(require_admin_or_manager)):
+    """
+    Chargers known to this process with their connector states and open transactions.
+    Station managers only see chargers at their stations.
+    """
+    station_ids = None
+    if current_user.get("role") != "admin":
+        station_ids = {str(s) for s in current_user.get("station_ids") or []}
+    return fast_response(central_system.snapshot(station_ids))
@@ -24,19 +24,17 @@ async def get_all_profiles(current_user: Dict = Depends(require_admin)):
 @router.get("/me", response_model=ProfileOut)
 async def get_my_profile(current_user: Any = Depends(get_current_user)):
     """Get the current user's profile."""
-    logger.info(f"[profiles.me] current_user id={current_user.get('id')} role={current_user.get('role')}")
+    logger.debug("[profiles.me] current_user id=%s role=%s", current_user.get('id'), current_user.get('role'))
     profile = await get_user_profile(UUID(current_user["id"]))
 
     if not profile:
-        logger.warning(f"[profiles.me] No profile found for user {current_user['id']}")
+        logger.warning("[profiles.me] No profile found for user %s", current_user['id'])
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Profile not found"
         )
 
-    # Successfully retrieved profile - log the response
-    response_json = profile.model_dump_json()
-    logger.info(f"[profiles.me] final response: {response_json}")
+    logger.debug("[profiles.me] final response: %s", profile)
     return profile
 
 @router.get("/{profile_id}", response_model=ProfileOut)
@@ -117,7 +115,7 @@ async def change_my_password(
         )
 
     try:
-        logger.info(f"[profiles.me] Password change request received for user {current_user['id']}")
+        logger.info("[profiles.me] Password change request received for user %s", current_user['id'])
 
         # Use Supabase Admin API to update user password directly
         supabase_admin = await get_supabase_service_role_client()
@@ -135,7 +133,7 @@ async def change_my_password(
         return {"message": "Password changed successfully"}
 
     except Exception as supabase_error:
-        logger.error(f"[profiles.me] Supabase password update failed: {supabase_error}")
+        logger.error("[profiles.me] Supabase password update failed: %s", supabase_error)
         # If Supabase update fails, we'll return an error
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
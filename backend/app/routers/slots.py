@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import Any, List, Optional
 from uuid import UUID
 
 from ..dependencies import get_current_user
 from ..crud import list_slots, list_station_slots, create_slot, update_slot, get_slot
 from ..models import SlotCreate, SlotUpdate, SlotOut
+from ..utils.fieldsets import parse_fields
+from ..utils.catalog_cache import catalog_response, render_rows, render_sparse
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/slots", tags=["Slots"])
 
 
 @router.get("/", response_model=List[SlotOut])
 async def get_slots(
+    request: Request,
     station_id: Optional[UUID] = None,
+    fields: Optional[str] = None,
     current_user: Any = Depends(get_current_user)
 ):
     """
-    List slots visible to the current user.
+    List slots visible to the current user. `fields=id,status,...` limits the returned fields.
+    Supports If-None-Match (ETag) polling.
     - If station_id is provided, return slots for that specific station (if user has access)
     - Otherwise, return all slots visible to the user:
       * Admin: can see all slots
@@ -33,6 +41,14 @@ async def get_slots(
         if isinstance(current_user, dict)
         else getattr(current_user, "station_ids", [])
     )
+    fieldset = parse_fields(fields, SlotOut)
+    columns = fieldset.columns if fieldset else "*"
+
+    def respond(scope, load):
+        async def render() -> bytes:
+            rows = await load()
+            return render_sparse(rows, fieldset) if fieldset else render_rows(rows, SlotOut)
+        return catalog_response(request, scope, render)
 
     # If station_id is provided, filter by that specific station
     if station_id:
@@ -46,15 +62,16 @@ async def get_slots(
                     detail="Not authorized to access slots for this station"
                 )
         # Admins and users can access any station
-        return await list_station_slots(station_id)
+        return await respond(f"slots:station:{station_id}", lambda: list_station_slots(station_id, columns))
 
     # No station_id provided - return all accessible slots
     # Regular users can see all slots for booking
     if role == "app_user":
-        return await list_slots([])  # Empty list means all slots
+        return await respond("slots:all", lambda: list_slots([], columns))  # Empty list means all slots
 
     # Station managers and admins see filtered slots
-    return await list_slots(user_station_ids)
+    scope = "slots:stations:" + ",".join(sorted(str(sid) for sid in user_station_ids))
+    return await respond(scope, lambda: list_slots(user_station_ids, columns))
 
 
 @router.post("/", response_model=SlotOut)
@@ -88,7 +105,7 @@ async def add_slot(slot: SlotCreate, current_user: Any = Depends(get_current_use
         )
 
     created = await create_slot(slot)
-    print("Created slot:", created)
+    logger.info("Created slot: %s", created)
     return created
 
 
@@ -21,6 +21,9 @@ from ..crud.statistics import (
     list_station_managers,
     get_all_station_managers
 )
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/station_managers", tags=["StationManagers"])
 
@@ -47,7 +50,7 @@ async def add_station_manager(manager: Dict[str, Any], current_user: dict = Depe
     """
 
     insert_response = await create_station_manager(manager)
-    print("Created station manager:", insert_response)
+    logger.debug("Created station manager: %s", insert_response)
 
     if not insert_response:
         raise HTTPException(status_code=400, detail="Failed to create station manager")
@@ -73,14 +76,14 @@ async def add_station_manager(manager: Dict[str, Any], current_user: dict = Depe
 @router.get("/my-stations", dependencies=[Depends(require_station_manager)])
 async def get_my_stations(current_user: dict = Depends(get_current_user)) -> List[Dict[str, Any]]:
     """Get all stations managed by the current station manager"""
-    print(f"[router] get_my_stations called for user {current_user.get('id')} with role {current_user.get('role')}")
+    logger.debug("[router] get_my_stations called for user %s with role %s", current_user.get('id'), current_user.get('role'))
     return await get_manager_stations(current_user["id"])
 
 
 @router.get("/my-bookings", dependencies=[Depends(require_station_manager)])
 async def get_my_bookings(current_user: dict = Depends(get_current_user)) -> List[Dict[str, Any]]:
     """Get all bookings for stations managed by the current station manager"""
-    print(f"[router] get_my_bookings called for user {current_user.get('id')} with role {current_user.get('role')}")
+    logger.debug("[router] get_my_bookings called for user %s with role %s", current_user.get('id'), current_user.get('role'))
     return await get_manager_bookings(current_user["id"])
 
 
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
 from uuid import UUID
 
-from ..dependencies import require_admin, get_current_user
+from ..dependencies import require_admin, get_current_user, get_current_user_or_query_token
 from ..crud import (
     create_station,
     update_station,
@@ -27,33 +28,131 @@ from ..crud import (
     get_recent_activity,
     get_station,
     get_station_manager,
-    get_manager_stations
+    get_manager_stations,
+    station_slot_counts
 )
 from ..crud.profiles import get_user_profile
+from ..crud.catalog_changes import catalog_changes_since
 from ..utils.logger import log_activity
+from ..utils.fieldsets import parse_fields
+from ..utils.availability import notify_availability_change
+from ..utils.catalog_cache import catalog_response, render_rows, render_sparse
+from ..utils.fast_json import fast_response
+from ..utils.availability_stream import AvailabilityHub, STREAM_HEARTBEAT, sse_event
 
 from ..models import StationCreate, StationUpdate, StationOut, ManagerOut
+from ..utils.structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/stations", tags=["Stations"])
 
+# Filled in by list_stations from charging_slots rather than read from the stations table
+SLOT_COUNT_FIELDS = ("available_slots", "total_slots", "connector_types")
+
+# Pushes per-station slot count changes to /stations/stream subscribers
+availability_hub = AvailabilityHub(station_slot_counts)
+
 # ------------------------
 # ✅ Station CRUD Endpoints
 # ------------------------
 
 @router.get("/", response_model=List[StationOut], dependencies=[Depends(get_current_user)])
-async def read_stations(current_user: dict = Depends(get_current_user)):
-    """List all stations. Admin sees all, managers see only their assigned stations, users can view all stations."""
-    if current_user.get("role") == "admin":
-        # Admin sees all stations
-        return await list_stations()
-    elif current_user.get("role") == "station_manager":
-        # Manager sees only stations assigned to them
-        return await get_manager_stations(current_user["id"])
-    elif current_user.get("role") == "app_user":
-        # Regular users can view all stations for booking purposes
-        return await list_stations()
-    else:
+async def read_stations(request: Request, fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """List all stations. Admin sees all, managers see only their assigned stations, users can view all stations.
+    Pass `fields=id,name,...` to receive only those fields. Supports If-None-Match (ETag) polling."""
+    role = current_user.get("role")
+    if role not in ("admin", "station_manager", "app_user"):
         raise HTTPException(status_code=403, detail="Insufficient permissions")
+    fieldset = parse_fields(fields, StationOut, computed=SLOT_COUNT_FIELDS, required=("id", "station_manager"))
+    # Managers see only stations assigned to them; admins and regular users (for booking) see all
+    manager_id = current_user["id"] if role == "station_manager" else None
+
+    async def render() -> bytes:
+        columns, with_slot_counts = "*", True
+        if fieldset is not None:
+            columns = fieldset.columns
+            with_slot_counts = any(f in SLOT_COUNT_FIELDS for f in fieldset.output)
+        if manager_id:
+            stations = await get_manager_stations(manager_id, columns, with_slot_counts)
+        else:
+            stations = await list_stations(columns, with_slot_counts)
+        return render_sparse(stations, fieldset) if fieldset else render_rows(stations, StationOut)
+
+    scope = f"stations:manager:{manager_id}" if manager_id else "stations:all"
+    return await catalog_response(request, scope, render)
+
+
+@router.get("/changes", response_model=Dict[str, Any], dependencies=[Depends(get_current_user)])
+async def read_station_changes(since: int = 0):
+    """
+    Delta sync for offline station catalogs. Returns stations and slots changed since
+    `since` plus tombstones in `deleted`; `version` is the value to send next time.
+    `full: true` means the response is the whole catalog (first sync or a version gap)
+    and `has_more: true` means another page is waiting.
+    """
+    if since < 0:
+        raise HTTPException(status_code=400, detail="since must be a non-negative version")
+    return fast_response(await catalog_changes_since(since))
+
+
+# ------------------------
+# ✅ Live Availability Stream
+# ------------------------
+
+@router.get("/stream", dependencies=[Depends(get_current_user_or_query_token)])
+async def stream_availability():
+    """
+    Server-sent events with per-station slot counts. Sends a `snapshot` event with every
+    station's counts, then `availability` events holding only the stations that changed.
+    EventSource clients can authenticate with `?token=<access token>`.
+    """
+    subscriber = await availability_hub.connect()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many availability subscribers")
+
+    async def events():
+        try:
+            yield sse_event("snapshot", {"seq": availability_hub.seq, "stations": availability_hub.snapshot()})
+            while True:
+                batch = await subscriber.next_batch(STREAM_HEARTBEAT)
+                if batch is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event("availability", {"seq": availability_hub.seq, "stations": batch})
+        finally:
+            availability_hub.disconnect(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/stream/ws")
+async def stream_availability_ws(websocket: WebSocket, token: Optional[str] = None):
+    """WebSocket variant of /stations/stream; pass the access token as `?token=`."""
+    try:
+        await get_current_user(token=token, auth_token=token)
+    except Exception:
+        await websocket.close(code=1008)
+        return
+    subscriber = await availability_hub.connect()
+    if subscriber is None:
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+    try:
+        await websocket.send_json({"type": "snapshot", "seq": availability_hub.seq, "stations": availability_hub.snapshot()})
+        while True:
+            batch = await subscriber.next_batch(STREAM_HEARTBEAT)
+            if batch is None:
+                await websocket.send_json({"type": "keep-alive"})
+                continue
+            await websocket.send_json({"type": "availability", "seq": availability_hub.seq, "stations": batch})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        availability_hub.disconnect(subscriber)
 
 
 @router.post("/", response_model=StationOut, dependencies=[Depends(require_admin)])
@@ -126,7 +225,7 @@ async def edit_station(station_id: UUID, update: StationUpdate, current_user: di
 @router.delete("/{station_id}", dependencies=[Depends(require_admin)])
 async def remove_station(station_id: UUID, current_user: dict = Depends(get_current_user)):
     """Delete a station"""
-    print(f"Deleting station {station_id}...")
+    logger.debug("Deleting station %s...", station_id)
 
     station_to_delete = await get_station(station_id)
     if not station_to_delete:
@@ -153,15 +252,18 @@ async def remove_station(station_id: UUID, current_user: dict = Depends(get_curr
 # ------------------------
 
 @router.get("/{station_id}/nearby", response_model=List[StationOut], dependencies=[Depends(get_current_user)])
-async def get_nearby_stations(station_id: UUID, limit: int = 5, sort_by: str = "distance"):
+async def get_nearby_stations(request: Request, station_id: UUID, limit: int = 5, sort_by: str = "distance"):
     """Get nearby stations with available slots, sorted by distance or power (for low battery)"""
     from ..crud.station import find_nearby_stations
-    
-    try:
+
+    async def render() -> bytes:
         nearby = await find_nearby_stations(str(station_id), limit=limit, sort_by=sort_by)
-        return nearby
+        return render_rows(nearby, StationOut)
+
+    try:
+        return await catalog_response(request, f"nearby:{station_id}", render)
     except Exception as e:
-        print(f"Error fetching nearby stations: {e}")
+        logger.error("Error fetching nearby stations: %s", e)
         raise HTTPException(status_code=400, detail="Failed to fetch nearby stations")
 
 
@@ -187,7 +289,7 @@ async def assign_manager(station_id: UUID, body: Dict[str, Any], current_user: d
         manager = await get_station_manager(UUID(str(manager_user_id)))
         station = await get_station(station_id)
         station_name = station['name'] if station else "Unknown"
-        print(f"station: {station} #################################################################################")
+        logger.debug("station: %s #################################################################################", station)
         manager_name = manager['name'] if manager else "Unknown"
         # Log activity
         user_profile = await get_user_profile(current_user["id"])
@@ -206,6 +308,7 @@ async def assign_manager(station_id: UUID, body: Dict[str, Any], current_user: d
         from ..database import get_supabase_client
         supabase = await get_supabase_client()
         response = supabase.table("stations").update({"station_manager": None}).eq("id", str(station_id)).execute()
+        notify_availability_change(station_id)
 
         if response.data:
             # Log activity
@@ -0,0 +1,39 @@
+"""
+Availability change notifications.
+
+Crud writes that change what is bookable (bookings, slots, charging sessions,
+stations) call notify_availability_change(); in-process caches subscribe to
+drop entries that could now be stale.
+"""
+
+from typing import Callable, List, Optional
+
+from .structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+AvailabilityListener = Callable[[Optional[str]], None]
+
+_listeners: List[AvailabilityListener] = []
+_version = 0
+
+
+def subscribe(listener: AvailabilityListener) -> None:
+    """Register a callback receiving the affected station id (None means "any station")."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def availability_version() -> int:
+    """Monotonic counter bumped on every availability change."""
+    return _version
+
+
+def notify_availability_change(station_id: Optional[str] = None) -> None:
+    global _version
+    _version += 1
+    for listener in list(_listeners):
+        try:
+            listener(str(station_id) if station_id else None)
+        except Exception as e:
+            logger.warning("⚠️  Availability listener failed: %s", e, sample=20)
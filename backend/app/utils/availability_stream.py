@@ -0,0 +1,178 @@
+"""
+Live station availability fan-out for /stations/stream.
+
+AvailabilityHub listens to the in-process availability hooks, collects the
+affected station ids, and after a short debounce recomputes slot counts for
+just those stations with one query. Only stations whose available_slots or
+total_slots actually changed are pushed to subscribers. A full resync also
+runs every AVAILABILITY_STREAM_RESYNC seconds, which picks up changes made by
+other workers or by the database lifecycle jobs.
+
+Backpressure: every subscriber has a pending map keyed by station id, not a
+queue. Pushing merges a delta into that map and never waits. A slow client
+therefore just gets fewer, coalesced updates carrying the latest counts, and
+its memory use is bounded by the number of stations.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from .availability import subscribe
+from .structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+STREAM_DEBOUNCE = float(os.getenv("AVAILABILITY_STREAM_DEBOUNCE", "0.5"))
+STREAM_HEARTBEAT = float(os.getenv("AVAILABILITY_STREAM_HEARTBEAT", "15"))
+STREAM_RESYNC = float(os.getenv("AVAILABILITY_STREAM_RESYNC", "60"))
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("AVAILABILITY_STREAM_MAX_SUBSCRIBERS", "5000"))
+
+CountsLoader = Callable[[Optional[List[str]]], Awaitable[Dict[str, Dict[str, Any]]]]
+
+
+class StreamSubscriber:
+    """One connected client: the station deltas it has not been sent yet."""
+
+    def __init__(self) -> None:
+        self.pending: Dict[str, Dict[str, int]] = {}
+        self.wakeup = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, delta: Dict[str, Dict[str, int]]) -> None:
+        if self.pending:
+            self.coalesced += sum(1 for sid in delta if sid in self.pending)
+        self.pending.update(delta)
+        self.wakeup.set()
+
+    async def next_batch(self, timeout: float) -> Optional[Dict[str, Dict[str, int]]]:
+        """Wait for pending deltas; returns None if nothing arrived within timeout."""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.wakeup.clear()
+        batch, self.pending = self.pending, {}
+        return batch
+
+
+class AvailabilityHub:
+    def __init__(self, load_counts: CountsLoader) -> None:
+        self._load = load_counts
+        self._state: Dict[str, Dict[str, int]] = {}
+        self._synced = False
+        self._subscribers: Set[StreamSubscriber] = set()
+        self._dirty: Set[str] = set()
+        self._dirty_all = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sync_lock: Optional[asyncio.Lock] = None
+        self.seq = 0
+        self._stats = {"broadcasts": 0, "recomputes": 0, "resyncs": 0}
+        subscribe(self._on_change)
+
+    # --- change hook (called synchronously from crud writes) ---
+
+    def _on_change(self, station_id: Optional[str]) -> None:
+        if not self._subscribers:
+            # Nobody listening: forget the snapshot instead of tracking changes
+            self._synced = False
+            return
+        if station_id is None:
+            self._dirty_all = True
+        else:
+            self._dirty.add(station_id)
+        if self._loop is not None and self._changed is not None:
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    # --- subscribers ---
+
+    def _start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._sync_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def connect(self) -> Optional[StreamSubscriber]:
+        """Register a client; returns None when the subscriber limit is reached."""
+        if len(self._subscribers) >= STREAM_MAX_SUBSCRIBERS:
+            return None
+        self._start()
+        if not self._synced:
+            async with self._sync_lock:
+                if not self._synced:
+                    await self._recompute(None)
+        subscriber = StreamSubscriber()
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: StreamSubscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return dict(self._state)
+
+    # --- recompute loop ---
+
+    async def _recompute(self, station_ids: Optional[List[str]]) -> Dict[str, Dict[str, int]]:
+        counts = await self._load(station_ids)
+        self._stats["recomputes"] += 1
+        delta: Dict[str, Dict[str, int]] = {}
+        seen = set()
+        for sid, c in counts.items():
+            entry = {"available_slots": c.get("available_slots", 0), "total_slots": c.get("total_slots", 0)}
+            seen.add(sid)
+            if self._state.get(sid) != entry:
+                self._state[sid] = entry
+                delta[sid] = entry
+        if station_ids is None:
+            # Stations that no longer have any slots (or were deleted)
+            for sid in [sid for sid in self._state if sid not in seen]:
+                if self._state[sid] != {"available_slots": 0, "total_slots": 0}:
+                    delta[sid] = {"available_slots": 0, "total_slots": 0}
+                del self._state[sid]
+            self._synced = True
+        return delta
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), STREAM_RESYNC)
+                await asyncio.sleep(STREAM_DEBOUNCE)  # coalesce bursts of writes
+            except asyncio.TimeoutError:
+                if self._subscribers:
+                    self._dirty_all = True
+                    self._stats["resyncs"] += 1
+            self._changed.clear()
+            dirty_all, dirty = self._dirty_all, self._dirty
+            self._dirty_all, self._dirty = False, set()
+            if not self._subscribers or not (dirty_all or dirty):
+                continue
+            try:
+                async with self._sync_lock:
+                    delta = await self._recompute(None if dirty_all else list(dirty))
+            except Exception as e:
+                logger.warning("⚠️  Availability stream recompute failed: %s", e, sample=20)
+                continue
+            if delta:
+                self.seq += 1
+                self._stats["broadcasts"] += 1
+                for subscriber in list(self._subscribers):
+                    subscriber.push(delta)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "subscribers": len(self._subscribers),
+            "stations": len(self._state),
+            "seq": self.seq,
+            "coalesced": sum(s.coalesced for s in self._subscribers),
+        }
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
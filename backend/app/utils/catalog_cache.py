@@ -0,0 +1,137 @@
+"""
+Conditional GET for the station and slot catalogs.
+
+Catalog responses are rendered once per catalog version and kept per scope
+(endpoint + query + whatever part of the caller's identity changes the result).
+Every response carries a strong ETag (hash of the body) and Cache-Control; a
+poll whose If-None-Match still matches gets a 304 and an unchanged poll is
+served from memory, in both cases without querying the catalog tables.
+
+The catalog version is the availability counter from app.utils.availability,
+bumped by station/slot writes and by booking, session and hold changes that
+move occupancy. The counter is per process, so with several workers an entry is
+also re-rendered after CATALOG_CACHE_TTL seconds; a re-render that produces the
+same body still answers 304.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Tuple, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+from .availability import availability_version
+from .fast_json import FAST_JSON_ENABLED, dumps, project_rows
+from .fieldsets import Fieldset
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "30"))
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "10"))
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "256"))
+
+# Representation suffixes appended by CompressionMiddleware
+_ENCODING_SUFFIXES = ("-gzip", "-br")
+
+# scope -> (catalog version, rendered at, etag, body)
+_entries: "OrderedDict[str, Tuple[int, float, str, bytes]]" = OrderedDict()
+_stats: Dict[str, int] = {"not_modified": 0, "memory": 0, "rendered": 0}
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def render_rows(rows: List[dict], model: Type[BaseModel]) -> bytes:
+    """Render catalog rows the way the route's response_model would."""
+    if FAST_JSON_ENABLED:
+        return dumps(project_rows(rows, model))
+    adapter = _list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(rows), by_alias=True)
+
+
+def render_sparse(rows: List[dict], fieldset: Fieldset) -> bytes:
+    return dumps([{key: row.get(key) for key in fieldset.output} for row in rows])
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:27] + '"'
+
+
+def _client_etags(request: Request) -> List[str]:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return []
+    if header.strip() == "*":
+        return ["*"]
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        for suffix in _ENCODING_SUFFIXES:
+            if tag.endswith(suffix + '"'):
+                tag = tag[: -len(suffix) - 1] + '"'
+        tags.append(tag)
+    return tags
+
+
+def _headers(etag: str) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={CATALOG_MAX_AGE}, must-revalidate",
+        "Vary": "Authorization",
+    }
+
+
+def _store(scope: str, version: int, etag: str, body: bytes) -> None:
+    _entries[scope] = (version, time.monotonic(), etag, body)
+    _entries.move_to_end(scope)
+    while len(_entries) > CATALOG_CACHE_MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+async def catalog_response(request: Request, scope: str, render: Callable[[], Awaitable[bytes]]) -> Response:
+    """
+    Answer a catalog GET conditionally.
+
+    Args:
+        request: Incoming request (for If-None-Match and the query string).
+        scope: Identifies who sees this result, e.g. "stations:all" or "slots:manager:<id>".
+        render: Loads the rows and renders the response body; only awaited on a miss.
+    """
+    scope = f"{scope}?{request.url.query}"
+    version = availability_version()
+    client_tags = _client_etags(request)
+
+    entry = _entries.get(scope)
+    fresh = entry is not None and entry[0] == version and time.monotonic() - entry[1] < CATALOG_CACHE_TTL
+    if fresh:
+        _, _, etag, body = entry
+        _entries.move_to_end(scope)
+        if "*" in client_tags or etag in client_tags:
+            _stats["not_modified"] += 1
+            return Response(status_code=304, headers=_headers(etag))
+        _stats["memory"] += 1
+        return Response(content=body, media_type="application/json", headers=_headers(etag))
+
+    body = await render()
+    etag = make_etag(body)
+    # Only cache if nothing changed while rendering, so a stale body never outlives its version
+    if availability_version() == version:
+        _store(scope, version, etag, body)
+    _stats["rendered"] += 1
+    if "*" in client_tags or etag in client_tags:
+        return Response(status_code=304, headers=_headers(etag))
+    return Response(content=body, media_type="application/json", headers=_headers(etag))
+
+
+def catalog_cache_stats() -> Dict[str, int]:
+    return {**_stats, "entries": len(_entries), "version": availability_version()}
+
+
+def clear_catalog_cache() -> None:
+    _entries.clear()
@@ -0,0 +1,199 @@
+"""
+Parquet cold storage for archived bookings and charging sessions.
+
+Rows are written under ARCHIVE_DIR as
+
+    <table>/month=YYYY-MM/station=<station_id>/part-<stamp>-<uuid>.parquet
+
+with the month taken from the row's start_time (the same key the hot tables
+are partitioned on). Readers prune by directory first, so a query for the last
+30 days never opens a file once those rows are older than the archive cutoff.
+
+Archived rows are gone from Postgres, so every worker that serves analytics
+must see the same files: ARCHIVE_DIR has to be an absolute path on storage
+mounted by all of them (NFS, EFS, a bucket mount...). There is no default; when
+it is unset or relative nothing is archived and reads return no rows.
+
+Column types are fixed by name (timestamps, numbers, everything else as text)
+so files written months apart always share one schema. pyarrow is optional:
+without it nothing is archived and reads return no rows.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = ds = pq = None
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "")
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+
+TIME_COLUMNS = {"start_time", "end_time", "created_at", "updated_at"}
+NUMERIC_COLUMNS = {
+    "energy_used", "energy_consumed", "cost", "initial_battery_level",
+    "final_battery_level", "current_battery_level",
+}
+
+PARTITION_TIME_COLUMN = "start_time"
+_NO_STATION = "none"
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def configured() -> bool:
+    """True when ARCHIVE_DIR is an absolute path (expected to be shared storage)."""
+    return bool(ARCHIVE_DIR) and os.path.isabs(ARCHIVE_DIR)
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _column_type(name: str):
+    if name in TIME_COLUMNS:
+        return pa.timestamp("us", tz="UTC")
+    if name in NUMERIC_COLUMNS:
+        return pa.float64()
+    return pa.string()
+
+
+def _normalize(name: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if name in TIME_COLUMNS:
+        return _parse_time(value)
+    if name in NUMERIC_COLUMNS:
+        return float(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _table_dir(table: str) -> str:
+    return os.path.join(ARCHIVE_DIR, table)
+
+
+def write_rows(table: str, rows: List[Dict[str, Any]]) -> List[str]:
+    """
+    Write rows to Parquet, one file per (month, station) group. Each file is
+    written to a temporary name and renamed into place, so readers never see a
+    partial file. Returns the paths written.
+    """
+    if not rows:
+        return []
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    if not configured():
+        raise RuntimeError("ARCHIVE_DIR must be an absolute path on shared storage")
+
+    columns: List[str] = []
+    for row in rows:
+        columns.extend(c for c in row if c not in columns)
+    schema = pa.schema([(c, _column_type(c)) for c in columns])
+
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        started = _parse_time(row.get(PARTITION_TIME_COLUMN)) or datetime.now(timezone.utc)
+        key = (started.astimezone(timezone.utc).strftime("%Y-%m"), str(row.get("station_id") or _NO_STATION))
+        groups.setdefault(key, []).append({c: _normalize(c, row.get(c)) for c in columns})
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    written = []
+    for (month, station), group in groups.items():
+        directory = os.path.join(_table_dir(table), f"month={month}", f"station={station}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(directory, name)
+        # Dot-prefixed files are skipped by dataset discovery
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(pa.Table.from_pylist(group, schema=schema), tmp_path, compression=ARCHIVE_COMPRESSION)
+        os.replace(tmp_path, path)
+        written.append(path)
+    return written
+
+
+def archived_months(table: str) -> List[str]:
+    """Months (YYYY-MM) that have archived rows, oldest first."""
+    if not configured():
+        return []
+    root = _table_dir(table)
+    if not os.path.isdir(root):
+        return []
+    return sorted(name[len("month="):] for name in os.listdir(root) if name.startswith("month="))
+
+
+def _to_json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _all_of(conditions: List[Any]):
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_rows(
+    table: str,
+    columns: Optional[Iterable[str]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    station_ids: Optional[Iterable[str]] = None,
+    time_column: str = PARTITION_TIME_COLUMN,
+) -> List[Dict[str, Any]]:
+    """
+    Archived rows as JSON-style dicts (timestamps as ISO strings, like the hot
+    tables return them), filtered by `since <= time_column < until` and station.
+    """
+    if pa is None:
+        return []
+    since, until = (_parse_time(since), _parse_time(until))
+    months = archived_months(table)
+    if not months:
+        return []
+    by_start = time_column == PARTITION_TIME_COLUMN
+    # Fast path: everything archived is older than the window
+    if since is not None and by_start and since.astimezone(timezone.utc).strftime("%Y-%m") > months[-1]:
+        return []
+
+    partitioning = ds.partitioning(pa.schema([("month", pa.string()), ("station", pa.string())]), flavor="hive")
+    directory_filter = _all_of(
+        ([ds.field("month") >= since.astimezone(timezone.utc).strftime("%Y-%m")] if since is not None and by_start else [])
+        + ([ds.field("month") <= until.astimezone(timezone.utc).strftime("%Y-%m")] if until is not None and by_start else [])
+        + ([ds.field("station").isin([str(s) for s in station_ids])] if station_ids is not None else [])
+    )
+
+    # Only the footers of files in matching directories are read to settle the schema
+    files = ds.dataset(_table_dir(table), format="parquet", partitioning=partitioning)
+    fragments = list(files.get_fragments(filter=directory_filter)) if directory_filter is not None else list(files.get_fragments())
+    if not fragments:
+        return []
+    schema = pa.unify_schemas([f.physical_schema for f in fragments] + [partitioning.schema])
+    dataset = ds.dataset([f.path for f in fragments], schema=schema, format="parquet",
+                         partitioning=partitioning, partition_base_dir=_table_dir(table))
+
+    row_conditions = []
+    if time_column in schema.names:
+        if since is not None:
+            row_conditions.append(ds.field(time_column) >= pa.scalar(since, type=pa.timestamp("us", tz="UTC")))
+        if until is not None:
+            row_conditions.append(ds.field(time_column) < pa.scalar(until, type=pa.timestamp("us", tz="UTC")))
+    expression = _all_of(row_conditions)
+
+    wanted = [c for c in columns if c in schema.names] if columns is not None else [
+        c for c in schema.names if c not in partitioning.schema.names
+    ]
+    rows = dataset.to_table(columns=wanted, filter=expression).to_pylist()
+    return [{k: _to_json_value(v) for k, v in row.items()} for row in rows]
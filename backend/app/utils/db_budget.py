@@ -0,0 +1,169 @@
+"""
+Per-request database round-trip budgets and N+1 detection.
+
+DbBudgetMiddleware counts every PostgREST call made while serving a request
+(via the db_instrumentation observer hook) and compares the count with the
+route's budget. Calls repeating the same shape (table, operation and filter
+columns, ignoring values) DB_REPEAT_THRESHOLD or more times are reported as
+likely N+1 loops.
+
+    DB_BUDGET_MODE      off | log (default) | raise
+    DB_BUDGET_DEFAULT   calls allowed per request when a route has no budget (25)
+    DB_BUDGETS          per-route budgets, "GET /bookings/=4;GET /stations/=3"
+    DB_REPEAT_THRESHOLD repeats of one shape that get reported (5)
+
+In "raise" mode the call that goes over budget raises DbBudgetExceeded, so a
+test client surfaces it as an error. Tests can also pin counts directly:
+
+    with count_db_calls() as stats:
+        await list_bookings(user_id)
+    assert stats.count == 2, stats.summary()
+"""
+
+import logging
+import os
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import metrics
+from .db_instrumentation import DbCall, add_db_observer
+
+logger = logging.getLogger(__name__)
+
+DB_BUDGET_MODE = os.getenv("DB_BUDGET_MODE", "log").lower()
+DB_BUDGET_DEFAULT = int(os.getenv("DB_BUDGET_DEFAULT", "25"))
+DB_REPEAT_THRESHOLD = int(os.getenv("DB_REPEAT_THRESHOLD", "5"))
+
+DB_BUDGET_EXCEEDED = metrics.Counter(
+    "db_budget_exceeded_total", "Requests that made more DB calls than their route budget", ("route",)
+)
+
+
+def _parse_budgets(spec: str) -> Dict[Tuple[str, str], int]:
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(";"))):
+        route, _, limit = item.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        if method and path and limit.strip().isdigit():
+            budgets[(method.upper(), path.strip())] = int(limit)
+        else:
+            logger.warning(f"⚠️  Ignoring malformed DB_BUDGETS entry: {item!r}")
+    return budgets
+
+
+_route_budgets: Dict[Tuple[str, str], int] = _parse_budgets(os.getenv("DB_BUDGETS", ""))
+
+
+def set_route_budget(method: str, path: str, max_calls: int) -> None:
+    """Set the budget for a route template, e.g. set_route_budget("GET", "/bookings/", 4)."""
+    _route_budgets[(method.upper(), path)] = max_calls
+
+
+class DbBudgetExceeded(RuntimeError):
+    pass
+
+
+class DbCallStats:
+    """DB calls made in one request (or one `count_db_calls` block)."""
+
+    def __init__(self, budget: Optional[int] = None, scope: Optional[Scope] = None, raise_on_exceed: bool = False):
+        self.calls: List[DbCall] = []
+        self.budget = budget
+        self.scope = scope
+        self.raise_on_exceed = raise_on_exceed
+
+    @property
+    def count(self) -> int:
+        return len(self.calls)
+
+    @property
+    def route(self) -> str:
+        if self.scope is None:
+            return "-"
+        route = self.scope.get("route")
+        return f"{self.scope.get('method', '')} {getattr(route, 'path', self.scope.get('path', ''))}"
+
+    def effective_budget(self) -> int:
+        if self.budget is not None:
+            return self.budget
+        route = self.scope.get("route") if self.scope is not None else None
+        if route is not None:
+            return _route_budgets.get((self.scope.get("method", ""), route.path), DB_BUDGET_DEFAULT)
+        return DB_BUDGET_DEFAULT
+
+    def repeated(self, threshold: int = DB_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """Shapes issued at least `threshold` times, most frequent first."""
+        counts = Counter(call.shape for call in self.calls)
+        return [(shape, n) for shape, n in counts.most_common() if n >= threshold]
+
+    def summary(self) -> str:
+        lines = [f"{self.count} DB calls (budget {self.effective_budget()}) for {self.route}"]
+        lines += [f"  {n}x {shape}" for shape, n in Counter(call.shape for call in self.calls).most_common()]
+        return "\n".join(lines)
+
+    def record(self, call: DbCall) -> None:
+        self.calls.append(call)
+        if self.raise_on_exceed and self.count > self.effective_budget():
+            raise DbBudgetExceeded(self.summary())
+
+
+_current: ContextVar[Optional[DbCallStats]] = ContextVar("db_call_stats", default=None)
+
+
+def current_db_stats() -> Optional[DbCallStats]:
+    return _current.get()
+
+
+def _observe(call: DbCall) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.record(call)
+
+
+add_db_observer(_observe)
+
+
+@contextmanager
+def count_db_calls(budget: Optional[int] = None) -> Iterator[DbCallStats]:
+    """Collect the DB calls made inside the block; with `budget`, exceeding it raises."""
+    stats = DbCallStats(budget=budget, raise_on_exceed=budget is not None)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class DbBudgetMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or DB_BUDGET_MODE == "off":
+            await self.app(scope, receive, send)
+            return
+
+        stats = DbCallStats(scope=scope, raise_on_exceed=DB_BUDGET_MODE == "raise")
+        token = _current.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            self._report(stats)
+        # crud functions catch Exception and return an error dict, which can swallow the
+        # raise from the offending call; fail the request here so the test still sees it
+        if stats.raise_on_exceed and stats.count > stats.effective_budget():
+            raise DbBudgetExceeded(stats.summary())
+
+    @staticmethod
+    def _report(stats: DbCallStats) -> None:
+        budget = stats.effective_budget()
+        if stats.count > budget:
+            DB_BUDGET_EXCEEDED.inc(stats.route)
+            logger.warning(f"⚠️  DB budget exceeded: {stats.summary()}")
+        for shape, n in stats.repeated():
+            logger.warning(f"⚠️  Possible N+1 in {stats.route}: {n}x {shape}")
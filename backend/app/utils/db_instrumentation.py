@@ -0,0 +1,138 @@
+"""
+Instrumented Supabase client.
+
+`instrument(client)` wraps a Supabase client so that every PostgREST call built
+from `.table(...)` or `.rpc(...)` is timed when it executes and reported to the
+registered observers as a DbCall. The query builders are proxied, not copied,
+so crud code keeps chaining `.select().eq().order()` exactly as before.
+
+Metrics register an observer at import time; anything else that wants to see
+each round trip (budgets, tracing) adds its own with `add_db_observer`.
+"""
+
+import time
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from . import metrics
+
+_OPERATIONS = {"select", "insert", "update", "delete", "upsert"}
+# Builder methods whose first argument is a column name; with the operation and table they make
+# up a call's shape, e.g. "select bookings eq(user_id) order(start_time)"
+_SHAPE_METHODS = {
+    "eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is_", "in_", "contains",
+    "contained_by", "match", "filter", "order", "range", "limit", "single", "maybe_single",
+}
+
+
+class DbCall(NamedTuple):
+    table: str
+    operation: str
+    duration: float
+    rows: int
+    error: Optional[BaseException]
+    shape: str
+
+
+_observers: List[Callable[[DbCall], None]] = []
+
+
+def add_db_observer(observer: Callable[[DbCall], None]) -> None:
+    _observers.append(observer)
+
+
+def remove_db_observer(observer: Callable[[DbCall], None]) -> None:
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def _notify(call: DbCall) -> None:
+    for observer in list(_observers):
+        observer(call)
+
+
+def _wrap(value: Any, table: str, operation: str, shape: tuple) -> Any:
+    if hasattr(value, "execute") and not isinstance(value, _InstrumentedQuery):
+        return _InstrumentedQuery(value, table, operation, shape)
+    return value
+
+
+class _InstrumentedQuery:
+    __slots__ = ("_builder", "_table", "_operation", "_shape")
+
+    def __init__(self, builder: Any, table: str, operation: str, shape: tuple = ()):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._shape = shape
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._builder, name)
+        operation = name if name in _OPERATIONS else self._operation
+        if not callable(attr):
+            # e.g. the `.not_` property, which returns the builder
+            return _wrap(attr, self._table, operation, self._shape + ("not",))
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            shape = self._shape
+            if name in _SHAPE_METHODS:
+                column = args[0] if args and isinstance(args[0], str) and name not in ("range", "limit") else ""
+                shape = shape + (f"{name}({column})",)
+            return _wrap(attr(*args, **kwargs), self._table, operation, shape)
+
+        return call
+
+    def execute(self) -> Any:
+        started = time.perf_counter()
+        response = None
+        error: Optional[BaseException] = None
+        try:
+            response = self._builder.execute()
+            return response
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            data = getattr(response, "data", None)
+            rows = len(data) if isinstance(data, list) else (1 if data else 0)
+            shape = " ".join((self._operation, self._table) + self._shape)
+            _notify(DbCall(self._table, self._operation, time.perf_counter() - started, rows, error, shape))
+
+
+class InstrumentedClient:
+    """Supabase client proxy; everything except `table`/`from_`/`rpc` passes straight through."""
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    @property
+    def wrapped(self) -> Any:
+        return self._client
+
+    def table(self, name: str) -> _InstrumentedQuery:
+        return _InstrumentedQuery(self._client.table(name), name, "query")
+
+    from_ = table
+
+    def rpc(self, fn: str, *args: Any, **kwargs: Any) -> _InstrumentedQuery:
+        return _InstrumentedQuery(self._client.rpc(fn, *args, **kwargs), fn, "rpc")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def instrument(client: Any) -> Any:
+    if client is None or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
+
+
+def _record_metrics(call: DbCall) -> None:
+    if not metrics.METRICS_ENABLED:
+        return
+    metrics.DB_CALL_LATENCY.observe(call.duration, call.table, call.operation)
+    metrics.DB_ROWS.inc(call.table, call.operation, amount=call.rows)
+    if call.error is not None:
+        metrics.DB_CALL_ERRORS.inc(call.table, call.operation)
+
+
+add_db_observer(_record_metrics)
@@ -0,0 +1,86 @@
+"""
+Opt-in fast serialization for large list endpoints.
+
+With FAST_JSON_RESPONSES=true, list endpoints hand rows that came straight from
+PostgREST (already shaped by the database) to FastJSONResponse instead of
+letting FastAPI validate every row through the response model and walk it with
+jsonable_encoder. Rows are projected onto the response model's fields so the
+payload keys stay the same; values are passed through as stored, so timestamps
+keep the database's ISO format. orjson is used when installed, otherwise the
+stdlib encoder.
+"""
+
+import datetime
+import decimal
+import json
+import os
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if isinstance(o, BaseModel):
+        return o.model_dump(by_alias=True, mode="json")
+    if isinstance(o, (set, frozenset, tuple)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (or compact stdlib json) and no jsonable_encoder pass."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _field_spec(model: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    """(output key, default) per field, using aliases like FastAPI's response serialization does."""
+    spec = []
+    for name, field in model.model_fields.items():
+        default = None if field.is_required() else field.get_default(call_default_factory=True)
+        spec.append((field.alias or name, default))
+    return tuple(spec)
+
+
+def project_rows(rows: Iterable[Dict[str, Any]], model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Keep only the response model's fields of each trusted row, filling declared defaults."""
+    spec = _field_spec(model)
+    return [{key: row.get(key, default) for key, default in spec} for row in rows]
+
+
+def fast_response(content: Any, model: Optional[Type[BaseModel]] = None, status_code: int = 200) -> Any:
+    """
+    Return trusted content as a FastJSONResponse when the fast path is enabled,
+    otherwise return it unchanged for FastAPI's regular validation/encoding.
+    Pass `model` for lists of rows that should be projected onto a response model.
+    """
+    if not FAST_JSON_ENABLED:
+        return content
+    if model is not None:
+        content = project_rows(content or [], model)
+    return FastJSONResponse(content, status_code=status_code)
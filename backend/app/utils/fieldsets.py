@@ -0,0 +1,64 @@
+"""
+Sparse fieldsets for list endpoints (`?fields=id,name,available_slots`).
+
+The requested fields are checked against the endpoint's response model and
+pushed down into the PostgREST `select`, so only those columns leave the
+database. Fields the backend computes (e.g. a station's `available_slots`) are
+accepted but kept out of the column list. `id` is always returned.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+from .fast_json import FastJSONResponse, _field_spec
+
+_FIELD_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+MAX_FIELDS = 50
+
+
+class Fieldset(NamedTuple):
+    columns: str        # PostgREST select string
+    output: List[str]   # keys returned to the client, in request order
+
+
+def parse_fields(
+    fields: Optional[str],
+    model: Optional[Type[BaseModel]] = None,
+    computed: Iterable[str] = (),
+    required: Iterable[str] = ("id",),
+) -> Optional[Fieldset]:
+    """
+    Parse a `fields` query parameter. Returns None when no fieldset was requested.
+    Raises 400 for malformed or unknown field names.
+
+    Args:
+        fields: Comma separated field names from the query string.
+        model: Response model whose keys are allowed; any column-like name is allowed without one.
+        computed: Fields filled in by the backend rather than read from the table.
+        required: Columns always selected (identity, or keys the CRUD layer needs internally).
+    """
+    if fields is None:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    if not requested:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="fields must name at least one field")
+    if len(requested) > MAX_FIELDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_FIELDS} fields can be requested")
+
+    allowed = {key for key, _ in _field_spec(model)} if model is not None else None
+    unknown = [f for f in requested if not _FIELD_NAME.match(f) or (allowed is not None and f not in allowed)]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    computed = set(computed)
+    output = list(dict.fromkeys(["id", *requested]))
+    columns = list(dict.fromkeys([*required, *(f for f in output if f not in computed)]))
+    return Fieldset(columns=",".join(columns), output=output)
+
+
+def sparse_response(rows: Iterable[Dict[str, Any]], fieldset: Fieldset) -> FastJSONResponse:
+    """Return only the requested keys of each row, bypassing response model validation."""
+    return FastJSONResponse([{key: row.get(key) for key in fieldset.output} for row in rows])
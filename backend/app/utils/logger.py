@@ -1,5 +1,8 @@
 from datetime import datetime
 from ..database import get_supabase_client
+from .structured_logging import get_logger
+
+logger = get_logger(__name__)
 
 async def log_activity(user_id, user_name, role, action, description, station_name=None, extra=None):
     """Insert an activity record into Supabase."""
@@ -16,8 +19,8 @@ async def log_activity(user_id, user_name, role, action, description, station_na
             "created_at": datetime.utcnow().isoformat(),
         }
         response = supabase.table("user_activity_log").insert(data).execute()
-        print(f"[LOGGED] {role.upper()} - {action} - {user_name}")
+        logger.debug("[LOGGED] %s - %s - %s", role.upper(), action, user_name)
         return response.data
     except Exception as e:
-        print("Error logging activity:", e)
+        logger.error("Error logging activity: %s", e)
         return None
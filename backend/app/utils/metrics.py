@@ -0,0 +1,242 @@
+"""
+Prometheus metrics without a client library.
+
+Counters, gauges and histograms are plain dicts keyed by label values, guarded
+by one lock each, and rendered in the Prometheus text format on scrape. Every
+update is a dict lookup and an add, so the instrumentation can stay on in
+production. Label values must come from a small, fixed set (route templates,
+table names, job names), never from ids or raw paths.
+
+    REQUEST_LATENCY.observe(0.012, "GET", "/stations", "200")
+    render()  # -> text/plain; version=0.0.4 exposition
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = self._header()
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {_format_value(cumulative)}")
+        return lines
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------------
+# Application metrics
+# ------------------------------------------------------------
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served", ("method",))
+RATE_LIMITED = Counter("http_rate_limited_total", "Requests rejected by the rate limiter")
+
+DB_CALL_LATENCY = Histogram(
+    "db_call_duration_seconds", "PostgREST call latency by table and operation", ("table", "operation")
+)
+DB_CALL_ERRORS = Counter("db_call_errors_total", "PostgREST calls that raised", ("table", "operation"))
+DB_ROWS = Counter("db_rows_returned_total", "Rows returned by PostgREST calls", ("table", "operation"))
+
+LLM_CALL_LATENCY = Histogram("agent_llm_call_duration_seconds", "Agent chat model call latency", ("model",), LLM_BUCKETS)
+LLM_TOKENS = Counter("agent_llm_tokens_total", "Agent chat model tokens", ("model", "kind"))
+AGENT_TURNS = Counter("agent_turns_total", "Agent turns by how they were answered", ("path",))
+
+TELEMETRY_READINGS = Counter("telemetry_readings_total", "Charger meter readings received by result", ("result",))
+TELEMETRY_POINTS = Counter("telemetry_points_written_total", "Downsampled telemetry points written to the database")
+TELEMETRY_SESSIONS = Gauge("telemetry_buffered_sessions", "Charging sessions with telemetry buffered in memory")
+
+OCPP_CONNECTIONS = Gauge("ocpp_connections", "Chargers connected over OCPP")
+OCPP_MESSAGES = Counter("ocpp_messages_total", "OCPP calls received from chargers by action and result", ("action", "result"))
+OCPP_BATCHES = Counter("ocpp_batch_writes_total", "Batched charger status and transaction writes by result", ("result",))
+
+JOB_DURATION = Histogram(
+    "lifecycle_job_duration_seconds", "Background job run time", ("job",), (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+)
+JOB_RUNS = Counter("lifecycle_job_runs_total", "Background job runs by result", ("job", "result"))
+JOB_LAG = Gauge("lifecycle_job_lag_seconds", "How late the last run started against its schedule", ("job",))
+JOB_LAST_SUCCESS = Gauge("lifecycle_job_last_success_timestamp_seconds", "Unix time of the last successful run", ("job",))
+
+_job_last_finished: Dict[str, float] = {}
+
+
+class JobRun:
+    """Handle for one job run; set `ok = False` when the job reports failure without raising."""
+
+    ok = True
+
+
+@contextmanager
+def track_job(job: str, interval: float) -> Iterator[JobRun]:
+    """Time one run of a periodic job that sleeps `interval` seconds between runs."""
+    started = time.time()
+    previous = _job_last_finished.get(job)
+    if previous is not None:
+        JOB_LAG.set(max(0.0, started - previous - interval), job)
+    run = JobRun()
+    try:
+        with JOB_DURATION.time(job):
+            yield run
+    except Exception:
+        run.ok = False
+        raise
+    finally:
+        JOB_RUNS.inc(job, "success" if run.ok else "error")
+        if run.ok:
+            JOB_LAST_SUCCESS.set(time.time(), job)
+        _job_last_finished[job] = time.time()
+
+
+class MetricsMiddleware:
+    """
+    Records latency per route template and in-flight requests per method (the
+    route is only known once routing has run). Requests that never match a
+    route, including rate-limited ones, are labelled "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        status_code = ["500"]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status_code[0] = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec(method)
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started, method, getattr(route, "path", "unmatched"), status_code[0]
+            )
@@ -0,0 +1,169 @@
+"""
+On-demand request profiling for admins.
+
+With PROFILING_ENABLED set, a request carrying `X-Profile: 1` and an admin
+bearer token is run under a profiler. The response gets an `X-Profile-Id`
+header and the profile is kept in an in-memory ring buffer of the last
+PROFILE_BUFFER_SIZE requests, served by /admin/profiles. Requests from
+anyone else are served normally and never profiled.
+
+pyinstrument (a sampling profiler that follows `await`s) is used when
+installed and gives an interactive HTML flame graph; otherwise cProfile
+stats are stored as text. cProfile sees the whole event loop thread, so
+other requests in flight show up in its output too. One request is profiled
+at a time.
+
+    PROFILING_ENABLED     off by default
+    PROFILE_BUFFER_SIZE   profiles kept (20)
+    PROFILE_INTERVAL      pyinstrument sampling interval in seconds (0.001)
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..dependencies import get_current_user, require_admin
+from .structured_logging import get_logger
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional dependency
+    Profiler = None
+
+logger = get_logger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "20"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+PROFILE_HEADER = "x-profile"
+
+_profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_busy = False
+
+
+def _store(profile: Dict[str, Any]) -> None:
+    _profiles[profile["id"]] = profile
+    while len(_profiles) > PROFILE_BUFFER_SIZE:
+        _profiles.popitem(last=False)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Summaries of the stored profiles, newest first."""
+    return [{k: v for k, v in p.items() if k != "session"} for p in reversed(_profiles.values())]
+
+
+def render_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    """A stored profile with its rendered `output` (HTML or text, see `format`)."""
+    profile = _profiles.get(profile_id)
+    if profile is None:
+        return None
+    # Rendered on first view rather than at the end of the profiled request
+    return {**profile, "output": profile["session"].render()}
+
+
+async def _is_admin(headers: Headers) -> bool:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        require_admin(await get_current_user(token=token))
+        return True
+    except Exception:
+        return False
+
+
+class _Session:
+    """Wraps whichever profiler is available behind start/stop/render."""
+
+    def __init__(self) -> None:
+        self._output: Optional[str] = None
+        if Profiler is not None:
+            self._profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+            self.format = "html"
+        else:
+            self._profiler = cProfile.Profile()
+            self.format = "text"
+
+    def start(self) -> None:
+        if Profiler is not None:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if Profiler is not None:
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def render(self) -> str:
+        if self._output is None:
+            if Profiler is not None:
+                self._output = self._profiler.output_html()
+            else:
+                out = io.StringIO()
+                pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(60)
+                self._output = out.getvalue()
+        return self._output
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global _busy
+        if scope["type"] != "http" or not PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER, "") in ("", "0") or not await _is_admin(headers) or _busy:
+            await self.app(scope, receive, send)
+            return
+        # Claimed with no await since the check, so only one request is profiled at a time
+        _busy = True
+
+        profile_id = uuid.uuid4().hex[:12]
+        status_code = [500]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        try:
+            session = _Session()
+            started = time.perf_counter()
+            session.start()
+        except Exception:
+            _busy = False
+            raise
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.stop()
+            _busy = False
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            route = scope.get("route")
+            _store({
+                "id": profile_id,
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "route": getattr(route, "path", None),
+                "status": status_code[0],
+                "duration_ms": duration_ms,
+                "format": session.format,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "session": session,
+            })
+            logger.info("🔬 Profiled %s %s in %sms", scope.get("method"), scope.get("path"), duration_ms, profile_id=profile_id)
@@ -0,0 +1,214 @@
+"""
+Anonymized request traces for record-and-replay performance tests.
+
+With REQUEST_RECORDING set, a sample of requests is appended to
+REQUEST_RECORD_FILE as one JSON object per line: when it arrived, method,
+route template, the caller's role, status, server time, DB calls and response
+size, and the *shape* of its path parameters, query string and JSON body.
+benchmarks.replay re-issues a trace against a local build.
+
+Nothing identifying is written. Ids become salted pseudonyms (`id:3f9c0a1b2e4d`,
+the same value maps to the same pseudonym for the life of the salt), datetimes
+become offsets from the request time (`dt:+86400`), free text becomes its
+length (`str:42`); numbers, booleans and a few enum-like keys (status,
+connector_type, ...) are kept because the endpoints validate them. Records are
+queued and written by a background thread.
+
+    REQUEST_RECORDING       off by default
+    REQUEST_RECORD_FILE     trace path (request-trace.jsonl)
+    REQUEST_RECORD_SAMPLE   fraction of requests recorded (1.0)
+    REQUEST_RECORD_SALT     pseudonym salt; random per process when unset
+"""
+
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import re
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import date, datetime
+from logging.handlers import QueueListener
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .db_budget import count_db_calls, current_db_stats
+from .structured_logging import _DroppingQueueHandler, get_logger
+
+logger = get_logger(__name__)
+
+REQUEST_RECORDING = os.getenv("REQUEST_RECORDING", "false").lower() in ("1", "true", "yes")
+REQUEST_RECORD_FILE = os.getenv("REQUEST_RECORD_FILE", "request-trace.jsonl")
+REQUEST_RECORD_SAMPLE = float(os.getenv("REQUEST_RECORD_SAMPLE", "1.0"))
+_SALT = (os.getenv("REQUEST_RECORD_SALT") or os.urandom(16).hex()).encode()
+
+# Request bodies past this size are recorded without a shape
+MAX_BODY_BYTES = 64 * 1024
+MAX_LIST_ITEMS = 20
+# Values under these keys are enums the endpoints validate, not personal data
+KEEP_VALUE_KEYS = {
+    "status", "connector_type", "charger_type", "charging_connector", "vehicle_type", "role", "sort_by",
+    "fields", "type", "action", "period", "range", "interval", "days", "limit", "offset",
+}
+
+_UUID = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}")
+_ID_SEGMENT = re.compile(r"/(?:[0-9a-fA-F-]{32,36}|\d+)(?=/|$)")
+
+# The trace of the request being served; get_current_user fills in the role
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_trace", default=None)
+
+_trace_logger = logging.getLogger("smartev.request_trace")
+_listener: Optional[QueueListener] = None
+
+
+def pseudonym(value: Any) -> str:
+    return "id:" + hmac.new(_SALT, str(value).encode(), hashlib.sha256).hexdigest()[:12]
+
+
+def _shape_str(value: str, key: Optional[str], now: datetime) -> str:
+    if key in KEEP_VALUE_KEYS and len(value) <= 40:
+        return value
+    if _UUID.match(value):
+        return pseudonym(value)
+    if _DATETIME.match(value):
+        try:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            base = now if moment.tzinfo else now.replace(tzinfo=None)
+            return f"dt:{int((moment - base).total_seconds()):+d}"
+        except ValueError:
+            pass
+    if _DATE.match(value):
+        try:
+            return f"date:{(date.fromisoformat(value) - now.date()).days:+d}"
+        except ValueError:
+            pass
+    return f"str:{len(value)}"
+
+
+def shape(value: Any, now: datetime, key: Optional[str] = None) -> Any:
+    """Anonymized copy of a JSON value that keeps enough structure to rebuild a valid request."""
+    if isinstance(value, dict):
+        return {k: shape(v, now, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [shape(v, now, key) for v in value[:MAX_LIST_ITEMS]]
+    if isinstance(value, str):
+        return _shape_str(value, key, now)
+    return value
+
+
+def note_role(role: Optional[str]) -> None:
+    """Record the authenticated caller's role on the current trace (no-op when not recording)."""
+    trace = _current.get()
+    if trace is not None:
+        trace["role"] = role
+
+
+def _start_writer() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.FileHandler(REQUEST_RECORD_FILE)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=10000)
+    _trace_logger.addHandler(_DroppingQueueHandler(trace_queue))
+    _trace_logger.setLevel(logging.INFO)
+    _trace_logger.propagate = False
+    _listener = QueueListener(trace_queue, handler)
+    _listener.start()
+    atexit.register(stop_recording)
+    logger.info("🎥 Recording request traces to %s", REQUEST_RECORD_FILE, sample=REQUEST_RECORD_SAMPLE)
+
+
+def stop_recording() -> None:
+    """Flush queued traces and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestRecordingMiddleware:
+    """
+    Records sampled requests when REQUEST_RECORDING is set. Added inside
+    DbBudgetMiddleware so it can read that middleware's DB call count (and
+    keeps its own count when budgets are off).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not REQUEST_RECORDING or random.random() >= REQUEST_RECORD_SAMPLE:
+            await self.app(scope, receive, send)
+            return
+        _start_writer()
+
+        arrived = time.time()
+        body = bytearray()
+        response = {"status": 500, "bytes": 0}
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and len(body) <= MAX_BODY_BYTES:
+                body.extend(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        trace: Dict[str, Any] = {"role": None}
+        token = _current.set(trace)
+        stats = current_db_stats()
+        started = time.perf_counter()
+        try:
+            with count_db_calls() if stats is None else nullcontext(stats) as stats:
+                await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            _current.reset(token)
+            try:
+                self._write(scope, trace, arrived, duration, stats.count, response, bytes(body))
+            except Exception as e:
+                logger.warning("⚠️  Could not record request trace: %s", e, sample=100)
+
+    @staticmethod
+    def _write(scope: Scope, trace: Dict[str, Any], arrived: float, duration: float, db_calls: int,
+               response: Dict[str, int], body: bytes) -> None:
+        now = datetime.fromtimestamp(arrived).astimezone()
+        route = scope.get("route")
+        query = {name: shape(value, now, name)
+                 for name, value in parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)}
+        body_shape: Any = None
+        if body and len(body) <= MAX_BODY_BYTES:
+            try:
+                body_shape = shape(json.loads(body), now)
+            except ValueError:
+                body_shape = f"bytes:{len(body)}"
+        elif body:
+            body_shape = f"bytes:{len(body)}"
+        _trace_logger.info(json.dumps({
+            "t": round(arrived, 3),
+            "method": scope.get("method"),
+            "route": route.path if route is not None else _ID_SEGMENT.sub("/{id}", scope.get("path", "")),
+            "params": {k: shape(str(v), now, k) for k, v in (scope.get("path_params") or {}).items()},
+            "query": query,
+            "body": body_shape,
+            "role": trace["role"],
+            "status": response["status"],
+            "duration_ms": round(duration * 1000, 2),
+            "db_calls": db_calls,
+            "response_bytes": response["bytes"],
+        }, separators=(",", ":")))
@@ -0,0 +1,152 @@
+"""
+Structured, non-blocking application logging.
+
+`setup_logging()` routes the root logger through a QueueHandler: request
+handlers only enqueue the record, and a QueueListener thread formats it and
+writes it to stdout. When the queue is full the record is dropped (and
+counted) rather than blocking the request.
+
+`get_logger(__name__)` returns a logger that takes key/value fields and
+keeps formatting lazy, so a disabled debug line costs one level check:
+
+    logger.debug("🔎 Fetched %d stations for manager %s", len(rows), manager_id)
+    logger.info("✅ Booking created", booking_id=booking["id"], station_id=station_id)
+    logger.warning("⚠️  Slot lookup failed: %s", e, sample=100)  # 1 in 100 calls
+
+    LOG_LEVEL       DEBUG | INFO (default) | WARNING | ERROR
+    LOG_FORMAT      text (default) | json, one object per line
+    LOG_QUEUE_SIZE  records buffered before new ones are dropped (10000)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from . import metrics
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+LOG_RECORDS_DROPPED = metrics.Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+# Keyword arguments that belong to Logger.log itself; everything else becomes a field
+_LOGGING_KWARGS = {"exc_info", "stack_info", "stacklevel", "extra"}
+
+_listener: Optional[QueueListener] = None
+# Keyed by message template; bounded in case a caller samples an already-formatted string
+_sample_counts: Dict[str, int] = {}
+_SAMPLE_KEYS_MAX = 1000
+_sample_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """The usual `time - name - level - message` line with any fields appended as key=value."""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the args into the message here, since they may be mutated after the call
+        # returns; the formatter and the stdout write run on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    """Install the queue handler on the root logger and start the writer thread. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _sampled_out(key: str, every: int) -> bool:
+    with _sample_lock:
+        if key not in _sample_counts and len(_sample_counts) >= _SAMPLE_KEYS_MAX:
+            _sample_counts.clear()
+        count = _sample_counts.get(key, 0)
+        _sample_counts[key] = count + 1
+    return count % every != 0
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    Logger adapter taking structured fields as keyword arguments. `sample=N` keeps
+    only the first of every N calls with the same message template; kept records
+    carry `sampled=N` so counts can be scaled back up.
+    """
+
+    def log(self, level: int, msg: Any, *args: Any, sample: int = 0, **kwargs: Any) -> None:
+        if not self.isEnabledFor(level):
+            return
+        if sample > 1:
+            if _sampled_out(f"{self.logger.name}:{msg}", sample):
+                return
+            kwargs["sampled"] = sample
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _LOGGING_KWARGS}
+        if fields:
+            kwargs["extra"] = {**(kwargs.get("extra") or {}), "fields": fields}
+        kwargs.setdefault("stacklevel", 2)  # report the caller, not this adapter
+        self.logger.log(level, msg, *args, **kwargs)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(logging.getLogger(name), {})
@@ -0,0 +1,67 @@
+"""
+Cursors for per-user delta sync (`?since=<cursor>` on /bookings and /charging_sessions/user/).
+
+A cursor is an opaque, URL-safe encoding of an updated_at timestamp. A sync
+returns every row with updated_at >= cursor, so rows that share the boundary
+timestamp are sent again rather than skipped, and clients upsert by id.
+
+The next cursor never moves past now() - SYNC_CURSOR_SETTLE_SECONDS. A
+transaction that stamped updated_at just before the read but commits just
+after it is therefore still covered by the next sync.
+"""
+
+import base64
+import binascii
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+SYNC_CURSOR_SETTLE_SECONDS = float(os.getenv("SYNC_CURSOR_SETTLE_SECONDS", "5"))
+
+_EPOCH = "1970-01-01T00:00:00+00:00"
+
+
+def encode_cursor(ts: str) -> str:
+    return base64.urlsafe_b64encode(ts.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """Return the ISO timestamp in a cursor; an empty cursor means "from the beginning". Raises 400 if malformed."""
+    if not cursor:
+        return _EPOCH
+    try:
+        ts = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        return ts
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync cursor")
+
+
+def _as_dt(ts: str) -> datetime:
+    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def sync_page(rows: List[Dict[str, Any]], since_ts: str, limit: int) -> Dict[str, Any]:
+    """
+    Build the delta response from rows fetched with updated_at >= since_ts ordered by
+    updated_at, fetching limit + 1 rows so a further page can be detected.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    horizon = datetime.now(timezone.utc) - timedelta(seconds=SYNC_CURSOR_SETTLE_SECONDS)
+    next_dt = _as_dt(since_ts)
+    if rows and rows[-1].get("updated_at"):
+        next_dt = max(next_dt, _as_dt(rows[-1]["updated_at"]))
+    if not has_more:
+        next_dt = min(next_dt, max(horizon, _as_dt(since_ts)))
+    return {"items": rows, "cursor": encode_cursor(next_dt.isoformat()), "has_more": has_more}
+
+
+def fetch_changed_rows(query, since_ts: str, limit: int) -> List[Dict[str, Any]]:
+    """Apply the delta filter/order/limit to a PostgREST query already scoped to one user."""
+    response = query.gte("updated_at", since_ts).order("updated_at").limit(limit + 1).execute()
+    return response.data or []
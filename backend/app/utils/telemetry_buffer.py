@@ -0,0 +1,265 @@
+"""
+In-memory buffering of charger meter readings for active charging sessions.
+
+Chargers report every few seconds; writing each sample to Postgres would cost
+one row per charger per sample. Readings are instead appended to a ring
+buffer per session (the newest TELEMETRY_BUFFER_SIZE are kept) and a
+background job drains what arrived since the last flush as one downsampled
+point per TELEMETRY_BUCKET_SECONDS bucket: sample count, last meter reading,
+average and peak power, last state of charge (see crud/telemetry.py).
+
+The buffers also answer "how is my session going" without a database read:
+progress() downsamples the ring on demand and prices the elapsed time like
+complete_expired_bookings() does.
+
+Buffers live in the worker that received the readings and are only touched
+from its event loop. Another worker serves the same session's progress from
+the columns the last flush wrote, at most TELEMETRY_FLUSH_SECONDS behind.
+
+    TELEMETRY_BUFFER_SIZE       raw readings kept per session (720, an hour at 5s)
+    TELEMETRY_BUCKET_SECONDS    width of a downsampled point (60)
+    TELEMETRY_FLUSH_SECONDS     how often buffered readings are written (30)
+    TELEMETRY_MAX_SESSIONS      sessions buffered per worker (20000)
+    TELEMETRY_IDLE_SECONDS      flushed buffers without readings for this long are dropped (900)
+"""
+
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import metrics
+
+TELEMETRY_BUFFER_SIZE = int(os.getenv("TELEMETRY_BUFFER_SIZE", "720"))
+TELEMETRY_BUCKET_SECONDS = int(os.getenv("TELEMETRY_BUCKET_SECONDS", "60"))
+TELEMETRY_FLUSH_SECONDS = int(os.getenv("TELEMETRY_FLUSH_SECONDS", "30"))
+TELEMETRY_MAX_SESSIONS = int(os.getenv("TELEMETRY_MAX_SESSIONS", "20000"))
+TELEMETRY_IDLE_SECONDS = int(os.getenv("TELEMETRY_IDLE_SECONDS", "900"))
+
+# Readings stamped further ahead of the server clock than this are rejected
+MAX_CLOCK_SKEW_SECONDS = 60
+
+
+class Reading(NamedTuple):
+    at: float  # unix time
+    energy_kwh: Optional[float]  # energy delivered in this session so far
+    power_kw: Optional[float]
+    soc: Optional[float]  # state of charge, percent
+
+
+def _to_unix(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts is not None else None
+
+
+def downsample(readings: Iterable[Reading], bucket_seconds: int = TELEMETRY_BUCKET_SECONDS) -> List[Dict[str, Any]]:
+    """One point per bucket of time-ordered readings, as session_telemetry columns."""
+    points: List[Dict[str, Any]] = []
+    bucket = None
+    powers: List[float] = []
+    for r in readings:
+        start = r.at - r.at % bucket_seconds
+        if bucket is None or start != bucket["_start"]:
+            if bucket is not None:
+                points.append(_close_bucket(bucket, powers))
+            bucket = {"_start": start, "samples": 0, "energy_kwh": None, "soc": None, "_last": r.at}
+            powers = []
+        bucket["samples"] += 1
+        bucket["_last"] = r.at
+        if r.energy_kwh is not None:
+            bucket["energy_kwh"] = r.energy_kwh
+        if r.soc is not None:
+            bucket["soc"] = r.soc
+        if r.power_kw is not None:
+            powers.append(r.power_kw)
+    if bucket is not None:
+        points.append(_close_bucket(bucket, powers))
+    return points
+
+
+def _close_bucket(bucket: Dict[str, Any], powers: List[float]) -> Dict[str, Any]:
+    return {
+        "bucket_start": _iso(bucket["_start"]),
+        "samples": bucket["samples"],
+        "energy_kwh": round(bucket["energy_kwh"], 3) if bucket["energy_kwh"] is not None else None,
+        "power_kw_avg": round(sum(powers) / len(powers), 2) if powers else None,
+        "power_kw_max": round(max(powers), 2) if powers else None,
+        "soc": round(bucket["soc"], 2) if bucket["soc"] is not None else None,
+        "last_reading_at": _iso(bucket["_last"]),
+    }
+
+
+class SessionBuffer:
+    """Ring buffer of one session's readings plus what is needed to price and attribute them."""
+
+    __slots__ = ("session_id", "station_id", "user_id", "session_start", "started_at", "price_per_hour",
+                 "readings", "unflushed", "last", "touched")
+
+    def __init__(self, session: Dict[str, Any], size: int = TELEMETRY_BUFFER_SIZE):
+        self.session_id = str(session["id"])
+        self.station_id = str(session["station_id"]) if session.get("station_id") else None
+        self.user_id = str(session["user_id"]) if session.get("user_id") else None
+        self.session_start = session.get("start_time")
+        self.started_at = _to_unix(session.get("start_time"))
+        self.price_per_hour = float(session.get("price_per_hour") or 10.0)
+        self.readings: Deque[Reading] = deque(maxlen=size)
+        # How many of the newest readings have not been written yet
+        self.unflushed = 0
+        self.last: Optional[Reading] = None
+        self.touched = time.monotonic()
+        if session.get("telemetry_at"):
+            # Continue from what an earlier worker (or a restart) already stored
+            self.last = Reading(_to_unix(session["telemetry_at"]), _float(session.get("energy_used")),
+                                _float(session.get("current_power_kw")), _float(session.get("current_soc")))
+
+    def add(self, readings: Iterable[Tuple[Any, Optional[float], Optional[float], Optional[float]]]) -> Dict[str, int]:
+        """
+        Append (timestamp, energy_kwh, power_kw, soc) readings. Readings not newer than the last
+        one, from before the session started or too far in the future are dropped; when a charger
+        only reports power, energy is integrated from it.
+        """
+        counts = {"accepted": 0, "stale": 0, "invalid": 0, "overflow": 0}
+        horizon = time.time() + MAX_CLOCK_SKEW_SECONDS
+        for at, energy, power, soc in sorted(readings, key=lambda r: _to_unix(r[0]) or 0.0):
+            ts = _to_unix(at)
+            if ts is None or ts > horizon:
+                counts["invalid"] += 1
+                continue
+            if (self.last is not None and ts <= self.last.at) or (self.started_at is not None and ts < self.started_at):
+                counts["stale"] += 1
+                continue
+            if energy is None and power is not None and self.last is not None and self.last.energy_kwh is not None:
+                previous_power = self.last.power_kw if self.last.power_kw is not None else power
+                energy = self.last.energy_kwh + (previous_power + power) / 2 * (ts - self.last.at) / 3600
+            reading = Reading(ts, energy, power, soc)
+            if len(self.readings) == self.readings.maxlen and self.unflushed >= len(self.readings):
+                counts["overflow"] += 1
+            else:
+                self.unflushed += 1
+            self.readings.append(reading)
+            self.last = reading
+            counts["accepted"] += 1
+        self.touched = time.monotonic()
+        for result, n in counts.items():
+            if n:
+                metrics.TELEMETRY_READINGS.inc(result, amount=n)
+        return counts
+
+    def take_pending(self) -> List[Dict[str, Any]]:
+        """Downsampled points for the readings that arrived since the last flush, ready for the RPC."""
+        if not self.unflushed:
+            return []
+        pending = list(self.readings)[-self.unflushed:]
+        self.unflushed = 0
+        points = downsample(pending)
+        for point in points:
+            point["session_id"] = self.session_id
+            point["station_id"] = self.station_id
+            point["session_start"] = self.session_start
+        # The last point carries the session's live values
+        points[-1]["power_kw"] = self.last.power_kw
+        points[-1]["cost"] = self.cost(self.last.at)
+        return points
+
+    def restore(self, count: int) -> None:
+        """Mark `count` readings taken by take_pending() as unwritten again after a failed flush."""
+        self.unflushed = min(len(self.readings), self.unflushed + count)
+
+    def cost(self, at: float) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return round(self.price_per_hour * max(0.0, at - self.started_at) / 3600, 2)
+
+    def progress(self) -> Dict[str, Any]:
+        """The session's live values and its recent downsampled points."""
+        last = self.last
+        return _progress(
+            self.session_id, self.station_id, "active", self.started_at,
+            last.at if last else None, last.energy_kwh if last else None, last.power_kw if last else None,
+            last.soc if last else None, self.cost(last.at) if last else None, downsample(self.readings), "live",
+        )
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _progress(session_id, station_id, status, started_at, updated_at, energy_kwh, power_kw, soc, cost,
+              points, source) -> Dict[str, Any]:
+    elapsed = (updated_at or time.time()) - started_at if started_at is not None else None
+    return {
+        "session_id": session_id,
+        "station_id": station_id,
+        "status": status,
+        "started_at": _iso(started_at),
+        "updated_at": _iso(updated_at),
+        "elapsed_minutes": round(elapsed / 60, 1) if elapsed is not None else None,
+        "energy_kwh": round(energy_kwh, 3) if energy_kwh is not None else None,
+        "power_kw": round(power_kw, 2) if power_kw is not None else None,
+        "soc": round(soc, 2) if soc is not None else None,
+        "cost": cost,
+        "points": points,
+        "source": source,
+    }
+
+
+def stored_progress(session: Dict[str, Any], points: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Progress of a session that is not buffered here, from its row and stored points."""
+    return _progress(
+        str(session["id"]), str(session["station_id"]) if session.get("station_id") else None,
+        session.get("status"), _to_unix(session.get("start_time")), _to_unix(session.get("telemetry_at")),
+        _float(session.get("energy_used")), _float(session.get("current_power_kw")),
+        _float(session.get("current_soc")), _float(session.get("cost")), points, "stored",
+    )
+
+
+_buffers: Dict[str, SessionBuffer] = {}
+
+
+def get_session_buffer(session_id: Any) -> Optional[SessionBuffer]:
+    return _buffers.get(str(session_id))
+
+
+def open_session_buffer(session: Dict[str, Any]) -> Optional[SessionBuffer]:
+    """The buffer for a session row, created if needed; None when TELEMETRY_MAX_SESSIONS are buffered."""
+    session_id = str(session["id"])
+    buffer = _buffers.get(session_id)
+    if buffer is None:
+        if len(_buffers) >= TELEMETRY_MAX_SESSIONS:
+            evict_idle()
+            if len(_buffers) >= TELEMETRY_MAX_SESSIONS:
+                return None
+        buffer = _buffers[session_id] = SessionBuffer(session)
+        metrics.TELEMETRY_SESSIONS.set(len(_buffers))
+    return buffer
+
+
+def pending_buffers() -> List[SessionBuffer]:
+    return [b for b in _buffers.values() if b.unflushed]
+
+
+def evict_idle(idle_seconds: float = TELEMETRY_IDLE_SECONDS) -> int:
+    """Drop fully flushed buffers that have not received readings for `idle_seconds`."""
+    cutoff = time.monotonic() - idle_seconds
+    idle = [sid for sid, b in _buffers.items() if not b.unflushed and b.touched < cutoff]
+    for session_id in idle:
+        del _buffers[session_id]
+    metrics.TELEMETRY_SESSIONS.set(len(_buffers))
+    return len(idle)
+
+
+def drop_session_buffer(session_id: Any) -> None:
+    _buffers.pop(str(session_id), None)
+    metrics.TELEMETRY_SESSIONS.set(len(_buffers))
@@ -0,0 +1,229 @@
+"""
+OpenTelemetry tracing.
+
+With TRACING_ENABLED set, a request produces one trace:
+
+    GET /analytics/energy                      (server span, TracingMiddleware or FastAPI's own)
+      auth.get_current_user                    (traced dependency)
+      crud.statistics.get_energy_trends        (trace_module on each crud module)
+        db select charging_sessions            (one span per PostgREST call)
+    POST /agent/chat
+      agent.iteration                          (one per model round)
+        llm.chat                               (model, token counts)
+      agent.tool                               (tool name, cache hit)
+        crud.station.find_nearby_stations
+          db rpc find_nearby_stations
+
+Spans go to an OTLP/HTTP collector (OTEL_EXPORTER_OTLP_ENDPOINT, default
+http://localhost:4318) or, when TRACING_FILE is set, to that file as one JSON
+span per line. `opentelemetry-sdk` is optional; without it, or with tracing
+off, `traced`/`trace_module` leave functions untouched and `span()` is a no-op.
+"""
+
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .db_instrumentation import DbCall, add_db_observer
+from .structured_logging import get_logger
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # optional dependency
+    trace = None
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+except ImportError:  # optional dependency
+    TracerProvider = None
+
+try:
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+except ImportError:  # optional dependency
+    OTLPSpanExporter = None
+
+try:
+    import fastapi.telemetry  # noqa: F401  newer FastAPI releases open the request span themselves
+    NATIVE_REQUEST_SPANS = True
+except ImportError:
+    NATIVE_REQUEST_SPANS = False
+
+logger = get_logger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes") and trace is not None
+TRACING_FILE = os.getenv("TRACING_FILE")
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "smartev-backend")
+
+_tracer = trace.get_tracer("smartev") if trace is not None else None
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def set_status(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def init_tracing() -> bool:
+    """Install the tracer provider and exporter; returns False when tracing stays off."""
+    if not TRACING_ENABLED:
+        return False
+    if TracerProvider is None:
+        logger.warning("⚠️  TRACING_ENABLED is set but opentelemetry-sdk is not installed")
+        return False
+
+    if TRACING_FILE:
+        out = open(TRACING_FILE, "a", buffering=1)
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        target = TRACING_FILE
+    elif OTLPSpanExporter is not None:
+        exporter = OTLPSpanExporter()  # endpoint and headers from the standard OTEL_EXPORTER_OTLP_* variables
+        target = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+    else:
+        logger.warning("⚠️  Tracing needs TRACING_FILE or opentelemetry-exporter-otlp-proto-http")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    logger.info("✅ Tracing enabled, exporting spans to %s", target)
+    return True
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: Any = None) -> Iterator[Any]:
+    """Run the block inside a child span of the current one; exceptions mark it as failed."""
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+    with _tracer.start_as_current_span(name, kind=kind or SpanKind.INTERNAL, attributes=attributes) as current:
+        yield current
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator giving each call of a function (sync or async) its own span."""
+
+    def decorate(fn: Callable) -> Callable:
+        if not TRACING_ENABLED:
+            return fn
+        span_name = name or f"{fn.__module__.replace('app.', '', 1)}.{fn.__name__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def trace_module(namespace: Dict[str, Any]) -> None:
+    """
+    Wrap every public coroutine function defined in a module with `traced`
+    (pure helpers stay unwrapped, they run in loops). Called as
+    `trace_module(globals())` at the bottom of each crud module, before routers
+    import the functions by name.
+    """
+    if not TRACING_ENABLED:
+        return
+    module = namespace["__name__"]
+    for attr, value in list(namespace.items()):
+        if attr.startswith("_") or not inspect.iscoroutinefunction(value) or value.__module__ != module:
+            continue
+        namespace[attr] = traced()(value)
+
+
+def _record_db_span(call: DbCall) -> None:
+    if not TRACING_ENABLED:
+        return
+    end = time.time_ns()
+    db_span = _tracer.start_span(
+        f"db {call.operation} {call.table}",
+        kind=SpanKind.CLIENT,
+        start_time=end - int(call.duration * 1e9),
+        attributes={
+            "db.system": "postgresql",
+            "db.collection.name": call.table,
+            "db.operation.name": call.operation,
+            "db.query.summary": call.shape,
+            "db.response.returned_rows": call.rows,
+        },
+    )
+    if call.error is not None:
+        db_span.record_exception(call.error)
+        db_span.set_status(Status(StatusCode.ERROR, type(call.error).__name__))
+    db_span.end(end_time=end)
+
+
+add_db_observer(_record_db_span)
+
+
+class TracingMiddleware:
+    """
+    Server span per HTTP request, continuing a trace from an incoming
+    `traceparent` header. The span is renamed to the route template once
+    routing has run. Passes through on FastAPI versions that already create
+    request (and dependency/endpoint) spans, so there is only one server span.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not TRACING_ENABLED or NATIVE_REQUEST_SPANS:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        carrier = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        with _tracer.start_as_current_span(
+            method,
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope.get("path", "")},
+        ) as server_span:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    server_span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        server_span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    server_span.update_name(f"{method} {route.path}")
+                    server_span.set_attribute("http.route", route.path)
@@ -0,0 +1 @@
+# In-process benchmarks. Run from backend/, e.g. `python -m benchmarks.agent_latency`.
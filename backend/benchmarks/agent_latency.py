@@ -0,0 +1,307 @@
+"""
+Agent latency benchmark.
+
+Drives process_agent_message through the standard chat flows against the
+in-process data stand-in and a scripted chat model, and reports per-stage
+latency, model time, orchestrator overhead (wall time minus model time) and
+DB call counts.
+
+    cd backend
+    python -m benchmarks.agent_latency --iterations 50 --model-latency 0.8 --db-latency 0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.database import set_supabase_clients
+from app.agent import intent_router, orchestrator
+from app.agent.response_cache import response_cache
+from app.agent.fake_llm import ScriptedChatModel
+from app.agent.llm import set_chat_model
+
+from .stand_in import StandInSupabase
+
+USER_ID = "11111111-1111-1111-1111-111111111111"
+CENTRAL_ID = "aaaaaaaa-0000-0000-0000-000000000001"
+GREEN_ID = "aaaaaaaa-0000-0000-0000-000000000002"
+METRO_ID = "aaaaaaaa-0000-0000-0000-000000000003"
+
+VEHICLES = [
+    {"id": "bbbbbbbb-0000-0000-0000-000000000001", "brand": "Tata", "model": "Nexon EV",
+     "charging_connector": "CCS2", "license_plate": "DL01AB1234", "year": 2023},
+    {"id": "bbbbbbbb-0000-0000-0000-000000000002", "brand": "Nissan", "model": "Leaf",
+     "charging_connector": "CHAdeMO", "license_plate": "DL02CD5678", "year": 2021},
+]
+
+
+def demo_tables(booking_date: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Three stations around central Delhi; Central EV Hub only has CCS2 connectors."""
+    stations = [
+        {"id": CENTRAL_ID, "name": "Central EV Hub", "address": "1 Janpath", "city": "New Delhi",
+         "latitude": 28.6139, "longitude": 77.2090, "status": "active", "price_per_hour": 12},
+        {"id": GREEN_ID, "name": "Green Power Point", "address": "Connaught Place", "city": "New Delhi",
+         "latitude": 28.6315, "longitude": 77.2167, "status": "active", "price_per_hour": 10},
+        {"id": METRO_ID, "name": "Metro Fast Station", "address": "Karol Bagh", "city": "New Delhi",
+         "latitude": 28.6519, "longitude": 77.1909, "status": "active", "price_per_hour": 15},
+    ]
+    slots = []
+    layout = {CENTRAL_ID: ["CCS2", "CCS2"], GREEN_ID: ["Type 2", "CCS2"], METRO_ID: ["CHAdeMO"]}
+    for station_id, connectors in layout.items():
+        for n, connector in enumerate(connectors, start=1):
+            slots.append({
+                "id": f"cccccccc-0000-0000-{station_id[-4:]}-{n:012d}",
+                "station_id": station_id, "slot_number": n, "charger_type": "fast",
+                "status": "available", "connector_type": connector, "max_power_kw": 50.0,
+                "is_available": True,
+            })
+    vehicles = [dict(v, owner_id=USER_ID) for v in VEHICLES]
+    return {
+        "stations": stations,
+        "charging_slots": slots,
+        "vehicles": vehicles,
+        "profiles": [{"id": USER_ID, "name": "Bench User", "email": "bench@example.com"}],
+        "bookings": [],
+        "charging_sessions": [],
+    }
+
+
+def block_central(tables: Dict[str, List[Dict[str, Any]]], booking_date: str) -> None:
+    """Occupy every Central EV Hub slot around 14:00 so the booking conflicts."""
+    for slot in tables["charging_slots"]:
+        if slot["station_id"] != CENTRAL_ID:
+            continue
+        tables["bookings"].append({
+            "id": f"dddddddd-0000-0000-0000-{slot['slot_number']:012d}",
+            "station_id": CENTRAL_ID, "slot_id": slot["id"], "user_id": USER_ID,
+            "vehicle_id": VEHICLES[0]["id"], "status": "confirmed",
+            "start_time": f"{booking_date}T13:30:00+00:00", "end_time": f"{booking_date}T15:30:00+00:00",
+        })
+
+
+# Geocoding hits Nominatim over the network; the benchmark resolves known places locally.
+PLACES = {"connaught place": {"lat": 28.6315, "lon": 77.2167}, "isbt": {"lat": 28.6675, "lon": 77.2282}}
+
+
+async def _local_geocode(place: str) -> Optional[Dict[str, float]]:
+    return PLACES.get(place.strip().lower())
+
+
+def add_upcoming_booking(tables: Dict[str, List[Dict[str, Any]]], booking_date: str) -> None:
+    tables["bookings"].append({
+        "id": "eeeeeeee-0000-0000-0000-000000000001", "station_id": GREEN_ID,
+        "slot_id": f"cccccccc-0000-0000-{GREEN_ID[-4:]}-{1:012d}", "user_id": USER_ID,
+        "vehicle_id": VEHICLES[0]["id"], "status": "confirmed",
+        "start_time": f"{booking_date}T09:00:00+00:00", "end_time": f"{booking_date}T10:00:00+00:00",
+    })
+
+
+def _assistant(reply: Dict[str, Any]) -> Dict[str, str]:
+    # Mirrors AgentTab.jsx: the ctx cookie travels as hidden assistant content.
+    return {"role": "assistant", "content": reply["text"] + (reply.get("_ctx_cookie") or "")}
+
+
+def _booking_call(booking_date: str, vehicle: Dict[str, Any], connector: str) -> Dict[str, Any]:
+    return {"tool_calls": [{"name": "tool_create_booking_request", "args": {
+        "station_name_or_id": "Central EV Hub", "vehicle_id": vehicle["id"],
+        "connector_type": connector, "date": booking_date, "time_slot": "14:00",
+        "duration": 60, "current_battery": 40.0, "timezone_offset": 0,
+    }}]}
+
+
+def _flow(name: str, turns: List[Dict[str, Any]], conflict: bool = False, upcoming: bool = False) -> Dict[str, Any]:
+    return {"name": name, "turns": turns, "conflict": conflict, "upcoming": upcoming}
+
+
+def build_flows(booking_date: str) -> List[Dict[str, Any]]:
+    nexon, leaf = VEHICLES
+    book_msg = "Book Central EV Hub at 2pm tomorrow"
+    select = lambda v: f"[VEHICLE_SELECTED: vehicle_id={v['id']}, connector_type={v['charging_connector']}]"
+    return [
+        _flow("booking", [
+            {"stage": "book", "message": book_msg},
+            {"stage": "vehicle", "message": select(nexon)},
+            {"stage": "battery", "message": "40%",
+             "script": [_booking_call(booking_date, nexon, "CCS2"), "Your booking is confirmed."]},
+        ]),
+        _flow("booking_conflict", [
+            {"stage": "book", "message": book_msg},
+            {"stage": "vehicle", "message": select(nexon)},
+            {"stage": "battery", "message": "40%",
+             "script": [_booking_call(booking_date, nexon, "CCS2"), "That slot is taken; here are alternatives."]},
+        ], conflict=True),
+        _flow("connector_mismatch", [
+            {"stage": "book", "message": book_msg},
+            {"stage": "vehicle", "message": select(leaf)},
+            {"stage": "battery", "message": "40%",
+             "script": [_booking_call(booking_date, leaf, "CHAdeMO"), "Only CCS2 is free. Use that instead?"]},
+            {"stage": "confirm", "message": "yes",
+             "script": [_booking_call(booking_date, leaf, "CCS2"), "Your booking is confirmed."]},
+        ]),
+        _flow("nearby_search", [
+            {"stage": "search", "message": "which stations are near Connaught Place?",
+             "script": [
+                 {"tool_calls": [{"name": "tool_find_stations_nearby", "args": {"lat": 28.6315, "lon": 77.2167}}]},
+                 "Here are the closest stations with free slots.",
+             ]},
+        ]),
+        _flow("free_at", [
+            {"stage": "ask", "message": "Is Central EV Hub free at 3pm tomorrow?"},
+        ]),
+        _flow("availability", [
+            {"stage": "ask", "message": "Which stations have free slots?"},
+        ]),
+        _flow("cancel", [
+            {"stage": "ask", "message": "cancel my booking"},
+            {"stage": "confirm", "message": "yes"},
+        ], upcoming=True),
+        _flow("repeat_lookup", [
+            {"stage": "first", "message": "Which stations have free slots?"},
+            {"stage": "near_dup", "message": "which statons have a free slot"},
+        ]),
+        _flow("open_ended", [
+            {"stage": "ask", "message": "What payment methods do you accept?",
+             "script": ["You can pay by UPI or card at the end of the session."]},
+        ]),
+    ]
+
+
+async def run_flow(flow: Dict[str, Any], booking_date: str, model_latency: float, db_latency: float) -> List[Dict[str, Any]]:
+    tables = demo_tables(booking_date)
+    if flow["conflict"]:
+        block_central(tables, booking_date)
+    if flow["upcoming"]:
+        add_upcoming_booking(tables, booking_date)
+    db = StandInSupabase(tables, latency=db_latency)
+    set_supabase_clients(db)
+    # Each iteration starts cold; repeat_lookup shows what a warm cache saves
+    response_cache.clear()
+
+    model = ScriptedChatModel(latency=model_latency)
+    set_chat_model(model)
+
+    history: List[Dict[str, str]] = []
+    results = []
+    user = {"id": USER_ID, "role": "app_user", "station_ids": []}
+    for turn in flow["turns"]:
+        model.script = list(turn.get("script", []))
+        db.reset_stats()
+        calls_before, model_time_before = model.calls, model.total_time
+
+        started = time.perf_counter()
+        reply = await orchestrator.process_agent_message(
+            user_message=turn["message"],
+            chat_history=list(history),
+            user_context=user,
+            user_vehicles=VEHICLES,
+        )
+        wall = time.perf_counter() - started
+        model_time = model.total_time - model_time_before
+
+        results.append({
+            "stage": turn["stage"],
+            "wall_ms": wall * 1000,
+            "model_ms": model_time * 1000,
+            "overhead_ms": (wall - model_time) * 1000,
+            "model_calls": model.calls - calls_before,
+            "db_calls": db.total_calls,
+            "db_by_table": {f"{t}.{op}": n for (t, op), n in db.calls.items()},
+            "ui": (reply.get("ui_component") or {}).get("type"),
+        })
+        history.append({"role": "user", "content": turn["message"]})
+        history.append(_assistant(reply))
+    return results
+
+
+def _pct(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def run(iterations: int, model_latency: float, db_latency: float, flows: Optional[List[str]] = None) -> Dict[str, Any]:
+    booking_date = (date.today() + timedelta(days=1)).isoformat()
+    report: Dict[str, Any] = {"iterations": iterations, "model_latency_s": model_latency,
+                              "db_latency_s": db_latency, "flows": {}}
+    selected = [f for f in build_flows(booking_date) if not flows or f["name"] in flows]
+    intent_router._geocode = _local_geocode
+    intent_router.reset_fast_path_stats()
+    response_cache.reset_stats()
+
+    for flow in selected:
+        samples: Dict[str, List[Dict[str, Any]]] = {}
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(iterations):
+                for r in await run_flow(flow, booking_date, model_latency, db_latency):
+                    samples.setdefault(r["stage"], []).append(r)
+
+        stages = {}
+        for stage, rows in samples.items():
+            db_tables: Counter = Counter()
+            for r in rows:
+                db_tables.update(r["db_by_table"])
+            stages[stage] = {
+                "wall_ms_p50": statistics.median(r["wall_ms"] for r in rows),
+                "wall_ms_p95": _pct([r["wall_ms"] for r in rows], 95),
+                "overhead_ms_p50": statistics.median(r["overhead_ms"] for r in rows),
+                "model_ms_p50": statistics.median(r["model_ms"] for r in rows),
+                "model_calls": rows[-1]["model_calls"],
+                "db_calls": rows[-1]["db_calls"],
+                "db_by_table": {k: v // len(rows) for k, v in sorted(db_tables.items())},
+                "ui": rows[-1]["ui"],
+            }
+        report["flows"][flow["name"]] = stages
+
+    report["fast_path"] = intent_router.fast_path_stats()
+    report["response_cache"] = response_cache.stats()
+    set_chat_model(None)
+    set_supabase_clients(None)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'flow':<20}{'stage':<10}{'wall p50':>10}{'wall p95':>10}{'overhead':>10}{'model':>10}{'llm':>5}{'db':>5}  ui"
+    print(f"iterations={report['iterations']} model_latency={report['model_latency_s']}s "
+          f"db_latency={report['db_latency_s']}s (times in ms)")
+    print(header)
+    print("-" * len(header))
+    for flow, stages in report["flows"].items():
+        for stage, s in stages.items():
+            print(f"{flow:<20}{stage:<10}{s['wall_ms_p50']:>10.2f}{s['wall_ms_p95']:>10.2f}"
+                  f"{s['overhead_ms_p50']:>10.2f}{s['model_ms_p50']:>10.2f}"
+                  f"{s['model_calls']:>5}{s['db_calls']:>5}  {s['ui'] or '-'}")
+    fp = report.get("fast_path")
+    if fp:
+        print(f"\nfast-path hit ratio: {fp['hit_ratio']:.1%} ({fp['fast_path_turns']}/{fp['turns']} turns skipped the LLM)")
+    rc = report.get("response_cache")
+    if rc:
+        print(f"response cache: {rc['hits']} exact + {rc['near_hits']} near-duplicate hits, {rc['misses']} misses")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark agent orchestration with a scripted model.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--model-latency", type=float, default=0.0, help="simulated seconds per model call")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="simulated seconds per DB round trip")
+    parser.add_argument("--flow", action="append", help="only run the named flow (repeatable)")
+    parser.add_argument("--json", help="write the full report to this path")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.iterations, args.model_latency, args.db_latency, args.flow))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,636 @@
+"""
+Charger fleet simulator for the OCPP and telemetry ingestion paths.
+
+Builds --per-station virtual chargers for each of the first --stations
+stations, spreading the station's charging_slots over their connectors, and
+runs plug-in / metering / unplug cycles on every connector for --duration
+seconds:
+
+    idle ~--idle s, Preparing, StartTransaction, Charging, a meter reading
+    every --meter-interval s for ~--session s, StopTransaction, Finishing,
+    Available
+
+With --mode ocpp (default) every charger keeps an OCPP 1.6-J WebSocket open to
+/ocpp/{charge point id}. With --mode telemetry one gateway per station posts
+its connectors' readings to POST /charging_sessions/telemetry instead.
+
+Reported: messages and meter readings per second, reply latency per message
+type, errors, database calls per message (in-process) and, for OCPP, status
+propagation latency: from sending a StatusNotification that changes a slot's
+availability to the /stations/stream/ws update for its station. A change that
+is cancelled out before the stream pushes is matched to the station's next
+update, so the tail is an upper bound.
+
+In-process (default) the app is served by uvicorn on --port over the stand-in
+filled with benchmarks.synthetic_data, with ocpp_apply_batch and
+ingest_session_telemetry emulated on it (starts are accepted without a booking
+check). The simulator shares the process and its event loop with the server,
+so use --base-url for numbers about the server alone.
+
+    cd backend
+    python -m benchmarks.charger_fleet --stations 100 --per-station 2 --duration 60
+    python -m benchmarks.charger_fleet --mode telemetry --meter-interval 1 --compare latest
+
+Against a deployment pass --base-url and --token. Slots come from GET /slots/;
+run the SQL printed by --print-mapping once to map them to the simulated
+charge point ids, and pass the server's OCPP_AUTH_SECRET as --ocpp-secret.
+The server only accepts starts on slots with a booking covering the start
+time, and telemetry mode (station manager token) streams readings for the
+active sessions GET /charging_sessions/ returns.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+import websockets
+
+from . import load_endpoints
+from .load_endpoints import RESULTS_DIR, _pct, git_commit, load_baseline
+
+# A change to a slot's availability: Available -> Preparing takes it, -> Available frees it
+AVAILABILITY_CHANGES = {"Preparing", "Available"}
+BATTERY_KWH = 60.0
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def build_fleet(slots: List[Dict[str, Any]], stations: int, per_station: int) -> List[Dict[str, Any]]:
+    """Virtual chargers for the first `stations` stations (by id), each with a share of the station's slots."""
+    by_station: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for slot in slots:
+        by_station[str(slot["station_id"])].append(slot)
+    fleet = []
+    for station_id in sorted(by_station)[:stations]:
+        station_slots = sorted(by_station[station_id], key=lambda s: (s.get("slot_number") or 0, str(s["id"])))
+        for n in range(per_station):
+            mine = station_slots[n::per_station]
+            if not mine:
+                continue
+            fleet.append({
+                "id": f"SIM-{station_id}-{n + 1}",
+                "station_id": station_id,
+                "connectors": [
+                    {"connector_id": i + 1, "slot_id": str(slot["id"]), "max_power_kw": float(slot.get("max_power_kw") or 50)}
+                    for i, slot in enumerate(mine)
+                ],
+            })
+    return fleet
+
+
+def mapping_sql(fleet: List[Dict[str, Any]]) -> str:
+    return "\n".join(
+        f"UPDATE public.charging_slots SET charge_point_id = '{cp['id']}', connector_id = {c['connector_id']} "
+        f"WHERE id = '{c['slot_id']}';"
+        for cp in fleet for c in cp["connectors"]
+    )
+
+
+class FleetStats:
+    def __init__(self) -> None:
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.messages = 0
+        self.readings = 0
+        self.readings_accepted = 0
+        self.cycles = 0
+        self.rejected_starts = 0
+        self.connected = 0
+        self.propagation: List[float] = []
+        self._pending: Dict[str, List[float]] = defaultdict(list)
+
+    def reply(self, kind: str, seconds: float, ok: bool) -> None:
+        self.messages += 1
+        self.latency[kind].append(seconds * 1000)
+        if not ok:
+            self.errors[kind] += 1
+
+    def status_sent(self, station_id: str, at: float) -> None:
+        self._pending[station_id].append(at)
+
+    def stream_update(self, station_ids: List[str], at: float) -> None:
+        for station_id in station_ids:
+            self.propagation.extend(at - sent for sent in self._pending.pop(station_id, []))
+
+    @property
+    def unmatched(self) -> int:
+        return sum(len(v) for v in self._pending.values())
+
+
+class Connector:
+    def __init__(self, spec: Dict[str, Any], rng: random.Random):
+        self.connector_id = spec["connector_id"]
+        self.slot_id = spec["slot_id"]
+        self.max_power_kw = spec["max_power_kw"]
+        self.meter_wh = rng.randrange(1_000_000, 50_000_000)
+        self.soc = 0.0
+        self.session_id: Optional[str] = None
+        self.energy_kwh = 0.0
+        self.until = 0.0
+
+    def charge(self, seconds: float, rng: random.Random) -> float:
+        """Advance the meter by `seconds` of charging; returns the power in kW."""
+        taper = 1.0 if self.soc < 80 else max(0.1, (100 - self.soc) / 20)
+        power = self.max_power_kw * taper * rng.uniform(0.9, 1.0)
+        wh = power * 1000 * seconds / 3600
+        self.meter_wh += wh
+        self.energy_kwh += wh / 1000
+        self.soc = min(100.0, self.soc + wh / (BATTERY_KWH * 10))
+        return power
+
+
+class VirtualCharger:
+    """One OCPP charger: a WebSocket shared by its connectors, one call in flight at a time."""
+
+    def __init__(self, spec: Dict[str, Any], stats: FleetStats, args: argparse.Namespace, seed: int):
+        self.id = spec["id"]
+        self.station_id = spec["station_id"]
+        self.rng = random.Random(seed)
+        self.connectors = [Connector(c, self.rng) for c in spec["connectors"]]
+        self.stats = stats
+        self.args = args
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+        self._ws: Any = None
+
+    async def call(self, action: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async with self._lock:
+            started = time.perf_counter()
+            await self._ws.send(json.dumps([2, str(next(self._ids)), action, payload]))
+            reply = json.loads(await self._ws.recv())
+        ok = reply[0] == 3
+        self.stats.reply(action, time.perf_counter() - started, ok)
+        return reply[2] if ok else None
+
+    async def status(self, connector: Connector, status: str) -> None:
+        if status in AVAILABILITY_CHANGES:
+            self.stats.status_sent(self.station_id, time.perf_counter())
+        await self.call("StatusNotification", {"connectorId": connector.connector_id, "errorCode": "NoError",
+                                               "status": status, "timestamp": _now_iso()})
+
+    async def run(self, ws_url: str, stop_at: float) -> None:
+        headers = {}
+        if self.args.ocpp_secret:
+            # Same derivation as app.ocpp.central_system.charge_point_password()
+            password = hmac.new(self.args.ocpp_secret.encode(), self.id.encode(), hashlib.sha256).hexdigest()[:32]
+            headers["Authorization"] = "Basic " + base64.b64encode(f"{self.id}:{password}".encode()).decode()
+        async with websockets.connect(f"{ws_url}/ocpp/{self.id}", subprotocols=["ocpp1.6"], additional_headers=headers,
+                                      open_timeout=60, ping_interval=None) as ws:
+            self._ws = ws
+            self.stats.connected += 1
+            await self.call("BootNotification", {"chargePointVendor": "SmartEV", "chargePointModel": "Simulator"})
+            for connector in self.connectors:
+                await self.call("StatusNotification", {"connectorId": connector.connector_id, "errorCode": "NoError",
+                                                       "status": "Available"})
+            await asyncio.gather(*(self.cycle(c, stop_at) for c in self.connectors))
+
+    async def cycle(self, connector: Connector, stop_at: float) -> None:
+        args, rng = self.args, self.rng
+        while True:
+            await asyncio.sleep(min(rng.expovariate(1 / args.idle), max(0.0, stop_at - time.time())))
+            if time.time() >= stop_at:
+                return
+            await self.status(connector, "Preparing")
+            started = await self.call("StartTransaction", {
+                "connectorId": connector.connector_id, "idTag": f"SIM{rng.randrange(10 ** 6)}",
+                "meterStart": int(connector.meter_wh), "timestamp": _now_iso(),
+            })
+            if not started or started["idTagInfo"]["status"] != "Accepted":
+                self.stats.rejected_starts += 1
+                await self.status(connector, "Available")
+                continue
+            transaction_id = started["transactionId"]
+            await self.status(connector, "Charging")
+            connector.soc = rng.uniform(10, 60)
+            session_end = time.time() + rng.uniform(0.5, 1.5) * args.session
+            while time.time() < min(session_end, stop_at):
+                await asyncio.sleep(args.meter_interval)
+                power = connector.charge(args.meter_interval, rng)
+                await self.call("MeterValues", {
+                    "connectorId": connector.connector_id, "transactionId": transaction_id,
+                    "meterValue": [{"timestamp": _now_iso(), "sampledValue": [
+                        {"value": str(int(connector.meter_wh)), "measurand": "Energy.Active.Import.Register", "unit": "Wh"},
+                        {"value": str(int(power * 1000)), "measurand": "Power.Active.Import", "unit": "W"},
+                        {"value": f"{connector.soc:.1f}", "measurand": "SoC", "unit": "Percent"},
+                    ]}],
+                })
+                self.stats.readings += 1
+            await self.call("StopTransaction", {"transactionId": transaction_id, "meterStop": int(connector.meter_wh),
+                                                "timestamp": _now_iso(), "reason": "EVDisconnected"})
+            await self.status(connector, "Finishing")
+            await self.status(connector, "Available")
+            self.stats.cycles += 1
+
+
+class SessionSource:
+    """Where telemetry gateways get a session for a plug-in and hand it back at unplug."""
+
+    def __init__(self, pool: Optional[Dict[str, List[str]]] = None, create: Any = None, finish: Any = None):
+        self._pool = pool
+        self._create = create
+        self._finish = finish
+
+    def start(self, station_id: str, connector: Connector) -> Optional[str]:
+        if self._create is not None:
+            return self._create(station_id, connector.slot_id)
+        sessions = (self._pool or {}).get(station_id) or []
+        return sessions.pop(0) if sessions else None
+
+    def stop(self, station_id: str, session_id: str) -> None:
+        if self._finish is not None:
+            self._finish(session_id)
+        elif self._pool is not None:
+            self._pool.setdefault(station_id, []).append(session_id)
+
+
+async def telemetry_gateway(client: httpx.AsyncClient, station_id: str, chargers: List[Dict[str, Any]],
+                            sessions: SessionSource, stats: FleetStats, args: argparse.Namespace,
+                            seed: int, stop_at: float) -> None:
+    """Steps every connector of a station each --meter-interval and posts their readings in one batch."""
+    rng = random.Random(seed)
+    connectors = [Connector(c, rng) for cp in chargers for c in cp["connectors"]]
+    for connector in connectors:
+        connector.until = time.time() + rng.expovariate(1 / args.idle)
+    stats.connected += 1
+    while time.time() < stop_at:
+        now = time.time()
+        batch = []
+        for connector in connectors:
+            if connector.session_id is None and now >= connector.until:
+                connector.session_id = sessions.start(station_id, connector)
+                connector.soc, connector.energy_kwh = rng.uniform(10, 60), 0.0
+                connector.until = now + rng.uniform(0.5, 1.5) * args.session
+            elif connector.session_id is not None and now >= connector.until:
+                sessions.stop(station_id, connector.session_id)
+                connector.session_id = None
+                connector.until = now + rng.expovariate(1 / args.idle)
+                stats.cycles += 1
+            elif connector.session_id is not None:
+                power = connector.charge(args.meter_interval, rng)
+                batch.append({"session_id": connector.session_id, "readings": [{
+                    "timestamp": _now_iso(), "energy_kwh": round(connector.energy_kwh, 3),
+                    "power_kw": round(power, 2), "soc": round(connector.soc, 1),
+                }]})
+        if batch:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/charging_sessions/telemetry", json={"sessions": batch})
+                ok = response.status_code == 202
+                if ok:
+                    stats.readings_accepted += response.json().get("accepted", 0)
+            except httpx.HTTPError:
+                ok = False
+            stats.reply("telemetry", time.perf_counter() - started, ok)
+            stats.readings += len(batch)
+        await asyncio.sleep(max(0.0, args.meter_interval - (time.time() - now)))
+
+
+async def watch_availability(ws_url: str, token: str, stats: FleetStats, ready: asyncio.Event) -> None:
+    """Subscribe to /stations/stream/ws and timestamp every station update."""
+    async with websockets.connect(f"{ws_url}/stations/stream/ws?token={token}", open_timeout=60,
+                                  ping_interval=None, max_size=None) as ws:
+        await ws.recv()  # snapshot
+        ready.set()
+        async for raw in ws:
+            message = json.loads(raw)
+            if message.get("type") == "availability":
+                stats.stream_update(list(message.get("stations") or {}), time.perf_counter())
+
+
+def emulate_database(db: Any, seed: int) -> None:
+    """Stand-in versions of the OCPP and telemetry RPCs, enough for slot status and session rows to move."""
+    rng = random.Random(seed)
+    tables = db.tables
+    slots = {str(s["id"]): s for s in tables["charging_slots"]}
+    prices = {str(s["id"]): s.get("price_per_hour") or 10 for s in tables["stations"]}
+    user_ids = [p["id"] for p in tables["profiles"]]
+    sessions: Dict[str, Dict[str, Any]] = {}
+    by_transaction: Dict[int, Dict[str, Any]] = {}
+    transaction_ids = itertools.count(1)
+    tables.setdefault("session_telemetry", [])
+
+    def open_session(station_id: str, slot_id: str, transaction_id: Optional[int] = None,
+                     meter_start: Optional[int] = None) -> Dict[str, Any]:
+        now = _now_iso()
+        session = {
+            "id": str(uuid.uuid4()), "station_id": station_id, "user_id": rng.choice(user_ids), "slot_id": slot_id,
+            "booking_id": None, "vehicle_id": None, "start_time": now, "end_time": None, "status": "active",
+            "energy_used": 0, "cost": 0, "ocpp_transaction_id": transaction_id, "meter_start_wh": meter_start,
+            "created_at": now, "updated_at": now,
+        }
+        tables["charging_sessions"].append(session)
+        sessions[session["id"]] = session
+        return session
+
+    def close_session(session: Dict[str, Any], at: str, energy: Optional[float] = None) -> None:
+        session.update(status="completed", end_time=at, updated_at=_now_iso(), current_power_kw=None)
+        if energy is not None:
+            session["energy_used"] = energy
+
+    def ocpp_apply_batch(db: Any, statuses: Any = (), starts: Any = (), stops: Any = ()) -> Dict[str, Any]:
+        for update in statuses:
+            slot = slots.get(update["slot_id"])
+            if slot is not None:
+                slot.update(ocpp_status=update["ocpp_status"], ocpp_error_code=update["error_code"])
+                if update.get("status"):
+                    slot["status"] = update["status"]
+        results = []
+        for start in starts:
+            transaction_id = next(transaction_ids)
+            slot = slots.get(start.get("slot_id") or "")
+            if slot is None:
+                results.append({"ref": start["ref"], "transaction_id": transaction_id, "status": "Invalid"})
+                continue
+            station_id = str(slot["station_id"])
+            session = open_session(station_id, str(slot["id"]), transaction_id, start["meter_start"])
+            by_transaction[transaction_id] = session
+            results.append({"ref": start["ref"], "transaction_id": transaction_id, "status": "Accepted", "session": {
+                "id": session["id"], "station_id": station_id, "user_id": session["user_id"],
+                "start_time": session["start_time"], "price_per_hour": prices.get(station_id, 10),
+            }})
+        for stop in stops:
+            session = by_transaction.pop(stop["transaction_id"], None)
+            if session is not None:
+                close_session(session, stop["at"], max(0, stop["meter_stop"] - (session["meter_start_wh"] or 0)) / 1000)
+        return {"statuses": len(statuses), "stops": len(stops), "starts": results}
+
+    def ingest_session_telemetry(db: Any, points: Any) -> Dict[str, Any]:
+        updated = 0
+        for point in points:
+            tables["session_telemetry"].append(point)
+            session = sessions.get(point["session_id"])
+            if session is not None and session["status"] == "active" and "cost" in point:
+                session.update(energy_used=point["energy_kwh"], cost=point["cost"], current_power_kw=point.get("power_kw"),
+                               current_soc=point["soc"], telemetry_at=point["last_reading_at"])
+                updated += 1
+        return {"updated_count": len(points), "session_count": updated}
+
+    db.register_rpc("ocpp_apply_batch", ocpp_apply_batch)
+    db.register_rpc("ingest_session_telemetry", ingest_session_telemetry)
+    db.open_sim_session = lambda station_id, slot_id: open_session(station_id, slot_id)["id"]
+    db.close_sim_session = lambda session_id: close_session(sessions[session_id], _now_iso())
+
+
+def _raise_file_limit() -> None:
+    try:
+        import resource
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    _raise_file_limit()
+    stats = FleetStats()
+    server = server_task = db = None
+    sessions = SessionSource()
+
+    if args.base_url:
+        base_url, token = args.base_url.rstrip("/"), args.token
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60) as client:
+            slots = (await client.get("/slots/")).raise_for_status().json()
+            if args.mode == "telemetry":
+                pool: Dict[str, List[str]] = defaultdict(list)
+                for session in (await client.get("/charging_sessions/")).raise_for_status().json():
+                    if session.get("status") == "active":
+                        pool[str(session["station_id"])].append(str(session.get("id") or session.get("session_id")))
+                sessions = SessionSource(pool=pool)
+        data: Dict[str, int] = {"charging_slots": len(slots)}
+    else:
+        import uvicorn
+
+        from app.utils import metrics
+
+        # The central system refuses chargers without credentials
+        os.environ.setdefault("OCPP_AUTH_SECRET", "bench-ocpp")
+        app, db, users, data = load_endpoints.boot(args.scale, args.seed)
+        from app.ocpp.central_system import OCPP_AUTH_SECRET
+
+        args.ocpp_secret = OCPP_AUTH_SECRET
+        emulate_database(db, args.seed)
+        slots = db.tables["charging_slots"]
+        token = load_endpoints.ADMIN_TOKEN
+        sessions = SessionSource(create=db.open_sim_session, finish=db.close_sim_session)
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning",
+                                               lifespan="off", ws_ping_interval=None, backlog=4096))
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+
+    fleet = build_fleet(slots, args.stations, args.per_station)
+    if db is not None:
+        for cp in fleet:
+            for c in cp["connectors"]:
+                slot = next(s for s in slots if str(s["id"]) == c["slot_id"])
+                slot.update(charge_point_id=cp["id"], connector_id=c["connector_id"], status="available")
+    ws_url = "ws" + base_url[len("http"):]
+    print(f"  {len(fleet)} chargers, {sum(len(cp['connectors']) for cp in fleet)} connectors, mode={args.mode}", file=sys.stderr)
+
+    background = []
+    if args.mode == "ocpp":
+        ready = asyncio.Event()
+        background.append(asyncio.create_task(watch_availability(ws_url, token, stats, ready)))
+        await asyncio.wait_for(ready.wait(), 60)
+    if db is not None:
+        from app.crud.telemetry import flush_session_telemetry
+        from app.utils.telemetry_buffer import TELEMETRY_FLUSH_SECONDS
+
+        async def flush_loop() -> None:
+            while True:
+                await asyncio.sleep(min(TELEMETRY_FLUSH_SECONDS, 5))
+                await flush_session_telemetry()
+
+        background.append(asyncio.create_task(flush_loop()))
+        db.reset_stats()
+
+    started = time.perf_counter()
+    stop_at = time.time() + args.duration
+    auth = {"Authorization": f"Bearer {token}"}
+    if args.mode == "ocpp":
+        chargers = [VirtualCharger(cp, stats, args, args.seed + i) for i, cp in enumerate(fleet)]
+        ramp = args.ramp / max(1, len(chargers))
+
+        async def launch(i: int, charger: VirtualCharger) -> None:
+            await asyncio.sleep(i * ramp)
+            await charger.run(ws_url, stop_at)
+
+        results = await asyncio.gather(*(launch(i, c) for i, c in enumerate(chargers)), return_exceptions=True)
+    else:
+        by_station: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for cp in fleet:
+            by_station[cp["station_id"]].append(cp)
+        async with httpx.AsyncClient(base_url=base_url, headers=auth, timeout=60,
+                                     limits=httpx.Limits(max_connections=256)) as client:
+            results = await asyncio.gather(*(
+                telemetry_gateway(client, station_id, chargers, sessions, stats, args, args.seed + i, stop_at)
+                for i, (station_id, chargers) in enumerate(sorted(by_station.items()))
+            ), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    failures = [r for r in results if isinstance(r, Exception)]
+    for failure in failures[:3]:
+        print(f"  client failed: {failure!r}", file=sys.stderr)
+
+    # Let the last batch and availability update land before reading the counters
+    await asyncio.sleep(1.5)
+    server_side: Dict[str, Any] = {}
+    if db is not None:
+        server_side = {
+            "db_calls": db.total_calls,
+            "db_calls_per_message": round(db.total_calls / stats.messages, 3) if stats.messages else None,
+            "ocpp_batch_writes": int(metrics.OCPP_BATCHES.value("success")),
+            "ocpp_batch_errors": int(metrics.OCPP_BATCHES.value("error")),
+            "telemetry_points_written": int(metrics.TELEMETRY_POINTS.value()),
+            "telemetry_readings_accepted": int(metrics.TELEMETRY_READINGS.value("accepted")),
+        }
+    for task in background:
+        task.cancel()
+    if server is not None:
+        server.should_exit = True
+        await server_task
+        load_endpoints.shutdown()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(), "git_commit": git_commit(),
+            "python": platform.python_version(), "mode": args.mode, "base_url": args.base_url,
+            "scale": None if args.base_url else args.scale, "seed": args.seed, "stations": args.stations,
+            "per_station": args.per_station, "chargers": len(fleet),
+            "connectors": sum(len(cp["connectors"]) for cp in fleet), "duration_s": round(elapsed, 2),
+            "meter_interval_s": args.meter_interval, "session_s": args.session, "idle_s": args.idle,
+        },
+        "data": data,
+        "fleet": {
+            "connected": stats.connected, "client_failures": len(failures), "cycles": stats.cycles,
+            "rejected_starts": stats.rejected_starts, "messages": stats.messages,
+            "messages_per_s": round(stats.messages / elapsed, 1), "readings": stats.readings,
+            "readings_per_s": round(stats.readings / elapsed, 1),
+            "readings_accepted": stats.readings_accepted if args.mode == "telemetry" else None,
+        },
+        "messages": {
+            kind: {"count": len(values), "errors": stats.errors[kind], "p50_ms": round(_pct(values, 50), 2),
+                   "p99_ms": round(_pct(values, 99), 2), "max_ms": round(max(values), 2)}
+            for kind, values in sorted(stats.latency.items())
+        },
+        "propagation": {
+            "count": len(stats.propagation), "unmatched": stats.unmatched,
+            "p50_ms": round(_pct(stats.propagation, 50) * 1000, 1),
+            "p90_ms": round(_pct(stats.propagation, 90) * 1000, 1),
+            "p99_ms": round(_pct(stats.propagation, 99) * 1000, 1),
+        } if stats.propagation else None,
+        "server": server_side,
+    }
+
+
+def _delta(after: Optional[float], before: Optional[float]) -> str:
+    if after is None or not before:
+        return f"{'-':>10}"
+    return f"{(after - before) / before:>+10.0%}"
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    meta, fleet = report["meta"], report["fleet"]
+    print(f"mode={meta['mode']} chargers={meta['chargers']} connectors={meta['connectors']} "
+          f"duration={meta['duration_s']}s meter_interval={meta['meter_interval_s']}s "
+          f"session={meta['session_s']}s idle={meta['idle_s']}s")
+    base_fleet = (baseline or {}).get("fleet", {})
+    print(f"connected {fleet['connected']}, {fleet['cycles']} plug-in cycles, {fleet['rejected_starts']} rejected starts, "
+          f"{fleet['client_failures']} client failures")
+    print(f"{'messages/s':<14}{fleet['messages_per_s']:>10.1f}" + (_delta(fleet['messages_per_s'], base_fleet.get('messages_per_s')) if baseline else ""))
+    print(f"{'readings/s':<14}{fleet['readings_per_s']:>10.1f}" + (_delta(fleet['readings_per_s'], base_fleet.get('readings_per_s')) if baseline else ""))
+
+    header = f"\n{'message':<22}{'count':>8}{'errors':>8}{'p50':>9}{'p99':>9}{'max':>9}"
+    if baseline:
+        header += f"{'Δ p50':>10}{'Δ p99':>10}"
+    print(header + "  (ms)")
+    print("-" * (len(header) - 1))
+    for kind, m in report["messages"].items():
+        line = f"{kind:<22}{m['count']:>8}{m['errors']:>8}{m['p50_ms']:>9.2f}{m['p99_ms']:>9.2f}{m['max_ms']:>9.2f}"
+        before = (baseline or {}).get("messages", {}).get(kind)
+        if baseline:
+            line += _delta(m["p50_ms"], (before or {}).get("p50_ms")) + _delta(m["p99_ms"], (before or {}).get("p99_ms"))
+        print(line)
+
+    propagation = report.get("propagation")
+    if propagation:
+        line = (f"\nstatus propagation to /stations/stream: {propagation['count']} changes, p50 {propagation['p50_ms']:.1f} ms, "
+                f"p90 {propagation['p90_ms']:.1f} ms, p99 {propagation['p99_ms']:.1f} ms, {propagation['unmatched']} unmatched")
+        before = (baseline or {}).get("propagation")
+        if before:
+            line += f" (Δ p50 {_delta(propagation['p50_ms'], before.get('p50_ms')).strip()})"
+        print(line)
+    server = report.get("server")
+    if server:
+        print(f"server: {server['db_calls']} DB calls ({server['db_calls_per_message']} per message), "
+              f"{server['ocpp_batch_writes']} OCPP batch writes ({server['ocpp_batch_errors']} failed), "
+              f"{server['telemetry_readings_accepted']} readings buffered -> {server['telemetry_points_written']} points written")
+    if baseline:
+        base = baseline["meta"]
+        print(f"\nbaseline: {base.get('created_at')} commit {base.get('git_commit')} mode={base.get('mode')} "
+              f"chargers={base.get('chargers')}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("ocpp", "telemetry"), default="ocpp")
+    parser.add_argument("--stations", type=int, default=50, help="stations to simulate chargers for")
+    parser.add_argument("--per-station", type=int, default=2, help="virtual chargers per station")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run plug-in cycles for")
+    parser.add_argument("--meter-interval", type=float, default=5, help="seconds between meter readings")
+    parser.add_argument("--session", type=float, default=60, help="mean seconds plugged in")
+    parser.add_argument("--idle", type=float, default=20, help="mean seconds between sessions on a connector")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds over which chargers connect")
+    parser.add_argument("--base-url", help="run against a deployment instead of in-process")
+    parser.add_argument("--token", help="bearer token for --base-url (admin; station manager for telemetry mode)")
+    parser.add_argument("--ocpp-secret", default=os.getenv("OCPP_AUTH_SECRET", ""),
+                        help="OCPP_AUTH_SECRET of --base-url, to derive the chargers' Basic auth passwords")
+    parser.add_argument("--print-mapping", action="store_true",
+                        help="print the SQL mapping --base-url slots to the simulated chargers and exit")
+    parser.add_argument("--port", type=int, default=8765, help="port for the in-process server")
+    parser.add_argument("--scale", type=float, default=0.01, help="synthetic data scale for in-process runs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="report path (default: benchmarks/results/fleet-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier fleet report to diff against, or `latest`")
+    args = parser.parse_args(argv)
+    if args.base_url and not args.token:
+        parser.error("--base-url needs --token")
+
+    if args.print_mapping:
+        if not args.base_url:
+            parser.error("--print-mapping needs --base-url")
+        response = httpx.get(args.base_url.rstrip("/") + "/slots/", headers={"Authorization": f"Bearer {args.token}"}, timeout=60)
+        print(mapping_sql(build_fleet(response.raise_for_status().json(), args.stations, args.per_station)))
+        return
+
+    path = args.json or os.path.join(RESULTS_DIR, f"fleet-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.json")
+    baseline = load_baseline(args.compare, path, prefix="fleet") if args.compare else None
+    report = asyncio.run(run(args))
+    print_report(report, baseline)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
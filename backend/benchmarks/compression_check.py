@@ -0,0 +1,83 @@
+"""
+Compression check for large JSON responses.
+
+Boots the app over the stand-in filled with benchmarks.synthetic_data and
+fetches the large list endpoints through the full middleware stack with
+`Accept-Encoding: gzip`. An endpoint fails the check when its body is at
+least COMPRESSION_MIN_SIZE bytes but comes back without `Content-Encoding:
+gzip`, or when the gzip body does not decode to the same JSON. Exits non-zero
+on any failure.
+
+    cd backend
+    python -m benchmarks.compression_check
+    python -m benchmarks.compression_check --scale 0.05
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import sys
+from typing import Any, Dict, List
+
+import httpx
+
+from . import load_endpoints
+
+# (path, token) pairs whose responses are well over the minimum size at the default scale
+ENDPOINTS = [
+    ("/stations/", load_endpoints.USER_TOKEN),
+    ("/slots/", load_endpoints.USER_TOKEN),
+    ("/admin/dashboard-data", load_endpoints.ADMIN_TOKEN),
+]
+
+
+async def run(scale: float, seed: int) -> List[Dict[str, Any]]:
+    app, _, _, _ = load_endpoints.boot(scale, seed)
+    from app.utils.compression import COMPRESSION_MIN_SIZE
+
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for path, token in ENDPOINTS:
+                headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+                # Read the raw bytes so httpx does not decode them for us
+                async with client.stream("GET", path, headers=headers) as response:
+                    raw = b"".join([chunk async for chunk in response.aiter_raw()])
+                encoding = response.headers.get("content-encoding")
+                body = gzip.decompress(raw) if encoding == "gzip" else raw
+                problem = None
+                if response.status_code != 200:
+                    problem = f"status {response.status_code}"
+                elif len(body) >= COMPRESSION_MIN_SIZE and encoding != "gzip":
+                    problem = f"not compressed (Content-Encoding: {encoding or '-'})"
+                else:
+                    try:
+                        json.loads(body)
+                    except ValueError:
+                        problem = "body is not valid JSON after decoding"
+                results.append({"path": path, "status": response.status_code, "encoding": encoding,
+                                "body_bytes": len(body), "wire_bytes": len(raw), "problem": problem})
+    finally:
+        load_endpoints.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=0.01, help="synthetic data scale")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.scale, args.seed))
+    print(f"{'endpoint':<26}{'encoding':>10}{'body':>10}{'wire':>10}  result")
+    print("-" * 70)
+    for r in results:
+        print(f"{r['path']:<26}{r['encoding'] or '-':>10}{r['body_bytes']:>10}{r['wire_bytes']:>10}  {r['problem'] or 'ok'}")
+    failed = [r for r in results if r["problem"]]
+    if failed:
+        sys.exit(f"{len(failed)} endpoint(s) failed the compression check")
+
+
+if __name__ == "__main__":
+    main()
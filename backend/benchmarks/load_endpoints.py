@@ -0,0 +1,304 @@
+"""
+Endpoint load benchmark.
+
+Fills the in-process stand-in with benchmarks.synthetic_data, then drives the
+real FastAPI app (every middleware and dependency, including the bearer-token
+role lookup) through httpx's ASGI transport with a fixed number of concurrent
+clients, and reports throughput, p50/p99 latency and DB calls per request for
+the key endpoints. The chat agent runs against the scripted fake model.
+
+Each run is saved as JSON under benchmarks/results/ (or --json); pass
+--compare with an earlier report, or `latest`, to print the change per
+endpoint.
+
+    cd backend
+    python -m benchmarks.load_endpoints --scale 0.05 --requests 200 --concurrency 16
+    python -m benchmarks.load_endpoints --scenario stations_list --db-latency 0.005 --compare latest
+
+The stand-in evaluates filters by scanning its lists, so at --scale 1 (1M
+bookings) every bookings/sessions query is a full scan of 1M dicts and needs a
+few GB of memory; use the CSV/Postgres output of benchmarks.synthetic_data to
+study full-volume query plans.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from . import synthetic_data
+from .stand_in import StandInSupabase
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# app.main refuses to start without the Supabase settings; nothing connects to them.
+# The rate limiter would turn a load test into a 429 test, and per-request logging
+# and budget warnings would be measured along with the endpoints.
+BENCH_ENV = {
+    "SUPABASE_URL": "http://localhost:54321", "SUPABASE_KEY": "bench", "SERVICE_ROLE": "bench",
+    "RATE_LIMIT_CALLS": "1000000000", "LOG_LEVEL": "WARNING", "DB_BUDGET_MODE": "off",
+}
+
+USER_TOKEN = "bench-user"
+ADMIN_TOKEN = "bench-admin"
+MANAGER_TOKEN = "bench-manager"
+
+ANALYTICS_PATHS = [
+    "user-growth", "energy-consumption", "revenue", "bookings", "station-utilization", "charging-types",
+    "peak-hours", "active-sessions", "avg-session-duration", "co2-saved", "recent-activity",
+]
+
+
+def _scenario(name: str, method: str, path: Callable[[int], str], token: str = USER_TOKEN,
+              body: Optional[Callable[[int], Any]] = None, before: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    return {"name": name, "method": method, "path": path, "token": token, "body": body, "before": before}
+
+
+def build_scenarios(tables: Dict[str, List[Dict[str, Any]]], user: Dict[str, Any]) -> List[Dict[str, Any]]:
+    from app.agent.response_cache import response_cache
+
+    stations = [s for s in tables["stations"] if s["status"] == "active"]
+    active_ids = {s["id"] for s in stations}
+    slots = [s for s in tables["charging_slots"] if s["status"] == "available" and s["station_id"] in active_ids]
+    vehicle = next(v for v in tables["vehicles"] if v["owner_id"] == user["id"])
+    # New bookings go well past the generated ones, each on its own slot/time, so none conflict
+    first_start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=60)
+
+    def booking(i: int) -> Dict[str, Any]:
+        slot = slots[i % len(slots)]
+        start = first_start + timedelta(hours=2 * (i // len(slots)))
+        return {"station_id": slot["station_id"], "slot_id": slot["id"], "vehicle_id": vehicle["id"],
+                "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+                "status": "confirmed", "current_battery_level": 40}
+
+    def chat(message: str) -> Callable[[int], Dict[str, Any]]:
+        return lambda i: {"message": message, "chat_history": [], "client_vehicles": [vehicle], "timezone_offset": 0}
+
+    scenarios = [
+        _scenario("stations_list", "GET", lambda i: "/stations/"),
+        _scenario("station_nearby", "GET", lambda i: f"/stations/{stations[i * 7919 % len(stations)]['id']}/nearby"),
+        _scenario("booking_create", "POST", lambda i: "/bookings/", body=booking),
+        _scenario("admin_dashboard", "GET", lambda i: "/admin/dashboard-data", token=ADMIN_TOKEN),
+    ]
+    scenarios += [_scenario(f"analytics_{p.replace('-', '_')}", "GET", lambda i, p=p: f"/analytics/{p}", token=ADMIN_TOKEN)
+                  for p in ANALYTICS_PATHS]
+    scenarios.append(_scenario("analytics_user_statistics", "GET", lambda i: "/analytics/user-statistics"))
+    # Every chat turn starts with a cold response cache, or all but the first would be cache hits
+    scenarios += [
+        _scenario("agent_chat_fast_path", "POST", lambda i: "/agent/chat",
+                  body=chat("Which stations have free slots?"), before=response_cache.clear),
+        _scenario("agent_chat_llm", "POST", lambda i: "/agent/chat",
+                  body=chat("What payment methods do you accept?"), before=response_cache.clear),
+    ]
+    return scenarios
+
+
+def _pct(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def run_scenario(client: httpx.AsyncClient, db: StandInSupabase, scenario: Dict[str, Any],
+                       requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    counter = itertools.count(warmup)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def one(i: int, record: bool) -> None:
+        if scenario["before"]:
+            scenario["before"]()
+        body = scenario["body"](i) if scenario["body"] else None
+        started = time.perf_counter()
+        response = await client.request(scenario["method"], scenario["path"](i), json=body,
+                                        headers={"Authorization": f"Bearer {scenario['token']}"})
+        elapsed = time.perf_counter() - started
+        if record:
+            latencies.append(elapsed * 1000)
+            statuses[response.status_code] += 1
+
+    async def worker() -> None:
+        while (i := next(counter)) < warmup + requests:
+            await one(i, True)
+
+    for i in range(warmup):
+        await one(i, False)
+    db.reset_stats()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    errors = sum(n for code, n in statuses.items() if code >= 400)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": requests / wall,
+        "p50_ms": statistics.median(latencies),
+        "p90_ms": _pct(latencies, 90),
+        "p99_ms": _pct(latencies, 99),
+        "mean_ms": statistics.fmean(latencies),
+        "max_ms": max(latencies),
+        "errors": errors,
+        "status": {str(code): n for code, n in sorted(statuses.items())},
+        "db_calls_per_request": db.total_calls / requests,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def boot(scale: float, seed: int, model_latency: float = 0.0) -> Tuple[Any, StandInSupabase, Dict[str, Dict[str, Any]], Dict[str, int]]:
+    """
+    Import the app with BENCH_ENV applied and install a stand-in filled with
+    synthetic data and the scripted chat model. Returns the app, the stand-in,
+    one signed-in profile per role (with its bearer `token`) and rows per table.
+    """
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    # Imported here so BENCH_ENV is in place before app.main reads its settings
+    from app.agent.fake_llm import ScriptedChatModel
+    from app.agent.llm import set_chat_model
+    from app.database import set_supabase_clients
+    from app.main import app
+
+    db = StandInSupabase(latency=0.0)
+    counts = synthetic_data.fill_stand_in(db, scale, seed)
+
+    admin = db.tables["admins"][0]
+    manager = db.tables["station_managers"][0]
+    manager_ids = {m["id"] for m in db.tables["station_managers"]}
+    user = next(p for p in reversed(db.tables["profiles"]) if p["id"] not in manager_ids and p["id"] != admin["id"])
+    users = {
+        "admin": dict(admin, token=ADMIN_TOKEN),
+        "station_manager": dict(manager, token=MANAGER_TOKEN),
+        "app_user": dict(user, token=USER_TOKEN),
+    }
+    for profile in users.values():
+        db.auth.add_user(profile["token"], profile["id"], profile["email"])
+    set_supabase_clients(db)
+    set_chat_model(ScriptedChatModel(latency=model_latency, default_reply="You can pay by UPI or card at the end of the session."))
+    return app, db, users, counts
+
+
+def shutdown() -> None:
+    from app.agent.llm import set_chat_model
+    from app.database import set_supabase_clients
+
+    set_chat_model(None)
+    set_supabase_clients(None)
+
+
+async def run(scale: float, seed: int, requests: int, concurrency: int, warmup: int, db_latency: float,
+              model_latency: float, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    app, db, users, counts = boot(scale, seed, model_latency)
+    generated_s = time.perf_counter() - started
+
+    scenarios = [s for s in build_scenarios(db.tables, users["app_user"]) if not only or s["name"] in only]
+    db.latency = db_latency
+    report: Dict[str, Any] = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(), "git_commit": git_commit(),
+            "python": platform.python_version(), "scale": scale, "seed": seed, "requests": requests,
+            "concurrency": concurrency, "warmup": warmup, "db_latency_s": db_latency,
+            "model_latency_s": model_latency, "data_generated_s": round(generated_s, 2),
+        },
+        "data": counts,
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for scenario in scenarios:
+                print(f"  {scenario['name']}", file=sys.stderr)
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    report["scenarios"][scenario["name"]] = await run_scenario(
+                        client, db, scenario, requests, concurrency, warmup)
+    finally:
+        shutdown()
+    return report
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    meta = report["meta"]
+    print(f"scale={meta['scale']} ({report['data'].get('stations', 0):,} stations, "
+          f"{report['data'].get('bookings', 0):,} bookings) requests={meta['requests']} "
+          f"concurrency={meta['concurrency']} db_latency={meta['db_latency_s']}s (times in ms)")
+    header = f"{'endpoint':<32}{'req/s':>9}{'p50':>9}{'p99':>9}{'max':>9}{'db/req':>8}{'errors':>8}"
+    if baseline:
+        header += f"{'Δ req/s':>10}{'Δ p50':>10}{'Δ p99':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, s in report["scenarios"].items():
+        line = (f"{name:<32}{s['throughput_rps']:>9.1f}{s['p50_ms']:>9.2f}{s['p99_ms']:>9.2f}"
+                f"{s['max_ms']:>9.2f}{s['db_calls_per_request']:>8.1f}{s['errors']:>8}")
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        if before:
+            line += "".join(f"{(s[k] - before[k]) / before[k]:>+10.0%}" if before[k] else f"{'-':>10}"
+                            for k in ("throughput_rps", "p50_ms", "p99_ms"))
+        print(line)
+    if baseline:
+        base = baseline["meta"]
+        print(f"\nbaseline: {base.get('created_at')} commit {base.get('git_commit')} scale={base.get('scale')} "
+              f"concurrency={base.get('concurrency')}")
+
+
+def load_baseline(ref: str, exclude: str, prefix: str = "endpoints") -> Dict[str, Any]:
+    """An earlier report by path, or with `latest` the newest `<prefix>-*.json` in RESULTS_DIR."""
+    if ref == "latest":
+        runs = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, f"{prefix}-*.json"))
+                      if os.path.abspath(p) != os.path.abspath(exclude))
+        if not runs:
+            sys.exit(f"no earlier reports in {RESULTS_DIR}")
+        ref = runs[-1]
+    with open(ref) as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=0.05, help="fraction of the full 10k/100k/1M/1M data set")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per endpoint first")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="simulated seconds per DB round trip")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="simulated seconds per model call")
+    parser.add_argument("--scenario", action="append", help="only run the named endpoint scenario (repeatable)")
+    parser.add_argument("--json", help="report path (default: benchmarks/results/endpoints-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier report to diff against, or `latest`")
+    args = parser.parse_args(argv)
+
+    path = args.json or os.path.join(RESULTS_DIR, f"endpoints-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.json")
+    baseline = load_baseline(args.compare, path) if args.compare else None
+    report = asyncio.run(run(args.scale, args.seed, args.requests, args.concurrency, args.warmup,
+                             args.db_latency, args.model_latency, args.scenario))
+    print_report(report, baseline)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
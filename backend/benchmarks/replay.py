@@ -0,0 +1,306 @@
+"""
+Replay recorded request traces.
+
+Re-issues a trace written by app.utils.request_recording (REQUEST_RECORDING=1)
+with the original arrival pattern, sped up or slowed down by --speed, and
+reports latency percentiles, errors and DB calls per route. Run it once per
+build and diff the reports with --compare. That turns real traffic shapes
+into a repeatable performance test.
+
+By default the requests go to the app in-process, on the stand-in filled with
+benchmarks.synthetic_data. DB calls are then counted per request. Recorded ids
+are pseudonyms; each one is mapped to a fixed row of the matching table
+(station_id → stations, ...), so repeated hits on one station stay repeated.
+Datetimes are re-anchored to the replay time. Free text such as chat messages
+is replaced by filler of the same length. Each role in the trace gets a
+bearer token for a user with that role.
+
+With --base-url the requests go to a running instance instead. Pass one
+--token ROLE=TOKEN per role and --ids with {"stations": [...], ...} so ids
+resolve. DB calls are not visible from outside the process.
+
+    cd backend
+    python -m benchmarks.replay request-trace.jsonl --speed 4 --json /tmp/before.json
+    git checkout my-branch && python -m benchmarks.replay request-trace.jsonl --speed 4 --compare /tmp/before.json
+    python -m benchmarks.replay request-trace.jsonl --speed 0 --max-in-flight 32   # as fast as possible
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from . import load_endpoints
+
+# Which table a pseudonymized id under a given key refers to
+PARAM_TABLES = {
+    "station_id": "stations", "slot_id": "charging_slots", "booking_id": "bookings",
+    "session_id": "charging_sessions", "vehicle_id": "vehicles", "profile_id": "profiles",
+    "user_id": "profiles", "owner_id": "profiles", "manager_id": "station_managers",
+}
+FILLER = "please help me with my charging booking "
+
+_route_param = re.compile(r"{(\w+)(?::\w+)?}")
+_db_calls: ContextVar[Optional[List[int]]] = ContextVar("replay_db_calls", default=None)
+
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return sorted(entries, key=lambda e: e["t"])
+
+
+class IdPool:
+    """Maps pseudonyms to real ids, the same pseudonym always to the same row."""
+
+    def __init__(self, pools: Dict[str, List[str]]):
+        self.pools = {table: ids for table, ids in pools.items() if ids}
+
+    def resolve(self, pseudonym: str, key: Optional[str]) -> str:
+        pool = self.pools.get(PARAM_TABLES.get(key or "", ""))
+        digest = pseudonym.split(":", 1)[1]
+        if pool:
+            return pool[int(digest, 16) % len(pool)]
+        # Unknown kind of id: stable but not found, as an id from another data set would be
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, digest))
+
+
+def materialize(value: Any, now: datetime, ids: IdPool, key: Optional[str] = None) -> Any:
+    """Turn a recorded shape back into a concrete JSON value."""
+    if isinstance(value, dict):
+        return {k: materialize(v, now, ids, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [materialize(v, now, ids, key) for v in value]
+    if not isinstance(value, str) or ":" not in value:
+        return value
+    kind, _, arg = value.partition(":")
+    if kind == "id":
+        return ids.resolve(value, key)
+    if kind == "dt":
+        return (now + timedelta(seconds=int(arg))).isoformat()
+    if kind == "date":
+        return (now.date() + timedelta(days=int(arg))).isoformat()
+    if kind == "str" and arg.isdigit():
+        return (FILLER * (int(arg) // len(FILLER) + 1))[: int(arg)]
+    return value
+
+
+def build_request(entry: Dict[str, Any], ids: IdPool) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    params = {k: materialize(v, now, ids, k) for k, v in (entry.get("params") or {}).items()}
+    path = _route_param.sub(lambda m: str(params.get(m.group(1), m.group(0))), entry["route"])
+    path = path.replace("{id}", str(uuid.uuid5(uuid.NAMESPACE_OID, "unmatched")))
+    body = entry.get("body")
+    return {
+        "method": entry["method"],
+        "url": path,
+        "params": {k: materialize(v, now, ids, k) for k, v in (entry.get("query") or {}).items()},
+        # Bodies that were too large or not JSON are recorded as "bytes:N"; those are sent empty
+        "json": materialize(body, now, ids) if isinstance(body, (dict, list)) else None,
+    }
+
+
+def _count_call(call: Any) -> None:
+    calls = _db_calls.get()
+    if calls is not None:
+        calls[0] += 1
+
+
+def _pct(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def replay(client: httpx.AsyncClient, entries: List[Dict[str, Any]], ids: IdPool, tokens: Dict[str, str],
+                 speed: float, max_in_flight: int) -> Dict[str, Any]:
+    """Issue the entries on their recorded schedule divided by `speed` (0: back to back)."""
+    results: List[Dict[str, Any]] = []
+    lags: List[float] = []
+    in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def one(entry: Dict[str, Any]) -> None:
+        token = tokens.get(entry.get("role") or "")
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        calls = [0]
+        _db_calls.set(calls)  # each task has its own context
+        started = time.perf_counter()
+        try:
+            response = await client.request(headers=headers, **build_request(entry, ids))
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 599
+        finally:
+            in_flight.release()
+        results.append({
+            "route": f"{entry['method']} {entry['route']}",
+            "status": status,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "db_calls": calls[0],
+            "recorded_ms": entry.get("duration_ms"),
+            "recorded_db_calls": entry.get("db_calls"),
+        })
+
+    loop = asyncio.get_running_loop()
+    t0, start = entries[0]["t"], loop.time()
+    tasks = []
+    for entry in entries:
+        if speed > 0:
+            due = start + (entry["t"] - t0) / speed
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+            lags.append(max(0.0, loop.time() - due) * 1000)
+        await in_flight.acquire()
+        tasks.append(asyncio.create_task(one(entry)))
+    await asyncio.gather(*tasks)
+    wall = loop.time() - start
+    return {"results": results, "wall_s": wall, "max_lag_ms": max(lags, default=0.0)}
+
+
+def summarize(results: List[Dict[str, Any]], db_counted: bool) -> Dict[str, Dict[str, Any]]:
+    by_route: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for r in results:
+        by_route[r["route"]].append(r)
+    routes = {}
+    for route, rows in sorted(by_route.items(), key=lambda item: -len(item[1])):
+        latencies = [r["latency_ms"] for r in rows]
+        recorded = [r["recorded_ms"] for r in rows if r["recorded_ms"] is not None]
+        recorded_db = [r["recorded_db_calls"] for r in rows if r["recorded_db_calls"] is not None]
+        status = Counter(r["status"] for r in rows)
+        routes[route] = {
+            "count": len(rows),
+            "p50_ms": statistics.median(latencies),
+            "p90_ms": _pct(latencies, 90),
+            "p99_ms": _pct(latencies, 99),
+            "mean_ms": statistics.fmean(latencies),
+            "errors": sum(n for code, n in status.items() if code >= 400),
+            "status": {str(code): n for code, n in sorted(status.items())},
+            "db_calls_mean": statistics.fmean(r["db_calls"] for r in rows) if db_counted else None,
+            "recorded_p50_ms": statistics.median(recorded) if recorded else None,
+            "recorded_db_calls_mean": statistics.fmean(recorded_db) if recorded_db else None,
+        }
+    return routes
+
+
+async def run(trace_path: str, speed: float, max_in_flight: int, limit: Optional[int], base_url: Optional[str],
+              tokens: Dict[str, str], ids_path: Optional[str], scale: float, seed: int,
+              db_latency: float, model_latency: float) -> Dict[str, Any]:
+    entries = load_trace(trace_path)[:limit]
+    if not entries:
+        sys.exit(f"{trace_path} has no requests")
+    meta: Dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).isoformat(), "git_commit": load_endpoints.git_commit(),
+        "python": platform.python_version(), "trace": os.path.abspath(trace_path), "requests": len(entries),
+        "trace_span_s": round(entries[-1]["t"] - entries[0]["t"], 3), "speed": speed,
+        "max_in_flight": max_in_flight, "target": base_url or "in-process",
+    }
+
+    if base_url:
+        pools = {}
+        if ids_path:
+            with open(ids_path) as f:
+                pools = json.load(f)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            outcome = await replay(client, entries, IdPool(pools), tokens, speed, max_in_flight)
+    else:
+        from app.utils.db_instrumentation import add_db_observer
+
+        app, db, users, counts = load_endpoints.boot(scale, seed, model_latency)
+        db.latency = db_latency
+        add_db_observer(_count_call)
+        meta.update({"scale": scale, "seed": seed, "db_latency_s": db_latency, "model_latency_s": model_latency})
+        ids = IdPool({table: [row["id"] for row in rows if row.get("id")] for table, rows in db.tables.items()})
+        tokens = {**{role: user["token"] for role, user in users.items()}, **tokens}
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    outcome = await replay(client, entries, ids, tokens, speed, max_in_flight)
+        finally:
+            load_endpoints.shutdown()
+
+    meta.update({"wall_s": round(outcome["wall_s"], 3), "throughput_rps": len(entries) / outcome["wall_s"],
+                 "max_lag_ms": round(outcome["max_lag_ms"], 1)})
+    return {"meta": meta, "routes": summarize(outcome["results"], db_counted=not base_url)}
+
+
+def _delta(after: Optional[float], before: Optional[float]) -> str:
+    if after is None or before is None:
+        return f"{'-':>9}"
+    if not before:
+        return f"{'-':>9}" if not after else f"{'new':>9}"
+    return f"{(after - before) / before:>+9.0%}"
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    meta = report["meta"]
+    print(f"{meta['requests']} requests over {meta['trace_span_s']}s recorded, replayed at speed {meta['speed']} "
+          f"against {meta['target']} in {meta['wall_s']}s ({meta['throughput_rps']:.1f} req/s, "
+          f"max schedule lag {meta['max_lag_ms']}ms; times in ms)")
+    header = f"{'route':<44}{'n':>6}{'p50':>9}{'p90':>9}{'p99':>9}{'db':>7}{'err':>5}{'rec p50':>9}{'rec db':>8}"
+    if baseline:
+        header += f"{'Δ p50':>9}{'Δ p99':>9}{'Δ db':>9}"
+    print(header)
+    print("-" * len(header))
+    fmt = lambda v, spec: format(v, spec) if v is not None else f"{'-':>{spec.split('.')[0]}}"
+    for route, s in report["routes"].items():
+        line = (f"{route[:43]:<44}{s['count']:>6}{s['p50_ms']:>9.2f}{s['p90_ms']:>9.2f}{s['p99_ms']:>9.2f}"
+                f"{fmt(s['db_calls_mean'], '7.1f')}{s['errors']:>5}{fmt(s['recorded_p50_ms'], '9.2f')}"
+                f"{fmt(s['recorded_db_calls_mean'], '8.1f')}")
+        before = (baseline or {}).get("routes", {}).get(route)
+        if before:
+            line += (_delta(s["p50_ms"], before["p50_ms"]) + _delta(s["p99_ms"], before["p99_ms"])
+                     + _delta(s["db_calls_mean"], before["db_calls_mean"]))
+        print(line)
+    if baseline:
+        base = baseline["meta"]
+        print(f"\nbaseline: {base.get('created_at')} commit {base.get('git_commit')} speed={base.get('speed')} "
+              f"target={base.get('target')}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="JSONL trace written with REQUEST_RECORDING=1")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up; 0 sends requests back to back")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="cap on concurrent requests")
+    parser.add_argument("--limit", type=int, help="only replay the first N requests")
+    parser.add_argument("--base-url", help="replay against a running instance instead of in-process")
+    parser.add_argument("--token", action="append", default=[], metavar="ROLE=TOKEN",
+                        help="bearer token per role (admin, station_manager, app_user) for --base-url")
+    parser.add_argument("--ids", help='JSON {"stations": [...], "bookings": [...]} to resolve ids for --base-url')
+    parser.add_argument("--scale", type=float, default=0.05, help="synthetic data scale for in-process replay")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db-latency", type=float, default=0.0, help="simulated seconds per DB round trip")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="simulated seconds per model call")
+    parser.add_argument("--json", help="report path (default: benchmarks/results/replay-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier replay report to diff against, or `latest`")
+    args = parser.parse_args(argv)
+
+    tokens = dict(t.split("=", 1) for t in args.token)
+    path = args.json or os.path.join(load_endpoints.RESULTS_DIR, f"replay-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.json")
+    baseline = load_endpoints.load_baseline(args.compare, path, prefix="replay") if args.compare else None
+    report = asyncio.run(run(args.trace, args.speed, args.max_in_flight, args.limit, args.base_url, tokens,
+                             args.ids, args.scale, args.seed, args.db_latency, args.model_latency))
+    print_report(report, baseline)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+List-endpoint serialization benchmark.
+
+Serves the same 10k-row payloads through a throwaway FastAPI app twice: once the
+regular way (response_model validation + jsonable_encoder + json) and once via
+app.utils.fast_json (row projection + FastJSONResponse), and reports request
+latency and payload size for each. Requests go through httpx's ASGI transport,
+so no network is involved.
+
+    python -m benchmarks.serialization --rows 10000 --iterations 5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Type
+
+import httpx
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from app.models import BookingOut, ChargingSessionOut, SlotOut, StationOut
+from app.utils import fast_json
+
+CONNECTORS = ["CCS2", "Type 2", "CHAdeMO"]
+
+
+def _ts(i: int) -> str:
+    return (datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=30 * i)).isoformat()
+
+
+def make_stations(n: int) -> List[Dict[str, Any]]:
+    return [{
+        "id": str(uuid.UUID(int=i)), "name": f"Station {i}", "address": f"{i} Ring Road", "city": "Delhi",
+        "country": "India", "zip_code": "110001", "state": "DL", "latitude": 28.6 + i * 1e-4, "longitude": 77.2,
+        "capacity": 4, "available_slots": i % 5, "total_slots": 4, "price_per_hour": 120.0,
+        "charger_types": ["DC"], "amenities": ["Cafe"], "image": None, "is_open": True, "open_hours": "24/7",
+        "photos": [], "rating": 4.2, "reviews": 12, "status": "active", "station_manager": None,
+        "connector_types": [{"type": c, "power": "60kW", "available": 1} for c in CONNECTORS],
+        "created_at": _ts(i), "updated_at": _ts(i),
+    } for i in range(n)]
+
+
+def make_slots(n: int) -> List[Dict[str, Any]]:
+    return [{
+        "id": str(uuid.UUID(int=10**6 + i)), "station_id": str(uuid.UUID(int=i // 4)), "slot_number": i % 4 + 1,
+        "charger_type": "DC", "status": "available", "connector_type": CONNECTORS[i % 3], "max_power_kw": 60.0,
+        "is_available": True, "last_used": None, "created_at": _ts(i), "updated_at": _ts(i),
+    } for i in range(n)]
+
+
+def make_bookings(n: int) -> List[Dict[str, Any]]:
+    return [{
+        "id": str(uuid.UUID(int=2 * 10**6 + i)), "vehicle_id": str(uuid.UUID(int=7)), "station_id": str(uuid.UUID(int=i % 500)),
+        "slot_id": str(uuid.UUID(int=10**6 + i % 2000)), "user_id": str(uuid.UUID(int=9)), "start_time": _ts(i),
+        "end_time": _ts(i + 2), "status": "confirmed", "current_battery_level": 40.0, "created_at": _ts(i),
+        "updated_at": _ts(i), "vehicle_name": "Tata Nexon EV", "station_name": f"Station {i % 500}",
+        "station_address": "Ring Road", "connector_type": "CCS2",
+    } for i in range(n)]
+
+
+def make_sessions(n: int) -> List[Dict[str, Any]]:
+    return [{
+        "session_id": str(uuid.UUID(int=3 * 10**6 + i)), "booking_id": str(uuid.UUID(int=2 * 10**6 + i)),
+        "vehicle_id": str(uuid.UUID(int=7)), "station_id": str(uuid.UUID(int=i % 500)), "user_id": str(uuid.UUID(int=9)),
+        "start_time": _ts(i), "end_time": _ts(i + 2), "energy_consumed": 18.5, "cost": 240.0, "status": "completed",
+        "created_at": _ts(i), "updated_at": _ts(i),
+    } for i in range(n)]
+
+
+CASES: Dict[str, tuple] = {
+    "stations": (StationOut, make_stations),
+    "slots": (SlotOut, make_slots),
+    "bookings": (BookingOut, make_bookings),
+    "charging_sessions": (ChargingSessionOut, make_sessions),
+}
+
+
+def build_app(payloads: Dict[str, List[Dict[str, Any]]]) -> FastAPI:
+    app = FastAPI()
+
+    def add(name: str, model: Type[BaseModel]) -> None:
+        rows = payloads[name]
+
+        @app.get(f"/default/{name}", response_model=List[model])
+        async def default_route():
+            return rows
+
+        @app.get(f"/fast/{name}", response_model=List[model])
+        async def fast_route():
+            return fast_json.fast_response(rows, model)
+
+    for name, (model, _) in CASES.items():
+        add(name, model)
+
+    dashboard = {"stations": payloads["stations"], "analytics": {"bookings": payloads["bookings"]}}
+
+    @app.get("/default/dashboard")
+    async def default_dashboard():
+        return dashboard
+
+    @app.get("/fast/dashboard")
+    async def fast_dashboard():
+        return fast_json.fast_response(dashboard)
+
+    return app
+
+
+async def _time(client: httpx.AsyncClient, path: str, iterations: int) -> Dict[str, Any]:
+    samples = []
+    body = b""
+    for _ in range(iterations):
+        started = time.perf_counter()
+        resp = await client.get(path)
+        samples.append((time.perf_counter() - started) * 1000)
+        resp.raise_for_status()
+        body = resp.content
+    return {"p50_ms": statistics.median(samples), "max_ms": max(samples), "bytes": len(body), "body": body}
+
+
+async def run(rows: int, iterations: int) -> Dict[str, Any]:
+    fast_json.FAST_JSON_ENABLED = True
+    payloads = {name: make(rows) for name, (_, make) in CASES.items()}
+    app = build_app(payloads)
+    report: Dict[str, Any] = {"rows": rows, "iterations": iterations, "orjson": fast_json.orjson is not None,
+                              "endpoints": {}}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for name in list(CASES) + ["dashboard"]:
+            default = await _time(client, f"/default/{name}", iterations)
+            fast = await _time(client, f"/fast/{name}", iterations)
+            d_body, f_body = json.loads(default.pop("body")), json.loads(fast.pop("body"))
+            first = (lambda b: b[0] if isinstance(b, list) else b["stations"][0])
+            report["endpoints"][name] = {
+                "default": default,
+                "fast": fast,
+                "speedup": default["p50_ms"] / fast["p50_ms"] if fast["p50_ms"] else None,
+                "same_keys": set(first(d_body)) == set(first(f_body)),
+            }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--json", help="write the full report to this path")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.rows, args.iterations))
+    print(f"rows={report['rows']} iterations={report['iterations']} orjson={report['orjson']} (times in ms)")
+    print(f"{'endpoint':<20}{'default p50':>12}{'fast p50':>10}{'speedup':>9}{'default KB':>12}{'fast KB':>9}  keys")
+    print("-" * 82)
+    for name, r in report["endpoints"].items():
+        print(f"{name:<20}{r['default']['p50_ms']:>12.1f}{r['fast']['p50_ms']:>10.1f}{r['speedup']:>8.1f}x"
+              f"{r['default']['bytes'] / 1024:>12.0f}{r['fast']['bytes'] / 1024:>9.0f}  {'same' if r['same_keys'] else 'DIFF'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+In-process stand-in for the Supabase client.
+
+Implements the subset of the PostgREST query builder the crud layer uses
+(select/insert/update/delete, eq/neq/in_/is_/gt/gte/lt/lte/ilike, not_, order,
+limit, single/maybe_single, count="exact" and rpc) over plain lists of dicts,
+plus `auth.get_user` for tokens registered with `auth.add_user`, and counts
+every executed call per (table, operation). Install it with
+`app.database.set_supabase_clients(StandInSupabase(...))`.
+"""
+
+import copy
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+
+class StandInAPIError(Exception):
+    """Mirrors postgrest's APIError for single() on zero or many rows."""
+
+
+class StandInResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _same(a: Any, b: Any) -> bool:
+    if a == b:
+        return True
+    if a is None or b is None or isinstance(a, bool) or isinstance(b, bool):
+        return False
+    return str(a) == str(b)
+
+
+def _compare(a: Any, b: Any) -> Optional[int]:
+    if a is None or b is None:
+        return None
+    if isinstance(a, str) or isinstance(b, str):
+        a, b = str(a), str(b)
+    return (a > b) - (a < b)
+
+
+class _Query:
+    def __init__(self, db: "StandInSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._count = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._negate_next = False
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single = False
+        self._maybe_single = False
+        self._payload: Any = None
+
+    # ── operations ───────────────────────────────────────────────────────────
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "_Query":
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, rows: Any) -> "_Query":
+        self._op = "insert"
+        self._payload = rows
+        return self
+
+    def upsert(self, rows: Any) -> "_Query":
+        self._op = "upsert"
+        self._payload = rows
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "_Query":
+        self._op = "update"
+        self._payload = values
+        return self
+
+    def delete(self) -> "_Query":
+        self._op = "delete"
+        return self
+
+    # ── filters ──────────────────────────────────────────────────────────────
+    @property
+    def not_(self) -> "_Query":
+        self._negate_next = True
+        return self
+
+    def _add(self, predicate: Callable[[Dict[str, Any]], bool]) -> "_Query":
+        if self._negate_next:
+            self._negate_next = False
+            self._filters.append(lambda row, p=predicate: not p(row))
+        else:
+            self._filters.append(predicate)
+        return self
+
+    def eq(self, column: str, value: Any) -> "_Query":
+        return self._add(lambda row: _same(row.get(column), value))
+
+    def neq(self, column: str, value: Any) -> "_Query":
+        return self._add(lambda row: not _same(row.get(column), value))
+
+    def in_(self, column: str, values: List[Any]) -> "_Query":
+        values = list(values)
+        return self._add(lambda row: any(_same(row.get(column), v) for v in values))
+
+    def is_(self, column: str, value: Any) -> "_Query":
+        if value is None or value == "null":
+            return self._add(lambda row: row.get(column) is None)
+        return self._add(lambda row: row.get(column) is value or _same(row.get(column), value))
+
+    def gt(self, column: str, value: Any) -> "_Query":
+        return self._add(lambda row: (_compare(row.get(column), value) or 0) > 0)
+
+    def gte(self, column: str, value: Any) -> "_Query":
+        return self._add(lambda row: _compare(row.get(column), value) in (0, 1))
+
+    def lt(self, column: str, value: Any) -> "_Query":
+        return self._add(lambda row: (_compare(row.get(column), value) or 0) < 0)
+
+    def lte(self, column: str, value: Any) -> "_Query":
+        return self._add(lambda row: _compare(row.get(column), value) in (0, -1))
+
+    def ilike(self, column: str, pattern: str) -> "_Query":
+        needle = pattern.strip("%").lower()
+        return self._add(lambda row: needle in str(row.get(column) or "").lower())
+
+    like = ilike
+
+    # ── modifiers ────────────────────────────────────────────────────────────
+    def order(self, column: str, desc: bool = False) -> "_Query":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> "_Query":
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int) -> "_Query":
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self) -> "_Query":
+        self._single = True
+        return self
+
+    def maybe_single(self) -> "_Query":
+        self._maybe_single = True
+        return self
+
+    # ── execution ────────────────────────────────────────────────────────────
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if self._columns.strip() == "*":
+            return copy.deepcopy(row)
+        cols = [c.strip() for c in self._columns.split(",") if c.strip()]
+        return {c: copy.deepcopy(row.get(c)) for c in cols}
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        rows = self._db.tables.setdefault(self._table, [])
+        return [r for r in rows if all(f(r) for f in self._filters)]
+
+    def execute(self) -> Optional[StandInResponse]:
+        self._db._record(self._table, self._op)
+        now = datetime.now(timezone.utc).isoformat()
+        rows = self._db.tables.setdefault(self._table, [])
+
+        if self._op in ("insert", "upsert"):
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            created = []
+            for item in payload:
+                row = dict(item)
+                existing = next((r for r in rows if row.get("id") and _same(r.get("id"), row["id"])), None)
+                if existing is not None and self._op == "upsert":
+                    existing.update(row)
+                    existing["updated_at"] = now
+                    created.append(copy.deepcopy(existing))
+                    continue
+                row.setdefault("id", str(uuid.uuid4()))
+                row.setdefault("created_at", now)
+                row.setdefault("updated_at", now)
+                rows.append(row)
+                created.append(copy.deepcopy(row))
+            return StandInResponse(created)
+
+        matched = self._matching()
+
+        if self._op == "update":
+            for row in matched:
+                row.update(copy.deepcopy(self._payload))
+                if "updated_at" not in self._payload:
+                    row["updated_at"] = now
+            return StandInResponse([copy.deepcopy(r) for r in matched])
+
+        if self._op == "delete":
+            ids = {id(r) for r in matched}
+            self._db.tables[self._table] = [r for r in rows if id(r) not in ids]
+            return StandInResponse([copy.deepcopy(r) for r in matched])
+
+        for column, desc in reversed(self._order):
+            matched.sort(key=lambda r: (r.get(column) is None, str(r.get(column) or "")), reverse=desc)
+        total = len(matched)
+        if self._offset:
+            matched = matched[self._offset:]
+        if self._limit is not None:
+            matched = matched[: self._limit]
+        data = [self._project(r) for r in matched]
+
+        if self._single:
+            if len(data) != 1:
+                raise StandInAPIError(f"JSON object requested, {len(data)} rows returned from {self._table}")
+            return StandInResponse(data[0], total if self._count else None)
+        if self._maybe_single:
+            if not data:
+                return None
+            return StandInResponse(data[0], total if self._count else None)
+        return StandInResponse(data, total if self._count else None)
+
+
+class _RpcCall:
+    def __init__(self, db: "StandInSupabase", name: str, params: Optional[Dict[str, Any]]):
+        self._db = db
+        self._name = name
+        self._params = params or {}
+
+    def execute(self) -> StandInResponse:
+        self._db._record(f"rpc:{self._name}", "rpc")
+        handler = self._db.rpcs.get(self._name)
+        return StandInResponse(handler(self._db, **self._params) if handler else [])
+
+
+class StandInAuth:
+    """Token → user lookup standing in for `client.auth.get_user(jwt)`."""
+
+    def __init__(self, db: "StandInSupabase"):
+        self._db = db
+        self._users: Dict[str, SimpleNamespace] = {}
+
+    def add_user(self, token: str, user_id: str, email: str, role: Optional[str] = None) -> None:
+        """Register a bearer token; `role` lands in app_metadata like a Supabase custom claim."""
+        self._users[token] = SimpleNamespace(
+            id=user_id, email=email, app_metadata={"role": role} if role else {}, user_metadata={},
+        )
+
+    def get_user(self, token: str) -> SimpleNamespace:
+        self._db._record("auth", "get_user")
+        if token not in self._users:
+            raise StandInAPIError("invalid JWT: unable to parse or verify signature")
+        return SimpleNamespace(user=self._users[token])
+
+
+class StandInSupabase:
+    """Dict-backed Supabase client stand-in with per-call accounting."""
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None, latency: float = 0.0):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {k: list(v) for k, v in (tables or {}).items()}
+        self.rpcs: Dict[str, Callable[..., Any]] = {}
+        # Seconds slept per call; the real client is synchronous, so a blocking
+        # sleep is the honest way to simulate a PostgREST round trip.
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.auth = StandInAuth(self)
+
+    def _record(self, table: str, op: str) -> None:
+        self.calls[(table, op)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _RpcCall:
+        return _RpcCall(self, name, params)
+
+    def register_rpc(self, name: str, handler: Callable[..., Any]) -> None:
+        self.rpcs[name] = handler
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_stats(self) -> None:
+        self.calls.clear()
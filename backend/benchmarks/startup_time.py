@@ -0,0 +1,82 @@
+"""
+Worker cold-start benchmark.
+
+Imports app.main in fresh interpreters and reports how long the import takes
+and whether the LangChain agent stack was loaded along the way, with the agent
+router enabled and disabled. Also measures the one-off cost the first chat
+request pays to import the orchestrator.
+
+    python -m benchmarks.startup_time --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+boot = time.perf_counter() - started
+heavy = sorted(m for m in ("langchain_core", "langchain_ollama", "app.agent.orchestrator") if m in sys.modules)
+started = time.perf_counter()
+import app.agent.orchestrator
+first_chat = time.perf_counter() - started
+print(json.dumps({"boot_s": boot, "first_chat_import_s": first_chat, "loaded_at_boot": heavy}))
+"""
+
+# app.main refuses to start without these; nothing connects during import
+DUMMY_ENV = {"SUPABASE_URL": "http://localhost:54321", "SUPABASE_KEY": "bench", "SERVICE_ROLE": "bench"}
+
+
+def probe(agent_enabled: bool) -> Dict[str, Any]:
+    env = {**os.environ, **{k: os.environ.get(k, v) for k, v in DUMMY_ENV.items()},
+           "AGENT_ENABLED": "true" if agent_enabled else "false", "PYTHONDONTWRITEBYTECODE": "1"}
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run(runs: int) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"runs": runs, "modes": {}}
+    for label, enabled in (("agent_enabled", True), ("agent_disabled", False)):
+        samples: List[Dict[str, Any]] = [probe(enabled) for _ in range(runs)]
+        boots = [s["boot_s"] * 1000 for s in samples]
+        chats = [s["first_chat_import_s"] * 1000 for s in samples]
+        report["modes"][label] = {
+            "boot_ms_median": statistics.median(boots),
+            "boot_ms_max": max(boots),
+            "first_chat_import_ms_median": statistics.median(chats),
+            "loaded_at_boot": samples[-1]["loaded_at_boot"],
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="write the full report to this path")
+    args = parser.parse_args()
+
+    report = run(args.runs)
+    print(f"runs={args.runs} (times in ms)")
+    print(f"{'mode':<16}{'boot p50':>10}{'boot max':>10}{'1st chat':>10}  loaded at boot")
+    print("-" * 70)
+    for label, m in report["modes"].items():
+        print(f"{label:<16}{m['boot_ms_median']:>10.1f}{m['boot_ms_max']:>10.1f}"
+              f"{m['first_chat_import_ms_median']:>10.1f}  {', '.join(m['loaded_at_boot']) or '-'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
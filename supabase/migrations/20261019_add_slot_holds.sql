@@ -0,0 +1,52 @@
+-- Migration: Short-lived slot holds
+-- Date: October 19, 2026
+-- Description: Lets a user reserve a slot and time window for a few minutes while a
+-- booking conversation (agent or UI) is still collecting vehicle/battery details.
+-- Holds block other users in the booking overlap checks and are cleared by the
+-- lifecycle scheduler through expire_slot_holds().
+
+CREATE TABLE IF NOT EXISTS public.slot_holds (
+    id uuid DEFAULT gen_random_uuid() NOT NULL PRIMARY KEY,
+    slot_id uuid NOT NULL REFERENCES public.charging_slots(id) ON DELETE CASCADE,
+    station_id uuid NOT NULL REFERENCES public.stations(id) ON DELETE CASCADE,
+    user_id uuid NOT NULL,
+    connector_type text,
+    start_time timestamp with time zone NOT NULL,
+    end_time timestamp with time zone NOT NULL,
+    expires_at timestamp with time zone NOT NULL,
+    created_at timestamp with time zone DEFAULT now(),
+    CONSTRAINT slot_holds_window_check CHECK (end_time > start_time)
+);
+
+ALTER TABLE public.slot_holds OWNER TO postgres;
+
+-- Overlap checks look up live holds per slot / per station
+CREATE INDEX IF NOT EXISTS slot_holds_slot_expires_idx ON public.slot_holds (slot_id, expires_at);
+CREATE INDEX IF NOT EXISTS slot_holds_station_expires_idx ON public.slot_holds (station_id, expires_at);
+CREATE INDEX IF NOT EXISTS slot_holds_user_idx ON public.slot_holds (user_id);
+
+ALTER TABLE public.slot_holds ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can manage their own slot holds" ON public.slot_holds
+    USING ((user_id = auth.uid())) WITH CHECK ((user_id = auth.uid()));
+
+-- Delete holds past their expiry; returns the same shape as the booking lifecycle RPCs
+CREATE OR REPLACE FUNCTION expire_slot_holds()
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    deleted_count integer;
+BEGIN
+    DELETE FROM public.slot_holds WHERE expires_at <= now();
+    GET DIAGNOSTICS deleted_count = ROW_COUNT;
+
+    RETURN jsonb_build_object(
+        'updated_count', deleted_count,
+        'message', format('Expired %s slot holds', deleted_count)
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION expire_slot_holds() TO service_role;
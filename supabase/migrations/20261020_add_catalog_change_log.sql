@@ -0,0 +1,88 @@
+-- Migration: Station catalog change log
+-- Date: October 20, 2026
+-- Description: Records every insert/update/delete on stations and charging_slots with a
+-- monotonically increasing version so clients can sync their offline station catalog
+-- through /stations/changes?since=<version>. Deletes are kept as tombstones. Old entries
+-- are pruned by prune_catalog_changes(); a client whose version predates the oldest
+-- retained entry falls back to a full reload.
+
+CREATE TABLE IF NOT EXISTS public.catalog_changes (
+    version bigserial PRIMARY KEY,
+    entity text NOT NULL,
+    entity_id uuid NOT NULL,
+    op text NOT NULL,
+    changed_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT catalog_changes_entity_check CHECK (entity IN ('station', 'slot')),
+    CONSTRAINT catalog_changes_op_check CHECK (op IN ('insert', 'update', 'delete'))
+);
+
+ALTER TABLE public.catalog_changes OWNER TO postgres;
+
+-- Pruning by age
+CREATE INDEX IF NOT EXISTS catalog_changes_changed_at_idx ON public.catalog_changes (changed_at);
+
+ALTER TABLE public.catalog_changes ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can read catalog changes" ON public.catalog_changes
+    FOR SELECT TO authenticated USING (true);
+
+CREATE OR REPLACE FUNCTION public.log_catalog_change()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO public.catalog_changes (entity, entity_id, op) VALUES (TG_ARGV[0], OLD.id, 'delete');
+        RETURN OLD;
+    END IF;
+    INSERT INTO public.catalog_changes (entity, entity_id, op) VALUES (TG_ARGV[0], NEW.id, lower(TG_OP));
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS stations_catalog_change ON public.stations;
+CREATE TRIGGER stations_catalog_change
+    AFTER INSERT OR DELETE ON public.stations
+    FOR EACH ROW EXECUTE FUNCTION public.log_catalog_change('station');
+
+DROP TRIGGER IF EXISTS stations_catalog_update ON public.stations;
+CREATE TRIGGER stations_catalog_update
+    AFTER UPDATE ON public.stations
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+    EXECUTE FUNCTION public.log_catalog_change('station');
+
+DROP TRIGGER IF EXISTS charging_slots_catalog_change ON public.charging_slots;
+CREATE TRIGGER charging_slots_catalog_change
+    AFTER INSERT OR DELETE ON public.charging_slots
+    FOR EACH ROW EXECUTE FUNCTION public.log_catalog_change('slot');
+
+DROP TRIGGER IF EXISTS charging_slots_catalog_update ON public.charging_slots;
+CREATE TRIGGER charging_slots_catalog_update
+    AFTER UPDATE ON public.charging_slots
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+    EXECUTE FUNCTION public.log_catalog_change('slot');
+
+-- Drop change log entries older than keep_days; returns the same shape as the lifecycle RPCs
+CREATE OR REPLACE FUNCTION prune_catalog_changes(keep_days integer DEFAULT 30)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    deleted_count integer;
+BEGIN
+    -- Always keep the newest entry so the current version stays known
+    DELETE FROM public.catalog_changes
+    WHERE changed_at < now() - make_interval(days => keep_days)
+      AND version < (SELECT max(version) FROM public.catalog_changes);
+    GET DIAGNOSTICS deleted_count = ROW_COUNT;
+
+    RETURN jsonb_build_object(
+        'updated_count', deleted_count,
+        'message', format('Pruned %s catalog changes', deleted_count)
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION prune_catalog_changes(integer) TO service_role;
@@ -0,0 +1,40 @@
+-- Migration: updated_at maintenance for per-user delta sync
+-- Date: October 20, 2026
+-- Description: GET /bookings?since= and GET /charging_sessions/user/?since= return rows whose
+-- updated_at is at or after the client's cursor. Only the lifecycle RPCs set updated_at today,
+-- so plain PostgREST updates would be missed; these triggers stamp every update. clock_timestamp()
+-- (not now()) keeps the stamp close to commit time for long transactions.
+
+ALTER TABLE public.bookings
+ADD COLUMN IF NOT EXISTS updated_at timestamp with time zone DEFAULT now();
+
+ALTER TABLE public.charging_sessions
+ADD COLUMN IF NOT EXISTS updated_at timestamp with time zone DEFAULT now();
+
+-- Backfill rows that never had updated_at set
+UPDATE public.bookings SET updated_at = COALESCE(created_at, now()) WHERE updated_at IS NULL;
+UPDATE public.charging_sessions SET updated_at = COALESCE(created_at, now()) WHERE updated_at IS NULL;
+
+CREATE OR REPLACE FUNCTION public.set_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at = clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS bookings_set_updated_at ON public.bookings;
+CREATE TRIGGER bookings_set_updated_at
+    BEFORE INSERT OR UPDATE ON public.bookings
+    FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+
+DROP TRIGGER IF EXISTS charging_sessions_set_updated_at ON public.charging_sessions;
+CREATE TRIGGER charging_sessions_set_updated_at
+    BEFORE INSERT OR UPDATE ON public.charging_sessions
+    FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+
+-- Delta queries: user_id = ? AND updated_at >= ? ORDER BY updated_at
+CREATE INDEX IF NOT EXISTS bookings_user_updated_at_idx ON public.bookings (user_id, updated_at);
+CREATE INDEX IF NOT EXISTS charging_sessions_user_updated_at_idx ON public.charging_sessions (user_id, updated_at);
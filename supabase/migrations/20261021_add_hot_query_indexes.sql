@@ -0,0 +1,91 @@
+-- Migration: Indexes for the hot query shapes
+-- Date: October 21, 2026
+-- Description: The base schema only indexes station_vehicles and stations(city), so the filters
+-- used by the crud layer and the booking lifecycle RPCs all end up as sequential scans. This adds
+-- composite and partial indexes matched to those filters. Check the plans with
+-- `python -m benchmarks.explain_plans` (see backend/benchmarks/explain_plans.py).
+--
+-- Plain CREATE INDEX takes a SHARE lock (writes wait, reads continue). On a large production table
+-- run the same statements with CREATE INDEX CONCURRENTLY outside a transaction instead.
+
+-- ------------------------------------------------------------
+-- bookings
+-- ------------------------------------------------------------
+
+-- Overlap checks: slot_id = ? AND status IN ('pending','confirmed','active'), then time window
+CREATE INDEX IF NOT EXISTS bookings_slot_blocking_idx
+    ON public.bookings (slot_id, start_time)
+    WHERE status IN ('pending', 'confirmed', 'active');
+
+-- Manager queues: station_id = ? AND status = 'pending'
+CREATE INDEX IF NOT EXISTS bookings_station_status_idx ON public.bookings (station_id, status);
+
+-- A user's bookings, and upcoming ones ordered by start_time
+CREATE INDEX IF NOT EXISTS bookings_user_start_idx ON public.bookings (user_id, start_time);
+
+-- activate_started_bookings(): status = 'confirmed' AND start_time <= now()
+CREATE INDEX IF NOT EXISTS bookings_confirmed_start_idx
+    ON public.bookings (start_time)
+    WHERE status = 'confirmed';
+
+-- complete_expired_bookings(): status = 'active' AND end_time <= now()
+CREATE INDEX IF NOT EXISTS bookings_active_end_idx
+    ON public.bookings (end_time)
+    WHERE status = 'active';
+
+-- Booking trend analytics: created_at >= ?
+CREATE INDEX IF NOT EXISTS bookings_created_at_idx ON public.bookings (created_at);
+
+-- ------------------------------------------------------------
+-- charging_sessions
+-- ------------------------------------------------------------
+
+-- Slot occupancy: SELECT slot_id ... WHERE end_time IS NULL (index-only scan)
+CREATE INDEX IF NOT EXISTS charging_sessions_open_slot_idx
+    ON public.charging_sessions (slot_id)
+    WHERE end_time IS NULL;
+
+-- Per-station analytics windows: station_id IN (...) AND start_time BETWEEN ? AND ?
+CREATE INDEX IF NOT EXISTS charging_sessions_station_start_idx ON public.charging_sessions (station_id, start_time);
+
+-- Network-wide analytics windows: start_time >= ?
+CREATE INDEX IF NOT EXISTS charging_sessions_start_time_idx ON public.charging_sessions (start_time);
+
+-- A user's sessions, newest first
+CREATE INDEX IF NOT EXISTS charging_sessions_user_created_idx ON public.charging_sessions (user_id, created_at DESC);
+
+-- complete_expired_bookings() updates the session of each finished booking
+CREATE INDEX IF NOT EXISTS charging_sessions_booking_idx ON public.charging_sessions (booking_id);
+
+-- ------------------------------------------------------------
+-- charging_slots, stations, feedback, vehicles
+-- ------------------------------------------------------------
+
+-- station_id = ? / IN (...); the (station_id, slot_number) unique constraint already covers it where present
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'charging_slots_station_id_slot_number_key') THEN
+        CREATE INDEX IF NOT EXISTS charging_slots_station_idx ON public.charging_slots (station_id);
+    END IF;
+END $$;
+
+-- Manager views: station_manager = ?
+CREATE INDEX IF NOT EXISTS stations_station_manager_idx ON public.stations (station_manager);
+
+CREATE INDEX IF NOT EXISTS feedback_station_idx ON public.feedback (station_id);
+
+CREATE INDEX IF NOT EXISTS vehicles_owner_idx ON public.vehicles (owner_id);
+
+-- ------------------------------------------------------------
+-- user_activity_log (created outside the base schema dump)
+-- ------------------------------------------------------------
+
+DO $$
+BEGIN
+    IF to_regclass('public.user_activity_log') IS NOT NULL THEN
+        -- Admin feed: ORDER BY created_at DESC LIMIT n
+        CREATE INDEX IF NOT EXISTS user_activity_log_created_idx ON public.user_activity_log (created_at DESC);
+        -- Personal feed: user_id = ? ORDER BY created_at DESC LIMIT n
+        CREATE INDEX IF NOT EXISTS user_activity_log_user_created_idx ON public.user_activity_log (user_id, created_at DESC);
+    END IF;
+END $$;
@@ -0,0 +1,416 @@
+-- Migration: Monthly range partitioning for bookings, charging_sessions and user_activity_log
+-- Date: October 22, 2026
+-- Description: These tables only grow, while the lifecycle RPCs and analytics windows filter on
+-- recent start_time / created_at. Each table becomes a partitioned table with one partition per
+-- UTC month (bookings_2026_10, ...) plus a default partition, so those queries are pruned to the
+-- recent partitions and old months can be detached (and archived or dropped) without a DELETE.
+--
+-- * Partition keys: bookings.start_time, charging_sessions.start_time, user_activity_log.created_at.
+--   Primary keys become (id, <key>) because Postgres requires the key in every unique constraint;
+--   lookups by id alone still work, they just probe each partition's index.
+-- * charging_sessions.booking_id can no longer be a foreign key to bookings (bookings.id alone is
+--   not unique any more); its ON DELETE CASCADE is kept by a trigger.
+-- * ensure_monthly_partitions() creates upcoming months and is called daily by the backend
+--   scheduler. Rows that arrive before their month exists land in the default partition and are
+--   moved when the month is created.
+-- * detach_monthly_partitions() detaches months older than a cutoff; the detached tables keep
+--   their name and data.
+--
+-- The conversion rewrites each table under an ACCESS EXCLUSIVE lock; run it in a maintenance window.
+
+-- ------------------------------------------------------------
+-- Partition management
+-- ------------------------------------------------------------
+
+-- Create the partition for the month containing p_month (UTC), moving any of its rows out of the
+-- default partition first. Returns false if the partition already exists.
+CREATE OR REPLACE FUNCTION public.create_monthly_partition(p_table text, p_key text, p_month date)
+RETURNS boolean
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    month_start date := date_trunc('month', p_month)::date;
+    lo timestamptz := month_start::timestamp AT TIME ZONE 'UTC';
+    hi timestamptz := (month_start + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+    part text := format('%s_%s', p_table, to_char(month_start, 'YYYY_MM'));
+BEGIN
+    IF to_regclass(format('public.%I', part)) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+
+    EXECUTE format('CREATE TABLE public.%I (LIKE public.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, p_table);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM public.%I WHERE %I >= %L AND %I < %L RETURNING *) INSERT INTO public.%I SELECT * FROM moved',
+        p_table || '_default', p_key, lo, p_key, hi, part
+    );
+    EXECUTE format('ALTER TABLE public.%I ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)', p_table, part, lo, hi);
+    -- Partitions are reachable directly through the API; without policies RLS denies everyone but the service role
+    EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', part);
+    RETURN true;
+END;
+$$;
+
+-- Make sure every partitioned table has partitions from last month through months_ahead months
+-- from now; returns the same shape as the booking lifecycle RPCs
+CREATE OR REPLACE FUNCTION public.ensure_monthly_partitions(months_ahead integer DEFAULT 3)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    created_count integer := 0;
+    t record;
+    m date;
+BEGIN
+    FOR t IN
+        SELECT c.relname AS tbl, a.attname AS key
+        FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = 'public'
+        JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+        WHERE c.relname IN ('bookings', 'charging_sessions', 'user_activity_log')
+    LOOP
+        FOR m IN
+            SELECT generate_series(
+                date_trunc('month', now() AT TIME ZONE 'UTC') - interval '1 month',
+                date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => months_ahead),
+                interval '1 month'
+            )::date
+        LOOP
+            IF public.create_monthly_partition(t.tbl, t.key, m) THEN
+                created_count := created_count + 1;
+            END IF;
+        END LOOP;
+    END LOOP;
+
+    RETURN jsonb_build_object(
+        'updated_count', created_count,
+        'message', format('Created %s monthly partitions', created_count)
+    );
+END;
+$$;
+
+-- Detach the monthly partitions of p_table that end on or before older_than. The detached tables
+-- stay in place for archiving; DROP them once they are no longer needed. For a lock that does not
+-- block readers, run ALTER TABLE ... DETACH PARTITION ... CONCURRENTLY by hand instead.
+CREATE OR REPLACE FUNCTION public.detach_monthly_partitions(p_table text, older_than timestamptz)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    part record;
+    detached text[] := ARRAY[]::text[];
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = format('public.%I', p_table)::regclass
+          AND c.relname ~ ('^' || p_table || '_[0-9]{4}_[0-9]{2}$')
+          AND (to_date(right(c.relname, 7), 'YYYY_MM') + interval '1 month')::timestamp AT TIME ZONE 'UTC' <= older_than
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE public.%I DETACH PARTITION public.%I', p_table, part.relname);
+        detached := detached || part.relname::text;
+    END LOOP;
+
+    RETURN jsonb_build_object('updated_count', cardinality(detached), 'detached', to_jsonb(detached));
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.create_monthly_partition(text, text, date) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.ensure_monthly_partitions(integer) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.detach_monthly_partitions(text, timestamptz) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION public.create_monthly_partition(text, text, date) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION public.ensure_monthly_partitions(integer) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION public.detach_monthly_partitions(text, timestamptz) FROM anon, authenticated;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION public.ensure_monthly_partitions(integer) TO service_role;
+        GRANT EXECUTE ON FUNCTION public.detach_monthly_partitions(text, timestamptz) TO service_role;
+    END IF;
+END $$;
+
+-- ------------------------------------------------------------
+-- One-off conversion of an existing table (session-local helper)
+-- ------------------------------------------------------------
+
+-- Rebuilds p_table as a table partitioned by month on p_key, keeping its columns, defaults,
+-- checks, indexes, unique and foreign keys, triggers, RLS policies and grants. Unique constraints
+-- that do not include p_key cannot exist on a partitioned table and are reported and skipped.
+CREATE FUNCTION pg_temp.partition_by_month(p_table text, p_key text)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    old_table text := p_table || '_unpartitioned';
+    rel oid := to_regclass(format('public.%I', p_table));
+    ddl text[] := ARRAY[]::text[];
+    stmt text;
+    r record;
+    first_month date;
+    last_month date;
+    m date;
+BEGIN
+    IF rel IS NULL THEN
+        RAISE NOTICE 'public.% does not exist, skipping', p_table;
+        RETURN;
+    END IF;
+    IF (SELECT relkind FROM pg_class WHERE oid = rel) = 'p' THEN
+        RAISE NOTICE 'public.% is already partitioned', p_table;
+        RETURN;
+    END IF;
+
+    EXECUTE format('LOCK TABLE public.%I IN ACCESS EXCLUSIVE MODE', p_table);
+
+    -- Capture everything that has to be recreated while it still deparses against the original name
+    ddl := ddl || format('ALTER TABLE public.%I ADD PRIMARY KEY (id, %I)', p_table, p_key);
+    FOR r IN
+        SELECT conname, contype, pg_get_constraintdef(oid) AS def,
+               EXISTS (SELECT 1 FROM pg_attribute a WHERE a.attrelid = rel AND a.attname = p_key AND a.attnum = ANY (conkey)) AS has_key
+        FROM pg_constraint
+        WHERE conrelid = rel AND contype IN ('u', 'f')
+    LOOP
+        IF r.contype = 'u' AND NOT r.has_key THEN
+            RAISE NOTICE 'Dropping unique constraint %.% (does not include %)', p_table, r.conname, p_key;
+        ELSE
+            ddl := ddl || format('ALTER TABLE public.%I ADD CONSTRAINT %I %s', p_table, r.conname, r.def);
+        END IF;
+    END LOOP;
+    FOR r IN
+        SELECT pg_get_indexdef(i.indexrelid) AS def
+        FROM pg_index i
+        WHERE i.indrelid = rel
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid AND c.conrelid = rel)
+    LOOP
+        IF r.def LIKE 'CREATE UNIQUE%' THEN
+            RAISE NOTICE 'Dropping unique index on % (%)', p_table, r.def;
+        ELSE
+            ddl := ddl || r.def;
+        END IF;
+    END LOOP;
+    FOR r IN SELECT pg_get_triggerdef(oid) AS def FROM pg_trigger WHERE tgrelid = rel AND NOT tgisinternal LOOP
+        ddl := ddl || r.def;
+    END LOOP;
+    IF (SELECT relrowsecurity FROM pg_class WHERE oid = rel) THEN
+        ddl := ddl || format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', p_table);
+    END IF;
+    FOR r IN SELECT * FROM pg_policies WHERE schemaname = 'public' AND tablename = p_table LOOP
+        ddl := ddl || format(
+            'CREATE POLICY %I ON public.%I AS %s FOR %s TO %s%s%s',
+            r.policyname, p_table, r.permissive, r.cmd,
+            (SELECT string_agg(CASE WHEN role = 'public' THEN 'public' ELSE quote_ident(role) END, ', ') FROM unnest(r.roles) AS role),
+            CASE WHEN r.qual IS NOT NULL THEN ' USING (' || r.qual || ')' ELSE '' END,
+            CASE WHEN r.with_check IS NOT NULL THEN ' WITH CHECK (' || r.with_check || ')' ELSE '' END
+        );
+    END LOOP;
+    FOR r IN
+        SELECT grantee, string_agg(privilege_type, ', ') AS privileges
+        FROM information_schema.role_table_grants
+        WHERE table_schema = 'public' AND table_name = p_table AND grantee <> 'postgres'
+        GROUP BY grantee
+    LOOP
+        ddl := ddl || format('GRANT %s ON public.%I TO %s', r.privileges,  p_table,
+                             CASE WHEN r.grantee = 'PUBLIC' THEN 'PUBLIC' ELSE quote_ident(r.grantee) END);
+    END LOOP;
+
+    -- Partition keys cannot be NULL once they are part of the primary key
+    EXECUTE format('UPDATE public.%I SET %I = now() WHERE %I IS NULL', p_table, p_key, p_key);
+
+    EXECUTE format('ALTER TABLE public.%I RENAME TO %I', p_table, old_table);
+    EXECUTE format(
+        'CREATE TABLE public.%I (LIKE public.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (%I)',
+        p_table, old_table, p_key
+    );
+    EXECUTE format('ALTER TABLE public.%I OWNER TO postgres', p_table);
+    EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I DEFAULT', p_table || '_default', p_table);
+    EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', p_table || '_default');
+
+    -- One partition per month that has data, through the usual three months ahead
+    EXECUTE format('SELECT min(%I) AT TIME ZONE ''UTC'', max(%I) AT TIME ZONE ''UTC'' FROM public.%I', p_key, p_key, old_table)
+        INTO first_month, last_month;
+    first_month := date_trunc('month', LEAST(COALESCE(first_month, now() AT TIME ZONE 'UTC'), now() AT TIME ZONE 'UTC') - interval '1 month')::date;
+    last_month := date_trunc('month', GREATEST(COALESCE(last_month, now() AT TIME ZONE 'UTC'), now() AT TIME ZONE 'UTC' + interval '3 months'))::date;
+    m := first_month;
+    WHILE m <= last_month LOOP
+        PERFORM public.create_monthly_partition(p_table, p_key, m);
+        m := (m + interval '1 month')::date;
+    END LOOP;
+
+    EXECUTE format('INSERT INTO public.%I SELECT * FROM public.%I', p_table, old_table);
+    EXECUTE format('DROP TABLE public.%I', old_table);
+
+    FOREACH stmt IN ARRAY ddl LOOP
+        EXECUTE stmt;
+    END LOOP;
+    EXECUTE format('ANALYZE public.%I', p_table);
+END;
+$$;
+
+-- ------------------------------------------------------------
+-- Convert
+-- ------------------------------------------------------------
+
+-- bookings.id stops being unique on its own, so the session -> booking foreign key goes first
+ALTER TABLE public.charging_sessions DROP CONSTRAINT IF EXISTS charging_sessions_booking_id_fkey;
+
+SELECT pg_temp.partition_by_month('bookings', 'start_time');
+SELECT pg_temp.partition_by_month('charging_sessions', 'start_time');
+SELECT pg_temp.partition_by_month('user_activity_log', 'created_at');
+
+-- Keep the old ON DELETE CASCADE from bookings to their charging sessions
+CREATE OR REPLACE FUNCTION public.delete_booking_charging_sessions()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM public.charging_sessions WHERE booking_id = OLD.id;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS bookings_delete_charging_sessions ON public.bookings;
+CREATE TRIGGER bookings_delete_charging_sessions
+    AFTER DELETE ON public.bookings
+    FOR EACH ROW EXECUTE FUNCTION public.delete_booking_charging_sessions();
+
+-- ------------------------------------------------------------
+-- Lifecycle RPCs: bound the scans by start_time so they only touch recent partitions.
+-- lookback is how far back a confirmed/active booking can have started and still be picked up;
+-- the scheduler calls these with no arguments. Pass a longer interval to catch up after an outage.
+-- ------------------------------------------------------------
+
+DROP FUNCTION IF EXISTS activate_started_bookings();
+CREATE OR REPLACE FUNCTION activate_started_bookings(lookback interval DEFAULT interval '7 days')
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    updated_count INTEGER := 0;
+    booking_record RECORD;
+BEGIN
+    -- First, collect all bookings that need to be activated
+    FOR booking_record IN
+        SELECT id, slot_id, vehicle_id, station_id, user_id, start_time, end_time, current_battery_level
+        FROM public.bookings
+        WHERE status = 'confirmed'
+        AND start_time <= now()
+        AND start_time >= now() - lookback
+    LOOP
+        -- Update booking status to active
+        UPDATE public.bookings
+        SET status = 'active',
+            updated_at = now()
+        WHERE id = booking_record.id
+        AND start_time = booking_record.start_time;
+
+        -- Mark slot as occupied if slot_id exists
+        IF booking_record.slot_id IS NOT NULL THEN
+            UPDATE public.charging_slots
+            SET status = 'occupied',
+                updated_at = now()
+            WHERE id = booking_record.slot_id;
+        END IF;
+
+        -- Create charging session for this booking
+        INSERT INTO public.charging_sessions (
+            booking_id, vehicle_id, station_id, user_id, slot_id,
+            start_time, end_time, initial_battery_level, final_battery_level,
+            energy_used, cost, status, created_at, updated_at
+        ) VALUES (
+            booking_record.id,
+            booking_record.vehicle_id,
+            booking_record.station_id,
+            booking_record.user_id,
+            booking_record.slot_id,
+            booking_record.start_time,
+            booking_record.end_time,
+            COALESCE(booking_record.current_battery_level, 0),
+            NULL,
+            0,
+            0,
+            'active',
+            now(),
+            now()
+        );
+
+        updated_count := updated_count + 1;
+    END LOOP;
+
+    RETURN jsonb_build_object('updated_count', updated_count);
+END;
+$$;
+
+DROP FUNCTION IF EXISTS complete_expired_bookings();
+CREATE OR REPLACE FUNCTION complete_expired_bookings(lookback interval DEFAULT interval '7 days')
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    updated_count INTEGER := 0;
+    booking_record RECORD;
+    calculated_energy_used FLOAT := 0;
+    cost_calculated FLOAT := 0;
+BEGIN
+    -- First, collect all bookings that need to be completed
+    FOR booking_record IN
+        SELECT id, slot_id, station_id, end_time, start_time
+        FROM public.bookings
+        WHERE status = 'active'
+        AND end_time <= now()
+        AND start_time >= now() - lookback
+    LOOP
+        -- Update booking status to completed
+        UPDATE public.bookings
+        SET status = 'completed',
+            updated_at = now()
+        WHERE id = booking_record.id
+        AND start_time = booking_record.start_time;
+
+        -- Free up slot if slot_id exists
+        IF booking_record.slot_id IS NOT NULL THEN
+            UPDATE public.charging_slots
+            SET status = 'available',
+                updated_at = now()
+            WHERE id = booking_record.slot_id;
+        END IF;
+
+        -- Calculate energy used and cost for the charging session
+        -- Simple calculation: assume 50 kW charging rate for demo
+        calculated_energy_used := EXTRACT(EPOCH FROM (booking_record.end_time - booking_record.start_time)) / 3600 * 50; -- kWh
+
+        -- Get station pricing
+        SELECT COALESCE(price_per_hour, 10) INTO cost_calculated
+        FROM public.stations
+        WHERE id = booking_record.station_id;
+
+        -- Calculate cost based on time
+        cost_calculated := cost_calculated * EXTRACT(EPOCH FROM (booking_record.end_time - booking_record.start_time)) / 3600;
+
+        -- Update charging session with final data; sessions created by activation share the booking's start_time
+        UPDATE public.charging_sessions
+        SET
+            final_battery_level = 100, -- Assume full charge for demo
+            energy_used = calculated_energy_used,
+            cost = cost_calculated,
+            status = 'completed',
+            updated_at = now()
+        WHERE booking_id = booking_record.id
+        AND start_time >= booking_record.start_time - lookback;
+
+        updated_count := updated_count + 1;
+    END LOOP;
+
+    RETURN jsonb_build_object('updated_count', updated_count);
+END;
+$$;
@@ -0,0 +1,254 @@
+-- Migration: Live charger telemetry for active charging sessions
+-- Date: October 23, 2026
+-- Description: Until now a session's energy_used and cost were only known once
+-- complete_expired_bookings() closed it, and were estimated from the booking window (50 kW flat).
+-- Chargers now post meter readings (cumulative kWh, power kW, state of charge) to the backend,
+-- which keeps them in per-session ring buffers and flushes one downsampled point per session and
+-- TELEMETRY_BUCKET_SECONDS bucket through ingest_session_telemetry(). Raw samples never reach
+-- Postgres.
+--
+-- * session_telemetry holds the downsampled points. It is partitioned by month on bucket_start
+--   like charging_sessions, so ensure_monthly_partitions() now covers it too and old months can be
+--   detached with detach_monthly_partitions().
+-- * charging_sessions gains current_power_kw, current_soc and telemetry_at; energy_used and cost
+--   are kept up to date while the session runs.
+-- * complete_expired_bookings() keeps the metered energy and last state of charge of sessions that
+--   reported telemetry and only falls back to the estimate for those that did not.
+
+-- ------------------------------------------------------------
+-- Live columns on charging_sessions
+-- ------------------------------------------------------------
+
+ALTER TABLE public.charging_sessions
+ADD COLUMN IF NOT EXISTS current_power_kw numeric(7,2),
+ADD COLUMN IF NOT EXISTS current_soc numeric(5,2),
+ADD COLUMN IF NOT EXISTS telemetry_at timestamptz;
+
+-- ------------------------------------------------------------
+-- Downsampled points
+-- ------------------------------------------------------------
+
+-- No foreign key to charging_sessions: its primary key is (id, start_time) since partitioning
+CREATE TABLE IF NOT EXISTS public.session_telemetry (
+    session_id uuid NOT NULL,
+    bucket_start timestamptz NOT NULL,
+    station_id uuid,
+    samples integer NOT NULL DEFAULT 0,
+    energy_kwh numeric(10,3),        -- meter reading at the end of the bucket, cumulative for the session
+    power_kw_avg numeric(7,2),
+    power_kw_max numeric(7,2),
+    soc numeric(5,2),                -- last state of charge in the bucket, percent
+    last_reading_at timestamptz,
+    PRIMARY KEY (session_id, bucket_start)
+) PARTITION BY RANGE (bucket_start);
+
+CREATE TABLE IF NOT EXISTS public.session_telemetry_default PARTITION OF public.session_telemetry DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_session_telemetry_station_bucket
+ON public.session_telemetry (station_id, bucket_start);
+
+-- Only the service role (the backend) reads and writes points
+ALTER TABLE public.session_telemetry ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.session_telemetry_default ENABLE ROW LEVEL SECURITY;
+
+DO $$
+DECLARE
+    m date;
+BEGIN
+    FOR m IN
+        SELECT generate_series(
+            date_trunc('month', now() AT TIME ZONE 'UTC') - interval '1 month',
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months',
+            interval '1 month'
+        )::date
+    LOOP
+        PERFORM public.create_monthly_partition('session_telemetry', 'bucket_start', m);
+    END LOOP;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.ensure_monthly_partitions(months_ahead integer DEFAULT 3)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    created_count integer := 0;
+    t record;
+    m date;
+BEGIN
+    FOR t IN
+        SELECT c.relname AS tbl, a.attname AS key
+        FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = 'public'
+        JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+        WHERE c.relname IN ('bookings', 'charging_sessions', 'user_activity_log', 'session_telemetry')
+    LOOP
+        FOR m IN
+            SELECT generate_series(
+                date_trunc('month', now() AT TIME ZONE 'UTC') - interval '1 month',
+                date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => months_ahead),
+                interval '1 month'
+            )::date
+        LOOP
+            IF public.create_monthly_partition(t.tbl, t.key, m) THEN
+                created_count := created_count + 1;
+            END IF;
+        END LOOP;
+    END LOOP;
+
+    RETURN jsonb_build_object(
+        'updated_count', created_count,
+        'message', format('Created %s monthly partitions', created_count)
+    );
+END;
+$$;
+
+-- ------------------------------------------------------------
+-- Bulk ingestion
+-- ------------------------------------------------------------
+
+-- Upsert a batch of downsampled points and move each session's live columns to its newest point.
+-- A bucket flushed twice (readings arrived on both sides of a flush) is merged: sample counts add
+-- up, the average is weighted by samples and the later reading wins for energy and SoC.
+-- `points` is a JSON array of objects with the session_telemetry columns plus session_start
+-- (the session's start_time, so the update is pruned to one partition) and cost.
+CREATE OR REPLACE FUNCTION public.ingest_session_telemetry(points jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    point_count integer := 0;
+    session_count integer := 0;
+BEGIN
+    INSERT INTO public.session_telemetry AS t (
+        session_id, bucket_start, station_id, samples, energy_kwh,
+        power_kw_avg, power_kw_max, soc, last_reading_at
+    )
+    SELECT p.session_id, p.bucket_start, p.station_id, p.samples, p.energy_kwh,
+           p.power_kw_avg, p.power_kw_max, p.soc, p.last_reading_at
+    FROM jsonb_to_recordset(points) AS p(
+        session_id uuid, bucket_start timestamptz, station_id uuid, samples integer, energy_kwh numeric,
+        power_kw_avg numeric, power_kw_max numeric, soc numeric, last_reading_at timestamptz
+    )
+    ON CONFLICT (session_id, bucket_start) DO UPDATE SET
+        samples = t.samples + EXCLUDED.samples,
+        power_kw_avg = (COALESCE(t.power_kw_avg, 0) * t.samples + COALESCE(EXCLUDED.power_kw_avg, 0) * EXCLUDED.samples)
+                       / NULLIF(t.samples + EXCLUDED.samples, 0),
+        power_kw_max = GREATEST(t.power_kw_max, EXCLUDED.power_kw_max),
+        energy_kwh = CASE WHEN EXCLUDED.last_reading_at >= t.last_reading_at
+                          THEN COALESCE(EXCLUDED.energy_kwh, t.energy_kwh) ELSE t.energy_kwh END,
+        soc = CASE WHEN EXCLUDED.last_reading_at >= t.last_reading_at
+                   THEN COALESCE(EXCLUDED.soc, t.soc) ELSE t.soc END,
+        last_reading_at = GREATEST(t.last_reading_at, EXCLUDED.last_reading_at);
+    GET DIAGNOSTICS point_count = ROW_COUNT;
+
+    -- The newest point of each session carries its live values
+    UPDATE public.charging_sessions s
+    SET energy_used = COALESCE(latest.energy_kwh, s.energy_used),
+        cost = COALESCE(latest.cost, s.cost),
+        current_power_kw = latest.power_kw,
+        current_soc = COALESCE(latest.soc, s.current_soc),
+        telemetry_at = latest.last_reading_at,
+        updated_at = now()
+    FROM (
+        SELECT DISTINCT ON (p.session_id)
+               p.session_id, p.session_start, p.energy_kwh, p.cost, p.power_kw, p.soc, p.last_reading_at
+        FROM jsonb_to_recordset(points) AS p(
+            session_id uuid, session_start timestamptz, energy_kwh numeric, cost numeric,
+            power_kw numeric, soc numeric, last_reading_at timestamptz
+        )
+        ORDER BY p.session_id, p.last_reading_at DESC
+    ) AS latest
+    WHERE s.id = latest.session_id
+      AND (latest.session_start IS NULL OR s.start_time = latest.session_start)
+      AND s.status = 'active'
+      AND (s.telemetry_at IS NULL OR s.telemetry_at <= latest.last_reading_at);
+    GET DIAGNOSTICS session_count = ROW_COUNT;
+
+    RETURN jsonb_build_object('updated_count', point_count, 'session_count', session_count);
+END;
+$$;
+
+-- ------------------------------------------------------------
+-- Completion keeps metered values
+-- ------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION complete_expired_bookings(lookback interval DEFAULT interval '7 days')
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    updated_count INTEGER := 0;
+    booking_record RECORD;
+    calculated_energy_used FLOAT := 0;
+    cost_calculated FLOAT := 0;
+BEGIN
+    -- First, collect all bookings that need to be completed
+    FOR booking_record IN
+        SELECT id, slot_id, station_id, end_time, start_time
+        FROM public.bookings
+        WHERE status = 'active'
+        AND end_time <= now()
+        AND start_time >= now() - lookback
+    LOOP
+        -- Update booking status to completed
+        UPDATE public.bookings
+        SET status = 'completed',
+            updated_at = now()
+        WHERE id = booking_record.id
+        AND start_time = booking_record.start_time;
+
+        -- Free up slot if slot_id exists
+        IF booking_record.slot_id IS NOT NULL THEN
+            UPDATE public.charging_slots
+            SET status = 'available',
+                updated_at = now()
+            WHERE id = booking_record.slot_id;
+        END IF;
+
+        -- Estimated energy for sessions without telemetry: assume a 50 kW charging rate
+        calculated_energy_used := EXTRACT(EPOCH FROM (booking_record.end_time - booking_record.start_time)) / 3600 * 50; -- kWh
+
+        -- Get station pricing
+        SELECT COALESCE(price_per_hour, 10) INTO cost_calculated
+        FROM public.stations
+        WHERE id = booking_record.station_id;
+
+        -- Calculate cost based on time
+        cost_calculated := cost_calculated * EXTRACT(EPOCH FROM (booking_record.end_time - booking_record.start_time)) / 3600;
+
+        -- Sessions that reported telemetry keep the metered energy and last state of charge
+        UPDATE public.charging_sessions
+        SET
+            final_battery_level = CASE WHEN telemetry_at IS NOT NULL AND current_soc IS NOT NULL
+                                       THEN round(current_soc)::integer ELSE 100 END,
+            energy_used = CASE WHEN telemetry_at IS NOT NULL THEN energy_used ELSE calculated_energy_used END,
+            cost = cost_calculated,
+            current_power_kw = NULL,
+            status = 'completed',
+            updated_at = now()
+        WHERE booking_id = booking_record.id
+        AND start_time >= booking_record.start_time - lookback;
+
+        updated_count := updated_count + 1;
+    END LOOP;
+
+    RETURN jsonb_build_object('updated_count', updated_count);
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.ingest_session_telemetry(jsonb) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION public.ingest_session_telemetry(jsonb) FROM anon, authenticated;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION public.ingest_session_telemetry(jsonb) TO service_role;
+    END IF;
+END $$;
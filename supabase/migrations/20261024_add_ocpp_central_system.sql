@@ -0,0 +1,191 @@
+-- Migration: OCPP 1.6-J central system
+-- Date: October 24, 2026
+-- Description: Chargers connect to the backend over OCPP 1.6-J (WebSocket /ocpp/{charge_point_id})
+-- instead of slot status being set by hand through update_slot.
+--
+-- * charging_slots gains charge_point_id + connector_id, which map a charger's connector to a slot,
+--   and the raw OCPP status / error code last reported for it.
+-- * charging_sessions gains ocpp_transaction_id (from ocpp_transaction_id_seq; OCPP transaction ids
+--   are 32-bit integers) and meter_start_wh, the meter reading the transaction started at.
+-- * ocpp_apply_batch() applies a batch of connector status changes, transaction starts and
+--   transaction stops collected by the backend over a short window, in one call.
+
+-- ------------------------------------------------------------
+-- Connector mapping and status
+-- ------------------------------------------------------------
+
+ALTER TABLE public.charging_slots
+ADD COLUMN IF NOT EXISTS charge_point_id text,
+ADD COLUMN IF NOT EXISTS connector_id integer,
+ADD COLUMN IF NOT EXISTS ocpp_status text,
+ADD COLUMN IF NOT EXISTS ocpp_error_code text,
+ADD COLUMN IF NOT EXISTS ocpp_status_at timestamptz;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_charging_slots_connector
+ON public.charging_slots (charge_point_id, connector_id)
+WHERE charge_point_id IS NOT NULL;
+
+-- ------------------------------------------------------------
+-- Transactions
+-- ------------------------------------------------------------
+
+CREATE SEQUENCE IF NOT EXISTS public.ocpp_transaction_id_seq AS integer;
+
+ALTER TABLE public.charging_sessions
+ADD COLUMN IF NOT EXISTS ocpp_transaction_id integer,
+ADD COLUMN IF NOT EXISTS meter_start_wh bigint;
+
+CREATE INDEX IF NOT EXISTS idx_charging_sessions_ocpp_transaction
+ON public.charging_sessions (ocpp_transaction_id)
+WHERE ocpp_transaction_id IS NOT NULL;
+
+-- ------------------------------------------------------------
+-- Batched updates
+-- ------------------------------------------------------------
+
+-- statuses: [{slot_id, ocpp_status, error_code, status, at}], one per slot; status is the slot
+--   status the OCPP status maps to, or null to leave it unchanged.
+-- starts:   [{ref, slot_id, id_tag, meter_start, at}]. A start is accepted when the slot has a
+--   confirmed or active booking covering `at`; the booking is activated and its session (created
+--   here if activate_started_bookings() has not run yet) linked to the transaction.
+-- stops:    [{transaction_id, meter_stop, at, reason}]. Closes the session with the metered
+--   energy and completes its booking. A session the lifecycle job already completed keeps its
+--   end time and cost but gets the metered energy.
+-- Returns {"statuses", "stops", "starts": [{ref, transaction_id, status, session}]}.
+CREATE OR REPLACE FUNCTION public.ocpp_apply_batch(
+    statuses jsonb DEFAULT '[]'::jsonb,
+    starts jsonb DEFAULT '[]'::jsonb,
+    stops jsonb DEFAULT '[]'::jsonb
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    status_count integer := 0;
+    stop_count integer := 0;
+    start_results jsonb := '[]'::jsonb;
+    s record;
+    b record;
+    sess record;
+    txn integer;
+    price numeric;
+BEGIN
+    UPDATE public.charging_slots c
+    SET ocpp_status = u.ocpp_status,
+        ocpp_error_code = u.error_code,
+        ocpp_status_at = u.at,
+        status = COALESCE(u.status, c.status),
+        updated_at = now()
+    FROM jsonb_to_recordset(statuses) AS u(slot_id uuid, ocpp_status text, error_code text, status text, at timestamptz)
+    WHERE c.id = u.slot_id
+      AND (c.ocpp_status_at IS NULL OR c.ocpp_status_at <= u.at);
+    GET DIAGNOSTICS status_count = ROW_COUNT;
+
+    FOR s IN
+        SELECT * FROM jsonb_to_recordset(starts) AS x(ref integer, slot_id uuid, id_tag text, meter_start bigint, at timestamptz)
+    LOOP
+        txn := nextval('public.ocpp_transaction_id_seq');
+
+        SELECT id, slot_id, vehicle_id, station_id, user_id, start_time, end_time, status, current_battery_level
+        INTO b
+        FROM public.bookings
+        WHERE slot_id = s.slot_id
+          AND status IN ('confirmed', 'active')
+          AND start_time <= s.at + interval '15 minutes'
+          AND start_time >= s.at - interval '2 days'
+          AND end_time > s.at
+        ORDER BY start_time
+        LIMIT 1;
+
+        IF NOT FOUND THEN
+            start_results := start_results || jsonb_build_object('ref', s.ref, 'transaction_id', txn, 'status', 'Invalid');
+            CONTINUE;
+        END IF;
+
+        IF b.status = 'confirmed' THEN
+            UPDATE public.bookings SET status = 'active', updated_at = now()
+            WHERE id = b.id AND start_time = b.start_time;
+        END IF;
+
+        UPDATE public.charging_slots SET status = 'occupied', updated_at = now() WHERE id = s.slot_id;
+
+        -- Sessions created by activation share the booking's start_time
+        UPDATE public.charging_sessions
+        SET ocpp_transaction_id = txn,
+            meter_start_wh = s.meter_start,
+            updated_at = now()
+        WHERE booking_id = b.id AND start_time = b.start_time AND status = 'active'
+        RETURNING id, station_id, user_id, start_time INTO sess;
+
+        IF NOT FOUND THEN
+            INSERT INTO public.charging_sessions (
+                booking_id, vehicle_id, station_id, user_id, slot_id,
+                start_time, end_time, initial_battery_level, final_battery_level,
+                energy_used, cost, status, ocpp_transaction_id, meter_start_wh, created_at, updated_at
+            ) VALUES (
+                b.id, b.vehicle_id, b.station_id, b.user_id, b.slot_id,
+                b.start_time, b.end_time, COALESCE(b.current_battery_level, 0), NULL,
+                0, 0, 'active', txn, s.meter_start, now(), now()
+            )
+            RETURNING id, station_id, user_id, start_time INTO sess;
+        END IF;
+
+        SELECT COALESCE(price_per_hour, 10) INTO price FROM public.stations WHERE id = b.station_id;
+
+        start_results := start_results || jsonb_build_object(
+            'ref', s.ref, 'transaction_id', txn, 'status', 'Accepted',
+            'session', jsonb_build_object(
+                'id', sess.id, 'station_id', sess.station_id, 'user_id', sess.user_id,
+                'start_time', sess.start_time, 'price_per_hour', COALESCE(price, 10)
+            )
+        );
+    END LOOP;
+
+    FOR s IN
+        SELECT * FROM jsonb_to_recordset(stops) AS x(transaction_id integer, meter_stop bigint, at timestamptz, reason text)
+    LOOP
+        UPDATE public.charging_sessions cs
+        SET energy_used = GREATEST(0, s.meter_stop - COALESCE(cs.meter_start_wh, 0)) / 1000.0,
+            cost = CASE WHEN cs.status = 'active'
+                        THEN COALESCE(st.price_per_hour, 10) * GREATEST(0, EXTRACT(EPOCH FROM (s.at - cs.start_time))) / 3600
+                        ELSE cs.cost END,
+            end_time = CASE WHEN cs.status = 'active' THEN s.at ELSE cs.end_time END,
+            final_battery_level = COALESCE(round(cs.current_soc)::integer, cs.final_battery_level),
+            current_power_kw = NULL,
+            telemetry_at = s.at,
+            status = 'completed',
+            updated_at = now()
+        FROM public.stations st
+        WHERE cs.ocpp_transaction_id = s.transaction_id
+          AND cs.start_time >= s.at - interval '7 days'
+          AND st.id = cs.station_id
+        RETURNING cs.booking_id INTO sess;
+
+        IF FOUND THEN
+            stop_count := stop_count + 1;
+            UPDATE public.bookings SET status = 'completed', updated_at = now()
+            WHERE id = sess.booking_id AND status = 'active' AND start_time >= s.at - interval '7 days';
+        END IF;
+    END LOOP;
+
+    RETURN jsonb_build_object(
+        'updated_count', status_count + jsonb_array_length(start_results) + stop_count,
+        'statuses', status_count,
+        'stops', stop_count,
+        'starts', start_results
+    );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.ocpp_apply_batch(jsonb, jsonb, jsonb) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION public.ocpp_apply_batch(jsonb, jsonb, jsonb) FROM anon, authenticated;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION public.ocpp_apply_batch(jsonb, jsonb, jsonb) TO service_role;
+    END IF;
+END $$;
@@ -0,0 +1,10 @@
+-- Migration: Stamp catalog changes when their version is assigned
+-- Date: October 25, 2026
+-- Description: catalog_changes.changed_at defaulted to now(), the start of the writing
+-- transaction, while the version comes from the bigserial when the row is inserted. A long
+-- transaction could therefore hold a higher version with an older changed_at than a lower,
+-- still uncommitted version, defeating the settle window /stations/changes waits out before
+-- handing out a version. clock_timestamp() stamps the entry when its version is taken.
+
+ALTER TABLE public.catalog_changes
+ALTER COLUMN changed_at SET DEFAULT clock_timestamp();
@@ -0,0 +1,63 @@
+-- Migration: Job leases
+-- Date: October 26, 2026
+-- Description: Every backend worker schedules the periodic jobs. Jobs that must not run
+-- concurrently (archive_cold_rows, which writes Parquet and deletes from the hot tables)
+-- take a lease first. A lease belongs to one holder until it is released or its ttl runs
+-- out, so a worker that dies mid-run blocks the job for at most ttl_seconds. Session
+-- advisory locks would not survive PostgREST handing each RPC call its own connection.
+
+CREATE TABLE IF NOT EXISTS public.job_leases (
+    job_name text PRIMARY KEY,
+    holder text NOT NULL,
+    expires_at timestamp with time zone NOT NULL
+);
+
+ALTER TABLE public.job_leases OWNER TO postgres;
+ALTER TABLE public.job_leases ENABLE ROW LEVEL SECURITY;
+
+-- True when lease_holder now holds the lease on lease_job (newly taken, expired, or already its own)
+CREATE OR REPLACE FUNCTION public.try_acquire_job_lease(lease_job text, lease_holder text, ttl_seconds integer DEFAULT 3600)
+RETURNS boolean
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    acquired text;
+BEGIN
+    INSERT INTO public.job_leases AS l (job_name, holder, expires_at)
+    VALUES (lease_job, lease_holder, now() + make_interval(secs => ttl_seconds))
+    ON CONFLICT (job_name) DO UPDATE
+    SET holder = EXCLUDED.holder, expires_at = EXCLUDED.expires_at
+    WHERE l.expires_at < now() OR l.holder = EXCLUDED.holder
+    RETURNING l.holder INTO acquired;
+    RETURN acquired IS NOT NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.release_job_lease(lease_job text, lease_holder text)
+RETURNS boolean
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    DELETE FROM public.job_leases l
+    WHERE l.job_name = lease_job AND l.holder = lease_holder;
+    RETURN FOUND;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.try_acquire_job_lease(text, text, integer) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.release_job_lease(text, text) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION public.try_acquire_job_lease(text, text, integer) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION public.release_job_lease(text, text) FROM anon, authenticated;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION public.try_acquire_job_lease(text, text, integer) TO service_role;
+        GRANT EXECUTE ON FUNCTION public.release_job_lease(text, text) TO service_role;
+    END IF;
+END $$;
@@ -0,0 +1,89 @@
+-- Migration: Atomic slot hold placement
+-- Date: October 27, 2026
+-- Description: create_slot_hold used to check for overlapping bookings/holds and then
+-- delete + insert in separate requests, so two users could both be granted the same
+-- slot and window. place_slot_hold() does the checks and the insert in one transaction
+-- under a per-slot transaction lock, takes station_id from the slot itself rather than
+-- the caller, and caps how long a user can keep one slot held by re-posting: a renewal
+-- keeps the original created_at and never extends expires_at past
+-- created_at + max_minutes. An exclusion constraint is not used because expired rows
+-- stay in the table until expire_slot_holds() runs and would still conflict.
+
+CREATE OR REPLACE FUNCTION public.place_slot_hold(
+    hold_user_id uuid,
+    hold_station_id uuid,
+    hold_slot_id uuid,
+    hold_start timestamp with time zone,
+    hold_end timestamp with time zone,
+    hold_minutes integer,
+    max_minutes integer,
+    hold_connector_type text DEFAULT NULL,
+    check_bookings boolean DEFAULT true
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    slot_station uuid;
+    held_since timestamp with time zone;
+    new_expires timestamp with time zone;
+    created public.slot_holds;
+BEGIN
+    -- Serialise every placement on this slot until the transaction ends
+    PERFORM pg_advisory_xact_lock(hashtext('slot_hold:' || hold_slot_id::text));
+
+    SELECT s.station_id INTO slot_station FROM public.charging_slots s WHERE s.id = hold_slot_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'slot_not_found');
+    END IF;
+    IF slot_station IS DISTINCT FROM hold_station_id THEN
+        RETURN jsonb_build_object('status', 'station_mismatch', 'station_id', slot_station);
+    END IF;
+
+    IF check_bookings AND EXISTS (
+        SELECT 1 FROM public.bookings b
+        WHERE b.slot_id = hold_slot_id
+          AND b.status IN ('confirmed', 'active', 'pending')
+          AND b.start_time < hold_end AND b.end_time > hold_start
+    ) THEN
+        RETURN jsonb_build_object('status', 'booked');
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM public.slot_holds h
+        WHERE h.slot_id = hold_slot_id
+          AND h.user_id <> hold_user_id
+          AND h.expires_at > now()
+          AND h.start_time < hold_end AND h.end_time > hold_start
+    ) THEN
+        RETURN jsonb_build_object('status', 'held');
+    END IF;
+
+    -- A renewal on the same slot keeps counting from the first hold
+    SELECT min(h.created_at) INTO held_since FROM public.slot_holds h
+    WHERE h.user_id = hold_user_id AND h.slot_id = hold_slot_id AND h.expires_at > now();
+    held_since := coalesce(held_since, now());
+    new_expires := least(now() + make_interval(mins => hold_minutes),
+                         held_since + make_interval(mins => max_minutes));
+
+    DELETE FROM public.slot_holds h WHERE h.user_id = hold_user_id;
+    INSERT INTO public.slot_holds (user_id, station_id, slot_id, connector_type, start_time, end_time, expires_at, created_at)
+    VALUES (hold_user_id, slot_station, hold_slot_id, hold_connector_type, hold_start, hold_end, new_expires, held_since)
+    RETURNING * INTO created;
+
+    RETURN jsonb_build_object('status', 'ok', 'hold', to_jsonb(created));
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.place_slot_hold(uuid, uuid, uuid, timestamp with time zone, timestamp with time zone, integer, integer, text, boolean) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION public.place_slot_hold(uuid, uuid, uuid, timestamp with time zone, timestamp with time zone, integer, integer, text, boolean) FROM anon, authenticated;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION public.place_slot_hold(uuid, uuid, uuid, timestamp with time zone, timestamp with time zone, integer, integer, text, boolean) TO service_role;
+    END IF;
+END $$;